@@ -11,9 +11,14 @@ Documentation for sherlock can be found here: http://sherlock.readthedocs.org
 Usage:
     sherlock init
     sherlock info [-s <pathToSettingsFile>]
-    sherlock [-NA] dbmatch [--update] [-s <pathToSettingsFile>]
+    sherlock [-NAD] dbmatch [--update] [-s <pathToSettingsFile>]
+    sherlock [-A] annotate [-s <pathToSettingsFile>]
+    sherlock annotate (--compact|--expand) [-s <pathToSettingsFile>]
     sherlock [-bN] match -- <ra> <dec> [<pathToSettingsFile>] 
     sherlock clean [-s <pathToSettingsFile>]
+    sherlock partition [-s <pathToSettingsFile>]
+    sherlock photometry [-s <pathToSettingsFile>]
+    sherlock [-D] nedprefetch [-s <pathToSettingsFile>]
     sherlock wiki [-s <pathToSettingsFile>]
     sherlock import ned <ra> <dec> <radiusArcsec> [-s <pathToSettingsFile>]
     sherlock import cat <cat_name> <pathToDataFile> <cat_version> [-s <pathToSettingsFile>]
@@ -23,7 +28,11 @@ Options:
     init                    setup the sherlock settings file for the first time
     match                   XXXX
     dbmatch                 database match
+    annotate                backfill the peak magnitudes, annotations and summaries of classified transients from the results already in the transient database
     clean                   XXXX
+    partition               partition the result tables (see `result table partitioning` in the settings), add partitions ahead of new results and purge partitions past their retention
+    photometry              convert `sherlock_crossmatches` to the photometry layout set by `sparse photometry` in the settings (compact or one column per magnitude band)
+    nedprefetch             refresh the NED stream around the locations queued by `dbmatch` (with `ned prefetch: True` in the settings) and flag their transients for reclassification
     wiki                    XXXX
     import                  XXXX
     ned                     use the online NED database as the source catalogue
@@ -39,6 +48,9 @@ Options:
 
     -N, --skipNedUpdate     do not update the NED database before classification
     -A, --skipMagUpdate     do not update the peak magnitudes and human readable text annotations of objects (can eat up some time)
+    -D, --daemon            keep running, classifying new transients as they land in the database (SIGTERM/ctrl-c drains the in-flight batch then exits). With `nedprefetch`, keep polling the NED prefetch queue
+    --compact               convert the annotations stored in the transient database to the compact (link template + parameters) form
+    --expand                convert compact annotations stored in the transient database back to full html
     -h, --help              show this help message
     -s, --settings          the settings file
     -b, --verbose           print more details to stdout
@@ -165,6 +177,10 @@ def main(arguments=None):
     init = a["init"]
     match = a["match"]
     dbmatch = a["dbmatch"]
+    annotate = a["annotate"]
+    partition = a["partition"]
+    photometry = a["photometry"]
+    nedprefetch = a["nedprefetch"]
     clean = a["clean"]
     wiki = a["wiki"]
     iimport = a["import"]
@@ -181,6 +197,9 @@ def main(arguments=None):
     pathToDataFile = a["pathToDataFile"]
     skipNedUpdateFlag = a["skipNedUpdateFlag"]
     skipMagUpdateFlag = a["skipMagUpdateFlag"]
+    daemonFlag = a["daemonFlag"]
+    compactFlag = a["compactFlag"]
+    expandFlag = a["expandFlag"]
     settingsFlag = a["settingsFlag"]
     verboseFlag = a["verboseFlag"]
     updateFlag = a["updateFlag"]
@@ -215,11 +234,66 @@ def main(arguments=None):
             verbose=verbose,
             update=updateFlag,
             updateNed=updateNed,
-            updatePeakMags=updatePeakMags
+            updatePeakMags=updatePeakMags,
+            daemonMode=daemonFlag
         )
 
         classifier.classify()
 
+    if annotate and (compactFlag or expandFlag):
+        classifier = transient_classifier(
+            log=log,
+            settings=settings,
+            updateNed=False
+        )
+        classifier.migrate_annotations(compact=compactFlag)
+    elif annotate:
+        classifier = transient_classifier(
+            log=log,
+            settings=settings,
+            update=True,
+            updateNed=False
+        )
+        # MAKE SURE THE COMPACT-ANNOTATION COLUMNS EXIST (BACKFILLS CAN RUN
+        # WITHOUT A PRECEDING CLASSIFICATION)
+        classifier._create_tables_if_not_exist()
+        if not skipMagUpdateFlag and settings["database settings"]["transients"]["transient peak magnitude query"]:
+            classifier.update_peak_magnitudes()
+        classifier.update_classification_annotations_and_summaries(
+            updatePeakMagnitudes=not skipMagUpdateFlag)
+
+    if partition:
+        from sherlock.commonutils import result_table_partitioner
+        classifier = transient_classifier(
+            log=log,
+            settings=settings,
+            updateNed=False
+        )
+        partitioner = result_table_partitioner(
+            log=log,
+            dbConn=classifier.transientsDbConn,
+            settings=classifier.settings
+        )
+        partitioner.migrate()
+        partitioner.ensure_partitions()
+        partitioner.purge()
+
+    if photometry:
+        classifier = transient_classifier(
+            log=log,
+            settings=settings,
+            updateNed=False
+        )
+        classifier.convert_photometry_layout()
+
+    if nedprefetch:
+        classifier = transient_classifier(
+            log=log,
+            settings=settings,
+            daemonMode=daemonFlag
+        )
+        classifier.prefetch_ned()
+
     if clean:
         cleaner = database_cleaner(
             log=log,
@@ -5,3 +5,14 @@ from __future__ import absolute_import
 from .update_wiki_pages import update_wiki_pages
 from .getpackagepath import getpackagepath
 from .get_crossmatch_catalogues_column_map import get_crossmatch_catalogues_column_map
+from .adaptive_batch_controller import adaptive_batch_controller
+from .bulk_result_writer import bulk_result_writer
+from .annotation_renderer import annotation_renderer
+from .sparse_photometry import pack_photometry, unpack_photometry
+from .result_table_partitioner import result_table_partitioner
+from .checkpoint_journal import checkpoint_journal
+from .ned_coverage_map import ned_coverage_map
+from .disc_cover import disc_cover
+from .concurrent_fetcher import concurrent_fetcher
+from .response_cache import response_cache
+from .ned_prefetch_queue import ned_prefetch_queue
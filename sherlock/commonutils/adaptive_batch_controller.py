@@ -0,0 +1,227 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*Tune the classifier's mini-batch and worker-pool sizes from the measured crossmatch throughput, sky density and memory use*
+
+:Author:
+    David Young
+"""
+import os
+os.environ['TERM'] = 'vt100'
+
+
+class adaptive_batch_controller(object):
+    """
+    *Tune the classifier's mini-batch and worker-pool sizes from the measured crossmatch throughput, sky density and memory use*
+
+    After each round of crossmatching the classifier reports the size, wall-clock time and number of catalogue matches of every mini-batch. The controller fits a simple cost model (seconds = a x transients + b x matches) to the most recent batches and picks the mini-batch size that lets a batch from the *densest* part of the recent sky finish close to the target time. Dense Galactic-plane batches therefore get smaller and no longer leave a single straggler holding the pool. The pool size is stepped down when system memory use exceeds the configured ceiling, and back up again once there is headroom.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``settings`` -- the settings dictionary. Bounds are read from the ``adaptive batching`` block
+    - ``miniBatchSize`` -- the initial mini-batch size. Default *2500*
+    - ``poolSize`` -- the initial worker-pool size. Default *False* (number of CPUs - 1)
+
+    The ``adaptive batching`` settings block:
+
+    ```yaml
+    adaptive batching:
+        enabled: True
+        min mini batch size: 100
+        max mini batch size: 10000
+        min pool size: 1
+        max pool size: False
+        target batch seconds: 60
+        max memory percent: 85
+        history length: 50
+    ```
+
+    **Usage**
+
+    ```python
+    from sherlock.commonutils import adaptive_batch_controller
+    controller = adaptive_batch_controller(
+        log=log,
+        settings=settings,
+        miniBatchSize=2500
+    )
+    for result in batchResults:
+        controller.record(
+            transientCount=result["transients"],
+            seconds=result["seconds"],
+            matchCount=len(result["crossmatches"])
+        )
+    miniBatchSize, poolSize = controller.update()
+    ```
+    """
+    # INITIALISATION
+
+    def __init__(
+            self,
+            log,
+            settings=False,
+            miniBatchSize=2500,
+            poolSize=False
+    ):
+        import psutil
+
+        self.log = log
+        log.debug("instansiating a new 'adaptive_batch_controller' object")
+        self.settings = settings
+
+        bounds = {}
+        if settings and "adaptive batching" in settings and settings["adaptive batching"]:
+            bounds = settings["adaptive batching"]
+
+        cpuCount = max(1, psutil.cpu_count() - 1)
+        self.minMiniBatchSize = int(bounds.get("min mini batch size", 100))
+        self.maxMiniBatchSize = int(bounds.get("max mini batch size", 10000))
+        self.minPoolSize = int(bounds.get("min pool size", 1))
+        self.maxPoolSize = bounds.get("max pool size", False) or cpuCount
+        self.maxPoolSize = int(self.maxPoolSize)
+        self.targetSeconds = float(bounds.get("target batch seconds", 60.))
+        self.maxMemoryPercent = float(bounds.get("max memory percent", 85.))
+        self.historyLength = int(bounds.get("history length", 50))
+
+        if not poolSize:
+            poolSize = cpuCount
+        self.miniBatchSize = self._clamp(
+            int(miniBatchSize), self.minMiniBatchSize, self.maxMiniBatchSize)
+        self.poolSize = self._clamp(
+            int(poolSize), self.minPoolSize, self.maxPoolSize)
+
+        # (TRANSIENT COUNT, SECONDS, MATCH COUNT) OF THE MOST RECENT BATCHES
+        self.history = []
+        self.decisions = []
+
+        return None
+
+    def record(
+            self,
+            transientCount,
+            seconds,
+            matchCount=0):
+        """*record the outcome of a single crossmatched mini-batch*
+
+        **Key Arguments**
+
+        - ``transientCount`` -- number of transients in the mini-batch
+        - ``seconds`` -- wall-clock time taken to crossmatch the mini-batch
+        - ``matchCount`` -- number of catalogue matches returned for the mini-batch. Default *0*
+
+        **Usage**
+
+        ```python
+        controller.record(transientCount=2500, seconds=48.2, matchCount=31022)
+        ```
+        """
+        if not transientCount:
+            return None
+        self.history.append(
+            (float(transientCount), float(seconds), float(matchCount)))
+        self.history = self.history[-self.historyLength:]
+        return None
+
+    def update(
+            self,
+            memoryPercent=None):
+        """*recompute the mini-batch and pool sizes from the recorded batches*
+
+        **Key Arguments**
+
+        - ``memoryPercent`` -- current system memory use (percent). Default *None* (read from ``psutil``)
+
+        **Return**
+
+        - ``miniBatchSize`` -- the mini-batch size to use for the next round
+        - ``poolSize`` -- the worker-pool size to use for the next round
+
+        **Usage**
+
+        ```python
+        miniBatchSize, poolSize = controller.update()
+        ```
+        """
+        self.log.debug('starting the ``update`` method')
+
+        import psutil
+
+        oldMiniBatchSize = self.miniBatchSize
+        oldPoolSize = self.poolSize
+        reasons = []
+
+        # MINI-BATCH SIZE FROM THE COST MODEL
+        if len(self.history):
+            costPerTransient = self._worst_case_seconds_per_transient()
+            if costPerTransient > 0:
+                proposed = self.targetSeconds / costPerTransient
+                # DAMP THE STEP SO A SINGLE ODD ROUND CANNOT SWING THE SIZE WILDLY
+                proposed = min(max(proposed, oldMiniBatchSize * 0.5),
+                               oldMiniBatchSize * 2.)
+                self.miniBatchSize = self._clamp(
+                    int(proposed), self.minMiniBatchSize, self.maxMiniBatchSize)
+                reasons.append("%(costPerTransient)0.4fs per transient in the densest recent batches" % locals())
+
+        # POOL SIZE FROM MEMORY PRESSURE
+        if memoryPercent is None:
+            memoryPercent = psutil.virtual_memory().percent
+        if memoryPercent > self.maxMemoryPercent and self.poolSize > self.minPoolSize:
+            self.poolSize -= 1
+            reasons.append("memory at %(memoryPercent)0.0f%%" % locals())
+        elif memoryPercent < self.maxMemoryPercent - 15. and self.poolSize < self.maxPoolSize:
+            self.poolSize += 1
+            reasons.append("memory at %(memoryPercent)0.0f%%" % locals())
+
+        if self.miniBatchSize != oldMiniBatchSize or self.poolSize != oldPoolSize:
+            reasons = "; ".join(reasons)
+            newMiniBatchSize = self.miniBatchSize
+            newPoolSize = self.poolSize
+            message = "adaptive batching: mini-batch size %(oldMiniBatchSize)s -> %(newMiniBatchSize)s, pool size %(oldPoolSize)s -> %(newPoolSize)s (%(reasons)s)" % locals()
+            self.log.info(message)
+            self.decisions.append(message)
+
+        self.log.debug('completed the ``update`` method')
+        return self.miniBatchSize, self.poolSize
+
+    def _worst_case_seconds_per_transient(
+            self):
+        """*predict the crossmatch time per transient for the densest batches recently seen*
+
+        Fits seconds = a x transients + b x matches by least squares (falling back to a plain seconds-per-transient ratio when the fit is degenerate) and evaluates it at the 90th percentile of matches-per-transient.
+
+        **Return**
+
+        - ``costPerTransient`` -- predicted seconds per transient
+        """
+        import numpy as np
+
+        history = np.array(self.history)
+        transients = history[:, 0]
+        seconds = history[:, 1]
+        matches = history[:, 2]
+        density = matches / transients
+        worstDensity = np.percentile(density, 90)
+
+        a = b = None
+        if len(history) >= 3 and np.ptp(density) > 0:
+            design = np.vstack([transients, matches]).T
+            (a, b), _, _, _ = np.linalg.lstsq(design, seconds, rcond=None)
+            if a < 0 or b < 0:
+                a = b = None
+
+        if a is None:
+            return float(np.percentile(seconds / transients, 90))
+        return float(a + b * worstDensity)
+
+    def _clamp(
+            self,
+            value,
+            lower,
+            upper):
+        """*clamp a value between lower and upper bounds*
+        """
+        return max(lower, min(upper, value))
+
+    # use the tab-trigger below for new method
+    # xt-class-method
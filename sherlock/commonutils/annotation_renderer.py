@@ -0,0 +1,553 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*Render the human-readable annotations and summaries of transient-catalogue source matches*
+
+:Author:
+    David Young
+"""
+import os
+os.environ['TERM'] = 'vt100'
+
+# CATALOGUE LINK TEMPLATES -- BUILT ONCE AT IMPORT RATHER THAN %-FORMATTED
+# FOR EVERY MATCH
+_NED_URL_PREFIX = "https://ned.ipac.caltech.edu/cgi-bin/objsearch?objname="
+_NED_URL_SUFFIX = "&extend=no&hconst=73&omegam=0.27&omegav=0.73&corr_z=1&out_csys=Equatorial&out_equinox=J2000.0&obj_sort=RA+or+Longitude&of=pre_text&zv_breaker=30000.0&list_limit=5&img_stamp=YES"
+_SDSS_URL_PREFIX = "http://skyserver.sdss.org/dr12/en/tools/explore/Summary.aspx?id="
+
+_MILLIQUAS_URL_PREFIX = (
+    "https://heasarc.gsfc.nasa.gov/db-perl/W3Browse/w3table.pl?popupFrom=Query+Results&"
+    "tablehead=name%3Dheasarc_milliquas%26description%3DMillion+Quasars+Catalog+%28MILLIQUAS%29%2C+Version+4.8+%2822+June+2016%29%26url%3Dhttp%3A%2F%2Fheasarc.gsfc.nasa.gov%2FW3Browse%2Fgalaxy-catalog%2Fmilliquas.html%26archive%3DN%26radius%3D1%26mission%3DGALAXY+CATALOG%26priority%3D5%26tabletype%3DObject&"
+    "dummy=Examples+of+query+constraints%3A&varon=name&"
+    "bparam_name=%3D%22"
+)
+
+_MILLIQUAS_URL_SUFFIX = (
+    "%22&bparam_name%3A%3Aunit=+&bparam_name%3A%3Aformat=char25&"
+    "varon=ra&bparam_ra=&bparam_ra%3A%3Aunit=degree&"
+    "bparam_ra%3A%3Aformat=float8%3A.5f&varon=dec&bparam_dec=&"
+    "bparam_dec%3A%3Aunit=degree&bparam_dec%3A%3Aformat=float8%3A.5f&"
+    "varon=bmag&bparam_bmag=&bparam_bmag%3A%3Aunit=mag&"
+    "bparam_bmag%3A%3Aformat=float8%3A4.1f&varon=rmag&bparam_rmag=&"
+    "bparam_rmag%3A%3Aunit=mag&bparam_rmag%3A%3Aformat=float8%3A4.1f&"
+    "varon=redshift&bparam_redshift=&bparam_redshift%3A%3Aunit=+&"
+    "bparam_redshift%3A%3Aformat=float8%3A6.3f&varon=radio_name&"
+    "bparam_radio_name=&bparam_radio_name%3A%3Aunit=+&"
+    "bparam_radio_name%3A%3Aformat=char22&varon=xray_name&"
+    "bparam_xray_name=&bparam_xray_name%3A%3Aunit=+&"
+    "bparam_xray_name%3A%3Aformat=char22&bparam_lii=&"
+    "bparam_lii%3A%3Aunit=degree&bparam_lii%3A%3Aformat=float8%3A.5f&"
+    "bparam_bii=&bparam_bii%3A%3Aunit=degree&"
+    "bparam_bii%3A%3Aformat=float8%3A.5f&bparam_broad_type=&"
+    "bparam_broad_type%3A%3Aunit=+&bparam_broad_type%3A%3Aformat=char4&"
+    "bparam_optical_flag=&bparam_optical_flag%3A%3Aunit=+&"
+    "bparam_optical_flag%3A%3Aformat=char3&bparam_red_psf_flag=&"
+    "bparam_red_psf_flag%3A%3Aunit=+&"
+    "bparam_red_psf_flag%3A%3Aformat=char1&bparam_blue_psf_flag=&"
+    "bparam_blue_psf_flag%3A%3Aunit=+&"
+    "bparam_blue_psf_flag%3A%3Aformat=char1&bparam_ref_name=&"
+    "bparam_ref_name%3A%3Aunit=+&bparam_ref_name%3A%3Aformat=char6&"
+    "bparam_ref_redshift=&bparam_ref_redshift%3A%3Aunit=+&"
+    "bparam_ref_redshift%3A%3Aformat=char6&bparam_qso_prob=&"
+    "bparam_qso_prob%3A%3Aunit=percent&"
+    "bparam_qso_prob%3A%3Aformat=int2%3A3d&bparam_alt_name_1=&"
+    "bparam_alt_name_1%3A%3Aunit=+&"
+    "bparam_alt_name_1%3A%3Aformat=char22&bparam_alt_name_2=&"
+    "bparam_alt_name_2%3A%3Aunit=+&"
+    "bparam_alt_name_2%3A%3Aformat=char22&Entry=&Coordinates=J2000&"
+    "Radius=Default&Radius_unit=arcsec&"
+    "NR=CheckCaches%2FGRB%2FSIMBAD%2BSesame%2FNED&Time=&ResultMax=1000&"
+    "displaymode=Display&Action=Start+Search&table=heasarc_milliquas"
+)
+
+# OBJECT SUBTYPES THAT ARE MORE INFORMATIVE THAN THEIR OBJECT TYPE
+_PROMOTED_SUBTYPES = frozenset(["uvs", "radios", "xray", "qso", "irs", 'uves',
+                                'viss', 'hii', 'gclstr', 'ggroup', 'gpair', 'gtrpl'])
+_OBJECT_TYPE_NAMES = {
+    "star": "stellar source",
+    "agn": "AGN",
+    "cb": "CV",
+    "unknown": "unclassified source"
+}
+
+# MAGNITUDE COLUMNS IN ORDER OF PREFERENCE, WITH THE FILTER LABEL QUOTED IN THE
+# ANNOTATION
+_MAGNITUDE_FILTERS = [(f, f.replace("_", "").replace("Mag", "")) for f in ["R", "V", "B", "I", "J", "G", "H", "K", "U",
+                                                                          "_r", "_g", "_i", "_z", "_y", "_u", "W1", "unkMag"]]
+
+# LINKS ARE BUILT AS PREFIX + ID + MIDDLE + NAME + SUFFIX. COMPACT ANNOTATIONS
+# STORE ONLY THE TEMPLATE KEY AND THE ID/NAME, WITH THIS PLACEHOLDER IN THE TEXT
+LINK_PLACEHOLDER = "{link}"
+LINK_TEMPLATES = {
+    "ned": ('<a href="' + _NED_URL_PREFIX, _NED_URL_SUFFIX + '">', '</a>'),
+    "sdss": ('<a href="' + _SDSS_URL_PREFIX, '">', '</a>'),
+    "milliquas": ('<a href="' + _MILLIQUAS_URL_PREFIX, _MILLIQUAS_URL_SUFFIX + '">', '</a>')
+}
+
+# PRECOMPILED (POSITIONAL) ANNOTATION TEMPLATES
+_SYNONYMOUS_LOCATION_KPC = '%0.1f" (%0.1f Kpc) from the %s core'
+_SYNONYMOUS_LOCATION = '%0.1f" from the %s core'
+_ASSOCIATED_LOCATION_KPC = '%0.2f" %s, %0.2f" %s (%0.1f Kpc) from the %s centre'
+_ASSOCIATED_LOCATION = '%0.2f" %s, %0.2f" %s from the %s centre'
+_ABS_MAG = " A host %s implies a transient <em>M =</em> %s mag."
+_DISTANCE_MODULUS = " A host %s implies a <em>m - M =</em> %0.2f."
+_ANNOTATION = "The transient is %s with <em>%s</em>; %s%smag %s found in the %s. It's located %s.%s"
+_SUMMARY = '%0.1f" from %s in %s'
+
+
+class annotation_renderer(object):
+    """
+    *Render the human-readable annotations and summaries of transient-catalogue source matches*
+
+    Produces exactly the same text as the original per-match ``transient_classifier.generate_match_annotation`` code, but the per-catalogue link templates are built once at import, the sentence templates are positional (no ``locals()`` dictionary per match) and the SDSS names (sexagesimal conversions of the source coordinates) are memoised. ``render_batch`` renders a whole batch of matches in one call.
+
+    The annotation can also be rendered in a *compact* form for storage: the long NED/SDSS/MILLIQUAS hyperlink is replaced by a ``{link}`` placeholder and only the link template key (``annotation_template``) and the link id and name (``annotation_params``, JSON) are kept. ``expand`` rebuilds the full html from these (as does the ``view_sherlock_classifications_rendered`` database view) and ``compact`` converts a full annotation into the compact form.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``cacheSize`` -- the maximum number of SDSS names to hold in the coordinate-formatting cache. Default *100000*
+
+    **Usage**
+
+    ```python
+    from sherlock.commonutils import annotation_renderer
+    renderer = annotation_renderer(
+        log=log
+    )
+    annotation, summary, sep = renderer.render(
+        match=crossmatch,
+        updatePeakMagnitudes=False
+    )
+    results = renderer.render_batch(
+        matches=crossmatches,
+        updatePeakMagnitudes=True
+    )
+    ```
+    """
+    # INITIALISATION
+
+    def __init__(
+            self,
+            log,
+            cacheSize=100000
+    ):
+        from functools import lru_cache
+        from astrocalc.coords import unit_conversion
+
+        self.log = log
+        log.debug("instansiating a new 'annotation_renderer' object")
+        self.converter = unit_conversion(
+            log=self.log
+        )
+        # TYPED CACHE -- THE CONVERTER'S OUTPUT PRECISION DEPENDS ON THE REPR OF
+        # THE COORDINATE, SO e.g. 1.5 AND Decimal("1.5") MUST NOT SHARE AN ENTRY
+        self._sdss_name = lru_cache(maxsize=cacheSize, typed=True)(
+            self._format_sdss_name)
+
+        return None
+
+    def render(
+            self,
+            match,
+            updatePeakMagnitudes=False):
+        """*render the annotation and summary of a single transient-catalogue source match*
+
+        **Key Arguments**
+
+        - ``match`` -- the source crossmatched against the transient
+        - ``updatePeakMagnitudes`` -- quote the transient's absolute peak magnitude (``transientAbsMag``) rather than the host's distance modulus. Default *False*
+
+        **Return**
+
+        - ``annotation`` -- the full html annotation
+        - ``summary`` -- the one-line summary
+        - ``sep`` -- the transient-source separation in arcsec
+
+        **Usage**
+
+        ```python
+        annotation, summary, sep = renderer.render(
+            match=crossmatch,
+            updatePeakMagnitudes=False
+        )
+        ```
+        """
+        body, template, linkId, linkName, summary, sep = self._render_parts(
+            match, updatePeakMagnitudes)
+        if template:
+            prefix, middle, suffix = LINK_TEMPLATES[template]
+            body = body.replace(LINK_PLACEHOLDER, prefix + linkId +
+                                middle + linkName + suffix, 1)
+        return body, summary, sep
+
+    def render_columns(
+            self,
+            match,
+            updatePeakMagnitudes=False,
+            compact=False):
+        """*render a match straight into the annotation columns of the ``sherlock_classifications`` table*
+
+        **Key Arguments**
+
+        - ``match`` -- the source crossmatched against the transient
+        - ``updatePeakMagnitudes`` -- quote the transient's absolute peak magnitude rather than the host's distance modulus. Default *False*
+        - ``compact`` -- store the compact form of the annotation (link template key + parameters). Default *False*
+
+        **Return**
+
+        - ``columns`` -- dictionary of ``annotation``, ``annotation_template``, ``annotation_params``, ``summary`` and ``separationArcsec``
+
+        **Usage**
+
+        ```python
+        columns = renderer.render_columns(
+            match=crossmatch,
+            compact=True
+        )
+        ```
+        """
+        import json
+        if not compact:
+            annotation, summary, sep = self.render(
+                match, updatePeakMagnitudes)
+            return {
+                "annotation": annotation,
+                "annotation_template": None,
+                "annotation_params": None,
+                "summary": summary,
+                "separationArcsec": sep
+            }
+
+        body, template, linkId, linkName, summary, sep = self._render_parts(
+            match, updatePeakMagnitudes)
+        params = None
+        if template:
+            params = {"id": linkId}
+            if linkName != linkId:
+                params["name"] = linkName
+            params = json.dumps(params, separators=(",", ":"))
+        return {
+            "annotation": body,
+            "annotation_template": template,
+            "annotation_params": params,
+            "summary": summary,
+            "separationArcsec": sep
+        }
+
+    def expand(
+            self,
+            annotation,
+            annotationTemplate=None,
+            annotationParams=None):
+        """*rebuild the full html annotation from its compact form*
+
+        **Key Arguments**
+
+        - ``annotation`` -- the stored annotation text (full html or compact)
+        - ``annotationTemplate`` -- the link template key (``ned``, ``sdss``, ``milliquas``). Default *None* (the annotation is already full html)
+        - ``annotationParams`` -- the link ``id``/``name`` (JSON string or dictionary)
+
+        **Return**
+
+        - ``annotation`` -- the full html annotation
+
+        **Usage**
+
+        ```python
+        annotation = renderer.expand(
+            annotation=row["annotation"],
+            annotationTemplate=row["annotation_template"],
+            annotationParams=row["annotation_params"]
+        )
+        ```
+        """
+        import json
+        if not annotationTemplate or annotation is None:
+            return annotation
+        if annotationTemplate not in LINK_TEMPLATES:
+            message = "unknown annotation template `%(annotationTemplate)s`" % locals()
+            self.log.error(message)
+            raise ValueError(message)
+        if isinstance(annotationParams, str):
+            annotationParams = json.loads(annotationParams)
+        linkId = annotationParams["id"]
+        linkName = annotationParams.get("name", linkId)
+        prefix, middle, suffix = LINK_TEMPLATES[annotationTemplate]
+        return annotation.replace(LINK_PLACEHOLDER, prefix + linkId + middle + linkName + suffix, 1)
+
+    def compact(
+            self,
+            annotation):
+        """*convert a full html annotation into its compact form*
+
+        **Key Arguments**
+
+        - ``annotation`` -- the full html annotation
+
+        **Return**
+
+        - ``annotation`` -- the annotation text with the catalogue link replaced by a ``{link}`` placeholder (unchanged if it holds no recognised link)
+        - ``annotationTemplate`` -- the link template key, or *None*
+        - ``annotationParams`` -- the link ``id``/``name`` as a JSON string, or *None*
+
+        **Usage**
+
+        ```python
+        annotation, annotationTemplate, annotationParams = renderer.compact(
+            annotation=row["annotation"]
+        )
+        ```
+        """
+        import json
+        if not annotation or LINK_PLACEHOLDER in annotation:
+            return annotation, None, None
+        for template, (prefix, middle, suffix) in LINK_TEMPLATES.items():
+            start = annotation.find(prefix)
+            if start < 0:
+                continue
+            idStart = start + len(prefix)
+            idEnd = annotation.find(middle, idStart)
+            if idEnd < 0:
+                continue
+            nameStart = idEnd + len(middle)
+            nameEnd = annotation.find(suffix, nameStart)
+            if nameEnd < 0:
+                continue
+            linkId = annotation[idStart:idEnd]
+            linkName = annotation[nameStart:nameEnd]
+            params = {"id": linkId}
+            if linkName != linkId:
+                params["name"] = linkName
+            body = annotation[:start] + LINK_PLACEHOLDER + \
+                annotation[nameEnd + len(suffix):]
+            return body, template, json.dumps(params, separators=(",", ":"))
+        return annotation, None, None
+
+    def _render_parts(
+            self,
+            match,
+            updatePeakMagnitudes=False):
+        """*render a match into its annotation text (with a link placeholder when the catalogue has a link template), link parameters, summary and separation*
+        """
+        if "catalogue_object_subtype" not in match:
+            match["catalogue_object_subtype"] = None
+        catalogue = match["catalogue_table_name"]
+        objectId = match["catalogue_object_id"]
+        objectType = match["catalogue_object_type"]
+        objectSubtype = match["catalogue_object_subtype"]
+        if catalogue is None:
+            badGuy = match["transient_object_id"]
+            message = f"Issue with object {badGuy}"
+            self.log.error(message)
+            raise TypeError(message)
+        catalogueLower = catalogue.lower()
+        catalogueString = catalogue
+        if "catalogue" not in catalogueLower:
+            catalogueString = catalogue + " catalogue"
+        if "/" in catalogueString:
+            catalogueString += "s"
+
+        template = None
+        if "ned" in catalogueLower:
+            template = "ned"
+            linkId = objectId.replace("+", "%2B")
+            linkName = linkId
+        elif "sdss" in catalogueLower:
+            template = "sdss"
+            linkId = str(objectId)
+            linkName = self._sdss_name(match["raDeg"], match["decDeg"])
+        elif "milliquas" in catalogueLower:
+            template = "milliquas"
+            linkId = objectId.replace(" ", "+")
+            linkName = str(objectId)
+        if template:
+            objectId = LINK_PLACEHOLDER
+        else:
+            linkId = None
+            linkName = None
+
+        if objectSubtype and str(objectSubtype).lower() in _PROMOTED_SUBTYPES:
+            objectType = objectSubtype
+        objectType = _OBJECT_TYPE_NAMES.get(objectType, objectType)
+
+        sep = match["separationArcsec"]
+        psep = match["physical_separation_kpc"]
+        if match["classificationReliability"] == 1:
+            classificationReliability = "synonymous"
+            if psep:
+                location = _SYNONYMOUS_LOCATION_KPC % (sep, psep, objectType)
+            else:
+                location = _SYNONYMOUS_LOCATION % (sep, objectType)
+        else:
+            classificationReliability = "possibly associated"
+            n = float(match["northSeparationArcsec"])
+            nd = "S" if n > 0 else "N"
+            e = float(match["eastSeparationArcsec"])
+            ed = "W" if e > 0 else "E"
+            n = abs(n)
+            e = abs(e)
+            if psep:
+                location = _ASSOCIATED_LOCATION_KPC % (
+                    n, nd, e, ed, psep, objectType)
+            else:
+                location = _ASSOCIATED_LOCATION % (n, nd, e, ed, objectType)
+            location = location.replace("unclassified", "object's")
+
+        # FIRST POPULATED MAGNITUDE IN ORDER OF FILTER PREFERENCE
+        best_mag = None
+        best_mag_filter = None
+        for f, label in _MAGNITUDE_FILTERS:
+            if f in match and match[f]:
+                best_mag = match[f]
+                best_mag_filter = label + "="
+                if "unk" in best_mag_filter:
+                    best_mag_filter = ""
+                break
+
+        if not best_mag_filter:
+            if str(best_mag).lower() in ("8", "11", "18"):
+                best_mag_filter = "an "
+            else:
+                best_mag_filter = "a "
+        else:
+            if best_mag_filter[0].lower() in ("r", "i", "h"):
+                best_mag_filter = "an " + best_mag_filter
+            else:
+                best_mag_filter = "a " + best_mag_filter
+        if not best_mag:
+            best_mag = "an unknown-"
+            best_mag_filter = ""
+        else:
+            best_mag = "%0.2f " % (best_mag,)
+
+        distance = None
+        if "direct_distance" in match and match["direct_distance"]:
+            distance = "distance of %0.1f Mpc" % (match["direct_distance"],)
+            if match["z"]:
+                distance += "(z=%0.3f)" % (match["z"],)
+        elif "z" in match and match["z"]:
+            distance = "z=%0.3f" % (match["z"],)
+        elif "photoZ" in match and match["photoZ"]:
+            zErr = match["photoZErr"]
+            if not zErr:
+                distance = "photoZ=%0.3f" % (match["photoZ"],)
+            else:
+                distance = "photoZ=%0.3f (&plusmn%0.3f)" % (
+                    match["photoZ"], zErr)
+
+        if updatePeakMagnitudes:
+            if distance:
+                absMag = _ABS_MAG % (distance, match["transientAbsMag"])
+            else:
+                absMag = ""
+        else:
+            distance_modulus = match["direct_distance_modulus"] or match[
+                "z_distance_modulus"] or match["pz_distance_modulus"] or None
+            if distance and distance_modulus:
+                absMag = _DISTANCE_MODULUS % (distance, distance_modulus)
+            else:
+                absMag = ""
+
+        body = _ANNOTATION % (classificationReliability, objectId, best_mag_filter,
+                              best_mag, objectType, catalogueString, location, absMag)
+        try:
+            summary = _SUMMARY % (sep, objectType, catalogue)
+        except:
+            badGuy = match["transient_object_id"]
+            message = f"Issue with object {badGuy}"
+            self.log.error(message)
+            raise TypeError(message)
+
+        return body, template, linkId, linkName, summary, sep
+
+    def render_batch(
+            self,
+            matches,
+            updatePeakMagnitudes=False):
+        """*render the annotations and summaries of a batch of transient-catalogue source matches in one call*
+
+        **Key Arguments**
+
+        - ``matches`` -- list of the sources crossmatched against the transients
+        - ``updatePeakMagnitudes`` -- quote the transients' absolute peak magnitudes rather than the hosts' distance moduli. Default *False*
+
+        **Return**
+
+        - ``results`` -- list of ``(annotation, summary, sep)`` tuples in the same order as ``matches``
+
+        **Usage**
+
+        ```python
+        results = renderer.render_batch(
+            matches=crossmatches,
+            updatePeakMagnitudes=True
+        )
+        ```
+        """
+        self.log.debug('starting the ``render_batch`` method')
+
+        render = self.render
+        results = [render(m, updatePeakMagnitudes) for m in matches]
+
+        self.log.debug('completed the ``render_batch`` method')
+        return results
+
+    def render_batch_columns(
+            self,
+            matches,
+            updatePeakMagnitudes=False,
+            compact=False):
+        """*render a batch of matches straight into the annotation columns of the ``sherlock_classifications`` table*
+
+        **Key Arguments**
+
+        - ``matches`` -- list of the sources crossmatched against the transients
+        - ``updatePeakMagnitudes`` -- quote the transients' absolute peak magnitudes rather than the hosts' distance moduli. Default *False*
+        - ``compact`` -- store the compact form of the annotations. Default *False*
+
+        **Return**
+
+        - ``results`` -- list of column dictionaries (see ``render_columns``) in the same order as ``matches``
+
+        **Usage**
+
+        ```python
+        results = renderer.render_batch_columns(
+            matches=crossmatches,
+            compact=True
+        )
+        ```
+        """
+        self.log.debug('starting the ``render_batch_columns`` method')
+
+        render = self.render_columns
+        results = [render(m, updatePeakMagnitudes, compact) for m in matches]
+
+        self.log.debug('completed the ``render_batch_columns`` method')
+        return results
+
+    def _format_sdss_name(
+            self,
+            raDeg,
+            decDeg):
+        """*build the IAU-style SDSS name of a source from its coordinates (memoised via ``self._sdss_name``)*
+        """
+        ra = self.converter.ra_decimal_to_sexegesimal(
+            ra=raDeg,
+            delimiter=""
+        )
+        dec = self.converter.dec_decimal_to_sexegesimal(
+            dec=decDeg,
+            delimiter=""
+        )
+        # 2025-07-17 KWS Added a quick workaround for when the ra or dec are not parseable.
+        try:
+            return "SDSS J" + ra[0:9] + dec[0:9]
+        except TypeError as e:
+            self.log.error(
+                "could not build an SDSS name from ra=%(raDeg)s, dec=%(decDeg)s" % locals())
+            return ''
+
+    # use the tab-trigger below for new method
+    # xt-class-method
@@ -0,0 +1,562 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*Bulk-load classifier results into the transient database via a staging table and a set-based swap*
+
+:Author:
+    David Young
+"""
+import os
+os.environ['TERM'] = 'vt100'
+
+
+class bulk_result_writer(object):
+    """
+    *Bulk-load classifier results into the transient database via a staging table and a set-based swap*
+
+    Rows are streamed into a temporary staging table with a single ``LOAD DATA LOCAL INFILE`` (or, where the server does not allow local infiles, multi-row inserts inside one transaction). The staged rows are then applied to the target table with set-based SQL: either a delete-and-insert swap keyed on ``transient_object_id`` (``replace_rows``) or an ``INSERT ... SELECT ... ON DUPLICATE KEY UPDATE`` (``upsert_rows``). The time spent in each phase is logged and returned.
+
+    The swap statements are run in one transaction, but that is only atomic if the target table is transactional (InnoDB). The sherlock result tables are MyISAM by default, so a failure part-way through a swap leaves it part-written (e.g. a transient's old crossmatches deleted without the new ones inserted). Re-running the batch rewrites it. A warning is logged the first time a non-transactional table is written.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``dbConn`` -- connection to the transient database
+    - ``settings`` -- the settings dictionary. The ``bulk load method`` setting (infile|insert) picks how the staging table is filled. Default *infile*
+
+    **Usage**
+
+    ```python
+    from sherlock.commonutils import bulk_result_writer
+    writer = bulk_result_writer(
+        log=log,
+        dbConn=transientsDbConn,
+        settings=settings
+    )
+    timings = writer.replace_rows(
+        dbTableName="sherlock_crossmatches",
+        dictList=crossmatches,
+        replaceIds=transientIds
+    )
+    ```
+    """
+    # INITIALISATION
+
+    def __init__(
+            self,
+            log,
+            dbConn,
+            settings=False
+    ):
+        self.log = log
+        log.debug("instansiating a new 'bulk_result_writer' object")
+        self.dbConn = dbConn
+        self.settings = settings
+
+        self.loadMethod = "infile"
+        if settings and "bulk load method" in settings and settings["bulk load method"]:
+            self.loadMethod = str(settings["bulk load method"]).lower()
+        if self.loadMethod not in ("infile", "insert"):
+            message = "`bulk load method` must be one of infile or insert (not `%s`)" % (
+                self.loadMethod,)
+            self.log.error(message)
+            raise ValueError(message)
+
+        return None
+
+    def replace_rows(
+            self,
+            dbTableName,
+            dictList,
+            replaceIds,
+            idColumn="transient_object_id"):
+        """*replace all rows belonging to a set of transients with a new set of rows*
+
+        All existing rows in ``dbTableName`` whose ``idColumn`` is in ``replaceIds`` are deleted and the new rows inserted from the staging table, inside a single transaction. This is only atomic for InnoDB tables; on MyISAM tables a failure between the delete and the insert leaves the transients without rows until they are rewritten.
+
+        **Key Arguments**
+
+        - ``dbTableName`` -- the table to write to
+        - ``dictList`` -- list of dictionaries (one per row)
+        - ``replaceIds`` -- the ids of every transient whose rows are being replaced (including those with no new rows)
+        - ``idColumn`` -- the column holding the transient id. Default *transient_object_id*
+
+        **Return**
+
+        - ``timings`` -- dictionary of seconds spent in the ``stage``, ``load`` and ``swap`` phases
+
+        **Usage**
+
+        ```python
+        timings = writer.replace_rows(
+            dbTableName="sherlock_classifications",
+            dictList=classificationRows,
+            replaceIds=transientIds
+        )
+        ```
+        """
+        self.log.debug('starting the ``replace_rows`` method')
+
+        import time
+
+        timings = {}
+        start_time = time.time()
+        stageTable, columns = self._create_staging_table(
+            dbTableName=dbTableName, dictList=dictList)
+        idTable = "_sherlock_stage_ids"
+        self._execute([
+            "DROP TEMPORARY TABLE IF EXISTS `%(idTable)s`" % locals(),
+            "CREATE TEMPORARY TABLE `%(idTable)s` (`id` bigint(20) NOT NULL, PRIMARY KEY (`id`)) ENGINE=MEMORY" % locals()
+        ])
+        timings["stage"] = time.time() - start_time
+
+        start_time = time.time()
+        self._load_staging_table(
+            stageTable=stageTable, columns=columns, dictList=dictList)
+        self._insert_many(
+            tableName=idTable,
+            columns=["id"],
+            rows=[(i,) for i in set(replaceIds)]
+        )
+        timings["load"] = time.time() - start_time
+
+        start_time = time.time()
+        self._warn_if_not_transactional(dbTableName)
+        self._execute(self._replace_statements(
+            dbTableName=dbTableName,
+            stageTable=stageTable,
+            idTable=idTable,
+            columns=columns,
+            idColumn=idColumn
+        ), transaction=True)
+        timings["swap"] = time.time() - start_time
+
+        self._execute([
+            "DROP TEMPORARY TABLE IF EXISTS `%(stageTable)s`" % locals(),
+            "DROP TEMPORARY TABLE IF EXISTS `%(idTable)s`" % locals()
+        ])
+        self._report(dbTableName=dbTableName,
+                     rowCount=len(dictList), timings=timings)
+
+        self.log.debug('completed the ``replace_rows`` method')
+        return timings
+
+    def upsert_rows(
+            self,
+            dbTableName,
+            dictList):
+        """*insert new rows and update the supplied columns of existing rows (matched on the table's unique keys)*
+
+        **Key Arguments**
+
+        - ``dbTableName`` -- the table to write to
+        - ``dictList`` -- list of dictionaries (one per row). Only the columns present in the dictionaries are updated on existing rows
+
+        **Return**
+
+        - ``timings`` -- dictionary of seconds spent in the ``stage``, ``load`` and ``swap`` phases
+
+        **Usage**
+
+        ```python
+        timings = writer.upsert_rows(
+            dbTableName="sherlock_classifications",
+            dictList=annotationUpdates
+        )
+        ```
+        """
+        self.log.debug('starting the ``upsert_rows`` method')
+
+        import time
+
+        timings = {}
+        if not len(dictList):
+            return timings
+
+        start_time = time.time()
+        stageTable, columns = self._create_staging_table(
+            dbTableName=dbTableName, dictList=dictList)
+        timings["stage"] = time.time() - start_time
+
+        start_time = time.time()
+        self._load_staging_table(
+            stageTable=stageTable, columns=columns, dictList=dictList)
+        timings["load"] = time.time() - start_time
+
+        start_time = time.time()
+        self._execute(self._upsert_statements(
+            dbTableName=dbTableName,
+            stageTable=stageTable,
+            columns=columns
+        ), transaction=True)
+        timings["swap"] = time.time() - start_time
+
+        self._execute([
+            "DROP TEMPORARY TABLE IF EXISTS `%(stageTable)s`" % locals()
+        ])
+        self._report(dbTableName=dbTableName,
+                     rowCount=len(dictList), timings=timings)
+
+        self.log.debug('completed the ``upsert_rows`` method')
+        return timings
+
+    def _replace_statements(
+            self,
+            dbTableName,
+            stageTable,
+            idTable,
+            columns,
+            idColumn="transient_object_id"):
+        """*the statements swapping the staged rows in for the existing rows of the staged ids*
+
+        **Key Arguments**
+
+        - ``dbTableName`` -- the table to write to
+        - ``stageTable`` -- the staging table holding the new rows
+        - ``idTable`` -- the staging table holding the ids being replaced
+        - ``columns`` -- the columns being written
+        - ``idColumn`` -- the column holding the transient id. Default *transient_object_id*
+
+        **Return**
+
+        - ``sqlQueries`` -- list of SQL statements
+        """
+        insertColumns, selectColumns = self._insert_select_columns(
+            dbTableName=dbTableName, columns=columns)
+        sqlQueries = [
+            "DELETE FROM `%(dbTableName)s` WHERE `%(idColumn)s` IN (SELECT `id` FROM `%(idTable)s`)" % locals()]
+        if len(columns):
+            sqlQueries.append(
+                "INSERT INTO `%(dbTableName)s` (%(insertColumns)s) SELECT %(selectColumns)s FROM `%(stageTable)s`" % locals())
+        return sqlQueries
+
+    def _upsert_statements(
+            self,
+            dbTableName,
+            stageTable,
+            columns):
+        """*the statement upserting the staged rows (matched on the table's unique keys)*
+
+        **Key Arguments**
+
+        - ``dbTableName`` -- the table to write to
+        - ``stageTable`` -- the staging table holding the rows
+        - ``columns`` -- the columns being written
+
+        **Return**
+
+        - ``sqlQueries`` -- list of SQL statements
+        """
+        insertColumns, selectColumns = self._insert_select_columns(
+            dbTableName=dbTableName, columns=columns)
+        updateStatement = ", ".join(
+            ["`%s` = VALUES(`%s`)" % (c, c) for c in columns])
+        if "dateLastModified" in self.tableColumns:
+            updateStatement += ", `dateLastModified` = NOW()"
+        return [
+            "INSERT INTO `%(dbTableName)s` (%(insertColumns)s) SELECT %(selectColumns)s FROM `%(stageTable)s` ON DUPLICATE KEY UPDATE %(updateStatement)s" % locals()
+        ]
+
+    def _warn_if_not_transactional(
+            self,
+            dbTableName):
+        """*log a warning (once per table) if the table's engine can't roll back a part-written swap*
+        """
+        from fundamentals.mysql import readquery
+
+        if not hasattr(self, "_checkedEngines"):
+            self._checkedEngines = {}
+        if dbTableName in self._checkedEngines:
+            return None
+        rows = readquery(
+            log=self.log,
+            sqlQuery="SELECT ENGINE FROM information_schema.TABLES WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME='%(dbTableName)s'" % locals(),
+            dbConn=self.dbConn
+        )
+        engine = rows[0]["ENGINE"] if len(rows) else None
+        self._checkedEngines[dbTableName] = engine
+        if engine and engine.lower() != "innodb":
+            self.log.warning(
+                "`%(dbTableName)s` is a %(engine)s table, so its bulk writes are not atomic - a failed swap leaves it part-written until the batch is rewritten" % locals())
+        return None
+
+    def _create_staging_table(
+            self,
+            dbTableName,
+            dictList):
+        """*create an empty temporary staging table with the same structure as the target table*
+
+        Keys in ``dictList`` that are not yet columns of the target table are added to it first, as ``insert_list_of_dictionaries_into_database_tables`` would have done.
+
+        **Return**
+
+        - ``stageTable`` -- name of the staging table
+        - ``columns`` -- the columns being written
+        """
+        from fundamentals.mysql import convert_dictionary_to_mysql_table
+
+        keys = []
+        for d in dictList:
+            for k in d.keys():
+                if k not in keys:
+                    keys.append(k)
+
+        self.tableColumns = self._table_columns(dbTableName)
+        missing = [k for k in keys if k not in self.tableColumns]
+        while len(missing):
+            example = [d for d in dictList if missing[0] in d][0]
+            self.log.info('adding the missing column(s) %s to `%s`' %
+                          (", ".join(missing), dbTableName))
+            convert_dictionary_to_mysql_table(
+                dbConn=self.dbConn,
+                log=self.log,
+                dictionary=example,
+                dbTableName=dbTableName,
+                uniqueKeyList=[],
+                dateModified=False,
+                replace=True
+            )
+            self.tableColumns = self._table_columns(dbTableName)
+            stillMissing = [k for k in keys if k not in self.tableColumns]
+            if stillMissing == missing:
+                message = "could not add the column(s) %s to `%s`" % (
+                    ", ".join(missing), dbTableName)
+                self.log.error(message)
+                raise IOError(message)
+            missing = stillMissing
+
+        columns = keys
+        stageTable = "_sherlock_stage_%(dbTableName)s" % locals()
+        # TEMPORARY TABLES CANNOT BE PARTITIONED, SO A PARTITIONED TARGET IS
+        # COPIED COLUMN-FOR-COLUMN (WITHOUT ITS KEYS) RATHER THAN WITH `LIKE`
+        if self._is_partitioned(dbTableName):
+            createStatement = "CREATE TEMPORARY TABLE `%(stageTable)s` SELECT * FROM `%(dbTableName)s` LIMIT 0" % locals()
+        else:
+            createStatement = "CREATE TEMPORARY TABLE `%(stageTable)s` LIKE `%(dbTableName)s`" % locals()
+        self._execute([
+            "DROP TEMPORARY TABLE IF EXISTS `%(stageTable)s`" % locals(),
+            createStatement
+        ])
+        return stageTable, columns
+
+    def _is_partitioned(
+            self,
+            dbTableName):
+        """*is the table partitioned?*
+        """
+        from fundamentals.mysql import readquery
+        rows = readquery(
+            log=self.log,
+            sqlQuery="SELECT COUNT(*) AS count FROM information_schema.PARTITIONS WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME='%(dbTableName)s' AND PARTITION_NAME IS NOT NULL" % locals(),
+            dbConn=self.dbConn
+        )
+        return rows[0]["count"] > 0
+
+    def _load_staging_table(
+            self,
+            stageTable,
+            columns,
+            dictList):
+        """*fill the staging table with ``LOAD DATA LOCAL INFILE`` (or multi-row inserts)*
+        """
+        import tempfile
+
+        if not len(dictList):
+            return None
+
+        if self.loadMethod == "insert":
+            rows = [tuple(_mysql_value(d.get(c)) for c in columns)
+                    for d in dictList]
+            self._insert_many(tableName=stageTable,
+                              columns=columns, rows=rows)
+            return None
+
+        fd, pathToTsv = tempfile.mkstemp(
+            prefix="sherlock_stage_", suffix=".tsv")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for d in dictList:
+                    f.write(_dictionary_to_tsv_line(d, columns))
+            columnList = self._column_list(columns)
+            self._execute(["""LOAD DATA LOCAL INFILE '%(pathToTsv)s'
+                INTO TABLE `%(stageTable)s`
+                CHARACTER SET utf8
+                FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+                LINES TERMINATED BY '\\n'
+                (%(columnList)s)""" % locals()])
+        finally:
+            os.remove(pathToTsv)
+
+        return None
+
+    def _insert_many(
+            self,
+            tableName,
+            columns,
+            rows):
+        """*multi-row insert inside a single transaction (pymysql folds ``executemany`` into multi-row INSERT statements)*
+        """
+        if not len(rows):
+            return None
+        columnList = self._column_list(columns)
+        placeholders = ", ".join(["%s"] * len(columns))
+        sqlQuery = "INSERT INTO `%(tableName)s` (%(columnList)s) VALUES (%(placeholders)s)" % locals()
+
+        self.dbConn.autocommit(False)
+        cursor = self.dbConn.cursor()
+        try:
+            cursor.executemany(sqlQuery, rows)
+            self.dbConn.commit()
+        except Exception as e:
+            self.dbConn.rollback()
+            self.log.error(
+                'could not insert rows into `%(tableName)s`: %(e)s' % locals())
+            raise
+        finally:
+            cursor.close()
+            self.dbConn.autocommit(True)
+        return None
+
+    def _execute(
+            self,
+            sqlQueries,
+            transaction=False):
+        """*execute a list of statements, optionally as a single transaction*
+        """
+        if transaction:
+            self.dbConn.autocommit(False)
+        cursor = self.dbConn.cursor()
+        try:
+            for sqlQuery in sqlQueries:
+                cursor.execute(sqlQuery)
+            if transaction:
+                self.dbConn.commit()
+        except Exception as e:
+            if transaction:
+                self.dbConn.rollback()
+            self.log.error(
+                'bulk write statement failed: %(e)s (%(sqlQuery)s)' % locals())
+            raise
+        finally:
+            cursor.close()
+            if transaction:
+                self.dbConn.autocommit(True)
+        return None
+
+    def _table_columns(
+            self,
+            dbTableName):
+        """*the column names of a table*
+        """
+        from fundamentals.mysql import readquery
+        rows = readquery(
+            log=self.log,
+            sqlQuery="SHOW COLUMNS FROM `%(dbTableName)s`" % locals(),
+            dbConn=self.dbConn
+        )
+        return [r["Field"] for r in rows]
+
+    def _insert_select_columns(
+            self,
+            dbTableName,
+            columns):
+        """*the column lists for the ``INSERT ... SELECT`` from staging, stamping the creation/modification dates the same way the dictionary inserter does*
+        """
+        insertColumns = list(columns)
+        selectColumns = ["`%s`" % c for c in columns]
+        for dateCol in ("dateCreated", "dateLastModified"):
+            if dateCol in self.tableColumns and dateCol not in columns:
+                insertColumns.append(dateCol)
+                selectColumns.append("NOW()")
+        return self._column_list(insertColumns), ", ".join(selectColumns)
+
+    def _column_list(
+            self,
+            columns):
+        """*backtick-quoted, comma-separated column list*
+        """
+        return ", ".join(["`%s`" % c for c in columns])
+
+    def _report(
+            self,
+            dbTableName,
+            rowCount,
+            timings):
+        """*log and print the time spent in each write phase*
+        """
+        stage = timings.get("stage", 0.)
+        load = timings.get("load", 0.)
+        swap = timings.get("swap", 0.)
+        message = "bulk wrote %(rowCount)s rows to %(dbTableName)s: stage %(stage)0.2fs, load %(load)0.2fs, swap %(swap)0.2fs" % locals()
+        self.log.info(message)
+        print(message)
+        return None
+
+    # use the tab-trigger below for new method
+    # xt-class-method
+
+
+def _mysql_value(value):
+    """*convert a python value to something the MySQL driver can bind (NaN -> NULL)*
+
+    Lists (and tuples) can't be stored in a single column, so they raise a ``TypeError`` rather than being silently truncated.
+
+    **Key Arguments**
+
+    - ``value`` -- the python value
+
+    **Return**
+
+    - ``value`` -- the value to bind
+    """
+    if isinstance(value, float) and value != value:
+        return None
+    if isinstance(value, (list, tuple)):
+        message = "cannot bulk write the list value %s to a single column" % (
+            repr(value)[:100],)
+        raise TypeError(message)
+    return value
+
+
+def _dictionary_to_tsv_line(
+        dictionary,
+        columns):
+    """*render a dictionary as a single line of a MySQL ``LOAD DATA`` tab-separated file*
+
+    ``None`` and NaN become ``\\N``, booleans become 1/0 and backslashes, tabs, newlines and carriage-returns inside strings are escaped.
+
+    **Key Arguments**
+
+    - ``dictionary`` -- the row
+    - ``columns`` -- the column order
+
+    **Return**
+
+    - ``line`` -- the tab-separated line, including the trailing newline
+
+    **Usage**
+
+    ```python
+    line = _dictionary_to_tsv_line({"a": 1, "b": None}, ["a", "b"])
+    # "1\\t\\\\N\\n"
+    ```
+    """
+    from datetime import datetime
+
+    fields = []
+    for c in columns:
+        value = _mysql_value(dictionary.get(c))
+        if value is None:
+            fields.append("\\N")
+        elif isinstance(value, bool):
+            fields.append("1" if value else "0")
+        elif isinstance(value, datetime):
+            fields.append(value.strftime("%Y-%m-%d %H:%M:%S"))
+        elif isinstance(value, (int, float)):
+            fields.append(repr(value) if isinstance(value, float) else str(value))
+        else:
+            value = str(value)
+            value = value.replace("\\", "\\\\").replace("\t", "\\t").replace(
+                "\n", "\\n").replace("\r", "\\r")
+            fields.append(value)
+    return "\t".join(fields) + "\n"
@@ -0,0 +1,476 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*An append-only journal of the transient batches a database run has finished writing, plus the results of any batch still being written*
+
+:Author:
+    David Young
+"""
+import os
+os.environ['TERM'] = 'vt100'
+
+
+class checkpoint_journal(object):
+    """
+    *An append-only journal of the transient batches a database run has finished writing, plus the results of any batch still being written*
+
+    Before a batch's results are written to the transient database they are spilled to disk and a ``pending`` line is appended to the journal. Once the write has committed a ``complete`` line recording the batch's transient-id ranges follows it and the spill is removed. Every line is flushed and fsync'd, so after a crash or kill:
+
+    - batches that were crossmatched but not (fully) written are replayed from their spills with ``outstanding``, without re-crossmatching them
+    - transients in completed batches are skipped with ``filter_completed`` when paging through the transient table by key (the pages are not re-queried by classification state)
+    - a transient query that only returns unclassified transients is filtered with ``filter_query_page`` instead, which only holds back the transients of batches still being written
+
+    The journal is JSON-lines, one event per line, and a torn final line from a killed process is dropped when the journal is next opened. ``reset`` clears it at the end of a pass through the transient table.
+
+    Transients sent back for reclassification mid-pass (e.g. by the NED prefetcher) are removed from the completed ranges with ``forget``. Another process can journal this against the same file; the lines it appends are picked up by ``filter_completed``.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``pathToJournal`` -- path to the journal file. Spills are kept in a ``<pathToJournal>.pending`` directory beside it
+    - ``settings`` -- the settings dictionary. Default *False*
+
+    **Usage**
+
+    ```python
+    from sherlock.commonutils import checkpoint_journal
+    journal = checkpoint_journal(
+        log=log,
+        pathToJournal="~/.config/sherlock/checkpoints/transients.jsonl"
+    )
+
+    # REPLAY ANY WRITES LEFT UNFINISHED BY A PREVIOUS RUN
+    for batchKey, payload in journal.outstanding():
+        write_results(**payload)
+        journal.record_complete(batchKey)
+
+    # SKIP TRANSIENTS ALREADY WRITTEN, THEN CHECKPOINT THE NEXT BATCH
+    transients = journal.filter_completed(transients)
+    batchKey = journal.record_pending(
+        transientIds=[t["id"] for t in transients],
+        crossmatches=crossmatches,
+        classifications=classifications
+    )
+    write_results(crossmatches=crossmatches, classifications=classifications)
+    journal.record_complete(batchKey)
+    ```
+    """
+    # INITIALISATION
+
+    def __init__(
+            self,
+            log,
+            pathToJournal,
+            settings=False
+    ):
+        self.log = log
+        log.debug("instansiating a new 'checkpoint_journal' object")
+        self.settings = settings
+        self.pathToJournal = os.path.expanduser(pathToJournal)
+        self.spillDirectory = self.pathToJournal + ".pending"
+
+        # Recursively create missing directories
+        journalDir = os.path.dirname(self.pathToJournal)
+        if journalDir and not os.path.exists(journalDir):
+            os.makedirs(journalDir)
+
+        # COMPLETED TRANSIENT IDS - MERGED [LOW, HIGH] RANGES OF INTEGER IDS
+        # PLUS A SET OF ANY NON-INTEGER IDS
+        self.completedRanges = []
+        self.completedIds = set()
+        # PENDING BATCHES (BATCH KEY -> JOURNAL ENTRY) NOT YET COMPLETED
+        self.pending = {}
+        self._batchCount = 0
+        # BYTES OF THE JOURNAL FILE ALREADY APPLIED
+        self._readOffset = 0
+
+        self._read(dropTornLine=True)
+
+        return None
+
+    def record_pending(
+            self,
+            transientIds,
+            crossmatches,
+            classifications,
+            annotations=False):
+        """*spill a batch's results to disk and journal it as pending, ahead of writing it to the transient database*
+
+        **Key Arguments**
+
+        - ``transientIds`` -- the ids of the transients in the batch
+        - ``crossmatches`` -- the batch's ranked crossmatches
+        - ``classifications`` -- the batch's classifications (dictionary keyed by transient id)
+        - ``annotations`` -- the batch's annotation columns keyed by transient id. Default *False*
+
+        **Return**
+
+        - ``batchKey`` -- key to pass to ``record_complete`` once the write has committed
+        """
+        self.log.debug('starting the ``record_pending`` method')
+
+        import pickle
+        import time
+
+        self._batchCount += 1
+        batchKey = "%d-%d-%d" % (os.getpid(), int(time.time()
+                                                  * 1000), self._batchCount)
+
+        if not os.path.exists(self.spillDirectory):
+            os.makedirs(self.spillDirectory)
+        spillFile = os.path.join(self.spillDirectory, batchKey + ".pickle")
+        payload = {
+            "crossmatches": crossmatches,
+            "classifications": classifications,
+            "annotations": annotations
+        }
+        # WRITE THEN RENAME SO A KILLED PROCESS NEVER LEAVES A HALF-WRITTEN SPILL
+        with open(spillFile + ".tmp", 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(spillFile + ".tmp", spillFile)
+
+        entry = {
+            "event": "pending",
+            "batch": batchKey,
+            "ranges": _id_ranges(transientIds),
+            "spill": spillFile
+        }
+        self._append(entry)
+        self.pending[batchKey] = entry
+
+        self.log.debug('completed the ``record_pending`` method')
+        return batchKey
+
+    def record_complete(
+            self,
+            batchKey):
+        """*journal a pending batch as completed (its results are committed to the transient database) and remove its spill*
+
+        **Key Arguments**
+
+        - ``batchKey`` -- the key returned by ``record_pending``
+        """
+        self.log.debug('starting the ``record_complete`` method')
+
+        entry = self.pending.pop(batchKey)
+        self._append({
+            "event": "complete",
+            "batch": batchKey,
+            "ranges": entry["ranges"]
+        })
+        self._add_completed(entry["ranges"])
+        try:
+            os.remove(entry["spill"])
+        except OSError:
+            pass
+
+        self.log.debug('completed the ``record_complete`` method')
+        return None
+
+    def outstanding(
+            self):
+        """*the pending batches left unfinished by a previous run, with their spilled results*
+
+        A pending batch whose spill is missing or unreadable is journalled as ``abandoned``; its transients were never marked complete so they are simply crossmatched again.
+
+        **Return**
+
+        - ``outstanding`` -- list of ``(batchKey, payload)`` tuples, where ``payload`` holds the ``crossmatches``, ``classifications`` and ``annotations`` to write
+        """
+        self.log.debug('starting the ``outstanding`` method')
+
+        import pickle
+
+        outstanding = []
+        for batchKey, entry in list(self.pending.items()):
+            try:
+                with open(entry["spill"], 'rb') as f:
+                    payload = pickle.load(f)
+            except Exception as e:
+                self.log.warning(
+                    'could not read the spilled results of checkpointed batch %(batchKey)s (%(e)s), these transients will be classified again' % locals())
+                self._append({"event": "abandoned", "batch": batchKey})
+                del self.pending[batchKey]
+                continue
+            outstanding.append((batchKey, payload))
+
+        if len(outstanding):
+            count = len(outstanding)
+            self.log.info(
+                'found %(count)s checkpointed batches with unfinished writes' % locals())
+
+        self.log.debug('completed the ``outstanding`` method')
+        return outstanding
+
+    def is_complete(
+            self,
+            transientId):
+        """*has this transient's batch already been written in the current pass?*
+
+        **Key Arguments**
+
+        - ``transientId`` -- the transient id
+
+        **Return**
+
+        - ``complete`` -- True or False
+        """
+        from bisect import bisect_right
+
+        if not isinstance(transientId, int):
+            return str(transientId) in self.completedIds
+        i = bisect_right(self.completedRanges, [transientId, float("inf")]) - 1
+        return i >= 0 and self.completedRanges[i][0] <= transientId <= self.completedRanges[i][1]
+
+    def filter_completed(
+            self,
+            transientsMetadataList):
+        """*drop the transients whose results have already been written in the current pass*
+
+        **Key Arguments**
+
+        - ``transientsMetadataList`` -- list of transient metadata dictionaries (with an ``id`` key)
+
+        **Return**
+
+        - ``transientsMetadataList`` -- the transients still to classify
+        """
+        self.log.debug('starting the ``filter_completed`` method')
+
+        # PICK UP EVENTS OTHER PROCESSES HAVE APPENDED (E.G. `forget`)
+        self._read()
+
+        if not len(self.completedRanges) and not len(self.completedIds):
+            return transientsMetadataList
+
+        remaining = [
+            t for t in transientsMetadataList if not self.is_complete(t["id"])]
+        skipped = len(transientsMetadataList) - len(remaining)
+        if skipped:
+            self.log.info(
+                'skipping %(skipped)s transients already classified according to the checkpoint journal' % locals())
+
+        self.log.debug('completed the ``filter_completed`` method')
+        return remaining
+
+    def filter_query_page(
+            self,
+            transientsMetadataList):
+        """*filter a page returned by a transient query that selects the transients still needing classification*
+
+        Such a query is the authority on what needs classifying: a transient it returns again after its batch was written (a ``dateLastModified`` window, or a reset for reclassification) must be classified again, so only the transients of batches still pending (spilled but not yet written) are dropped. An empty page, or a page holding only transients the journal has already seen written, is the end of the pass and the journal is reset, so it never holds back transients in later runs.
+
+        **Key Arguments**
+
+        - ``transientsMetadataList`` -- the page of transient metadata dictionaries (with an ``id`` key)
+
+        **Return**
+
+        - ``transientsMetadataList`` -- the transients to classify
+        """
+        self.log.debug('starting the ``filter_query_page`` method')
+
+        if not len(transientsMetadataList) or all(self.is_complete(t["id"]) for t in transientsMetadataList):
+            # END OF THE PASS
+            self.reset()
+            return transientsMetadataList
+
+        if len(self.pending):
+            pendingIds = set()
+            pendingRanges = []
+            for entry in self.pending.values():
+                for low, high in entry["ranges"]:
+                    if isinstance(low, int) and isinstance(high, int):
+                        pendingRanges.append((low, high))
+                    else:
+                        pendingIds.add(low)
+
+            def is_pending(transientId):
+                if not isinstance(transientId, int):
+                    return str(transientId) in pendingIds
+                return any(low <= transientId <= high for low, high in pendingRanges)
+
+            transientsMetadataList = [
+                t for t in transientsMetadataList if not is_pending(t["id"])]
+
+        self.log.debug('completed the ``filter_query_page`` method')
+        return transientsMetadataList
+
+    def forget(
+            self,
+            transientIds):
+        """*journal that these transients need classifying again in the current pass, removing them from the completed ranges*
+
+        **Key Arguments**
+
+        - ``transientIds`` -- the ids of the transients sent back for reclassification
+        """
+        self.log.debug('starting the ``forget`` method')
+
+        if not len(transientIds):
+            return None
+        ranges = _id_ranges(transientIds)
+        self._append({
+            "event": "forget",
+            "ranges": ranges
+        })
+        self._remove_completed(ranges)
+
+        self.log.debug('completed the ``forget`` method')
+        return None
+
+    def reset(
+            self):
+        """*clear the journal and any spills at the end of a pass through the transient table*
+        """
+        self.log.debug('starting the ``reset`` method')
+
+        import shutil
+
+        if os.path.exists(self.pathToJournal):
+            os.remove(self.pathToJournal)
+        if os.path.exists(self.spillDirectory):
+            shutil.rmtree(self.spillDirectory, ignore_errors=True)
+        self.completedRanges = []
+        self.completedIds = set()
+        self.pending = {}
+        self._readOffset = 0
+
+        self.log.debug('completed the ``reset`` method')
+        return None
+
+    def _read(
+            self,
+            dropTornLine=False):
+        """*apply the journal lines not yet read to the completed ranges and pending batches*
+
+        A final line without a newline is still being written by another process, or was torn by a killed one. It is left unread, or, with ``dropTornLine`` (when the journal is opened to resume a run), truncated away so new events start on a line of their own.
+        """
+        self.log.debug('starting the ``_read`` method')
+
+        import json
+
+        if not os.path.exists(self.pathToJournal):
+            return None
+
+        with open(self.pathToJournal, 'rb') as f:
+            f.seek(self._readOffset)
+            content = f.read()
+
+        complete = content[:content.rfind(b"\n") + 1]
+        if len(complete) < len(content) and dropTornLine:
+            self.log.warning(
+                'dropping the torn final line of the checkpoint journal')
+            with open(self.pathToJournal, 'r+b') as f:
+                f.truncate(self._readOffset + len(complete))
+        self._readOffset += len(complete)
+
+        lines = complete.decode("utf-8").split("\n")
+        for i, line in enumerate(lines):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                pathToJournal = self.pathToJournal
+                message = "the checkpoint journal %(pathToJournal)s is corrupt at line %(i)s" % locals(
+                )
+                self.log.error(message)
+                raise ValueError(message)
+
+            event = entry.get("event")
+            if event == "pending":
+                self.pending[entry["batch"]] = entry
+            elif event == "complete":
+                self.pending.pop(entry["batch"], None)
+                self._add_completed(entry["ranges"])
+            elif event == "abandoned":
+                self.pending.pop(entry["batch"], None)
+            elif event == "forget":
+                self._remove_completed(entry["ranges"])
+
+        self.log.debug('completed the ``_read`` method')
+        return None
+
+    def _append(
+            self,
+            entry):
+        """*append one event to the journal and make sure it is on disk*
+        """
+        import json
+
+        with open(self.pathToJournal, 'ab') as f:
+            # SKIP RE-READING OUR OWN LINE UNLESS ANOTHER PROCESS HAS APPENDED SINCE
+            upToDate = f.tell() == self._readOffset
+            f.write((json.dumps(entry, separators=(",", ":"),
+                                default=str) + "\n").encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+            if upToDate:
+                self._readOffset = f.tell()
+        return None
+
+    def _add_completed(
+            self,
+            ranges):
+        """*merge a batch's id ranges into the completed ranges*
+        """
+        for low, high in ranges:
+            if isinstance(low, int) and isinstance(high, int):
+                self.completedRanges.append([low, high])
+            else:
+                self.completedIds.add(low)
+        self.completedRanges = _merge_ranges(self.completedRanges)
+        return None
+
+    def _remove_completed(
+            self,
+            ranges):
+        """*cut forgotten id ranges out of the completed ranges*
+        """
+        for low, high in ranges:
+            if not (isinstance(low, int) and isinstance(high, int)):
+                self.completedIds.discard(low)
+                continue
+            remaining = []
+            for cLow, cHigh in self.completedRanges:
+                if cHigh < low or cLow > high:
+                    remaining.append([cLow, cHigh])
+                    continue
+                if cLow < low:
+                    remaining.append([cLow, low - 1])
+                if cHigh > high:
+                    remaining.append([high + 1, cHigh])
+            self.completedRanges = remaining
+        return None
+
+
+def _id_ranges(
+        transientIds):
+    """*collapse a list of transient ids into sorted ``[low, high]`` runs of consecutive integers (non-integer ids become ``[id, id]``)*
+    """
+    intIds = sorted(set(i for i in transientIds if isinstance(i, int)))
+    ranges = []
+    for i in intIds:
+        if len(ranges) and i == ranges[-1][1] + 1:
+            ranges[-1][1] = i
+        else:
+            ranges.append([i, i])
+    ranges += [[i, i] for i in sorted(set(str(i)
+                                          for i in transientIds if not isinstance(i, int)))]
+    return ranges
+
+
+def _merge_ranges(
+        ranges):
+    """*merge overlapping or adjacent ``[low, high]`` integer ranges*
+    """
+    merged = []
+    for low, high in sorted(ranges):
+        if len(merged) and low <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], high)
+        else:
+            merged.append([low, high])
+    return merged
@@ -0,0 +1,221 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*Run many web requests concurrently with a concurrency cap, a token-bucket rate limit, retries with jittered backoff and per-request timeouts*
+
+:Author:
+    David Young
+"""
+import os
+os.environ['TERM'] = 'vt100'
+
+
+class concurrent_fetcher(object):
+    """
+    *Run many web requests concurrently with a concurrency cap, a token-bucket rate limit, retries with jittered backoff and per-request timeouts*
+
+    Requests are run on a thread pool of at most ``max concurrent requests`` workers. Each attempt first takes a token from a bucket refilled at ``requests per second`` (holding at most ``burst`` tokens), so the remote service never sees more than the agreed rate however many workers are free. A failed attempt is retried up to ``max retries`` times after an exponential backoff with full jitter (a random wait of up to ``retry backoff seconds x 2^attempt``), so workers that failed together do not retry in lock-step. Client errors (HTTP 4xx other than 429) are not retried.
+
+    Every item given to ``get`` is one HTTP request, so the limits apply to the requests the remote service actually sees. Each request times out after ``request timeout seconds``. An optional ``parse`` function turns each response body into a result inside the attempt, so a malformed response is retried like a failed request.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``settings`` -- the settings dictionary. Default *False*
+    - ``settingsKey`` -- the settings block to read the limits from. Default *ned fetching*
+
+    The settings block:
+
+    ```yaml
+    ned fetching:
+        max concurrent requests: 4
+        requests per second: 2
+        burst: 4
+        max retries: 4
+        retry backoff seconds: 2
+        request timeout seconds: 180
+    ```
+
+    **Usage**
+
+    ```python
+    from sherlock.commonutils import concurrent_fetcher
+    fetcher = concurrent_fetcher(
+        log=log,
+        settings=settings
+    )
+    pages = fetcher.get(urls=["https://ned.ipac.caltech.edu/..."])
+    names = fetcher.get(
+        urls=conesearchUrls,
+        parse=parse_conesearch_page
+    )
+    ```
+    """
+    # INITIALISATION
+
+    def __init__(
+            self,
+            log,
+            settings=False,
+            settingsKey="ned fetching"
+    ):
+        self.log = log
+        log.debug("instansiating a new 'concurrent_fetcher' object")
+        self.settings = settings
+
+        import threading
+
+        config = {}
+        if settings and settingsKey in settings and settings[settingsKey]:
+            config = settings[settingsKey]
+
+        self.maxWorkers = int(config.get("max concurrent requests", 4))
+        self.rate = float(config.get("requests per second", 2))
+        self.burst = float(config.get("burst", self.maxWorkers))
+        self.maxRetries = int(config.get("max retries", 4))
+        self.backoff = float(config.get("retry backoff seconds", 2))
+        self.timeout = float(config.get("request timeout seconds", 180))
+
+        if self.maxWorkers < 1 or self.rate <= 0 or self.burst < 1:
+            message = "`%(settingsKey)s` needs at least 1 concurrent request, a positive request rate and a burst of at least 1" % locals()
+            self.log.error(message)
+            raise ValueError(message)
+
+        # TOKEN BUCKET (STARTS FULL)
+        self._tokens = self.burst
+        self._lastRefill = None
+        self._bucketLock = threading.Lock()
+
+        # ATTEMPTS AND RETRIES MADE (FOR REPORTING)
+        self.attempts = 0
+        self.retries = 0
+
+        return None
+
+    def get(
+            self,
+            urls,
+            parse=False):
+        """*fetch a list of URLs concurrently*
+
+        **Key Arguments**
+
+        - ``urls`` -- list of URLs (one request each)
+        - ``parse`` -- function turning a response body into a result. A failure to parse is retried like a failed request. Default *False* (return the bodies)
+
+        **Return**
+
+        - ``responses`` -- list of response bodies (bytes), or their parsed results, in the order of ``urls``
+        """
+        self.log.debug('starting the ``get`` method')
+
+        from urllib.request import urlopen
+
+        def fetch(url):
+            with urlopen(url, timeout=self.timeout) as response:
+                body = response.read()
+            if parse:
+                return parse(body)
+            return body
+
+        responses = self._run(fetch, urls)
+
+        self.log.debug('completed the ``get`` method')
+        return responses
+
+    def _run(
+            self,
+            function,
+            items):
+        """*run the items through the thread pool, with rate limiting and retries*
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        items = list(items)
+        if not len(items):
+            return []
+
+        workers = min(self.maxWorkers, len(items))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self._attempt, function, item)
+                       for item in items]
+            try:
+                results = [f.result() for f in futures]
+            except Exception:
+                # DON'T START REQUESTS THAT ARE NOT YET RUNNING
+                for f in futures:
+                    f.cancel()
+                raise
+
+        if self.retries:
+            attempts = self.attempts
+            retries = self.retries
+            self.log.info(
+                '%(attempts)s requests made, %(retries)s of them retries' % locals())
+        return results
+
+    def _attempt(
+            self,
+            function,
+            item):
+        """*call the function for one item, retrying retryable failures with jittered exponential backoff*
+        """
+        import random
+        import time
+
+        attempt = 0
+        while True:
+            self._take_token()
+            try:
+                return function(item)
+            except Exception as e:
+                if attempt >= self.maxRetries or not _is_retryable(e):
+                    self.log.error(
+                        'request failed after %s attempts: %s' % (attempt + 1, e))
+                    raise
+                wait = random.uniform(0, self.backoff * 2**attempt)
+                self.log.warning(
+                    'request failed (%s), retrying in %0.1f sec' % (e, wait))
+                attempt += 1
+                self.retries += 1
+                time.sleep(wait)
+
+    def _take_token(
+            self):
+        """*block until the token bucket has a token to spend*
+        """
+        import time
+
+        while True:
+            with self._bucketLock:
+                now = time.monotonic()
+                if self._lastRefill is not None:
+                    self._tokens = min(
+                        self.burst, self._tokens + (now - self._lastRefill) * self.rate)
+                self._lastRefill = now
+                if self._tokens >= 1.:
+                    self._tokens -= 1.
+                    self.attempts += 1
+                    return None
+                wait = (1. - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _is_retryable(
+        error):
+    """*should a failed request be tried again? Client errors (HTTP 4xx other than 429 Too Many Requests) are not*
+    """
+    from urllib.error import HTTPError
+
+    code = getattr(error, "code", None)
+    if code is None:
+        # E.G. `requests` HTTPError
+        response = getattr(error, "response", None)
+        code = getattr(response, "status_code", None)
+    if isinstance(error, HTTPError) or code is not None:
+        try:
+            code = int(code)
+        except (TypeError, ValueError):
+            return True
+        return code == 429 or code >= 500
+    return True
@@ -0,0 +1,178 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*Choose a near-minimal set of cone-search centres so every coordinate in a list sits within a given radius of a centre*
+
+:Author:
+    David Young
+"""
+import os
+os.environ['TERM'] = 'vt100'
+
+
+def disc_cover(
+        log,
+        coordinateList,
+        radiusArcsec,
+        maxExactSize=250):
+    """*choose a near-minimal set of cone-search centres so every coordinate sits within ``radiusArcsec`` of a centre*
+
+    An optimal cover can always be built from discs centred on a coordinate, or with two coordinates on the disc's edge. These candidate centres (each coordinate, plus the two centres of every pair of coordinates less than ``2 x radiusArcsec`` apart) are scored by how many coordinates they cover. The candidate covering the most uncovered coordinates is taken until everything is covered, and centres made redundant by later picks are dropped.
+
+    Large lists are split on a grid into tiles of at most ``maxExactSize`` coordinates (but no smaller than a disc across), so the cost stays bounded on large batches. Coordinates already covered by the centres chosen for neighbouring tiles are dropped before a tile is solved, and the candidates of a tile still too crowded to solve exactly are built from a sample of its coordinates, with any coordinates left uncovered solved again.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``coordinateList`` -- list of (ra, dec) tuples in decimal degrees
+    - ``radiusArcsec`` -- every coordinate must lie within this distance of a centre
+    - ``maxExactSize`` -- the most coordinates solved together in one tile. Default *250*
+
+    **Return**
+
+    - ``centres`` -- list of (ra, dec) cone-search centres in decimal degrees
+
+    **Usage**
+
+    ```python
+    from sherlock.commonutils import disc_cover
+    centres = disc_cover(
+        log=log,
+        coordinateList=[(10.2, -23.4), (10.21, -23.41), (201.1, 12.0)],
+        radiusArcsec=660.
+    )
+    ```
+    """
+    log.debug('starting the ``disc_cover`` function')
+
+    import numpy as np
+
+    if not len(coordinateList):
+        return []
+
+    ra = np.radians(np.array([float(c[0]) for c in coordinateList]))
+    dec = np.radians(np.array([float(c[1]) for c in coordinateList]))
+    vectors = np.column_stack(
+        [np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)])
+
+    radius = np.radians(float(radiusArcsec) / 3600.)
+    # CHORD LENGTH OF THE RADIUS ON THE UNIT SPHERE
+    radiusChord = 2. * np.sin(radius / 2.)
+
+    cosRadius = np.cos(radius)
+    centres = np.zeros((0, 3))
+    # (TILE COORDINATES, GRID CELL SIZE) STILL TO SOLVE - START WITH THE WHOLE SPHERE
+    chunks = [(vectors, 2.)]
+    while len(chunks):
+        tile, cellSize = chunks.pop()
+        # DROP COORDINATES ALREADY COVERED BY CENTRES CHOSEN FOR NEIGHBOURING TILES
+        if len(centres):
+            tile = tile[~((tile @ centres.T) >= cosRadius).any(axis=1)]
+        if not len(tile):
+            continue
+
+        if len(tile) <= maxExactSize:
+            tileCentres, uncovered = _greedy_disc_cover(tile, radius)
+        elif cellSize / 2. >= 2. * radiusChord:
+            cellSize = cellSize / 2.
+            cells = np.floor(tile / cellSize).astype(np.int64)
+            cellIds = np.unique(cells, axis=0, return_inverse=True)[1]
+            cellIds = cellIds.reshape(-1)
+            for cellId in np.unique(cellIds):
+                chunks.append((tile[cellIds == cellId], cellSize))
+            continue
+        else:
+            # A CROWDED TILE ABOUT A DISC ACROSS - CANDIDATES FROM A SAMPLE
+            sample = np.linspace(0, len(tile) - 1,
+                                 maxExactSize // 2).astype(int)
+            tileCentres, uncovered = _greedy_disc_cover(
+                tile, radius, candidateVectors=tile[sample])
+
+        centres = np.vstack([centres, tileCentres])
+        if uncovered.any():
+            chunks.append((tile[uncovered], cellSize))
+
+    centres = list(zip(
+        (np.degrees(np.arctan2(centres[:, 1], centres[:, 0])) % 360.).tolist(),
+        np.degrees(np.arcsin(np.clip(centres[:, 2], -1., 1.))).tolist()))
+
+    log.debug('completed the ``disc_cover`` function')
+    return centres
+
+
+def _greedy_disc_cover(
+        vectors,
+        radius,
+        candidateVectors=None):
+    """*greedy set cover of unit vectors by discs of angular radius ``radius`` (radians)*
+
+    **Key Arguments**
+
+    - ``vectors`` -- unit vectors of the coordinates to cover
+    - ``radius`` -- disc radius in radians
+    - ``candidateVectors`` -- the coordinates the candidate centres are built from. Default *None* (all of ``vectors``)
+
+    **Return**
+
+    - ``centres`` -- array of unit-vector disc centres
+    - ``uncovered`` -- boolean mask of the coordinates no candidate could cover (only possible with ``candidateVectors``)
+    """
+    import numpy as np
+
+    cosRadius = np.cos(radius)
+    # PAIR CENTRES SIT A HAIR INSIDE THE RADIUS SO ROUNDING NEVER LEAVES THE
+    # PAIR ITSELF UNCOVERED
+    innerRadius = radius * (1. - 1e-9)
+
+    if candidateVectors is None:
+        candidateVectors = vectors
+    candidates = [candidateVectors]
+    if len(candidateVectors) > 1:
+        dots = np.clip(candidateVectors @ candidateVectors.T, -1., 1.)
+        i, j = np.nonzero(np.triu(dots >= np.cos(2. * innerRadius), 1))
+        if len(i):
+            p, q = candidateVectors[i], candidateVectors[j]
+            normal = np.cross(p, q)
+            normalLength = np.linalg.norm(normal, axis=1)
+            # COINCIDENT PAIRS ARE ALREADY COVERED BY THE COORDINATE CANDIDATES
+            keep = normalLength > 1e-15
+            p, q, normal, normalLength = p[keep], q[keep], normal[
+                keep], normalLength[keep]
+            midpoint = p + q
+            midpointLength = np.linalg.norm(midpoint, axis=1)
+            midpoint = midpoint / midpointLength[:, None]
+            normal = normal / normalLength[:, None]
+            # cos(radius) = cos(half-separation) x cos(offset of the centre from the midpoint)
+            cosHalfSep = midpointLength / 2.
+            offset = np.arccos(
+                np.clip(np.cos(innerRadius) / cosHalfSep, -1., 1.))
+            for sign in (1., -1.):
+                candidates.append(np.cos(offset)[:, None] * midpoint +
+                                  sign * np.sin(offset)[:, None] * normal)
+    candidates = np.vstack(candidates)
+
+    covers = (candidates @ vectors.T) >= cosRadius
+    # EACH COORDINATE COVERS ITSELF, WHATEVER THE ROUNDING
+    if candidateVectors is vectors:
+        covers[np.arange(len(vectors)), np.arange(len(vectors))] = True
+
+    counts = covers.sum(axis=1)
+    uncovered = np.ones(len(vectors), dtype=bool)
+    chosen = []
+    while uncovered.any():
+        best = int(np.argmax(counts))
+        if counts[best] == 0:
+            break
+        chosen.append(best)
+        newlyCovered = covers[best] & uncovered
+        uncovered &= ~newlyCovered
+        counts = counts - covers[:, newlyCovered].sum(axis=1)
+
+    # DROP CENTRES WHOSE COORDINATES ARE ALL COVERED BY THE OTHER CENTRES
+    coverCounts = covers[chosen].sum(axis=0)
+    for c in chosen[::-1]:
+        if (coverCounts[covers[c]] > 1).all():
+            coverCounts = coverCounts - covers[c]
+            chosen.remove(c)
+
+    return candidates[chosen], uncovered
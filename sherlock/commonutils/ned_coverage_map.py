@@ -0,0 +1,368 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*An in-memory (and locally persisted) map of the sky already covered by recent NED stream queries*
+
+:Author:
+    David Young
+"""
+import os
+os.environ['TERM'] = 'vt100'
+
+
+class ned_coverage_map(object):
+    """
+    *An in-memory (and locally persisted) map of the sky already covered by recent NED stream queries*
+
+    Every query recorded in the ``tcs_helper_ned_query_history`` table is registered against the HTM trixels its search circle touches, and each trixel keeps the date of the most recent query touching it. Deciding whether a transient needs a NED refresh is then a trixel-id lookup plus an exact separation test against only the handful of queries registered to that trixel (with trixels last touched before the refresh limit rejected outright), rather than a 1 degree conesearch of the history table per transient.
+
+    A transient is covered when a query made within the last ``ned stream refresh rate in days`` contains the transient's ``first pass ned search radius arcec`` circle, i.e. the same test as the conesearch it replaces. The trixel depth is picked from the ``ned stream search radius arcec`` setting so a query circle touches only a few trixels.
+
+    The map is pickled to the ``ned coverage map file`` (default ``~/.config/sherlock/ned_coverage.pickle``) and ``sync`` only reads the history rows added since the map was last synced, so it is kept current after each NED ingest (and with other sherlock processes) cheaply. Queries older than the refresh limit are pruned from the map as they expire.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``dbConn`` -- connection to the catalogues database (holding ``tcs_helper_ned_query_history``)
+    - ``settings`` -- the settings dictionary
+    - ``pathToCoverageFile`` -- path to the local pickle of the map. Default *False* (use the ``ned coverage map file`` setting)
+
+    **Usage**
+
+    ```python
+    from sherlock.commonutils import ned_coverage_map
+    coverage = ned_coverage_map(
+        log=log,
+        dbConn=cataloguesDbConn,
+        settings=settings
+    )
+    coverage.sync()
+    coordinateList = coverage.uncovered(
+        coordinateList=[(10.2, -23.4), (201.1, 12.0)]
+    )
+    ```
+    """
+    # INITIALISATION
+
+    def __init__(
+            self,
+            log,
+            dbConn,
+            settings,
+            pathToCoverageFile=False
+    ):
+        self.log = log
+        log.debug("instansiating a new 'ned_coverage_map' object")
+        self.dbConn = dbConn
+        self.settings = settings
+
+        if not pathToCoverageFile:
+            pathToCoverageFile = "~/.config/sherlock/ned_coverage.pickle"
+            if "ned coverage map file" in settings and settings["ned coverage map file"]:
+                pathToCoverageFile = settings["ned coverage map file"]
+        self.pathToCoverageFile = os.path.expanduser(pathToCoverageFile)
+
+        self.refreshDays = float(settings["ned stream refresh rate in days"])
+        self.firstPassRadius = float(
+            settings["first pass ned search radius arcec"])
+
+        # THE DEEPEST TRIXELS STILL AT LEAST A QUERY-CIRCLE WIDE (AN HTM
+        # TRIXEL AT DEPTH N HAS SIDES OF ~90/2^N DEGREES)
+        radiusDeg = float(settings["ned stream search radius arcec"]) / 3600.
+        self.depth = 4
+        while self.depth < 16 and 90. / 2**(self.depth + 1) >= 2. * radiusDeg:
+            self.depth += 1
+
+        catalogueSettings = settings["database settings"]["static catalogues"]
+        self.source = "%s/%s" % (catalogueSettings.get("host"),
+                                 catalogueSettings.get("db"))
+
+        from HMpTy import HTM
+        self.mesh = HTM(
+            depth=self.depth,
+            log=self.log
+        )
+
+        self._reset()
+        self._load()
+
+        return None
+
+    def sync(
+            self):
+        """*add the queries recorded in the NED query history table since the map was last synced, prune expired ones and save the map*
+
+        **Return**
+
+        - ``added`` -- the number of queries added to the map
+        """
+        self.log.debug('starting the ``sync`` method')
+
+        from fundamentals.mysql import readquery
+
+        rows = readquery(
+            log=self.log,
+            sqlQuery="select max(primaryId) as maxId from tcs_helper_ned_query_history",
+            dbConn=self.dbConn
+        )
+        maxId = rows[0]["maxId"] or 0
+        # THE HISTORY TABLE HAS BEEN EMPTIED/REBUILT SINCE THE LAST SYNC
+        if maxId < self.lastPrimaryId:
+            self.log.info(
+                'the NED query history table has been rebuilt, rebuilding the NED coverage map')
+            self._reset()
+        if maxId == self.lastPrimaryId:
+            self.log.debug('completed the ``sync`` method')
+            return 0
+
+        lastPrimaryId = self.lastPrimaryId
+        refreshLimit = self._refresh_limit().astype(
+            "datetime64[s]").item().strftime("%Y-%m-%d %H:%M:%S")
+        rows = readquery(
+            log=self.log,
+            sqlQuery="""select primaryId, raDeg, decDeg, arcsecRadius, dateQueried from tcs_helper_ned_query_history where primaryId > %(lastPrimaryId)s and dateQueried > '%(refreshLimit)s' and raDeg is not null and decDeg is not null and arcsecRadius is not null order by primaryId""" % locals(),
+            dbConn=self.dbConn
+        )
+
+        self._add_queries(rows)
+        self.lastPrimaryId = maxId
+        self._prune()
+        self.save()
+
+        added = len(rows)
+        self.log.debug('completed the ``sync`` method')
+        return added
+
+    def uncovered(
+            self,
+            coordinateList):
+        """*filter a coordinate list down to the coordinates not covered by a recent NED query*
+
+        **Key Arguments**
+
+        - ``coordinateList`` -- list of (ra, dec) tuples in decimal degrees
+
+        **Return**
+
+        - ``updatedCoordinateList`` -- the coordinates (in their original order) that need a NED query
+        """
+        self.log.debug('starting the ``uncovered`` method')
+
+        import numpy as np
+
+        if not len(coordinateList) or not len(self.ra):
+            return list(coordinateList)
+
+        raArray = np.array([float(c[0]) for c in coordinateList])
+        decArray = np.array([float(c[1]) for c in coordinateList])
+        refreshLimit = self._refresh_limit()
+
+        covered = np.zeros(len(coordinateList), dtype=bool)
+        pixels = np.asarray(self.mesh.lookup_id(raArray, decArray))
+
+        # TEST THE COORDINATES ONE TRIXEL AT A TIME
+        order = np.argsort(pixels, kind="stable")
+        uniquePixels, starts = np.unique(pixels[order], return_index=True)
+        for pixel, group in zip(uniquePixels, np.split(order, starts[1:])):
+            pixel = int(pixel)
+            if pixel not in self.cells or self.cellDates[pixel] <= refreshLimit:
+                continue
+            candidates = np.array(self.cells[pixel])
+            candidates = candidates[self.dateQueried[candidates] > refreshLimit]
+            separations = _angular_separation_arcsec(
+                raArray[group][:, None], decArray[group][:, None], self.ra[candidates][None, :], self.dec[candidates][None, :])
+            covered[group] = np.any(
+                separations + self.firstPassRadius < self.radius[candidates][None, :], axis=1)
+
+        updatedCoordinateList = [c for c, isCovered in zip(
+            coordinateList, covered) if not isCovered]
+
+        self.log.debug('completed the ``uncovered`` method')
+        return updatedCoordinateList
+
+    def save(
+            self):
+        """*pickle the map to the local coverage file*
+        """
+        self.log.debug('starting the ``save`` method')
+
+        import pickle
+
+        # Recursively create missing directories
+        coverageDir = os.path.dirname(self.pathToCoverageFile)
+        if coverageDir and not os.path.exists(coverageDir):
+            os.makedirs(coverageDir)
+
+        state = {
+            "source": self.source,
+            "depth": self.depth,
+            "lastPrimaryId": self.lastPrimaryId,
+            "ra": self.ra,
+            "dec": self.dec,
+            "radius": self.radius,
+            "dateQueried": self.dateQueried,
+            "cells": self.cells,
+            "cellDates": self.cellDates
+        }
+        # WRITE THEN RENAME SO A KILLED PROCESS NEVER LEAVES A HALF-WRITTEN FILE
+        tmpFile = "%s.%s.tmp" % (self.pathToCoverageFile, os.getpid())
+        with open(tmpFile, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpFile, self.pathToCoverageFile)
+
+        self.log.debug('completed the ``save`` method')
+        return None
+
+    def _reset(
+            self):
+        """*empty the map*
+        """
+        import numpy as np
+
+        self.lastPrimaryId = 0
+        self.ra = np.zeros(0)
+        self.dec = np.zeros(0)
+        self.radius = np.zeros(0)
+        self.dateQueried = np.zeros(0, dtype="datetime64[s]")
+        # TRIXEL ID -> INDICES OF THE QUERIES TOUCHING IT, AND THE DATE OF THE
+        # MOST RECENT OF THOSE QUERIES
+        self.cells = {}
+        self.cellDates = {}
+        return None
+
+    def _load(
+            self):
+        """*load the map from the local coverage file, if it was built from the same catalogues database at the same trixel depth*
+        """
+        self.log.debug('starting the ``_load`` method')
+
+        import pickle
+
+        if not os.path.exists(self.pathToCoverageFile):
+            return None
+
+        try:
+            with open(self.pathToCoverageFile, 'rb') as f:
+                state = pickle.load(f)
+        except Exception as e:
+            pathToCoverageFile = self.pathToCoverageFile
+            self.log.warning(
+                'could not read the NED coverage map %(pathToCoverageFile)s (%(e)s), rebuilding it' % locals())
+            return None
+
+        if state.get("source") != self.source or state.get("depth") != self.depth:
+            self.log.info(
+                'the NED coverage map was built for another catalogues database or trixel depth, rebuilding it')
+            return None
+
+        self.lastPrimaryId = state["lastPrimaryId"]
+        self.ra = state["ra"]
+        self.dec = state["dec"]
+        self.radius = state["radius"]
+        self.dateQueried = state["dateQueried"]
+        self.cells = state["cells"]
+        self.cellDates = state["cellDates"]
+
+        self.log.debug('completed the ``_load`` method')
+        return None
+
+    def _add_queries(
+            self,
+            rows):
+        """*register NED query history rows against the trixels their search circles touch*
+        """
+        self.log.debug('starting the ``_add_queries`` method')
+
+        import numpy as np
+
+        if not len(rows):
+            return None
+
+        offset = len(self.ra)
+        self.ra = np.concatenate(
+            [self.ra, np.array([float(r["raDeg"]) for r in rows])])
+        self.dec = np.concatenate(
+            [self.dec, np.array([float(r["decDeg"]) for r in rows])])
+        self.radius = np.concatenate(
+            [self.radius, np.array([float(r["arcsecRadius"]) for r in rows])])
+        self.dateQueried = np.concatenate([self.dateQueried, np.array(
+            [r["dateQueried"] for r in rows], dtype="datetime64[s]")])
+
+        for i in range(offset, len(self.ra)):
+            pixels = self.mesh.intersect(
+                ra=self.ra[i],
+                dec=self.dec[i],
+                radius=self.radius[i] / 3600.,
+                inclusive=True
+            )
+            date = self.dateQueried[i]
+            for pixel in pixels:
+                pixel = int(pixel)
+                if pixel in self.cells:
+                    self.cells[pixel].append(i)
+                    if date > self.cellDates[pixel]:
+                        self.cellDates[pixel] = date
+                else:
+                    self.cells[pixel] = [i]
+                    self.cellDates[pixel] = date
+
+        self.log.debug('completed the ``_add_queries`` method')
+        return None
+
+    def _prune(
+            self):
+        """*drop the queries older than the refresh limit once they make up at least half of the map*
+        """
+        self.log.debug('starting the ``_prune`` method')
+
+        import numpy as np
+
+        live = self.dateQueried > self._refresh_limit()
+        if not len(live) or live.sum() * 2 > len(live):
+            return None
+
+        # OLD INDEX -> NEW INDEX OF EACH SURVIVING QUERY
+        newIndex = np.cumsum(live) - 1
+        self.ra = self.ra[live]
+        self.dec = self.dec[live]
+        self.radius = self.radius[live]
+        self.dateQueried = self.dateQueried[live]
+
+        cells = {}
+        cellDates = {}
+        for pixel, indices in self.cells.items():
+            indices = [int(newIndex[i]) for i in indices if live[i]]
+            if len(indices):
+                cells[pixel] = indices
+                cellDates[pixel] = self.cellDates[pixel]
+        self.cells = cells
+        self.cellDates = cellDates
+
+        self.log.debug('completed the ``_prune`` method')
+        return None
+
+    def _refresh_limit(
+            self):
+        """*queries made on or before this date no longer count as coverage*
+        """
+        import numpy as np
+        from datetime import datetime, timedelta
+
+        refreshLimit = datetime.now() - timedelta(days=self.refreshDays)
+        return np.datetime64(refreshLimit, "s")
+
+
+def _angular_separation_arcsec(
+        ra1,
+        dec1,
+        ra2,
+        dec2):
+    """*haversine angular separation (arcsec) between (broadcastable arrays of) coordinates in decimal degrees*
+    """
+    import numpy as np
+
+    ra1, dec1, ra2, dec2 = np.radians(ra1), np.radians(
+        dec1), np.radians(ra2), np.radians(dec2)
+    a = np.sin((dec2 - dec1) / 2.)**2 + np.cos(dec1) * \
+        np.cos(dec2) * np.sin((ra2 - ra1) / 2.)**2
+    return np.degrees(2. * np.arcsin(np.sqrt(np.clip(a, 0., 1.)))) * 3600.
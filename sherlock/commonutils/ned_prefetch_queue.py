@@ -0,0 +1,337 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*A queue of sky locations waiting for the NED stream to be refreshed around them, so NED can be queried ahead of (and apart from) classification*
+
+:Author:
+    David Young
+"""
+import os
+os.environ['TERM'] = 'vt100'
+
+
+class ned_prefetch_queue(object):
+    """
+    *A queue of sky locations waiting for the NED stream to be refreshed around them, so NED can be queried ahead of (and apart from) classification*
+
+    The queue lives in the ``tcs_helper_ned_prefetch_queue`` table of the sherlock-catalogues database. The classifier queues the transients it finds without recent NED coverage and carries on crossmatching against whatever coverage exists; the ``sherlock nedprefetch`` service takes the queued locations, refreshes the NED stream around them and marks them ``fetched``. Transients whose location was fetched are then flagged for reclassification and the entry is marked ``flagged``. Locations can also be queued without a transient id (e.g. a survey's upcoming footprints) to warm the NED stream before any transients land there.
+
+    Only one prefetcher should drain the queue at a time. The queue table is created on first use, and ``entries_for`` and ``done_entries`` hold the queueing and flagging decisions without touching the database.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``dbConn`` -- the sherlock-catalogues database connection
+    - ``settings`` -- the settings dictionary. Default *False*
+
+    **Usage**
+
+    ```python
+    from sherlock.commonutils import ned_prefetch_queue
+    queue = ned_prefetch_queue(
+        log=log,
+        dbConn=cataloguesDbConn,
+        settings=settings
+    )
+    queue.enqueue(
+        coordinateList=[(23.12323, -12.34343), (345.43234, 45.26789)],
+        transientIds=[1001, 1002]
+    )
+
+    # IN THE PREFETCHER
+    rows = queue.next_batch(limit=1000)
+    ... refresh the NED stream around the rows' raDeg/decDeg ...
+    queue.mark_fetched(primaryIds=[r["primaryId"] for r in rows])
+    ```
+    """
+    # INITIALISATION
+
+    def __init__(
+            self,
+            log,
+            dbConn,
+            settings=False
+    ):
+        self.log = log
+        log.debug("instansiating a new 'ned_prefetch_queue' object")
+        self.dbConn = dbConn
+        self.settings = settings
+        self.tableName = "tcs_helper_ned_prefetch_queue"
+        self._tableCreated = False
+
+        return None
+
+    def enqueue(
+            self,
+            coordinateList,
+            transientIds=False):
+        """*queue locations for a NED stream refresh*
+
+        **Key Arguments**
+
+        - ``coordinateList`` -- list of (ra, dec) tuples in decimal degrees
+        - ``transientIds`` -- the id of the transient at each location, flagged for reclassification once its location is fetched. Default *False* (locations not tied to a transient)
+
+        **Return**
+
+        - ``queued`` -- the number of locations queued
+        """
+        self.log.debug('starting the ``enqueue`` method')
+
+        from fundamentals.mysql import writequery
+
+        if not len(coordinateList):
+            return 0
+        if not transientIds:
+            transientIds = [None] * len(coordinateList)
+        if len(transientIds) != len(coordinateList):
+            message = "`transientIds` must give one id per coordinate"
+            self.log.error(message)
+            raise ValueError(message)
+
+        self._create_table()
+        tableName = self.tableName
+        sqlQuery = """insert into `%(tableName)s` (transientId, raDeg, decDeg) values (%%s, %%s, %%s)""" % locals()
+        writequery(
+            log=self.log,
+            sqlQuery=sqlQuery,
+            dbConn=self.dbConn,
+            manyValueList=[(None if t is None else str(t), float(c[0]), float(c[1]))
+                           for t, c in zip(transientIds, coordinateList)]
+        )
+
+        queued = len(coordinateList)
+        self.log.info(
+            'queued %(queued)s locations for a NED stream refresh' % locals())
+
+        self.log.debug('completed the ``enqueue`` method')
+        return queued
+
+    def next_batch(
+            self,
+            limit=1000):
+        """*the oldest queued locations*
+
+        **Key Arguments**
+
+        - ``limit`` -- the most locations to return. Default *1000*
+
+        **Return**
+
+        - ``rows`` -- list of queue rows (``primaryId``, ``transientId``, ``raDeg``, ``decDeg``)
+        """
+        self.log.debug('starting the ``next_batch`` method')
+
+        from fundamentals.mysql import readquery
+
+        self._create_table()
+        tableName = self.tableName
+        limit = int(limit)
+        sqlQuery = """select primaryId, transientId, raDeg, decDeg from `%(tableName)s` where status = "queued" order by primaryId limit %(limit)s""" % locals()
+        rows = readquery(
+            log=self.log,
+            sqlQuery=sqlQuery,
+            dbConn=self.dbConn,
+        )
+
+        self.log.debug('completed the ``next_batch`` method')
+        return list(rows)
+
+    def mark_fetched(
+            self,
+            primaryIds):
+        """*mark queued locations as fetched (the NED stream around them is up to date)*
+
+        Locations not tied to a transient are marked ``flagged`` straight away as there is nothing to reclassify.
+
+        **Key Arguments**
+
+        - ``primaryIds`` -- the queue ``primaryId`` of each location
+        """
+        self.log.debug('starting the ``mark_fetched`` method')
+
+        from fundamentals.mysql import writequery
+
+        if not len(primaryIds):
+            return None
+
+        self._create_table()
+        tableName = self.tableName
+        sqlQuery = """update `%(tableName)s` set status = if(transientId is null, "flagged", "fetched"), dateFetched = now() where primaryId = %%s""" % locals()
+        writequery(
+            log=self.log,
+            sqlQuery=sqlQuery,
+            dbConn=self.dbConn,
+            manyValueList=[(int(p),) for p in primaryIds]
+        )
+
+        self.log.debug('completed the ``mark_fetched`` method')
+        return None
+
+    def fetched_transients(
+            self):
+        """*the queue entries whose location has been fetched but whose transient is not yet flagged for reclassification*
+
+        **Return**
+
+        - ``rows`` -- list of queue rows (``primaryId``, ``transientId``, ``dateFetched``)
+        """
+        self.log.debug('starting the ``fetched_transients`` method')
+
+        from fundamentals.mysql import readquery
+
+        self._create_table()
+        tableName = self.tableName
+        sqlQuery = """select primaryId, transientId, dateFetched from `%(tableName)s` where status = "fetched" order by primaryId""" % locals()
+        rows = readquery(
+            log=self.log,
+            sqlQuery=sqlQuery,
+            dbConn=self.dbConn,
+        )
+
+        self.log.debug('completed the ``fetched_transients`` method')
+        return list(rows)
+
+    def mark_flagged(
+            self,
+            primaryIds):
+        """*mark fetched entries as done (their transients have been flagged for reclassification)*
+
+        **Key Arguments**
+
+        - ``primaryIds`` -- the queue ``primaryId`` of each entry
+        """
+        self.log.debug('starting the ``mark_flagged`` method')
+
+        from fundamentals.mysql import writequery
+
+        if not len(primaryIds):
+            return None
+
+        self._create_table()
+        tableName = self.tableName
+        sqlQuery = """update `%(tableName)s` set status = "flagged" where primaryId = %%s""" % locals()
+        writequery(
+            log=self.log,
+            sqlQuery=sqlQuery,
+            dbConn=self.dbConn,
+            manyValueList=[(int(p),) for p in primaryIds]
+        )
+
+        self.log.debug('completed the ``mark_flagged`` method')
+        return None
+
+    def purge(
+            self,
+            days=7):
+        """*delete the flagged entries fetched more than ``days`` ago*
+
+        **Key Arguments**
+
+        - ``days`` -- age in days of the entries to delete. Default *7*
+        """
+        self.log.debug('starting the ``purge`` method')
+
+        from fundamentals.mysql import writequery
+
+        self._create_table()
+        tableName = self.tableName
+        days = int(days)
+        sqlQuery = """delete from `%(tableName)s` where status = "flagged" and dateFetched < now() - interval %(days)s day""" % locals()
+        writequery(
+            log=self.log,
+            sqlQuery=sqlQuery,
+            dbConn=self.dbConn,
+        )
+
+        self.log.debug('completed the ``purge`` method')
+        return None
+
+    def entries_for(
+            self,
+            transientsMetadataList,
+            coordinateList):
+        """*the queue entries for the transients at the given locations (e.g. those without recent NED coverage)*
+
+        **Key Arguments**
+
+        - ``transientsMetadataList`` -- list of transient metadata dictionaries (``id``, ``ra``, ``dec``)
+        - ``coordinateList`` -- the (ra, dec) locations to queue
+
+        **Return**
+
+        - ``coordinates``, ``transientIds`` -- one (ra, dec) and transient id per transient at a queued location, in ``coordinateList`` order (ready for ``enqueue``)
+        """
+        idsByCoordinate = {}
+        for t in transientsMetadataList:
+            idsByCoordinate.setdefault((t["ra"], t["dec"]), []).append(t["id"])
+
+        coordinates = []
+        transientIds = []
+        for c in coordinateList:
+            for transientId in idsByCoordinate.get(tuple(c), []):
+                coordinates.append(tuple(c))
+                transientIds.append(transientId)
+        return coordinates, transientIds
+
+    def done_entries(
+            self,
+            rows,
+            flaggedIds,
+            giveUpDays=1,
+            now=False):
+        """*the fetched entries that are finished with: their transient has just been flagged for reclassification, or it has still not been classified ``giveUpDays`` after the fetch*
+
+        **Key Arguments**
+
+        - ``rows`` -- the fetched entries (from ``fetched_transients``)
+        - ``flaggedIds`` -- the transient ids just flagged for reclassification
+        - ``giveUpDays`` -- days to wait for a transient still being classified. Default *1*
+        - ``now`` -- the current time. Default *False* (``datetime.now()``)
+
+        **Return**
+
+        - ``primaryIds`` -- the entries to ``mark_flagged``
+        """
+        from datetime import datetime, timedelta
+
+        if not now:
+            now = datetime.now()
+        giveUp = now - timedelta(days=giveUpDays)
+        flaggedIds = set(str(t) for t in flaggedIds)
+        return [r["primaryId"] for r in rows if str(r["transientId"]) in flaggedIds or (
+            r["dateFetched"] and r["dateFetched"] < giveUp)]
+
+    def _create_table(
+            self):
+        """*create the queue table if it does not exist yet (once per queue object)*
+        """
+        if self._tableCreated:
+            return None
+        self.log.debug('starting the ``_create_table`` method')
+
+        from fundamentals.mysql import writequery
+
+        tableName = self.tableName
+        sqlQuery = """CREATE TABLE IF NOT EXISTS `%(tableName)s` (
+  `primaryId` bigint(20) NOT NULL AUTO_INCREMENT,
+  `transientId` varchar(100) DEFAULT NULL,
+  `raDeg` double NOT NULL,
+  `decDeg` double NOT NULL,
+  `status` varchar(10) NOT NULL DEFAULT 'queued',
+  `dateQueued` datetime DEFAULT CURRENT_TIMESTAMP,
+  `dateFetched` datetime DEFAULT NULL,
+  PRIMARY KEY (`primaryId`),
+  KEY `idx_status` (`status`,`primaryId`),
+  KEY `idx_dateFetched` (`dateFetched`)
+) ENGINE=MyISAM AUTO_INCREMENT=0 DEFAULT CHARSET=utf8 COLLATE=utf8_unicode_ci;
+""" % locals()
+        writequery(
+            log=self.log,
+            sqlQuery=sqlQuery,
+            dbConn=self.dbConn,
+        )
+        self._tableCreated = True
+
+        self.log.debug('completed the ``_create_table`` method')
+        return None
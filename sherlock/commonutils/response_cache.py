@@ -0,0 +1,322 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*A content-addressed on-disk cache of remote query responses, keyed by the normalised query parameters, with a TTL and size-bounded LRU eviction*
+
+:Author:
+    David Young
+"""
+import os
+os.environ['TERM'] = 'vt100'
+
+
+class response_cache(object):
+    """
+    *A content-addressed on-disk cache of remote query responses, keyed by the normalised query parameters, with a TTL and size-bounded LRU eviction*
+
+    Each response is stored as a JSON file named by the SHA-256 of the query kind and its normalised parameters (coordinates rounded to 1e-6 deg, names stripped), so identical queries share one entry whoever makes them. Only an identical query is served: a conesearch of an overlapping disc with another centre or radius is a miss. Entries older than ``ttl days`` are refetched. Once the cache grows past ``max megabytes`` the least recently used entries are evicted.
+
+    With ``replay only: True`` expired entries are still served and a cache miss raises an ``IOError`` instead of going to the network. Ingests and test runs can then be replayed offline and deterministically from a populated cache.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``settings`` -- the settings dictionary. Default *False*
+    - ``settingsKey`` -- the settings block to read. Default *ned cache*
+
+    The settings block:
+
+    ```yaml
+    ned cache:
+        enabled: False
+        directory: ~/.config/sherlock/ned_cache
+        ttl days: 30
+        max megabytes: 500
+        replay only: False
+    ```
+
+    **Usage**
+
+    ```python
+    from sherlock.commonutils import response_cache, concurrent_fetcher
+    cache = response_cache(
+        log=log,
+        settings=settings
+    )
+    results = cache.fetch(
+        fetcher=concurrent_fetcher(log=log, settings=settings),
+        kind="ned conesearch",
+        urls=conesearchUrls,
+        params=[{"raDeg": ra, "decDeg": dec, "radiusArcsec": 900} for ra, dec in centres],
+        parse=parse_conesearch_page
+    )
+    ```
+    """
+    # INITIALISATION
+
+    def __init__(
+            self,
+            log,
+            settings=False,
+            settingsKey="ned cache"
+    ):
+        self.log = log
+        log.debug("instansiating a new 'response_cache' object")
+        self.settings = settings
+
+        config = {}
+        if settings and settingsKey in settings and settings[settingsKey]:
+            config = settings[settingsKey]
+
+        self.enabled = bool(config.get("enabled", False))
+        self.directory = os.path.expanduser(
+            config.get("directory") or "~/.config/sherlock/ned_cache")
+        self.ttlSeconds = float(config.get("ttl days", 30)) * 86400.
+        self.maxBytes = float(config.get("max megabytes", 500)) * 1024**2
+        self.replayOnly = bool(config.get("replay only", False))
+
+        # TOTAL SIZE OF THE CACHE (MEASURED ON THE FIRST WRITE)
+        self._size = None
+        self.hits = 0
+        self.misses = 0
+
+        return None
+
+    def key(
+            self,
+            kind,
+            params):
+        """*the content address of a query*
+
+        **Key Arguments**
+
+        - ``kind`` -- the kind of query (e.g. ``ned conesearch``)
+        - ``params`` -- the query parameters (JSON-serialisable)
+
+        **Return**
+
+        - ``key`` -- SHA-256 hex digest of the kind and normalised parameters
+        """
+        import hashlib
+        import json
+
+        payload = json.dumps({"kind": kind, "params": _normalise(params)},
+                             sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(
+            self,
+            kind,
+            params):
+        """*look up a cached response*
+
+        **Key Arguments**
+
+        - ``kind`` -- the kind of query
+        - ``params`` -- the query parameters
+
+        **Return**
+
+        - ``hit`` -- True if a live response was found
+        - ``response`` -- the cached response (None on a miss)
+        """
+        import json
+        import time
+
+        if not self.enabled:
+            return False, None
+
+        path = self._path(self.key(kind, params))
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (IOError, OSError, ValueError):
+            self.misses += 1
+            return False, None
+
+        if not self.replayOnly and time.time() - entry["created"] > self.ttlSeconds:
+            self.misses += 1
+            return False, None
+
+        # MARK AS RECENTLY USED FOR LRU EVICTION
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        self.hits += 1
+        return True, entry["response"]
+
+    def set(
+            self,
+            kind,
+            params,
+            response):
+        """*cache a response*
+
+        **Key Arguments**
+
+        - ``kind`` -- the kind of query
+        - ``params`` -- the query parameters
+        - ``response`` -- the response (JSON-serialisable)
+        """
+        import json
+        import time
+
+        if not self.enabled:
+            return None
+
+        path = self._path(self.key(kind, params))
+        # Recursively create missing directories
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+
+        previousSize = os.path.getsize(path) if os.path.exists(path) else 0
+        # WRITE THEN RENAME SO A KILLED PROCESS NEVER LEAVES A HALF-WRITTEN ENTRY
+        tmpFile = "%s.%s.tmp" % (path, os.getpid())
+        with open(tmpFile, 'w') as f:
+            json.dump({"created": time.time(), "kind": kind,
+                       "response": response}, f, default=str)
+        os.replace(tmpFile, path)
+
+        if self._size is None:
+            self._size = self._measure()
+        else:
+            self._size += os.path.getsize(path) - previousSize
+        if self._size > self.maxBytes:
+            self._evict()
+        return None
+
+    def fetch(
+            self,
+            fetcher,
+            kind,
+            urls,
+            params,
+            parse=False):
+        """*serve the queries' responses from the cache, requesting only the misses through the ``fetcher``*
+
+        **Key Arguments**
+
+        - ``fetcher`` -- a ``concurrent_fetcher``
+        - ``kind`` -- the kind of query
+        - ``urls`` -- list of the URL of each query
+        - ``params`` -- list of the query parameters of each query (the cache keys)
+        - ``parse`` -- function turning a response body into the (JSON-serialisable) response that is cached. Default *False*
+
+        **Return**
+
+        - ``results`` -- list of responses, in the order of ``urls``
+        """
+        self.log.debug('starting the ``fetch`` method')
+
+        results = []
+        missing = []
+        for i, p in enumerate(params):
+            hit, response = self.get(kind, p)
+            results.append(response)
+            if not hit:
+                missing.append(i)
+
+        if len(missing) and self.replayOnly:
+            count = len(missing)
+            message = "%(count)s `%(kind)s` queries are not in the response cache and `replay only` is set" % locals()
+            self.log.error(message)
+            raise IOError(message)
+
+        if len(missing):
+            fetched = fetcher.get(
+                urls=[urls[i] for i in missing],
+                parse=parse
+            )
+            for i, response in zip(missing, fetched):
+                self.set(kind, params[i], response)
+                results[i] = response
+
+        if self.enabled:
+            hitCount = len(urls) - len(missing)
+            total = len(urls)
+            self.log.info(
+                '%(hitCount)s of %(total)s `%(kind)s` responses served from the cache' % locals())
+
+        self.log.debug('completed the ``fetch`` method')
+        return results
+
+    def _path(
+            self,
+            key):
+        """*the file holding an entry (fanned out over 256 sub-directories)*
+        """
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def _entries(
+            self):
+        """*list the cache entries as (path, size, last used) tuples*
+        """
+        entries = []
+        if not os.path.exists(self.directory):
+            return entries
+        for d in os.listdir(self.directory):
+            subDir = os.path.join(self.directory, d)
+            if not os.path.isdir(subDir):
+                continue
+            for name in os.listdir(subDir):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(subDir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _measure(
+            self):
+        """*the total size of the cache in bytes*
+        """
+        return sum(e[1] for e in self._entries())
+
+    def _evict(
+            self):
+        """*remove the least recently used entries until the cache is back under 90% of its size limit*
+        """
+        self.log.debug('starting the ``_evict`` method')
+
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        size = sum(e[1] for e in entries)
+        evicted = 0
+        for path, entrySize, lastUsed in entries:
+            if size <= 0.9 * self.maxBytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= entrySize
+            evicted += 1
+        self._size = size
+        self.log.info('evicted %(evicted)s entries from the response cache' % locals())
+
+        self.log.debug('completed the ``_evict`` method')
+        return None
+
+
+def _normalise(
+        value):
+    """*normalise query parameters so equivalent queries share a key - floats rounded to 1e-6, strings stripped, tuples as lists*
+    """
+    if isinstance(value, dict):
+        return {str(k): _normalise(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalise(v) for v in value]
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return round(float(value), 6)
+    if isinstance(value, str):
+        value = value.strip()
+        try:
+            return round(float(value), 6)
+        except ValueError:
+            return value
+    return str(value)
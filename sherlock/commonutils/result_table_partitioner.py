@@ -0,0 +1,503 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*Create, migrate and maintain range-partitioned sherlock result tables, with partition-level purges and swaps*
+
+:Author:
+    David Young
+"""
+import os
+os.environ['TERM'] = 'vt100'
+
+
+class result_table_partitioner(object):
+    """
+    *Create, migrate and maintain range-partitioned sherlock result tables, with partition-level purges and swaps*
+
+    Two partitioning schemes are supported:
+
+    - ``id`` -- both ``sherlock_crossmatches`` and ``sherlock_classifications`` are partitioned by ``RANGE (transient_object_id)`` in blocks of ``id partition size`` transients. Reclassification deletes keyed on transient id are pruned to the partitions holding the batch, and the results of whole id ranges can be purged with ``TRUNCATE PARTITION`` or rebuilt off-line and swapped in with ``EXCHANGE PARTITION``.
+    - ``date`` -- ``sherlock_crossmatches`` is partitioned by month of ``dateCreated`` so that old crossmatch detail can be retired with ``DROP PARTITION`` (``retention days``). ``sherlock_classifications`` is left unpartitioned in this scheme as its primary key must stay the transient id.
+
+    MySQL requires the partitioning column to be part of every unique key, so migrating a table extends the ``sherlock_crossmatches`` primary key to ``(id, <partition column>)``. Partitioned MyISAM tables are not supported by MySQL 8, so ``sherlock_classifications`` is converted to InnoDB when it is partitioned. Migration rebuilds the tables, so it is only run by the ``sherlock partition`` command, never by a classification run. A ``pmax`` catch-all partition is always kept at the top of the range, and ``ensure_partitions`` splits it ahead of the incoming data. The upper partition bound of each table is cached after the first look-up, so calling ``ensure_partitions`` for every batch only touches ``information_schema`` when a batch reaches past it.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``dbConn`` -- connection to the transient database
+    - ``settings`` -- the settings dictionary. Read from the ``result table partitioning`` block
+
+    The ``result table partitioning`` settings block:
+
+    ```yaml
+    result table partitioning:
+        enabled: True
+        scheme: id
+        id partition size: 1000000
+        partitions ahead: 2
+        retention days: False
+    ```
+
+    **Usage**
+
+    ```python
+    from sherlock.commonutils import result_table_partitioner
+    partitioner = result_table_partitioner(
+        log=log,
+        dbConn=transientsDbConn,
+        settings=settings
+    )
+    partitioner.migrate()
+    partitioner.ensure_partitions()
+    partitioner.purge(olderThanDays=365)
+    ```
+    """
+    # INITIALISATION
+
+    def __init__(
+            self,
+            log,
+            dbConn,
+            settings=False
+    ):
+        self.log = log
+        log.debug("instansiating a new 'result_table_partitioner' object")
+        self.dbConn = dbConn
+        self.settings = settings
+
+        config = {}
+        if settings and "result table partitioning" in settings and settings["result table partitioning"]:
+            config = settings["result table partitioning"]
+
+        self.enabled = bool(config.get("enabled", False))
+        self.scheme = str(config.get("scheme", "id")).lower()
+        self.idPartitionSize = int(config.get("id partition size", 1000000))
+        self.partitionsAhead = int(config.get("partitions ahead", 2))
+        self.retentionDays = config.get("retention days", False)
+
+        if self.scheme not in ("id", "date"):
+            message = "`result table partitioning: scheme` must be one of id or date (not `%s`)" % (
+                self.scheme,)
+            self.log.error(message)
+            raise ValueError(message)
+        if self.idPartitionSize < 1:
+            message = "`result table partitioning: id partition size` must be a positive integer"
+            self.log.error(message)
+            raise ValueError(message)
+
+        # THE TABLES PARTITIONED UNDER EACH SCHEME
+        self.tables = ["sherlock_crossmatches"]
+        if self.scheme == "id":
+            self.tables.append("sherlock_classifications")
+
+        # CACHED HIGHEST PARTITION BOUND OF EACH TABLE (None = NOT PARTITIONED)
+        self._highestBounds = {}
+
+        return None
+
+    def migrate(
+            self):
+        """*partition any result tables that are not yet partitioned*
+
+        Each table is rebuilt once with ``ALTER TABLE ... PARTITION BY RANGE``. This copies the table, so on a large existing table run it during a quiet period (``sherlock partition``).
+
+        **Return**
+
+        - ``migrated`` -- list of the tables that were partitioned
+
+        **Usage**
+
+        ```python
+        migrated = partitioner.migrate()
+        ```
+        """
+        self.log.debug('starting the ``migrate`` method')
+
+        migrated = []
+        if not self.enabled:
+            return migrated
+
+        for tableName in self.tables:
+            if len(self._partitions(tableName)):
+                continue
+            scheme = self.scheme
+            self.log.info(
+                "partitioning the `%(tableName)s` table (%(scheme)s scheme)" % locals())
+            for sqlQuery in self._migration_statements(tableName):
+                self._execute(sqlQuery)
+            self._highestBounds.pop(tableName, None)
+            migrated.append(tableName)
+
+        self.log.debug('completed the ``migrate`` method')
+        return migrated
+
+    def ensure_partitions(
+            self,
+            maxTransientId=False):
+        """*split the ``pmax`` catch-all partition so there are always empty partitions ahead of the incoming results*
+
+        **Key Arguments**
+
+        - ``maxTransientId`` -- the highest transient id about to be written (``id`` scheme). Default *False* (read from the tables)
+
+        **Return**
+
+        - None
+
+        **Usage**
+
+        ```python
+        partitioner.ensure_partitions(
+            maxTransientId=max(transientIds)
+        )
+        ```
+        """
+        self.log.debug('starting the ``ensure_partitions`` method')
+
+        import datetime
+
+        if not self.enabled:
+            return None
+
+        for tableName in self.tables:
+            # THE CACHED BOUND ALREADY COVERS THIS BATCH (PLUS THE PARTITIONS AHEAD)
+            if tableName in self._highestBounds:
+                highestBound = self._highestBounds[tableName]
+                if highestBound is None:
+                    continue
+                if self.scheme == "id" and maxTransientId is not False and int(maxTransientId) < highestBound - self.partitionsAhead * self.idPartitionSize:
+                    continue
+
+            partitions = self._partitions(tableName)
+            if not len(partitions):
+                self._highestBounds[tableName] = None
+                continue
+            bounds = [p["bound"] for p in partitions if p["bound"] is not None]
+            highestBound = max(bounds) if len(bounds) else 0
+            self._highestBounds[tableName] = highestBound
+
+            if self.scheme == "id":
+                if maxTransientId is False:
+                    rows = self._read(
+                        "SELECT MAX(transient_object_id) AS maxId FROM `%(tableName)s`" % locals())
+                    maxId = rows[0]["maxId"] or 0
+                else:
+                    maxId = maxTransientId
+                target = (int(maxId) // self.idPartitionSize +
+                          1 + self.partitionsAhead) * self.idPartitionSize
+                newBounds = list(range(
+                    highestBound + self.idPartitionSize, target + 1, self.idPartitionSize))
+                newPartitions = [("p%d" % b, "%d" % b) for b in newBounds]
+            else:
+                today = datetime.date.today()
+                newPartitions = []
+                month = datetime.date(today.year, today.month, 1)
+                for i in range(self.partitionsAhead + 1):
+                    month = _next_month(month)
+                    bound = month.toordinal() + 365
+                    if bound > highestBound:
+                        previous = _previous_month(month)
+                        newPartitions.append(
+                            ("p%s" % previous.strftime("%Y%m"), "TO_DAYS('%s')" % month.isoformat()))
+
+            if not len(newPartitions):
+                continue
+            partitionList = ", ".join(["PARTITION %s VALUES LESS THAN (%s)" % (
+                n, b) for n, b in newPartitions])
+            self._execute(
+                "ALTER TABLE `%(tableName)s` REORGANIZE PARTITION pmax INTO (%(partitionList)s, PARTITION pmax VALUES LESS THAN MAXVALUE)" % locals())
+            if self.scheme == "id":
+                self._highestBounds[tableName] = newBounds[-1]
+            else:
+                self._highestBounds.pop(tableName, None)
+
+        self.log.debug('completed the ``ensure_partitions`` method')
+        return None
+
+    def purge(
+            self,
+            olderThanDays=False,
+            belowTransientId=False):
+        """*remove whole partitions of results instead of deleting row-by-row*
+
+        **Key Arguments**
+
+        - ``olderThanDays`` -- drop (``date`` scheme) or truncate (``id`` scheme) the partitions holding only results created more than this many days ago. Default *False* (use the ``retention days`` setting)
+        - ``belowTransientId`` -- ``id`` scheme: truncate the partitions of both tables holding only transients with ids below this value. Default *False* (work the cut-off out from ``olderThanDays``)
+
+        In the ``id`` scheme the age cut-off becomes an id cut-off: the lowest transient id with a crossmatch created inside the retention window. Partitions wholly below it hold no recent results. Nothing is purged if no crossmatch is that recent, so a long idle spell never empties the tables.
+
+        **Return**
+
+        - ``purged`` -- list of ``(table, partition)`` tuples removed
+
+        **Usage**
+
+        ```python
+        purged = partitioner.purge(olderThanDays=365)
+        ```
+        """
+        self.log.debug('starting the ``purge`` method')
+
+        import datetime
+
+        purged = []
+        if not self.enabled:
+            return purged
+
+        if self.scheme == "date":
+            if olderThanDays is False:
+                olderThanDays = self.retentionDays
+            if not olderThanDays:
+                return purged
+            cutoff = datetime.date.today() - \
+                datetime.timedelta(days=int(olderThanDays))
+            # TO_DAYS() = PYTHON ORDINAL + 365
+            cutoff = cutoff.toordinal() + 365
+            for tableName in self.tables:
+                names = [p["name"] for p in self._partitions(tableName)
+                         if p["bound"] is not None and p["bound"] <= cutoff]
+                if len(names):
+                    partitionList = ", ".join(names)
+                    self._execute(
+                        "ALTER TABLE `%(tableName)s` DROP PARTITION %(partitionList)s" % locals())
+                    purged += [(tableName, n) for n in names]
+        else:
+            if belowTransientId is False:
+                if olderThanDays is False:
+                    olderThanDays = self.retentionDays
+                if not olderThanDays:
+                    return purged
+                rows = self._read(
+                    "SELECT MIN(transient_object_id) AS minId FROM `sherlock_crossmatches` WHERE dateCreated > DATE_SUB(NOW(), INTERVAL %d DAY)" % (int(olderThanDays),))
+                belowTransientId = rows[0]["minId"] if len(rows) else None
+                if belowTransientId is None:
+                    self.log.info(
+                        "no crossmatches created in the last %s days - nothing purged" % (olderThanDays,))
+                    return purged
+            for tableName in self.tables:
+                names = [p["name"] for p in self._partitions(tableName)
+                         if p["bound"] is not None and p["bound"] <= int(belowTransientId)]
+                if len(names):
+                    partitionList = ", ".join(names)
+                    self._execute(
+                        "ALTER TABLE `%(tableName)s` TRUNCATE PARTITION %(partitionList)s" % locals())
+                    purged += [(tableName, n) for n in names]
+
+        for tableName, name in purged:
+            self.log.info("purged partition %(name)s of `%(tableName)s`" % locals())
+
+        self.log.debug('completed the ``purge`` method')
+        return purged
+
+    def partition_for_transient_id(
+            self,
+            transientId):
+        """*the name of the ``id``-scheme partition holding a transient's results*
+
+        **Key Arguments**
+
+        - ``transientId`` -- the transient id
+
+        **Return**
+
+        - ``partitionName`` -- e.g. ``p2000000`` for transient ids 1000000-1999999 (with the default partition size)
+        """
+        upper = (int(transientId) // self.idPartitionSize + 1) * \
+            self.idPartitionSize
+        return "p%d" % upper
+
+    def create_exchange_table(
+            self,
+            tableName,
+            partitionName):
+        """*create an empty, unpartitioned copy of a result table to rebuild a partition's results in off-line*
+
+        Fill the returned table with the complete results for the partition's range, then swap it in with ``exchange_partition``.
+
+        **Key Arguments**
+
+        - ``tableName`` -- the partitioned result table
+        - ``partitionName`` -- the partition to be rebuilt
+
+        **Return**
+
+        - ``exchangeTable`` -- the name of the new table
+
+        **Usage**
+
+        ```python
+        partitionName = partitioner.partition_for_transient_id(transientId)
+        exchangeTable = partitioner.create_exchange_table(
+            tableName="sherlock_crossmatches",
+            partitionName=partitionName
+        )
+        # ... INSERT THE REBUILT RESULTS INTO exchangeTable ...
+        partitioner.exchange_partition(
+            tableName="sherlock_crossmatches",
+            partitionName=partitionName,
+            exchangeTable=exchangeTable
+        )
+        ```
+        """
+        self.log.debug('starting the ``create_exchange_table`` method')
+
+        exchangeTable = "_%(tableName)s_%(partitionName)s_exchange" % locals()
+        self._execute("DROP TABLE IF EXISTS `%(exchangeTable)s`" % locals())
+        self._execute(
+            "CREATE TABLE `%(exchangeTable)s` LIKE `%(tableName)s`" % locals())
+        self._execute(
+            "ALTER TABLE `%(exchangeTable)s` REMOVE PARTITIONING" % locals())
+
+        self.log.debug('completed the ``create_exchange_table`` method')
+        return exchangeTable
+
+    def exchange_partition(
+            self,
+            tableName,
+            partitionName,
+            exchangeTable,
+            dropExchangeTable=True):
+        """*swap a rebuilt table in as one partition of a result table (a metadata-only operation)*
+
+        **Key Arguments**
+
+        - ``tableName`` -- the partitioned result table
+        - ``partitionName`` -- the partition to replace
+        - ``exchangeTable`` -- the unpartitioned table holding the new results (see ``create_exchange_table``)
+        - ``dropExchangeTable`` -- drop the exchange table (now holding the old results) afterwards. Default *True*
+
+        **Return**
+
+        - None
+        """
+        self.log.debug('starting the ``exchange_partition`` method')
+
+        self._execute(
+            "ALTER TABLE `%(tableName)s` EXCHANGE PARTITION %(partitionName)s WITH TABLE `%(exchangeTable)s`" % locals())
+        if dropExchangeTable:
+            self._execute(
+                "DROP TABLE IF EXISTS `%(exchangeTable)s`" % locals())
+
+        self.log.debug('completed the ``exchange_partition`` method')
+        return None
+
+    def _migration_statements(
+            self,
+            tableName):
+        """*the ``ALTER TABLE`` statements that partition an existing result table under the configured scheme*
+        """
+        import datetime
+
+        statements = []
+        if self.scheme == "id":
+            column = "transient_object_id"
+            expression = "transient_object_id"
+            rows = self._read(
+                "SELECT MAX(transient_object_id) AS maxId FROM `%(tableName)s`" % locals())
+            maxId = rows[0]["maxId"] or 0
+            target = (int(maxId) // self.idPartitionSize +
+                      1 + self.partitionsAhead) * self.idPartitionSize
+            partitions = [("p%d" % b, "%d" % b) for b in range(
+                self.idPartitionSize, target + 1, self.idPartitionSize)]
+            if tableName == "sherlock_crossmatches":
+                statements.append(
+                    "ALTER TABLE `%(tableName)s` MODIFY `transient_object_id` bigint(20) unsigned NOT NULL" % locals())
+            else:
+                statements.append(
+                    "ALTER TABLE `%(tableName)s` ENGINE=InnoDB" % locals())
+        else:
+            column = "dateCreated"
+            expression = "TO_DAYS(dateCreated)"
+            rows = self._read(
+                "SELECT MIN(dateCreated) AS minDate FROM `%(tableName)s`" % locals())
+            minDate = rows[0]["minDate"] or datetime.datetime.now()
+            month = datetime.date(minDate.year, minDate.month, 1)
+            last = _next_month(datetime.date.today())
+            for i in range(self.partitionsAhead):
+                last = _next_month(last)
+            partitions = []
+            while month < last:
+                upper = _next_month(month)
+                partitions.append(("p%s" % month.strftime("%Y%m"),
+                                   "TO_DAYS('%s')" % upper.isoformat()))
+                month = upper
+            statements.append(
+                "UPDATE `%(tableName)s` SET dateCreated = IFNULL(dateLastModified, NOW()) WHERE dateCreated IS NULL" % locals())
+            statements.append(
+                "ALTER TABLE `%(tableName)s` MODIFY `dateCreated` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP" % locals())
+
+        if tableName == "sherlock_crossmatches":
+            statements.append(
+                "ALTER TABLE `%(tableName)s` DROP PRIMARY KEY, ADD PRIMARY KEY (`id`, `%(column)s`)" % locals())
+
+        partitionList = ", ".join(["PARTITION %s VALUES LESS THAN (%s)" % (
+            n, b) for n, b in partitions] + ["PARTITION pmax VALUES LESS THAN MAXVALUE"])
+        statements.append(
+            "ALTER TABLE `%(tableName)s` PARTITION BY RANGE (%(expression)s) (%(partitionList)s)" % locals())
+        return statements
+
+    def _partitions(
+            self,
+            tableName):
+        """*the range partitions of a table, in order, with their numeric upper bounds (None for ``pmax``)*
+        """
+        rows = self._read(
+            "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME='%(tableName)s' AND PARTITION_NAME IS NOT NULL ORDER BY PARTITION_ORDINAL_POSITION" % locals())
+        partitions = []
+        for r in rows:
+            bound = r["PARTITION_DESCRIPTION"]
+            try:
+                bound = int(bound)
+            except (TypeError, ValueError):
+                bound = None
+            partitions.append({"name": r["PARTITION_NAME"], "bound": bound})
+        return partitions
+
+    def _read(
+            self,
+            sqlQuery):
+        """*run a read query against the transient database*
+        """
+        from fundamentals.mysql import readquery
+        return readquery(
+            log=self.log,
+            sqlQuery=sqlQuery,
+            dbConn=self.dbConn
+        )
+
+    def _execute(
+            self,
+            sqlQuery):
+        """*run a schema/write statement against the transient database*
+        """
+        from fundamentals.mysql import writequery
+        writequery(
+            log=self.log,
+            sqlQuery=sqlQuery,
+            dbConn=self.dbConn
+        )
+        return None
+
+    # use the tab-trigger below for new method
+    # xt-class-method
+
+
+def _next_month(
+        date):
+    """*the first day of the month after ``date``*
+    """
+    import datetime
+    if date.month == 12:
+        return datetime.date(date.year + 1, 1, 1)
+    return datetime.date(date.year, date.month + 1, 1)
+
+
+def _previous_month(
+        date):
+    """*the first day of the month before ``date``*
+    """
+    import datetime
+    if date.month == 1:
+        return datetime.date(date.year - 1, 12, 1)
+    return datetime.date(date.year, date.month - 1, 1)
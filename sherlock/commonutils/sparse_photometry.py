@@ -0,0 +1,169 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*Pack the sparse magnitude columns of crossmatches into a single photometry column (and back again)*
+
+:Author:
+    David Young
+"""
+
+import os
+os.environ['TERM'] = 'vt100'
+
+# THE MAGNITUDE AND ERROR COLUMNS OF THE `sherlock_crossmatches` TABLE
+PHOTOMETRY_BANDS = ["U", "B", "V", "R", "I", "J", "H", "K", "_u",
+                    "_g", "_r", "_i", "_z", "_y", "G", "W1", "unkMag"]
+PHOTOMETRY_COLUMNS = [c for b in PHOTOMETRY_BANDS for c in (b, b + "Err")]
+
+
+def pack_photometry(
+        log,
+        crossmatches):
+    """*pack the magnitude columns of each crossmatch into a single JSON ``photometry`` column holding only the bands present*
+
+    Most catalogue matches only carry a handful of the ~36 magnitude/error columns, so the packed rows are much narrower. The input crossmatches are not modified.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``crossmatches`` -- list of crossmatch dictionaries
+
+    **Return**
+
+    - ``packed`` -- list of new crossmatch dictionaries with the magnitude columns replaced by a ``photometry`` JSON string (*None* if no band is present)
+
+    **Usage**
+
+    ```python
+    from sherlock.commonutils import pack_photometry
+    packed = pack_photometry(
+        log=log,
+        crossmatches=crossmatches
+    )
+    ```
+    """
+    log.debug('starting the ``pack_photometry`` function')
+
+    import json
+
+    photometryColumns = set(PHOTOMETRY_COLUMNS)
+    packed = []
+    for c in crossmatches:
+        row = {}
+        photometry = {}
+        for k, v in c.items():
+            if k in photometryColumns:
+                if v is not None:
+                    photometry[k] = v
+            else:
+                row[k] = v
+        row["photometry"] = json.dumps(
+            photometry, separators=(",", ":"), default=float) if photometry else None
+        packed.append(row)
+
+    log.debug('completed the ``pack_photometry`` function')
+    return packed
+
+
+def unpack_photometry(
+        log,
+        crossmatches):
+    """*unpack the ``photometry`` JSON column of each crossmatch back into the individual magnitude columns (in place)*
+
+    Rows without a ``photometry`` value keep their own magnitude columns (read from the one-column-per-band layout); magnitude columns missing from the row (the compact layout has none) are set to *None*.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``crossmatches`` -- list of crossmatch dictionaries (e.g. rows read from the ``sherlock_crossmatches`` table)
+
+    **Return**
+
+    - ``crossmatches`` -- the same list, with every magnitude column populated
+
+    **Usage**
+
+    ```python
+    from sherlock.commonutils import unpack_photometry
+    rows = unpack_photometry(
+        log=log,
+        crossmatches=rows
+    )
+    ```
+    """
+    log.debug('starting the ``unpack_photometry`` function')
+
+    import json
+
+    for c in crossmatches:
+        photometry = c.get("photometry")
+        if not photometry:
+            for k in PHOTOMETRY_COLUMNS:
+                c.setdefault(k, None)
+            continue
+        if isinstance(photometry, str):
+            photometry = json.loads(photometry)
+        for k in PHOTOMETRY_COLUMNS:
+            c[k] = photometry.get(k, c.get(k))
+
+    log.debug('completed the ``unpack_photometry`` function')
+    return crossmatches
+
+
+def photometry_layout_statements(
+        log,
+        sparse,
+        existingColumns,
+        tableName="sherlock_crossmatches"):
+    """*generate the SQL statements needed to convert the crossmatch table to the compact (sparse) or the one-column-per-band photometry layout*
+
+    In the compact layout the magnitude columns are dropped and the bands only live in the ``photometry`` column, so the packed JSON replaces (rather than duplicates) them. Converting packs (or unpacks) the existing rows first, so no photometry is lost when the setting is switched. Nothing is returned if the table already has the requested layout.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``sparse`` -- True for the compact layout, False for one column per band
+    - ``existingColumns`` -- the current column names of the table
+    - ``tableName`` -- the crossmatch table. Default *sherlock_crossmatches*
+
+    **Return**
+
+    - ``statements`` -- list of SQL statements to run in order
+
+    **Usage**
+
+    ```python
+    from sherlock.commonutils.sparse_photometry import photometry_layout_statements
+    statements = photometry_layout_statements(
+        log=log,
+        sparse=True,
+        existingColumns=existingColumns
+    )
+    ```
+    """
+    log.debug('starting the ``photometry_layout_statements`` function')
+
+    present = [c for c in PHOTOMETRY_COLUMNS if c in existingColumns]
+    statements = []
+    if sparse and len(present):
+        # PACK ONLY THE NON-NULL BANDS (CONCAT_WS SKIPS NULLS) INTO A JSON OBJECT
+        pairs = ", ".join(
+            ["IF(`%(c)s` IS NULL, NULL, CONCAT('\"%(c)s\":', `%(c)s`))" % locals() for c in present])
+        statements.append(
+            """UPDATE `%(tableName)s` SET photometry = NULLIF(CONCAT('{', CONCAT_WS(',', %(pairs)s), '}'), '{}') WHERE photometry IS NULL""" % locals())
+        drops = ", ".join(["DROP COLUMN `%(c)s`" % locals() for c in present])
+        statements.append(
+            """ALTER TABLE `%(tableName)s` %(drops)s""" % locals())
+    elif not sparse and len(present) < len(PHOTOMETRY_COLUMNS):
+        missing = [c for c in PHOTOMETRY_COLUMNS if c not in present]
+        adds = ", ".join(
+            ["ADD `%(c)s` double DEFAULT NULL" % locals() for c in missing])
+        statements.append(
+            """ALTER TABLE `%(tableName)s` %(adds)s""" % locals())
+        sets = ", ".join(
+            ["`%(c)s` = JSON_EXTRACT(photometry, '$.%(c)s') + 0" % locals() for c in missing])
+        statements.append(
+            """UPDATE `%(tableName)s` SET %(sets)s, photometry = NULL WHERE photometry IS NOT NULL""" % locals())
+
+    log.debug('completed the ``photometry_layout_statements`` function')
+    return statements
@@ -0,0 +1,100 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from sherlock.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+settings["adaptive batching"] = {
+    "enabled": True,
+    "min mini batch size": 100,
+    "max mini batch size": 5000,
+    "min pool size": 1,
+    "max pool size": 4,
+    "target batch seconds": 10,
+    "max memory percent": 85
+}
+
+
+class test_adaptive_batch_controller(unittest.TestCase):
+
+    def test_dense_batches_shrink_mini_batch_size(self):
+
+        from sherlock.commonutils import adaptive_batch_controller
+        controller = adaptive_batch_controller(
+            log=log,
+            settings=settings,
+            miniBatchSize=2000,
+            poolSize=4
+        )
+        # SPARSE BATCHES TAKE 0.001s PER TRANSIENT, DENSE ONES 0.01s
+        for i in range(6):
+            controller.record(transientCount=2000, seconds=2., matchCount=2000)
+        for i in range(2):
+            controller.record(
+                transientCount=2000, seconds=20., matchCount=20000)
+        miniBatchSize, poolSize = controller.update(memoryPercent=50.)
+        self.assertLess(miniBatchSize, 2000)
+        self.assertGreaterEqual(miniBatchSize, 100)
+        self.assertEqual(poolSize, 4)
+
+    def test_fast_batches_grow_mini_batch_size_within_bounds(self):
+
+        from sherlock.commonutils import adaptive_batch_controller
+        controller = adaptive_batch_controller(
+            log=log,
+            settings=settings,
+            miniBatchSize=4000,
+            poolSize=2
+        )
+        for i in range(5):
+            controller.record(transientCount=4000, seconds=1., matchCount=100)
+        miniBatchSize, poolSize = controller.update(memoryPercent=50.)
+        self.assertEqual(miniBatchSize, 5000)
+        self.assertEqual(poolSize, 3)
+        self.assertEqual(len(controller.decisions), 1)
+
+    def test_memory_pressure_shrinks_pool(self):
+
+        from sherlock.commonutils import adaptive_batch_controller
+        controller = adaptive_batch_controller(
+            log=log,
+            settings=settings,
+            miniBatchSize=1000,
+            poolSize=3
+        )
+        miniBatchSize, poolSize = controller.update(memoryPercent=95.)
+        self.assertEqual(miniBatchSize, 1000)
+        self.assertEqual(poolSize, 2)
+
+    def test_adaptive_batch_controller_function_exception(self):
+
+        from sherlock.commonutils import adaptive_batch_controller
+        try:
+            this = adaptive_batch_controller(
+                log=log,
+                settings=settings,
+                fakeKey="break the code"
+            )
+            this.get()
+            assert False
+        except Exception as e:
+            assert True
+            print(str(e))
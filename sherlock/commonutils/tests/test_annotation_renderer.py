@@ -0,0 +1,117 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from sherlock.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+
+# GOLDEN SET -- MATCHES WITH THE ANNOTATIONS RENDERED BY THE ORIGINAL
+# PER-MATCH ``generate_match_annotation`` CODE
+import json
+with open(pathToInputDir + "/annotation_renderer_golden.json") as f:
+    golden = json.load(f)
+
+
+class test_annotation_renderer(unittest.TestCase):
+
+    def test_render_matches_golden_set(self):
+
+        import copy
+        from sherlock.commonutils import annotation_renderer
+        renderer = annotation_renderer(
+            log=log
+        )
+        for row in golden:
+            annotation, summary, sep = renderer.render(
+                match=copy.deepcopy(row["match"]),
+                updatePeakMagnitudes=False
+            )
+            self.assertEqual([annotation, summary, sep], row["default"])
+            annotation, summary, sep = renderer.render(
+                match=copy.deepcopy(row["match"]),
+                updatePeakMagnitudes=True
+            )
+            self.assertEqual([annotation, summary, sep],
+                             row["updatePeakMagnitudes"])
+
+    def test_render_batch_matches_golden_set(self):
+
+        import copy
+        from sherlock.commonutils import annotation_renderer
+        renderer = annotation_renderer(
+            log=log
+        )
+        matches = [copy.deepcopy(row["match"]) for row in golden]
+        results = renderer.render_batch(
+            matches=matches,
+            updatePeakMagnitudes=True
+        )
+        self.assertEqual([list(r) for r in results], [
+                         row["updatePeakMagnitudes"] for row in golden])
+
+        # SDSS NAMES ARE SERVED FROM THE CACHE ON A SECOND PASS
+        renderer.render_batch(
+            matches=matches,
+            updatePeakMagnitudes=True
+        )
+        self.assertGreater(renderer._sdss_name.cache_info().hits, 0)
+
+    def test_compact_annotations_expand_to_golden_set(self):
+
+        import copy
+        from sherlock.commonutils import annotation_renderer
+        renderer = annotation_renderer(
+            log=log
+        )
+        for row in golden:
+            columns = renderer.render_columns(
+                match=copy.deepcopy(row["match"]),
+                updatePeakMagnitudes=False,
+                compact=True
+            )
+            full = row["default"][0]
+            if columns["annotation_template"]:
+                self.assertLess(len(columns["annotation"]), len(full))
+            self.assertEqual(renderer.expand(
+                annotation=columns["annotation"],
+                annotationTemplate=columns["annotation_template"],
+                annotationParams=columns["annotation_params"]
+            ), full)
+            # THE MIGRATION PATH COMPACTS THE STORED HTML TO THE SAME FORM
+            self.assertEqual(renderer.compact(annotation=full), (
+                columns["annotation"], columns["annotation_template"], columns["annotation_params"]))
+
+    def test_annotation_renderer_function_exception(self):
+
+        from sherlock.commonutils import annotation_renderer
+        try:
+            this = annotation_renderer(
+                log=log,
+                fakeKey="break the code"
+            )
+            this.get()
+            assert False
+        except Exception as e:
+            assert True
+            print(str(e))
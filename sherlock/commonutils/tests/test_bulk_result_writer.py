@@ -0,0 +1,119 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from sherlock.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+
+class test_bulk_result_writer(unittest.TestCase):
+
+    def test_dictionary_to_tsv_line(self):
+
+        from sherlock.commonutils.bulk_result_writer import _dictionary_to_tsv_line
+        from datetime import datetime
+        line = _dictionary_to_tsv_line(
+            {
+                "transient_object_id": 12,
+                "annotation": "tab\there\nnewline \\ slash",
+                "separationArcsec": 0.25,
+                "z": float("nan"),
+                "updated": True,
+                "dateCreated": datetime(2024, 1, 2, 3, 4, 5)
+            },
+            ["transient_object_id", "annotation", "separationArcsec",
+                "z", "summary", "updated", "dateCreated"]
+        )
+        self.assertEqual(
+            line, "12\ttab\\there\\nnewline \\\\ slash\t0.25\t\\N\t\\N\t1\t2024-01-02 03:04:05\n")
+
+    def test_list_values_are_rejected(self):
+
+        from sherlock.commonutils.bulk_result_writer import _dictionary_to_tsv_line
+        with self.assertRaises(TypeError):
+            _dictionary_to_tsv_line(
+                {"transient_object_id": 12, "annotation": ["a", "b"]},
+                ["transient_object_id", "annotation"]
+            )
+
+    def test_replace_statements(self):
+
+        from sherlock.commonutils import bulk_result_writer
+        writer = bulk_result_writer(
+            log=log,
+            dbConn=False,
+            settings={"bulk load method": "insert"}
+        )
+        writer.tableColumns = ["primaryId", "transient_object_id",
+                               "classification", "dateCreated", "dateLastModified"]
+        sqlQueries = writer._replace_statements(
+            dbTableName="sherlock_classifications",
+            stageTable="_sherlock_stage_sherlock_classifications",
+            idTable="_sherlock_stage_ids",
+            columns=["transient_object_id", "classification"]
+        )
+        self.assertEqual(sqlQueries, [
+            "DELETE FROM `sherlock_classifications` WHERE `transient_object_id` IN (SELECT `id` FROM `_sherlock_stage_ids`)",
+            "INSERT INTO `sherlock_classifications` (`transient_object_id`, `classification`, `dateCreated`, `dateLastModified`) SELECT `transient_object_id`, `classification`, NOW(), NOW() FROM `_sherlock_stage_sherlock_classifications`"
+        ])
+
+        # NO NEW ROWS - ONLY THE DELETE
+        sqlQueries = writer._replace_statements(
+            dbTableName="sherlock_crossmatches",
+            stageTable="_sherlock_stage_sherlock_crossmatches",
+            idTable="_sherlock_stage_ids",
+            columns=[]
+        )
+        self.assertEqual(sqlQueries, [
+            "DELETE FROM `sherlock_crossmatches` WHERE `transient_object_id` IN (SELECT `id` FROM `_sherlock_stage_ids`)"
+        ])
+
+    def test_upsert_statements(self):
+
+        from sherlock.commonutils import bulk_result_writer
+        writer = bulk_result_writer(
+            log=log,
+            dbConn=False,
+            settings={"bulk load method": "insert"}
+        )
+        writer.tableColumns = ["primaryId", "transient_object_id",
+                               "annotation", "summary", "dateLastModified"]
+        sqlQueries = writer._upsert_statements(
+            dbTableName="sherlock_classifications",
+            stageTable="_sherlock_stage_sherlock_classifications",
+            columns=["transient_object_id", "annotation", "summary"]
+        )
+        self.assertEqual(sqlQueries, [
+            "INSERT INTO `sherlock_classifications` (`transient_object_id`, `annotation`, `summary`, `dateLastModified`) SELECT `transient_object_id`, `annotation`, `summary`, NOW() FROM `_sherlock_stage_sherlock_classifications` ON DUPLICATE KEY UPDATE `transient_object_id` = VALUES(`transient_object_id`), `annotation` = VALUES(`annotation`), `summary` = VALUES(`summary`), `dateLastModified` = NOW()"
+        ])
+
+    def test_bulk_result_writer_function_exception(self):
+
+        from sherlock.commonutils import bulk_result_writer
+        try:
+            this = bulk_result_writer(
+                log=log,
+                dbConn=False,
+                settings={"bulk load method": "carrier pigeon"}
+            )
+            assert False
+        except ValueError as e:
+            assert True
+            print(str(e))
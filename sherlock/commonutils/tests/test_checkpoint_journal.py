@@ -0,0 +1,201 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from sherlock.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToOutputDir = moduleDirectory + "/output/"
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+class test_checkpoint_journal(unittest.TestCase):
+
+    def test_resume_after_interrupted_write(self):
+
+        from sherlock.commonutils import checkpoint_journal
+        pathToJournal = pathToOutputDir + "/checkpoint_journal.jsonl"
+        journal = checkpoint_journal(
+            log=log,
+            pathToJournal=pathToJournal
+        )
+        journal.reset()
+
+        # ONE BATCH WRITTEN, A SECOND CRASHES MID-WRITE
+        batchKey = journal.record_pending(
+            transientIds=[1, 2, 3, 5],
+            crossmatches=[{"transient_object_id": 1}],
+            classifications={1: ["SN"], 2: ["ORPHAN"], 3: [
+                "ORPHAN"], 5: ["ORPHAN"]}
+        )
+        journal.record_complete(batchKey)
+        journal.record_pending(
+            transientIds=[4, 6],
+            crossmatches=[],
+            classifications={4: ["AGN"], 6: ["ORPHAN"]},
+            annotations={4: {"annotation": "x"}}
+        )
+        # A TORN LINE FROM THE KILLED PROCESS
+        with open(pathToJournal, "a") as f:
+            f.write('{"event":"comp')
+
+        # RESTART
+        journal = checkpoint_journal(
+            log=log,
+            pathToJournal=pathToJournal
+        )
+        outstanding = journal.outstanding()
+        self.assertEqual(len(outstanding), 1)
+        batchKey, payload = outstanding[0]
+        self.assertEqual(payload["classifications"][4], ["AGN"])
+        self.assertEqual(payload["annotations"], {4: {"annotation": "x"}})
+        self.assertEqual(journal.completedRanges, [[1, 3], [5, 5]])
+
+        transients = [{"id": i} for i in range(1, 8)]
+        self.assertEqual([t["id"] for t in journal.filter_completed(
+            transients)], [4, 6, 7])
+        journal.record_complete(batchKey)
+        self.assertEqual([t["id"] for t in journal.filter_completed(
+            transients)], [7])
+        self.assertEqual(journal.outstanding(), [])
+
+        journal.reset()
+        self.assertFalse(os.path.exists(pathToJournal))
+        self.assertEqual(len(journal.filter_completed(transients)), 7)
+
+    def test_non_integer_transient_ids(self):
+
+        from sherlock.commonutils import checkpoint_journal
+        journal = checkpoint_journal(
+            log=log,
+            pathToJournal=pathToOutputDir + "/checkpoint_journal_names.jsonl"
+        )
+        journal.reset()
+        batchKey = journal.record_pending(
+            transientIds=["ZTF21a", "ZTF21b"],
+            crossmatches=[],
+            classifications={}
+        )
+        journal.record_complete(batchKey)
+        self.assertTrue(journal.is_complete("ZTF21a"))
+        self.assertFalse(journal.is_complete("ZTF21c"))
+        journal.reset()
+
+    def test_query_pages_are_not_held_back_by_written_batches(self):
+
+        from sherlock.commonutils import checkpoint_journal
+        pathToJournal = pathToOutputDir + "/checkpoint_journal_query.jsonl"
+        journal = checkpoint_journal(
+            log=log,
+            pathToJournal=pathToJournal
+        )
+        journal.reset()
+        batchKey = journal.record_pending(
+            transientIds=[1, 2, 3],
+            crossmatches=[],
+            classifications={}
+        )
+        journal.record_complete(batchKey)
+        journal.record_pending(
+            transientIds=[4, 5],
+            crossmatches=[],
+            classifications={}
+        )
+
+        # ONLY THE TRANSIENTS STILL BEING WRITTEN ARE HELD BACK
+        transients = [{"id": i} for i in range(1, 8)]
+        self.assertEqual([t["id"] for t in journal.filter_query_page(
+            transients)], [1, 2, 3, 6, 7])
+
+        # THE QUERY RETURNS ONLY WRITTEN TRANSIENTS AGAIN (E.G. RESET FOR
+        # RECLASSIFICATION) - THE END OF THE PASS, THE JOURNAL IS CLEARED
+        transients = [{"id": i} for i in range(1, 4)]
+        self.assertEqual(len(journal.filter_query_page(transients)), 3)
+        self.assertFalse(os.path.exists(pathToJournal))
+        self.assertEqual(journal.completedRanges, [])
+        self.assertEqual(journal.pending, {})
+
+        # AN EMPTY PAGE ALSO ENDS THE PASS
+        batchKey = journal.record_pending(
+            transientIds=[1], crossmatches=[], classifications={})
+        journal.record_complete(batchKey)
+        self.assertEqual(journal.filter_query_page([]), [])
+        self.assertFalse(os.path.exists(pathToJournal))
+
+    def test_forget_transients_sent_back_for_reclassification(self):
+
+        from sherlock.commonutils import checkpoint_journal
+        pathToJournal = pathToOutputDir + "/checkpoint_journal_forget.jsonl"
+        journal = checkpoint_journal(
+            log=log,
+            pathToJournal=pathToJournal
+        )
+        journal.reset()
+        batchKey = journal.record_pending(
+            transientIds=list(range(1, 11)) + ["ZTF21a"],
+            crossmatches=[],
+            classifications={}
+        )
+        journal.record_complete(batchKey)
+
+        journal.forget([3, 4, 10])
+        self.assertEqual(journal.completedRanges, [[1, 2], [5, 9]])
+
+        # ANOTHER PROCESS (THE NED PREFETCHER) FORGETS AGAINST THE SAME FILE
+        prefetcher = checkpoint_journal(
+            log=log,
+            pathToJournal=pathToJournal
+        )
+        self.assertEqual(prefetcher.completedRanges, [[1, 2], [5, 9]])
+        prefetcher.forget([7, "ZTF21a"])
+        transients = [{"id": i} for i in [1, 7, 8, "ZTF21a"]]
+        self.assertEqual([t["id"] for t in journal.filter_completed(
+            transients)], [7, "ZTF21a"])
+
+        # AND THE FORGETTING SURVIVES A RESTART
+        journal = checkpoint_journal(
+            log=log,
+            pathToJournal=pathToJournal
+        )
+        self.assertEqual(journal.completedRanges, [[1, 2], [5, 6], [8, 9]])
+        journal.reset()
+
+    def test_checkpoint_journal_function_exception(self):
+
+        from sherlock.commonutils import checkpoint_journal
+        pathToJournal = pathToOutputDir + "/checkpoint_journal_corrupt.jsonl"
+        with open(pathToJournal, "w") as f:
+            f.write('not json\n{"event":"abandoned","batch":"x"}\n')
+        try:
+            this = checkpoint_journal(
+                log=log,
+                pathToJournal=pathToJournal
+            )
+            assert False
+        except Exception as e:
+            assert True
+            print(str(e))
+        os.remove(pathToJournal)
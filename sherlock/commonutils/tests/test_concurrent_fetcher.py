@@ -0,0 +1,175 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from sherlock.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+
+# A LOCAL STAND-IN FOR THE NED SERVERS
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+
+class _standInServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _standInHandler(BaseHTTPRequestHandler):
+    lock = threading.Lock()
+    active = 0
+    maxActive = 0
+    requestTimes = []
+    hits = {}
+
+    def do_GET(self):
+        cls = _standInHandler
+        with cls.lock:
+            cls.active += 1
+            cls.maxActive = max(cls.maxActive, cls.active)
+            cls.requestTimes.append(time.monotonic())
+            cls.hits[self.path] = cls.hits.get(self.path, 0) + 1
+            hits = cls.hits[self.path]
+        try:
+            time.sleep(0.05)
+            if self.path.startswith("/flaky") and hits < 3:
+                self.send_response(503)
+                self.end_headers()
+            elif self.path.startswith("/missing"):
+                self.send_response(404)
+                self.end_headers()
+            elif self.path.startswith("/garbled") and hits < 2:
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(b"garbled")
+            elif self.path.startswith("/slow") and hits < 2:
+                time.sleep(1.)
+                self.send_response(200)
+                self.end_headers()
+            else:
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(self.path.encode())
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+server = _standInServer(("127.0.0.1", 0), _standInHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+baseUrl = "http://127.0.0.1:%s" % (server.server_address[1],)
+
+
+def _reset_stand_in():
+    _standInHandler.active = 0
+    _standInHandler.maxActive = 0
+    _standInHandler.requestTimes = []
+    _standInHandler.hits = {}
+
+
+class test_concurrent_fetcher(unittest.TestCase):
+
+    def test_concurrency_limit_and_retries(self):
+
+        _reset_stand_in()
+        from sherlock.commonutils import concurrent_fetcher
+        fetcher = concurrent_fetcher(
+            log=log,
+            settings={"ned fetching": {"max concurrent requests": 3, "requests per second": 1000,
+                                       "burst": 1000, "max retries": 4, "retry backoff seconds": 0.01}}
+        )
+        urls = [baseUrl + "/ok/%s" % i for i in range(12)] + \
+            [baseUrl + "/flaky/1"]
+        responses = fetcher.get(urls=urls)
+        self.assertEqual(responses, [u.replace(baseUrl, "").encode()
+                                     for u in urls])
+        self.assertLessEqual(_standInHandler.maxActive, 3)
+        self.assertGreater(_standInHandler.maxActive, 1)
+        # THE FLAKY ENDPOINT FAILED TWICE BEFORE SUCCEEDING
+        self.assertEqual(_standInHandler.hits["/flaky/1"], 3)
+        self.assertEqual(fetcher.retries, 2)
+
+    def test_token_bucket_rate_limit(self):
+
+        _reset_stand_in()
+        from sherlock.commonutils import concurrent_fetcher
+        fetcher = concurrent_fetcher(
+            log=log,
+            settings={"ned fetching": {"max concurrent requests": 8,
+                                       "requests per second": 20, "burst": 2}}
+        )
+        start = time.monotonic()
+        fetcher.get(urls=[baseUrl + "/ok/%s" % i for i in range(12)])
+        # 2 REQUESTS FROM THE BURST, THEN 10 AT 20 PER SECOND
+        self.assertGreaterEqual(time.monotonic() - start, 0.45)
+
+    def test_timeouts_are_retried(self):
+
+        _reset_stand_in()
+        from sherlock.commonutils import concurrent_fetcher
+        fetcher = concurrent_fetcher(
+            log=log,
+            settings={"ned fetching": {"request timeout seconds": 0.3,
+                                       "retry backoff seconds": 0.01}}
+        )
+        self.assertEqual(fetcher.get(urls=[baseUrl + "/slow/1"]), [b"/slow/1"])
+        self.assertEqual(_standInHandler.hits["/slow/1"], 2)
+
+    def test_parse_failures_are_retried(self):
+
+        _reset_stand_in()
+        from sherlock.commonutils import concurrent_fetcher
+        fetcher = concurrent_fetcher(
+            log=log,
+            settings={"ned fetching": {"retry backoff seconds": 0.01}}
+        )
+
+        def parse(body):
+            if body == b"garbled":
+                raise ValueError("could not parse the response")
+            return body.decode().split("/")[1:]
+
+        results = fetcher.get(
+            urls=[baseUrl + "/ok/1", baseUrl + "/garbled/2"], parse=parse)
+        self.assertEqual(results, [["ok", "1"], ["garbled", "2"]])
+        self.assertEqual(_standInHandler.hits["/garbled/2"], 2)
+        self.assertEqual(_standInHandler.hits["/ok/1"], 1)
+
+    def test_concurrent_fetcher_function_exception(self):
+
+        _reset_stand_in()
+        from sherlock.commonutils import concurrent_fetcher
+        fetcher = concurrent_fetcher(
+            log=log,
+            settings={"ned fetching": {"retry backoff seconds": 0.01}}
+        )
+        # CLIENT ERRORS ARE NOT RETRIED
+        try:
+            fetcher.get(urls=[baseUrl + "/missing/1"])
+            assert False
+        except Exception as e:
+            assert True
+            print(str(e))
+        self.assertEqual(_standInHandler.hits["/missing/1"], 1)
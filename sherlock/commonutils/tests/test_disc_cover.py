@@ -0,0 +1,68 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from sherlock.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+
+
+class test_disc_cover(unittest.TestCase):
+
+    def test_disc_cover_covers_every_coordinate(self):
+
+        import numpy as np
+        from sherlock.commonutils import disc_cover
+        from sherlock.commonutils.ned_coverage_map import _angular_separation_arcsec
+
+        rng = np.random.RandomState(42)
+        coordinateList = [(c[0] + rng.normal(0, .2), c[1] + rng.normal(0, .2)) for c in [(
+            rng.uniform(0, 360), rng.uniform(-89, 89)) for k in range(30)] for i in range(40)]
+        # ACROSS THE RA=0 WRAP AND AT THE POLE
+        coordinateList += [(rng.uniform(-0.3, 0.3) %
+                            360., rng.uniform(-.3, .3)) for i in range(100)]
+        coordinateList += [(rng.uniform(0, 360), rng.uniform(89.8, 90))
+                           for i in range(100)]
+
+        centres = disc_cover(
+            log=log,
+            coordinateList=coordinateList,
+            radiusArcsec=660.,
+            maxExactSize=100
+        )
+        coords = np.array(coordinateList)
+        centres = np.array(centres)
+        separations = _angular_separation_arcsec(
+            coords[:, 0][:, None], coords[:, 1][:, None], centres[:, 0][None, :], centres[:, 1][None, :])
+        self.assertTrue((separations.min(axis=1) <= 660. + 1e-6).all())
+        self.assertLess(len(centres), len(coordinateList) / 4)
+
+    def test_disc_cover_pair(self):
+
+        from sherlock.commonutils import disc_cover
+        # TWO COORDINATES 1000 ARCSEC APART NEED ONE 660 ARCSEC DISC
+        centres = disc_cover(
+            log=log,
+            coordinateList=[(10., 0.), (10. + 1000. / 3600., 0.)],
+            radiusArcsec=660.
+        )
+        self.assertEqual(len(centres), 1)
+        self.assertEqual(disc_cover(
+            log=log, coordinateList=[], radiusArcsec=660.), [])
@@ -0,0 +1,106 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from sherlock.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+# SETUP ALL DATABASE CONNECTIONS
+from sherlock import database
+db = database(
+    log=log,
+    settings=settings
+)
+dbConns, dbVersions = db.connect()
+transientsDbConn = dbConns["transients"]
+cataloguesDbConn = dbConns["catalogues"]
+
+
+class test_ned_coverage_map(unittest.TestCase):
+
+    def test_ned_coverage_map_matches_conesearch(self):
+
+        import copy
+        coverageSettings = copy.deepcopy(settings)
+        coverageSettings["ned coverage map file"] = pathToOutputDir + \
+            "/ned_coverage.pickle"
+
+        from sherlock.commonutils import ned_coverage_map
+        coverage = ned_coverage_map(
+            log=log,
+            dbConn=cataloguesDbConn,
+            settings=coverageSettings
+        )
+        coverage.sync()
+        # NOTHING NEW TO SYNC
+        self.assertEqual(coverage.sync(), 0)
+
+        coordinateList = [(c[0], c[1]) for c in zip(
+            coverage.ra[:20], coverage.dec[:20])] + [(0.1, -89.9)]
+
+        from sherlock import transient_classifier
+        classifier = transient_classifier(
+            log=log,
+            settings=settings,
+            updateNed=False
+        )
+        expected = classifier._remove_previous_ned_queries(
+            coordinateList=coordinateList)
+        self.assertEqual(coverage.uncovered(
+            coordinateList=coordinateList), expected)
+
+        # RELOADED FROM THE LOCAL FILE
+        coverage = ned_coverage_map(
+            log=log,
+            dbConn=cataloguesDbConn,
+            settings=coverageSettings
+        )
+        self.assertEqual(coverage.uncovered(
+            coordinateList=coordinateList), expected)
+
+    def test_ned_coverage_map_function_exception(self):
+
+        from sherlock.commonutils import ned_coverage_map
+        try:
+            this = ned_coverage_map(
+                log=log,
+                dbConn=cataloguesDbConn,
+                settings={}
+            )
+            assert False
+        except Exception as e:
+            assert True
+            print(str(e))
@@ -0,0 +1,141 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from sherlock.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+
+def _catalogues_db_conn():
+    """*connect to the sherlock-catalogues database (only the queue table tests need it) and drop any old queue table*
+    """
+    from sherlock import database
+    from fundamentals.mysql import writequery
+    db = database(
+        log=log,
+        settings=settings
+    )
+    dbConns, dbVersions = db.connect()
+    cataloguesDbConn = dbConns["catalogues"]
+    writequery(
+        log=log,
+        sqlQuery="drop table IF EXISTS tcs_helper_ned_prefetch_queue;",
+        dbConn=cataloguesDbConn
+    )
+    return cataloguesDbConn
+
+
+class test_ned_prefetch_queue(unittest.TestCase):
+
+    def test_entries_for(self):
+
+        from sherlock.commonutils import ned_prefetch_queue
+        queue = ned_prefetch_queue(
+            log=log,
+            dbConn=False,
+            settings=settings
+        )
+        transients = [
+            {"id": 1, "ra": 10.0, "dec": -5.0},
+            {"id": 2, "ra": 20.0, "dec": 5.0},
+            {"id": 3, "ra": 10.0, "dec": -5.0},
+            {"id": 4, "ra": 30.0, "dec": 1.0}
+        ]
+        # ONLY THE LOCATIONS WITHOUT COVERAGE, EVERY TRANSIENT AT EACH
+        coordinates, transientIds = queue.entries_for(
+            transientsMetadataList=transients,
+            coordinateList=[(30.0, 1.0), [10.0, -5.0]]
+        )
+        self.assertEqual(coordinates, [(30.0, 1.0), (10.0, -5.0), (10.0, -5.0)])
+        self.assertEqual(transientIds, [4, 1, 3])
+
+    def test_done_entries(self):
+
+        from datetime import datetime, timedelta
+        from sherlock.commonutils import ned_prefetch_queue
+        queue = ned_prefetch_queue(
+            log=log,
+            dbConn=False,
+            settings=settings
+        )
+        now = datetime(2024, 1, 10, 12)
+        rows = [
+            {"primaryId": 1, "transientId": "11", "dateFetched": now},
+            # STILL BEING CLASSIFIED - WAIT FOR IT
+            {"primaryId": 2, "transientId": "12", "dateFetched": now},
+            # NEVER CLASSIFIED - GIVE UP AFTER A DAY
+            {"primaryId": 3, "transientId": "13",
+             "dateFetched": now - timedelta(days=2)},
+            {"primaryId": 4, "transientId": "14", "dateFetched": None}
+        ]
+        self.assertEqual(queue.done_entries(
+            rows=rows, flaggedIds=[11, "14"], now=now), [1, 3, 4])
+
+    def test_ned_prefetch_queue_function(self):
+
+        cataloguesDbConn = _catalogues_db_conn()
+        from sherlock.commonutils import ned_prefetch_queue
+        queue = ned_prefetch_queue(
+            log=log,
+            dbConn=cataloguesDbConn,
+            settings=settings
+        )
+        queued = queue.enqueue(
+            coordinateList=[(23.2323, -43.23434), (155.125, 12.34)],
+            transientIds=[1, 2]
+        )
+        self.assertEqual(queued, 2)
+        # A FOOTPRINT NOT TIED TO A TRANSIENT
+        queue.enqueue(coordinateList=[(201.1, -5.2)])
+
+        rows = queue.next_batch(limit=2)
+        self.assertEqual([r["transientId"] for r in rows], ["1", "2"])
+
+        queue.mark_fetched(primaryIds=[r["primaryId"] for r in rows])
+        fetched = queue.fetched_transients()
+        self.assertEqual(len(fetched), 2)
+        self.assertEqual(len(queue.next_batch()), 1)
+
+        queue.mark_flagged(primaryIds=[fetched[0]["primaryId"]])
+        self.assertEqual(len(queue.fetched_transients()), 1)
+
+        # THE FOOTPRINT NEEDS NO FLAGGING
+        footprint = queue.next_batch()
+        queue.mark_fetched(primaryIds=[footprint[0]["primaryId"]])
+        self.assertEqual(len(queue.fetched_transients()), 1)
+        queue.purge(days=0)
+
+    def test_ned_prefetch_queue_function_exception(self):
+
+        from sherlock.commonutils import ned_prefetch_queue
+        try:
+            queue = ned_prefetch_queue(
+                log=log,
+                dbConn=False,
+                settings=settings
+            )
+            queue.enqueue(
+                coordinateList=[(23.2323, -43.23434)],
+                transientIds=[1, 2]
+            )
+            assert False
+        except Exception as e:
+            assert True
+            print(str(e))
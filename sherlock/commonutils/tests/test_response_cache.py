@@ -0,0 +1,130 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from sherlock.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToOutputDir = moduleDirectory + "/output/"
+
+
+def _cache_settings(name, **kwargs):
+    cacheDir = pathToOutputDir + "/" + name
+    shutil.rmtree(cacheDir, ignore_errors=True)
+    config = {"enabled": True, "directory": cacheDir}
+    config.update(kwargs)
+    return {"ned cache": config}
+
+
+class test_response_cache(unittest.TestCase):
+
+    def test_normalised_keys(self):
+
+        from sherlock.commonutils import response_cache
+        cache = response_cache(
+            log=log,
+            settings=_cache_settings("response_cache_keys")
+        )
+        self.assertEqual(cache.key("ned conesearch", {"coordinates": [(10.0, -5.0)], "radiusArcsec": 900}),
+                         cache.key("ned conesearch", {"radiusArcsec": 900., "coordinates": [["10.0000000001", " -5.0"]]}))
+        self.assertNotEqual(cache.key("ned conesearch", {"coordinates": [(10.0, -5.0)]}),
+                            cache.key("ned namesearch", {"coordinates": [(10.0, -5.0)]}))
+
+    def test_fetch_only_requests_misses(self):
+
+        from sherlock.commonutils import response_cache, concurrent_fetcher
+        settings = _cache_settings("response_cache_fetch")
+        cache = response_cache(
+            log=log,
+            settings=settings
+        )
+        fetcher = concurrent_fetcher(
+            log=log,
+            settings=settings
+        )
+        # ONE LOCAL FILE STANDS IN FOR EACH REMOTE RESPONSE
+        pagesDir = pathToOutputDir + "/response_cache_pages"
+        shutil.rmtree(pagesDir, ignore_errors=True)
+        os.makedirs(pagesDir)
+        urls = {}
+        for c in [1, 2, 3, 4]:
+            with open(pagesDir + "/%s.txt" % c, "w") as f:
+                f.write("NAME %s" % c)
+            urls[c] = "file://" + os.path.abspath(pagesDir + "/%s.txt" % c)
+        calls = []
+
+        def parse(body):
+            calls.append(body)
+            return [body.decode()]
+
+        first = cache.fetch(fetcher=fetcher, kind="ned conesearch",
+                            urls=[urls[1], urls[2]], params=[{"c": 1}, {"c": 2}], parse=parse)
+        second = cache.fetch(fetcher=fetcher, kind="ned conesearch",
+                             urls=[urls[2], urls[3]], params=[{"c": 2}, {"c": 3}], parse=parse)
+        self.assertEqual(first, [["NAME 1"], ["NAME 2"]])
+        self.assertEqual(second, [["NAME 2"], ["NAME 3"]])
+        self.assertEqual(sorted(calls), [b"NAME 1", b"NAME 2", b"NAME 3"])
+
+        # REPLAYS WITHOUT THE NETWORK
+        replay = response_cache(
+            log=log,
+            settings={"ned cache": dict(
+                settings["ned cache"], **{"replay only": True})}
+        )
+        self.assertEqual(replay.fetch(fetcher=fetcher, kind="ned conesearch",
+                                      urls=[urls[3]], params=[{"c": 3}], parse=parse), [["NAME 3"]])
+        try:
+            replay.fetch(fetcher=fetcher, kind="ned conesearch",
+                         urls=[urls[4]], params=[{"c": 4}], parse=parse)
+            assert False
+        except IOError as e:
+            print(str(e))
+        self.assertEqual(len(calls), 3)
+
+    def test_ttl_and_eviction(self):
+
+        import time
+        from sherlock.commonutils import response_cache
+        cache = response_cache(
+            log=log,
+            settings=_cache_settings("response_cache_evict", **{"ttl days": 1})
+        )
+        cache.set("ned namesearch", {"name": "n0"}, ["x" * 1000])
+        # ROOM FOR 20 ENTRIES
+        cache.maxBytes = cache._measure() * 20.5
+        for i in range(20):
+            cache.set("ned namesearch", {"name": "n%s" % i}, ["x" * 1000])
+            # DISTINCT LAST-USED TIMES
+            path = cache._path(cache.key("ned namesearch", {"name": "n%s" % i}))
+            os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+        # A RECENT HIT KEEPS AN OLD ENTRY ALIVE
+        self.assertTrue(cache.get("ned namesearch", {"name": "n0"})[0])
+        cache.set("ned namesearch", {"name": "n20"}, ["x" * 1000])
+        self.assertLessEqual(cache._measure(), cache.maxBytes)
+        self.assertTrue(cache.get("ned namesearch", {"name": "n0"})[0])
+        self.assertFalse(cache.get("ned namesearch", {"name": "n1"})[0])
+        self.assertTrue(cache.get("ned namesearch", {"name": "n20"})[0])
+
+        # EXPIRED ENTRIES ARE MISSES
+        cache.ttlSeconds = -1
+        self.assertFalse(cache.get("ned namesearch", {"name": "n20"})[0])
@@ -0,0 +1,170 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from sherlock.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+
+
+class test_result_table_partitioner(unittest.TestCase):
+
+    def test_partition_for_transient_id(self):
+
+        from sherlock.commonutils import result_table_partitioner
+        partitioner = result_table_partitioner(
+            log=log,
+            dbConn=False,
+            settings={"result table partitioning": {
+                "enabled": True, "scheme": "id", "id partition size": 1000}}
+        )
+        self.assertEqual(partitioner.partition_for_transient_id(0), "p1000")
+        self.assertEqual(partitioner.partition_for_transient_id(999), "p1000")
+        self.assertEqual(partitioner.partition_for_transient_id(1000), "p2000")
+        self.assertEqual(partitioner.tables, [
+                         "sherlock_crossmatches", "sherlock_classifications"])
+
+    def test_disabled_partitioner_is_a_no_op(self):
+
+        from sherlock.commonutils import result_table_partitioner
+        partitioner = result_table_partitioner(
+            log=log,
+            dbConn=False,
+            settings={}
+        )
+        self.assertEqual(partitioner.migrate(), [])
+        self.assertEqual(partitioner.purge(belowTransientId=10), [])
+        partitioner.ensure_partitions()
+
+    def test_result_table_partitioner_function_exception(self):
+
+        from sherlock.commonutils import result_table_partitioner
+        try:
+            this = result_table_partitioner(
+                log=log,
+                dbConn=False,
+                settings={"result table partitioning": {"scheme": "week"}}
+            )
+            assert False
+        except Exception as e:
+            assert True
+            print(str(e))
+
+    def test_migration_statements(self):
+
+        partitioner = _recording_partitioner(
+            scheme="id", reads={"MAX(transient_object_id)": [{"maxId": 2500}]})
+        self.assertEqual(partitioner.migrate(), [
+                         "sherlock_crossmatches", "sherlock_classifications"])
+        self.assertEqual(partitioner.executed[:3], [
+            "ALTER TABLE `sherlock_crossmatches` MODIFY `transient_object_id` bigint(20) unsigned NOT NULL",
+            "ALTER TABLE `sherlock_crossmatches` DROP PRIMARY KEY, ADD PRIMARY KEY (`id`, `transient_object_id`)",
+            "ALTER TABLE `sherlock_crossmatches` PARTITION BY RANGE (transient_object_id) (PARTITION p1000 VALUES LESS THAN (1000), PARTITION p2000 VALUES LESS THAN (2000), PARTITION p3000 VALUES LESS THAN (3000), PARTITION p4000 VALUES LESS THAN (4000), PARTITION p5000 VALUES LESS THAN (5000), PARTITION pmax VALUES LESS THAN MAXVALUE)"
+        ])
+        self.assertEqual(partitioner.executed[3],
+                         "ALTER TABLE `sherlock_classifications` ENGINE=InnoDB")
+        self.assertTrue(partitioner.executed[4].startswith(
+            "ALTER TABLE `sherlock_classifications` PARTITION BY RANGE (transient_object_id) (PARTITION p1000 VALUES LESS THAN (1000)"))
+
+        import datetime
+        partitioner = _recording_partitioner(
+            scheme="date", reads={"MIN(dateCreated)": [{"minDate": datetime.datetime(2020, 11, 5)}]})
+        partitioner.migrate()
+        self.assertTrue(partitioner.executed[-1].startswith(
+            "ALTER TABLE `sherlock_crossmatches` PARTITION BY RANGE (TO_DAYS(dateCreated)) (PARTITION p202011 VALUES LESS THAN (TO_DAYS('2020-12-01')), PARTITION p202012 VALUES LESS THAN (TO_DAYS('2021-01-01')), "))
+        self.assertTrue(partitioner.executed[-1].endswith(
+            ", PARTITION pmax VALUES LESS THAN MAXVALUE)"))
+
+    def test_ensure_partitions_reorganizes_pmax_and_caches_the_bound(self):
+
+        partitioner = _recording_partitioner(
+            scheme="id", partitions=[("p1000", "1000"), ("p2000", "2000"), ("pmax", "MAXVALUE")])
+        partitioner.ensure_partitions(maxTransientId=1500)
+        self.assertEqual(partitioner.executed, [
+            "ALTER TABLE `sherlock_crossmatches` REORGANIZE PARTITION pmax INTO (PARTITION p3000 VALUES LESS THAN (3000), PARTITION p4000 VALUES LESS THAN (4000), PARTITION pmax VALUES LESS THAN MAXVALUE)",
+            "ALTER TABLE `sherlock_classifications` REORGANIZE PARTITION pmax INTO (PARTITION p3000 VALUES LESS THAN (3000), PARTITION p4000 VALUES LESS THAN (4000), PARTITION pmax VALUES LESS THAN MAXVALUE)"
+        ])
+        reads = len(partitioner.reads)
+
+        # LATER BATCHES BELOW THE CACHED BOUND NEITHER READ NOR ALTER
+        partitioner.ensure_partitions(maxTransientId=1999)
+        self.assertEqual(len(partitioner.reads), reads)
+        self.assertEqual(len(partitioner.executed), 2)
+
+        # A BATCH REACHING PAST IT LOOKS THE PARTITIONS UP AGAIN
+        partitioner.ensure_partitions(maxTransientId=2000)
+        self.assertGreater(len(partitioner.reads), reads)
+
+    def test_purge_statements(self):
+
+        partitioner = _recording_partitioner(
+            scheme="date", partitions=[("p202001", "737790"), ("p202002", "737821"), ("pmax", "MAXVALUE")])
+        purged = partitioner.purge(olderThanDays=30)
+        self.assertEqual(partitioner.executed, [
+            "ALTER TABLE `sherlock_crossmatches` DROP PARTITION p202001, p202002"])
+        self.assertEqual(len(purged), 2)
+
+        # ID SCHEME: THE CUT-OFF COMES FROM THE RETENTION SETTING
+        partitioner = _recording_partitioner(
+            scheme="id", retention=30, partitions=[("p1000", "1000"), ("p2000", "2000"), ("pmax", "MAXVALUE")], reads={"MIN(transient_object_id)": [{"minId": 1700}]})
+        partitioner.purge()
+        self.assertEqual(partitioner.executed, [
+            "ALTER TABLE `sherlock_crossmatches` TRUNCATE PARTITION p1000",
+            "ALTER TABLE `sherlock_classifications` TRUNCATE PARTITION p1000"])
+
+        # NO RECENT CROSSMATCHES - NOTHING IS PURGED
+        partitioner = _recording_partitioner(
+            scheme="id", retention=30, partitions=[("p1000", "1000"), ("pmax", "MAXVALUE")], reads={"MIN(transient_object_id)": [{"minId": None}]})
+        self.assertEqual(partitioner.purge(), [])
+        self.assertEqual(partitioner.executed, [])
+
+
+def _recording_partitioner(
+        scheme,
+        partitions=[],
+        reads={},
+        retention=False):
+    """*a partitioner that records its SQL instead of running it (``reads`` maps a query fragment to its rows)*
+    """
+    from sherlock.commonutils import result_table_partitioner
+
+    class recorder(result_table_partitioner):
+
+        def _read(self, sqlQuery):
+            self.reads.append(sqlQuery)
+            if "information_schema.PARTITIONS" in sqlQuery:
+                return [{"PARTITION_NAME": n, "PARTITION_DESCRIPTION": d} for n, d in partitions]
+            for fragment, rows in reads.items():
+                if fragment in sqlQuery:
+                    return rows
+            return [{}]
+
+        def _execute(self, sqlQuery):
+            self.executed.append(sqlQuery)
+
+    partitioner = recorder(
+        log=log,
+        dbConn=False,
+        settings={"result table partitioning": {
+            "enabled": True, "scheme": scheme, "id partition size": 1000, "retention days": retention}}
+    )
+    partitioner.reads = []
+    partitioner.executed = []
+    return partitioner
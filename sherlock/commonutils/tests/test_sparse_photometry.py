@@ -0,0 +1,117 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from sherlock.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+
+class test_sparse_photometry(unittest.TestCase):
+
+    def test_pack_unpack_round_trip(self):
+
+        import copy
+        from sherlock.commonutils import pack_photometry, unpack_photometry
+        from sherlock.commonutils.sparse_photometry import PHOTOMETRY_COLUMNS
+        crossmatch = {c: None for c in PHOTOMETRY_COLUMNS}
+        crossmatch.update({
+            "transient_object_id": 1,
+            "catalogue_object_id": "a",
+            "R": 18.2,
+            "RErr": 0.05,
+            "_g": 19.01
+        })
+        original = copy.deepcopy(crossmatch)
+
+        packed = pack_photometry(
+            log=log,
+            crossmatches=[crossmatch]
+        )
+        # THE INPUT IS UNTOUCHED AND ONLY THE BANDS PRESENT ARE PACKED
+        self.assertEqual(crossmatch, original)
+        self.assertEqual(len(packed[0]), 3)
+        self.assertEqual(packed[0]["photometry"],
+                         '{"R":18.2,"RErr":0.05,"_g":19.01}')
+
+        # ROWS READ BACK FROM THE DATABASE CARRY NULL BAND COLUMNS
+        row = {c: None for c in PHOTOMETRY_COLUMNS}
+        row.update(packed[0])
+        unpacked = unpack_photometry(
+            log=log,
+            crossmatches=[row]
+        )
+        for k, v in original.items():
+            self.assertEqual(unpacked[0][k], v)
+
+    def test_no_photometry(self):
+
+        from sherlock.commonutils import pack_photometry, unpack_photometry
+        packed = pack_photometry(
+            log=log,
+            crossmatches=[{"transient_object_id": 1, "R": None}]
+        )
+        self.assertEqual(packed, [{"transient_object_id": 1, "photometry": None}])
+        rows = [{"transient_object_id": 1, "R": 17.0, "photometry": None}]
+        self.assertEqual(unpack_photometry(log=log, crossmatches=rows)[0]["R"], 17.0)
+
+    def test_compact_layout_rows_are_unpacked(self):
+
+        from sherlock.commonutils import unpack_photometry
+        from sherlock.commonutils.sparse_photometry import PHOTOMETRY_COLUMNS
+        # THE COMPACT LAYOUT HAS NO MAGNITUDE COLUMNS TO READ BACK
+        rows = [{"transient_object_id": 1, "photometry": '{"G":17.5}'},
+                {"transient_object_id": 2, "photometry": None}]
+        rows = unpack_photometry(log=log, crossmatches=rows)
+        self.assertEqual(rows[0]["G"], 17.5)
+        for c in PHOTOMETRY_COLUMNS:
+            self.assertIn(c, rows[0])
+            self.assertIsNone(rows[1][c])
+
+    def test_photometry_layout_statements(self):
+
+        from sherlock.commonutils.sparse_photometry import photometry_layout_statements, PHOTOMETRY_COLUMNS
+        wide = ["transient_object_id", "id"] + \
+            PHOTOMETRY_COLUMNS + ["photometry"]
+        compact = ["transient_object_id", "id", "photometry"]
+
+        # ALREADY IN THE REQUESTED LAYOUT
+        self.assertEqual(photometry_layout_statements(
+            log=log, sparse=True, existingColumns=compact), [])
+        self.assertEqual(photometry_layout_statements(
+            log=log, sparse=False, existingColumns=wide), [])
+
+        # TO COMPACT: PACK THE UNPACKED ROWS, THEN DROP EVERY BAND COLUMN
+        pack, drop = photometry_layout_statements(
+            log=log, sparse=True, existingColumns=wide)
+        self.assertTrue(pack.startswith(
+            "UPDATE `sherlock_crossmatches` SET photometry = NULLIF(CONCAT('{', CONCAT_WS(',', IF(`U` IS NULL, NULL, CONCAT('\"U\":', `U`)), "))
+        self.assertTrue(pack.endswith(
+            "'}'), '{}') WHERE photometry IS NULL"))
+        self.assertEqual(drop.count("DROP COLUMN"), len(PHOTOMETRY_COLUMNS))
+        self.assertTrue(drop.startswith(
+            "ALTER TABLE `sherlock_crossmatches` DROP COLUMN `U`, DROP COLUMN `UErr`"))
+
+        # BACK TO ONE COLUMN PER BAND: RE-ADD, UNPACK AND CLEAR THE JSON
+        add, unpack = photometry_layout_statements(
+            log=log, sparse=False, existingColumns=compact)
+        self.assertEqual(add.count("ADD `"), len(PHOTOMETRY_COLUMNS))
+        self.assertIn("`W1` = JSON_EXTRACT(photometry, '$.W1') + 0", unpack)
+        self.assertTrue(unpack.endswith(
+            "photometry = NULL WHERE photometry IS NOT NULL"))
@@ -18,6 +18,8 @@ class database(object):
         - ``transients`` -- the database hosting the transient source data
         - ``catalogues`` -- connection to the database hosting the contextual catalogues the transients are to be crossmatched against
 
+    ``LOAD DATA LOCAL INFILE`` lets the server ask the client for any file the client can read, so it is only enabled on the transients connection, and only when results are bulk written from local files (``bulk write results: True`` with ``bulk load method: infile``).
+
     **Key Arguments**
 
     - ``log`` -- logger
@@ -106,8 +108,12 @@ class database(object):
         else:
             transientSettings = False
 
+        # ONLY THE BULK RESULT WRITER NEEDS LOCAL INFILES (TRANSIENTS DATABASE)
+        bulkInfile = "bulk write results" in self.settings and self.settings["bulk write results"] and str(
+            self.settings.get("bulk load method") or "infile").lower() == "infile"
+
         dbConns = []
-        for dbSettings in [transientSettings, catalogueSettings]:
+        for dbSettings, localInfile in [(transientSettings, bulkInfile), (catalogueSettings, False)]:
             port = False
             if dbSettings and "tunnel" in dbSettings and dbSettings["tunnel"]:
                 port = self._setup_tunnel(
@@ -132,7 +138,8 @@ class database(object):
                     use_unicode=True,
                     charset='utf8',
                     client_flag=ms.constants.CLIENT.MULTI_STATEMENTS,
-                    connect_timeout=3600
+                    connect_timeout=3600,
+                    local_infile=bool(localInfile)
                 )
                 thisConn.autocommit(True)
                 dbConns.append(thisConn)
@@ -22,7 +22,7 @@ class _base_importer(object):
 
     - ``log`` -- logger
     - ``settings`` -- the settings dictionary
-    - ``pathToDataFIle`` -- path to the file containing the data to import
+    - ``pathToDataFIle`` -- path to the file containing the data to import (streamed in chunks, see ``stream_data_to_database_table``)
     - ``version`` -- version number of the catalogue to be imported (e.g. DR12)
     - ``catalogueName`` -- name of the catalogue to be imported
     - ``coordinateList`` -- list of coordinates (needed for some streamed tables)
@@ -38,6 +38,8 @@ class _base_importer(object):
             ...
         ```
 
+    File-based importers implement ``_parse_chunk(lines)``, yielding a dictionary per row for a chunk of the file's lines (and ``_read_header(dataFile)`` if the file has a header), then call ``stream_data_to_database_table`` from their ``ingest`` method.
+
     """
     # INITIALISATION
 
@@ -78,22 +80,39 @@ class _base_importer(object):
         self.transientsDbConn = dbConns["transients"]
         self.cataloguesDbConn = dbConns["catalogues"]
 
-        # OPEN THE FILE TO IMPORT THE DATA FROM
+        # CHECK THE FILE TO IMPORT THE DATA FROM CAN BE OPENED - IT IS STREAMED
+        # IN CHUNKS RATHER THAN READ INTO MEMORY
         if pathToDataFile:
             pathToReadFile = pathToDataFile
             try:
                 self.log.debug("attempting to open the file %s" %
                                (pathToReadFile,))
                 readFile = codecs.open(pathToReadFile, mode='r')
-                self.catData = readFile.read()
                 readFile.close()
             except IOError as e:
                 message = 'could not open the file %s' % (pathToReadFile,)
                 self.log.critical(message)
                 raise IOError(message)
-            readFile.close()
-        else:
-            self.catData = None
+
+        # THE SIZE OF THE CHUNKS THE DATA FILE IS STREAMED IN
+        self.chunkBytes = 16 * 1024**2
+        if settings and "catalogue import chunk megabytes" in settings and settings["catalogue import chunk megabytes"]:
+            self.chunkBytes = int(
+                float(settings["catalogue import chunk megabytes"]) * 1024**2)
+        self.encoding = "utf-8"
+
+        # PROCESSES PARSING THE CHUNKS OF THE DATA FILE IN PARALLEL (1 TO PARSE
+        # THEM IN THIS PROCESS) AND DATABASE CONNECTIONS INSERTING THEIR ROWS
+        import psutil
+        self.importWorkers = psutil.cpu_count()
+        if settings and "catalogue import workers" in settings and settings["catalogue import workers"]:
+            self.importWorkers = int(settings["catalogue import workers"])
+        self.insertConnections = 4
+        if settings and "catalogue import insert connections" in settings and settings["catalogue import insert connections"]:
+            self.insertConnections = int(
+                settings["catalogue import insert connections"])
+        # THE ROW WRITER OF SERIAL IMPORTS (SEE `_insert_rows`)
+        self.importWriter = None
 
         # GET THE VERSION TO APPEND TO THE DATABASE TABLE NAME FOR THE
         # CATALOGUE
@@ -126,7 +145,7 @@ class _base_importer(object):
             createStatement=False):
         """*Import data in the list of dictionaries in the requested database table*
 
-        Also adds HTMIDs and updates the sherlock-catalogue database helper table with the time-stamp of when the imported catlogue was last updated
+        Also adds HTMIDs and updates the sherlock-catalogue database helper table with the time-stamp of when the imported catlogue was last updated. The HTMIDs are computed as the rows are inserted (see ``_add_htmids_to_dictList``); only tables without HTMID columns fall back to the full-table ``_add_htmids_to_database_table`` pass.
 
         **Key Arguments**
 
@@ -150,15 +169,11 @@ class _base_importer(object):
         """
         self.log.debug('starting the ``add_data_to_database_table`` method')
 
-        from fundamentals.mysql import insert_list_of_dictionaries_into_database_tables, writequery
-        from sherlock.database_cleaner import database_cleaner
+        from fundamentals.mysql import writequery
 
         if len(dictList) == 0:
             return
 
-        myPid = self.myPid
-        dbTableName = self.dbTableName
-
         if createStatement:
             writequery(
                 log=self.log,
@@ -166,21 +181,537 @@ class _base_importer(object):
                 dbConn=self.cataloguesDbConn,
             )
 
-        insert_list_of_dictionaries_into_database_tables(
-            dbConn=self.cataloguesDbConn,
+        htmIdsAdded = self._insert_rows(
+            dictList=dictList
+        )
+        self._finish_import(
+            htmIdsAdded=htmIdsAdded
+        )
+
+        self.log.debug('completed the ``add_data_to_database_table`` method')
+        return None
+
+    def stream_data_to_database_table(
+            self,
+            createStatement=False):
+        """*Stream the data file into the database table chunk by chunk, so memory use is bounded by the chunk size rather than the size of the catalogue*
+
+        The data file (or for streamed sources, the importer's own ``_read_data_chunks``) is read in record-aligned chunks of ``catalogue import chunk megabytes`` (see ``_read_data_chunks``). Each chunk is parsed into rows by the importer's ``_parse_chunk`` and inserted, with its HTMIDs, before the next chunk is read. The byte offset reached is saved after every chunk, so re-running an interrupted import of the same (unchanged) data file resumes from the next chunk. (Rows are upserted on the table's unique key, so a chunk written just before the interruption is harmlessly written again.)
+
+        Data files spanning more than one chunk are imported in parallel when ``catalogue import workers`` (default one per CPU) is more than 1 - see ``_stream_chunks_in_parallel``.
+
+        **Key Arguments**
+
+        - ``createStatement`` - the table's mysql create statement (not run when resuming an interrupted import). Default *False*
+
+        **Usage**
+
+        ```python
+        self.stream_data_to_database_table(
+            createStatement=createStatement
+        )
+        ```
+        """
+        self.log.debug('starting the ``stream_data_to_database_table`` method')
+
+        from fundamentals.mysql import writequery
+
+        dbTableName = self.dbTableName
+
+        progress = self._read_import_progress()
+        if progress:
+            startOffset = progress["offset"]
+            rowCount = progress["rows"]
+            print("resuming the import into `%(dbTableName)s` after %(rowCount)s rows (byte %(startOffset)s of the data file)" % locals())
+        else:
+            startOffset = 0
+            rowCount = 0
+            if createStatement:
+                writequery(
+                    log=self.log,
+                    sqlQuery=createStatement,
+                    dbConn=self.cataloguesDbConn,
+                )
+
+        ranges = []
+        if self.pathToDataFile and self.importWorkers > 1:
+            ranges = self._data_chunk_ranges(startOffset=startOffset)
+
+        if len(ranges) > 1:
+            rowCount, htmIdsAdded = self._stream_chunks_in_parallel(
+                ranges=ranges,
+                rowCount=rowCount
+            )
+        else:
+            htmIdsAdded = True
+            for chunkStart, chunkEnd, lines in self._read_data_chunks(startOffset=startOffset):
+                dictList = list(self._parse_chunk(lines))
+                if len(dictList):
+                    htmIdsAdded = self._insert_rows(
+                        dictList=dictList) and htmIdsAdded
+                rowCount += len(dictList)
+                self._write_import_progress(
+                    offset=chunkEnd,
+                    rows=rowCount
+                )
+                self._report_import_progress(
+                    rowCount=rowCount,
+                    offset=chunkEnd
+                )
+
+        self._finish_import(
+            htmIdsAdded=htmIdsAdded
+        )
+        self._remove_import_progress()
+
+        self.log.debug(
+            'completed the ``stream_data_to_database_table`` method')
+        return rowCount
+
+    def _stream_chunks_in_parallel(
+            self,
+            ranges,
+            rowCount=0):
+        """*parse the chunks of the data file in a pool of worker processes and insert their rows over a bounded set of database connections*
+
+        ``catalogue import workers`` processes each read their chunk's byte range straight from the data file, parse it with the importer's ``_parse_chunk`` and compute the rows' HTMIDs. The parsed chunks are upserted with ``_write_rows`` (as in a serial import) by at most ``catalogue import insert connections`` threads, each with its own connection to the catalogues database. At most one chunk per worker and connection is held in memory, so the parsers wait for the database rather than filling memory when it is the bottleneck.
+
+        Each chunk is reported as it is inserted, and a chunk that fails to parse or insert is reported (with the error) without stopping the others. Chunks finish out of order, so the saved progress is the end of the run of finished chunks at the start of the file. If any chunk failed an ``IOError`` is raised once the rest are in, and re-running the import resumes from the first failed chunk.
+
+        **Key Arguments**
+
+        - ``ranges`` -- the ``(startOffset, endOffset)`` byte range of each chunk (see ``_data_chunk_ranges``)
+        - ``rowCount`` -- the rows already imported (when resuming). Default *0*
+
+        **Return**
+
+        - ``rowCount`` -- the rows imported, including ``rowCount``
+        - ``htmIdsAdded`` -- False if the table has no HTMID columns (see ``_add_htmids_to_dictList``)
+        """
+        self.log.debug('starting the ``_stream_chunks_in_parallel`` method')
+
+        import copy
+        import time
+        import queue
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        from multiprocess import Pool
+
+        dbTableName = self.dbTableName
+        chunkCount = len(ranges)
+        workers = min(self.importWorkers, chunkCount)
+        insertConnections = max(1, min(self.insertConnections, chunkCount))
+
+        htmColumns = self._htm_columns()
+        htmIdsAdded = len(htmColumns) > 0
+
+        # THE WORKERS GET A COPY OF THE IMPORTER (WITH THE STATE ITS
+        # `_read_header` SET UP) MINUS ITS DATABASE CONNECTIONS
+        parser = copy.copy(self)
+        parser.cataloguesDbConn = None
+        parser.transientsDbConn = None
+        parser.importWriter = None
+
+        writers = queue.Queue()
+        for i in range(insertConnections):
+            writers.put(self._import_writer())
+
+        def insert(dictList):
+            writer = writers.get()
+            try:
+                self._write_rows(
+                    writer=writer,
+                    dictList=dictList
+                )
+            finally:
+                writers.put(writer)
+
+        print("importing %(chunkCount)s chunks of the data file into `%(dbTableName)s` with %(workers)s parsing processes and %(insertConnections)s database connections" % locals())
+
+        progress = _import_chunk_progress(
+            ranges=ranges,
+            rowCount=rowCount
+        )
+        parsing = []
+        inserting = {}
+        nextChunk = 0
+        pool = Pool(
+            processes=workers,
+            initializer=_init_import_worker,
+            initargs=(parser, htmColumns)
+        )
+        executor = ThreadPoolExecutor(max_workers=insertConnections)
+        try:
+            while nextChunk < chunkCount or len(parsing) or len(inserting):
+                # KEEP EVERY WORKER AND CONNECTION BUSY, BUT NO MORE
+                while nextChunk < chunkCount and len(parsing) + len(inserting) < workers + insertConnections:
+                    chunkStart, chunkEnd = ranges[nextChunk]
+                    parsing.append(pool.apply_async(
+                        _parse_import_chunk, ((nextChunk, chunkStart, chunkEnd),)))
+                    nextChunk += 1
+
+                for parsed in [p for p in parsing if p.ready()]:
+                    parsing.remove(parsed)
+                    chunk = parsed.get()
+                    if chunk["error"]:
+                        progress.fail(chunk["index"])
+                        self._report_chunk(
+                            chunk=chunk, chunkCount=chunkCount)
+                        continue
+                    chunk["insertStart"] = time.time()
+                    inserting[executor.submit(
+                        insert, chunk.pop("rows"))] = chunk
+
+                if not len(inserting):
+                    time.sleep(0.05)
+                    continue
+                done, notDone = wait(
+                    list(inserting), timeout=0.05, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = inserting.pop(future)
+                    chunk["insertSeconds"] = time.time() - chunk["insertStart"]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        chunk["error"] = "%s: %s" % (e.__class__.__name__, e)
+                        progress.fail(chunk["index"])
+                        self._report_chunk(chunk=chunk, chunkCount=chunkCount)
+                        continue
+                    self._report_chunk(chunk=chunk, chunkCount=chunkCount)
+
+                    # SAVE THE PROGRESS THROUGH THE RUN OF FINISHED CHUNKS AT
+                    # THE START OF THE FILE
+                    saved = progress.finish(
+                        index=chunk["index"],
+                        rowCount=chunk["rowCount"]
+                    )
+                    if saved:
+                        offset, rows = saved
+                        self._write_import_progress(
+                            offset=offset,
+                            rows=rows
+                        )
+                        self._report_import_progress(
+                            rowCount=progress.importedRows,
+                            offset=offset
+                        )
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+            executor.shutdown(wait=True)
+            while not writers.empty():
+                writers.get().dbConn.close()
+
+        if len(progress.failed):
+            failedCount = len(progress.failed)
+            firstFailed = min(progress.failed) + 1
+            message = "%(failedCount)s of the %(chunkCount)s chunks of the data file failed to import into `%(dbTableName)s` (see the errors above). Re-run the import to resume from chunk %(firstFailed)s" % locals()
+            self.log.error(message)
+            raise IOError(message)
+
+        self.log.debug('completed the ``_stream_chunks_in_parallel`` method')
+        return progress.rowCount, htmIdsAdded
+
+    def _report_chunk(
+            self,
+            chunk,
+            chunkCount):
+        """*log and print how a chunk of a parallel import went*
+        """
+        index = chunk["index"] + 1
+        chunkStart = chunk["start"]
+        chunkEnd = chunk["end"]
+        message = "chunk %(index)s of %(chunkCount)s (bytes %(chunkStart)s-%(chunkEnd)s)" % locals()
+        if chunk["error"]:
+            error = chunk["error"]
+            message += " failed: %(error)s" % locals()
+            self.log.error(message)
+        else:
+            rows = chunk["rowCount"]
+            parseSeconds = chunk["parseSeconds"]
+            insertSeconds = chunk["insertSeconds"]
+            message += ": %(rows)s rows parsed in %(parseSeconds)0.1fs and inserted in %(insertSeconds)0.1fs" % locals()
+            self.log.info(message)
+        print(message)
+        return None
+
+    def _report_import_progress(
+            self,
+            rowCount,
+            offset):
+        """*log and print the rows imported and how far through the data file the import has got*
+        """
+        dbTableName = self.dbTableName
+        message = "%(rowCount)s rows imported into `%(dbTableName)s`" % locals()
+        if self.pathToDataFile:
+            totalBytes = os.path.getsize(self.pathToDataFile)
+            if totalBytes:
+                percent = 100. * offset / totalBytes
+                message += " (%(percent)1.1f%% of the data file)" % locals()
+        self.log.info(message)
+        print(message)
+        return None
+
+    def _read_header(
+            self,
+            dataFile):
+        """*read past (and parse) the data file's header - override in importers whose files have one*
+
+        **Key Arguments**
+
+        - ``dataFile`` -- the data file, opened in binary mode and positioned at its start. Leave it positioned at the first data record
+        """
+        return None
+
+    def _parse_chunk(
+            self,
+            lines):
+        """*yield a dictionary for each row in a chunk of the data file's lines - implemented by each file-based importer*
+
+        **Key Arguments**
+
+        - ``lines`` -- list of the (decoded) lines in the chunk
+        """
+        message = "%s does not implement `_parse_chunk` so cannot stream its data file" % (
+            self.__class__.__name__,)
+        self.log.error(message)
+        raise NotImplementedError(message)
+
+    def _chunk_ends_on_record(
+            self,
+            data):
+        """*does a chunk of the data file end on a record boundary? Every line is a record unless an importer overrides this (e.g. for quoted CSV fields spanning lines)*
+
+        **Key Arguments**
+
+        - ``data`` -- the bytes of the chunk, ending with a newline
+        """
+        return True
+
+    def _read_data_chunks(
+            self,
+            startOffset=0):
+        """*read the data file in chunks of about ``self.chunkBytes``, each extended to the end of its last record*
+
+        **Key Arguments**
+
+        - ``startOffset`` -- the byte offset to start reading from (the start of a chunk). Default *0* (the first record after the header)
+
+        **Return**
+
+        - a generator of ``(startOffset, endOffset, lines)`` tuples, one per chunk
+        """
+        with open(self.pathToDataFile, 'rb') as dataFile:
+            self._read_header(dataFile)
+            dataFile.seek(max(startOffset, dataFile.tell()))
+            while True:
+                chunkStart = dataFile.tell()
+                data = dataFile.read(self.chunkBytes)
+                if not data:
+                    break
+                # FINISH THE CHUNK'S LAST RECORD
+                data += dataFile.readline()
+                while not self._chunk_ends_on_record(data):
+                    line = dataFile.readline()
+                    if not line:
+                        break
+                    data += line
+                yield chunkStart, dataFile.tell(), data.decode(self.encoding).splitlines()
+
+    def _data_chunk_ranges(
+            self,
+            startOffset=0):
+        """*the byte ranges of the chunks ``_read_data_chunks`` would read, without parsing them*
+
+        Also runs the importer's ``_read_header``. Where every line is a record the chunk ends are found by seeking; otherwise (see ``_chunk_ends_on_record``) the file is read through to find them.
+
+        **Key Arguments**
+
+        - ``startOffset`` -- the byte offset to start from (the start of a chunk). Default *0* (the first record after the header)
+
+        **Return**
+
+        - ``ranges`` -- list of ``(startOffset, endOffset)`` tuples, one per chunk
+        """
+        fileSize = os.path.getsize(self.pathToDataFile)
+        lineRecords = type(self)._chunk_ends_on_record is _base_importer._chunk_ends_on_record
+
+        ranges = []
+        with open(self.pathToDataFile, 'rb') as dataFile:
+            self._read_header(dataFile)
+            dataFile.seek(max(startOffset, dataFile.tell()))
+            while dataFile.tell() < fileSize:
+                chunkStart = dataFile.tell()
+                if lineRecords:
+                    dataFile.seek(min(chunkStart + self.chunkBytes, fileSize))
+                    dataFile.readline()
+                else:
+                    data = dataFile.read(self.chunkBytes)
+                    data += dataFile.readline()
+                    while not self._chunk_ends_on_record(data):
+                        line = dataFile.readline()
+                        if not line:
+                            break
+                        data += line
+                ranges.append((chunkStart, dataFile.tell()))
+        return ranges
+
+    def _import_progress_file(
+            self):
+        """*the file recording how far an import of the data file into ``self.dbTableName`` has got*
+        """
+        return os.path.expanduser("~/.config/sherlock/import_progress/%s.json" % (self.dbTableName,))
+
+    def _read_import_progress(
+            self):
+        """*the progress of an interrupted import of this (unchanged) data file into this table, or None*
+        """
+        import json
+
+        if not self.pathToDataFile:
+            return None
+        progressFile = self._import_progress_file()
+        try:
+            with open(progressFile, 'r') as f:
+                progress = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+        stat = os.stat(self.pathToDataFile)
+        if progress.get("path") != os.path.abspath(self.pathToDataFile) or progress.get("size") != stat.st_size or progress.get("mtime") != stat.st_mtime:
+            self.log.warning(
+                'ignoring the progress saved by an import of a different data file into `%s`' % (self.dbTableName,))
+            return None
+        return progress
+
+    def _write_import_progress(
+            self,
+            offset,
+            rows):
+        """*save the byte offset (and row count) the import has reached*
+        """
+        import json
+
+        if not self.pathToDataFile:
+            return None
+        progressFile = self._import_progress_file()
+        # Recursively create missing directories
+        if not os.path.exists(os.path.dirname(progressFile)):
+            os.makedirs(os.path.dirname(progressFile))
+
+        stat = os.stat(self.pathToDataFile)
+        with open(progressFile + ".tmp", 'w') as f:
+            json.dump({
+                "path": os.path.abspath(self.pathToDataFile),
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "offset": offset,
+                "rows": rows
+            }, f)
+        os.replace(progressFile + ".tmp", progressFile)
+        return None
+
+    def _remove_import_progress(
+            self):
+        """*forget the progress of a finished import*
+        """
+        try:
+            os.remove(self._import_progress_file())
+        except OSError:
+            pass
+        return None
+
+    def _insert_rows(
+            self,
+            dictList):
+        """*insert rows (with their HTMIDs) into the database table*
+
+        The rows are written with ``_write_rows``, the same upsert a parallel import uses, over a connection of their own.
+
+        **Key Arguments**
+
+        - ``dictList`` - a list of dictionaries, one per row
+
+        **Return**
+
+        - ``htmIdsAdded`` -- False if the table has no HTMID columns (see ``_add_htmids_to_dictList``)
+        """
+        self.log.debug('starting the ``_insert_rows`` method')
+
+        # COMPUTE THE HTMIDS WITH THE ROWS RATHER THAN IN A SECOND PASS OVER
+        # THE TABLE
+        htmIdsAdded = self._add_htmids_to_dictList(
+            dictList=dictList
+        )
+
+        if not self.importWriter:
+            self.importWriter = self._import_writer()
+        self._write_rows(
+            writer=self.importWriter,
+            dictList=dictList
+        )
+
+        self.log.debug('completed the ``_insert_rows`` method')
+        return htmIdsAdded
+
+    def _write_rows(
+            self,
+            writer,
+            dictList):
+        """*upsert rows into the database table - the one write used by serial and parallel imports*
+
+        Rows are matched on the table's unique keys; new rows are stamped with ``dateCreated`` and every written row with ``dateLastModified``.
+
+        **Key Arguments**
+
+        - ``writer`` -- a ``bulk_result_writer`` on a connection to the catalogues database (see ``_import_writer``)
+        - ``dictList`` - a list of dictionaries, one per row
+        """
+        writer.upsert_rows(
+            dbTableName=self.dbTableName,
+            dictList=dictList
+        )
+        return None
+
+    def _import_writer(
+            self):
+        """*a ``bulk_result_writer`` on a new connection to the catalogues database (opened with ``local_infile``, so the rows can be bulk-loaded)*
+        """
+        from fundamentals.mysql import database
+        from sherlock.commonutils import bulk_result_writer
+        return bulk_result_writer(
             log=self.log,
-            dictList=dictList,
-            dbTableName=dbTableName,
-            uniqueKeyList=[],
-            dateModified=True,
-            dateCreated=True,
-            batchSize=10000,
-            replace=True,
-            dbSettings=self.settings["database settings"][
-                "static catalogues"]
+            dbConn=database(
+                log=self.log,
+                dbSettings=self.settings["database settings"][
+                    "static catalogues"]
+            ).connect(),
+            settings=self.settings
         )
 
-        self._add_htmids_to_database_table()
+    def _finish_import(
+            self,
+            htmIdsAdded=True):
+        """*finish an import - add any HTMIDs that could not be added at insert, and update the sherlock-catalogue database helper tables*
+
+        **Key Arguments**
+
+        - ``htmIdsAdded`` -- were the HTMIDs added as the rows were inserted? Default *True*
+        """
+        self.log.debug('starting the ``_finish_import`` method')
+
+        from sherlock.database_cleaner import database_cleaner
+
+        dbTableName = self.dbTableName
+
+        if self.importWriter:
+            self.importWriter.dbConn.close()
+            self.importWriter = None
+
+        if not htmIdsAdded:
+            self._add_htmids_to_database_table()
 
         cleaner = database_cleaner(
             log=self.log,
@@ -202,13 +733,108 @@ class _base_importer(object):
 
     """ % locals())
 
-        self.log.debug('completed the ``add_data_to_database_table`` method')
+        self.log.debug('completed the ``_finish_import`` method')
         return None
 
+    def _add_htmids_to_dictList(
+            self,
+            dictList,
+            tableName=False,
+            htmColumns=False):
+        """*Add HTMIDs to the rows before they are inserted into the database table*
+
+        IDs are computed (vectorised) for each of the ``htm07ID``, ``htm10ID``, ``htm13ID`` and ``htm16ID`` columns the table has, so they are written by the same statement as the rest of the row. Rows without valid coordinates get null IDs, and rows without coordinate keys (e.g. name-only NED stream rows) are left untouched so an upsert doesn't null their existing IDs.
+
+        **Key Arguments**
+
+        - ``dictList`` -- the list of row dictionaries (updated in place)
+        - ``tableName`` -- the table the rows are going into. Default *False* (``self.dbTableName``)
+        - ``htmColumns`` -- the table's HTMID columns, if already known (see ``_htm_columns``). Default *False* (look them up)
+
+        **Return**
+
+        - ``added`` -- False if the table has no HTMID columns (leave the IDs to ``_add_htmids_to_database_table``)
+
+        **Usage**
+
+        ```python
+        if not self._add_htmids_to_dictList(dictList=dictList):
+            self._add_htmids_to_database_table()
+        ```
+        """
+        self.log.debug('starting the ``_add_htmids_to_dictList`` method')
+
+        from HMpTy import HTM
+        import numpy as np
+
+        raColName = self.raColName
+        declColName = self.declColName
+
+        rows = [d for d in dictList if raColName in d and declColName in d]
+        if not len(rows):
+            self.log.debug('completed the ``_add_htmids_to_dictList`` method')
+            return True
+
+        if htmColumns is False:
+            htmColumns = self._htm_columns(tableName=tableName)
+        if not len(htmColumns):
+            self.log.debug('completed the ``_add_htmids_to_dictList`` method')
+            return False
+
+        ra = np.full(len(rows), np.nan)
+        dec = np.full(len(rows), np.nan)
+        for i, d in enumerate(rows):
+            try:
+                ra[i] = float(d[raColName])
+                dec[i] = float(d[declColName])
+            except (TypeError, ValueError):
+                pass
+        valid = np.isfinite(ra) & np.isfinite(dec)
+
+        for columnName in htmColumns:
+            ids = np.zeros(len(rows), dtype=np.int64)
+            if valid.any():
+                mesh = HTM(
+                    depth=int(columnName[3:5]),
+                    log=self.log
+                )
+                ids[valid] = np.asarray(mesh.lookup_id(
+                    ra[valid], dec[valid])).astype(np.int64)
+            for d, isValid, htmId in zip(rows, valid.tolist(), ids.tolist()):
+                d[columnName] = htmId if isValid else None
+
+        self.log.debug('completed the ``_add_htmids_to_dictList`` method')
+        return True
+
+    def _htm_columns(
+            self,
+            tableName=False):
+        """*the HTMID columns (``htm07ID``, ``htm10ID``, ``htm13ID`` and ``htm16ID``) a table has*
+
+        **Key Arguments**
+
+        - ``tableName`` -- the table. Default *False* (``self.dbTableName``)
+        """
+        from fundamentals.mysql import readquery
+
+        if not tableName:
+            tableName = self.dbTableName
+
+        sqlQuery = u"""
+            SELECT COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME='%(tableName)s' AND COLUMN_NAME in ("htm07ID", "htm10ID", "htm13ID", "htm16ID");
+        """ % locals()
+        return [r["COLUMN_NAME"] for r in readquery(
+            log=self.log,
+            sqlQuery=sqlQuery,
+            dbConn=self.cataloguesDbConn,
+        )]
+
     def _add_htmids_to_database_table(
             self):
         """*Add HTMIDs to database table once all the data has been imported (HTM Levels 10,13,16)*
 
+        This rescans the table and rewrites every row missing its HTMIDs, so it is only used for tables without HTMID columns (which it adds) and to repair tables imported by older versions of sherlock. New rows get their HTMIDs at insert (``_add_htmids_to_dictList``).
+
         **Usage**
 
         ```python
@@ -271,3 +897,110 @@ class _base_importer(object):
 
     # use the tab-trigger below for new method
     # xt-class-method
+
+
+class _import_chunk_progress(object):
+    """
+    *track the chunks of a parallel import as they finish out of order, and the progress that can be saved*
+
+    The saved progress is the end of the run of finished chunks at the start of the file. A failed chunk stops that run, so re-running the import resumes from it.
+
+    **Key Arguments**
+
+    - ``ranges`` -- the ``(startOffset, endOffset)`` of each chunk, in file order
+    - ``rowCount`` -- the rows already imported (when resuming). Default *0*
+    """
+
+    def __init__(
+            self,
+            ranges,
+            rowCount=0):
+        self.ranges = ranges
+        # ROWS IN THE SAVED RUN OF CHUNKS, AND IN EVERY FINISHED CHUNK
+        self.rowCount = rowCount
+        self.importedRows = rowCount
+        self.finished = {}
+        self.failed = set()
+        self.firstUnfinished = 0
+
+    def finish(
+            self,
+            index,
+            rowCount):
+        """*record a chunk as written*
+
+        **Return**
+
+        - ``saved`` -- the ``(offset, rows)`` progress to save if the run of finished chunks at the start of the file grew, else None
+        """
+        self.finished[index] = rowCount
+        self.importedRows += rowCount
+        if self.firstUnfinished not in self.finished:
+            return None
+        while self.firstUnfinished in self.finished:
+            self.rowCount += self.finished.pop(self.firstUnfinished)
+            self.firstUnfinished += 1
+        return self.ranges[self.firstUnfinished - 1][1], self.rowCount
+
+    def fail(
+            self,
+            index):
+        """*record a chunk as failed to parse or insert*
+        """
+        self.failed.add(index)
+        return None
+
+
+def _init_import_worker(
+        importer,
+        htmColumns):
+    """*initialise a parallel import worker with its copy of the importer (see ``_base_importer._stream_chunks_in_parallel``)*
+    """
+    global workerImporter
+    global workerHtmColumns
+
+    workerImporter = importer
+    workerHtmColumns = htmColumns
+
+
+def _parse_import_chunk(
+        chunk):
+    """*read and parse one chunk of the data file in a parallel import worker, adding the rows' HTMIDs*
+
+    **Key Arguments**
+
+    - ``chunk`` -- the ``(index, startOffset, endOffset)`` of the chunk
+
+    **Return**
+
+    - ``chunk`` -- dictionary with the chunk's ``index``, ``start`` and ``end``, its ``rows`` and ``rowCount``, the ``parseSeconds`` taken, and the ``error`` if it could not be parsed (else None)
+    """
+    import time
+
+    index, chunkStart, chunkEnd = chunk
+    start_time = time.time()
+    try:
+        with open(workerImporter.pathToDataFile, 'rb') as dataFile:
+            dataFile.seek(chunkStart)
+            data = dataFile.read(chunkEnd - chunkStart)
+        dictList = list(workerImporter._parse_chunk(
+            data.decode(workerImporter.encoding).splitlines()))
+        if len(dictList) and len(workerHtmColumns):
+            workerImporter._add_htmids_to_dictList(
+                dictList=dictList,
+                htmColumns=workerHtmColumns
+            )
+        error = None
+    except Exception as e:
+        dictList = []
+        error = "%s: %s" % (e.__class__.__name__, e)
+
+    return {
+        "index": index,
+        "start": chunkStart,
+        "end": chunkEnd,
+        "rows": dictList,
+        "rowCount": len(dictList),
+        "parseSeconds": time.time() - start_time,
+        "error": error
+    }
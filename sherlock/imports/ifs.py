@@ -47,7 +47,7 @@ class ifs(_base_importer):
     def ingest(self):
         """*Import the IFS catalogue into the sherlock-catalogues database*
 
-        The method first generates a list of python dictionaries from the IFS datafile, imports this list of dictionaries into a database table and then generates the HTMIDs for that table. 
+        The method streams the IFS galaxy list in chunks, parsing each chunk into python dictionaries and importing them (with their HTMIDs) into a database table before reading the next.
 
         **Usage**
 
@@ -62,8 +62,6 @@ class ifs(_base_importer):
         self.dbTableName = "tcs_cat_ifs_stream"
         self.databaseInsertbatchSize = 500
 
-        dictList = self._create_dictionary_of_IFS()
-
         tableName = self.dbTableName
         createStatement = """
     CREATE TABLE IF NOT EXISTS `%(tableName)s` (
@@ -86,58 +84,70 @@ class ifs(_base_importer):
     ) ENGINE=MyISAM AUTO_INCREMENT=0 DEFAULT CHARSET=utf8 COLLATE=utf8_unicode_ci;
 """ % locals()
 
-        self.add_data_to_database_table(
-            dictList=dictList,
+        self.stream_data_to_database_table(
             createStatement=createStatement
         )
 
         self.log.debug('completed the ``get`` method')
         return None
 
-    def _create_dictionary_of_IFS(
-            self):
-        """*Generate the list of dictionaries containing all the rows in the IFS stream*
-
-        **Return**
+    def _read_data_chunks(
+            self,
+            startOffset=0):
+        """*stream the IFS galaxy list from the ``ifs galaxies url`` in chunks of lines*
 
-        - ``dictList`` - a list of dictionaries containing all the rows in the IFS stream
+        **Key Arguments**
 
+        - ``startOffset`` -- ignored (a streamed import can't be resumed). Default *0*
 
-        **Usage**
-
-        ```python
-        from sherlock.imports import IFS
-        stream = IFS(
-            log=log,
-            settings=settings
-        )
-        dictList = stream._create_dictionary_of_IFS()
-        ```
+        **Return**
 
+        - a generator of ``(startOffset, endOffset, lines)`` tuples, one per chunk
         """
-        self.log.debug(
-            'starting the ``_create_dictionary_of_IFS`` method')
-
-        from astrocalc.coords import unit_conversion
         import requests
         import sys
 
-        # GRAB THE CONTENT OF THE IFS CSV
+        # STREAM THE CONTENT OF THE IFS CSV
         try:
             response = requests.get(
                 url=self.settings["ifs galaxies url"],
+                stream=True
             )
-            thisData = response.content
-            thisData = str(thisData).split("\n")
-            status_code = response.status_code
+            response.raise_for_status()
         except requests.exceptions.RequestException:
             print('HTTP Request failed')
             sys.exit(0)
 
-        dictList = []
-        columns = ["name", "raDeg", "decDeg", "z"]
+        chunkStart = 0
+        chunkEnd = 0
+        lines = []
+        for line in response.iter_lines():
+            chunkEnd += len(line) + 1
+            lines.append(line.decode(self.encoding, errors="replace"))
+            if chunkEnd - chunkStart >= self.chunkBytes:
+                yield chunkStart, chunkEnd, lines
+                chunkStart = chunkEnd
+                lines = []
+        if len(lines):
+            yield chunkStart, chunkEnd, lines
+
+    def _parse_chunk(
+            self,
+            lines):
+        """*yield a dictionary for each IFS galaxy in a chunk of lines*
+
+        **Key Arguments**
+
+        - ``lines`` -- list of lines from the IFS galaxy list
+        """
+        from astrocalc.coords import unit_conversion
+
+        # ASTROCALC UNIT CONVERTER OBJECT
+        converter = unit_conversion(
+            log=self.log
+        )
 
-        for line in thisData:
+        for line in lines:
             thisDict = {}
             line = line.strip()
             line = line.replace("\t", " ")
@@ -145,10 +155,6 @@ class ifs(_base_importer):
             if len(values) > 3:
                 thisDict["name"] = values[0].strip()
 
-                # ASTROCALC UNIT CONVERTER OBJECT
-                converter = unit_conversion(
-                    log=self.log
-                )
                 try:
                     raDeg = converter.ra_sexegesimal_to_decimal(
                         ra=values[1].strip()
@@ -171,11 +177,7 @@ class ifs(_base_importer):
                         thisDict["z"] = None
                 except:
                     thisDict["z"] = None
-                dictList.append(thisDict)
-
-        self.log.debug(
-            'completed the ``_create_dictionary_of_IFS`` method')
-        return dictList
+                yield thisDict
 
     # use the tab-trigger below for new method
     # xt-class-method
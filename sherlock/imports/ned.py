@@ -24,6 +24,8 @@ class ned(_base_importer):
         4. Updates the NED query history table
         5. Queris NED via NED IDs (object search) for the remaining source metadata to be added to the `tcs_cat_ned_stream` table
 
+    Each source's metadata fetch is timestamped (``metadata_fetched``) and given a ``metadata_status`` (``ok``, ``missing`` or ``error``), so only new sources, and those fetched more than ``ned metadata refresh days`` ago, are sent to NED.
+
     Note it's up to the user to filter the input coordinate list by checking whether or not the same area of the sky has been imported into the `tcs_cat_ned_stream` table recently (by checking the `tcs_helper_ned_query_history` table)
 
     **Key Arguments**
@@ -133,13 +135,17 @@ class ned(_base_importer):
   `download_error` tinyint(1) DEFAULT '0',
   `htm10ID` bigint(20) DEFAULT NULL,
   `htm13ID` bigint(20) DEFAULT NULL,
+  `magnitude` double DEFAULT NULL,
+  `metadata_fetched` datetime DEFAULT NULL,
+  `metadata_status` varchar(20) DEFAULT NULL,
   PRIMARY KEY (`primaryId`),
   UNIQUE KEY `ned_name` (`ned_name`),
   KEY `idx_htm16ID` (`htm16ID`),
   KEY `raDeg` (`raDeg`),
   KEY `downloadError` (`download_error`),
   KEY `idx_htm10ID` (`htm10ID`),
-  KEY `idx_htm13ID` (`htm13ID`)
+  KEY `idx_htm13ID` (`htm13ID`),
+  KEY `idx_metadata_fetched` (`metadata_fetched`)
 ) ENGINE=MyISAM AUTO_INCREMENT=0 DEFAULT CHARSET=latin1;
 """ % locals()
 
@@ -159,6 +165,8 @@ class ned(_base_importer):
             self):
         """*Create a list of dictionaries containing all the object ids (NED names) in the ned stream*
 
+        Each coordinate is one NED conesearch request. The requests are sent concurrently, rate-limited and retried by a ``concurrent_fetcher`` (``ned fetching`` settings), and the result pages are parsed in memory. Searches returning more than 45,000 sources (NED truncates at 50,000) are repeated over 7 sub-discs of half the radius, as ``neddy`` does. Query centres already in the local ``ned cache`` are not sent to NED.
+
         **Return**
 
         - ``dictList`` - a list of dictionaries containing all the object ids (NED names) in the ned stream
@@ -175,18 +183,45 @@ class ned(_base_importer):
             'starting the ``_create_dictionary_of_ned`` method')
 
         # GET THE NAMES (UNIQUE IDS) OF THE SOURCES WITHIN THE CONESEARCH FROM
-        # NED
-        from neddy import conesearch
-        names, searchParams = conesearch(
+        # NED - ONE REQUEST PER QUERY CENTRE
+        from sherlock.commonutils import concurrent_fetcher, response_cache
+
+        fetcher = concurrent_fetcher(
+            log=self.log,
+            settings=self.settings
+        )
+        cache = response_cache(
             log=self.log,
-            radiusArcsec=self.radiusArcsec,
-            nearestOnly=False,
-            unclassified=True,
-            quiet=False,
-            listOfCoordinates=self.coordinateList,
-            outputFilePath=False,
-            verbose=False
-        ).get_crossmatch_names()
+            settings=self.settings
+        )
+        baseUrl = self._ned_base_url()
+
+        queries = []
+        queries[:] = [[float(v) for v in _split_coordinate(c)] + [float(self.radiusArcsec)]
+                      for c in self.coordinateList]
+        names = []
+        while len(queries):
+            results = cache.fetch(
+                fetcher=fetcher,
+                kind="ned conesearch",
+                urls=[_ned_conesearch_url(baseUrl, *q) for q in queries],
+                params=[{"raDeg": q[0], "decDeg": q[1], "radiusArcsec": q[2],
+                         "unclassified": True} for q in queries],
+                parse=_parse_ned_conesearch
+            )
+            # OVERSIZED RESULTS ARE SEARCHED AGAIN IN FINER SUB-DISCS
+            oversized = []
+            for q, r in zip(queries, results):
+                if len(r) > 45000:
+                    self.log.warning(
+                        'NED conesearch at %s %s returned %s sources, searching 7 sub-discs instead' % (q[0], q[1], len(r)))
+                    oversized += _ned_sub_discs(*q)
+                else:
+                    names += r
+            queries = oversized
+
+        # SOURCES FOUND BY MORE THAN ONE CONESEARCH ARE ONLY LISTED ONCE
+        names = list(dict.fromkeys(names))
 
         dictList = []
         dictList[:] = [{"ned_name": n} for n in names]
@@ -266,6 +301,13 @@ class ned(_base_importer):
             dbConn=self.cataloguesDbConn
         )
 
+        # INDEX THE QUERIES FOR LATER SEARCHES - HTMIDS ARE INSERTED WITH THE
+        # ROWS RATHER THAN BY RESCANNING THE TABLE
+        htmIdsAdded = self._add_htmids_to_dictList(
+            dictList=dataList,
+            tableName="tcs_helper_ned_query_history"
+        )
+
         # USE dbSettings TO ACTIVATE MULTIPROCESSING
         insert_list_of_dictionaries_into_database_tables(
             dbConn=self.cataloguesDbConn,
@@ -280,16 +322,16 @@ class ned(_base_importer):
                 "static catalogues"]
         )
 
-        # INDEX THE TABLE FOR LATER SEARCHES
-        add_htm_ids_to_mysql_database_table(
-            raColName="raDeg",
-            declColName="decDeg",
-            tableName="tcs_helper_ned_query_history",
-            dbConn=self.cataloguesDbConn,
-            log=self.log,
-            primaryIdColumnName="primaryId",
-            dbSettings=self.settings["database settings"]["static catalogues"]
-        )
+        if not htmIdsAdded:
+            add_htm_ids_to_mysql_database_table(
+                raColName="raDeg",
+                declColName="decDeg",
+                tableName="tcs_helper_ned_query_history",
+                dbConn=self.cataloguesDbConn,
+                log=self.log,
+                primaryIdColumnName="primaryId",
+                dbSettings=self.settings["database settings"]["static catalogues"]
+            )
 
         self.log.debug('completed the ``_update_ned_query_history`` method')
         return None
@@ -298,6 +340,8 @@ class ned(_base_importer):
             self):
         """*Query NED using the names of the NED sources in our local database to retrieve extra metadata*
 
+        The sources needing metadata (never fetched, or fetched more than ``ned metadata refresh days`` ago) are walked in batches of ``ned metadata batch size`` in ``primaryId`` order. Every source is timestamped as soon as its batch is written, so an interrupted download picks up where it left off.
+
         *Usage:*
 
             ```python
@@ -308,6 +352,11 @@ class ned(_base_importer):
 
         self.dbTableName = "tcs_cat_ned_stream"
 
+        if not self._add_metadata_columns():
+            self.log.debug(
+                'completed the ``_download_ned_source_metadata`` method')
+            return None
+
         total, batches = self._count_ned_sources_in_database_requiring_metadata()
 
         print(
@@ -316,18 +365,15 @@ class ned(_base_importer):
         self.log.info(
             "%(total)s galaxies require metadata. Need to send %(batches)s batch requests to NED." % locals())
 
-        totalBatches = self.batches
         thisCount = 0
 
         # FOR EACH BATCH, GET THE GALAXY IDs, QUERY NED AND UPDATE THE DATABASE
-        # THEN RECOUNT TO DETERMINE IF THERE ARE REMAINING SOURCES TO GRAB
-        # METADATA FOR
-        while self.total:
+        # - KEYSET PAGINATION ON primaryId SO EACH SOURCE IS VISITED ONCE
+        self.lastPrimaryId = 0
+        while self._get_ned_sources_needing_metadata():
             thisCount += 1
-            self._get_ned_sources_needing_metadata()
             self._do_ned_namesearch_queries_and_add_resulting_metadata_to_database(
                 thisCount)
-            self._count_ned_sources_in_database_requiring_metadata()
 
         self.log.debug(
             'completed the ``_download_ned_source_metadata`` method')
@@ -335,7 +381,7 @@ class ned(_base_importer):
 
     def _get_ned_sources_needing_metadata(
             self):
-        """*Get the names of 50000 or less NED sources that still require metabase in the database*
+        """*Get the names of the next batch (``ned metadata batch size``) of NED sources, after ``self.lastPrimaryId``, that still require metadata in the database*
 
         **Return**
 
@@ -354,13 +400,13 @@ class ned(_base_importer):
         from fundamentals.mysql import readquery
 
         tableName = self.dbTableName
+        lastPrimaryId = self.lastPrimaryId
+        batchSize = self._ned_metadata_batch_size()
+        needsMetadata = self._ned_metadata_needed_predicate()
 
         # SELECT THE DATA FROM NED TABLE
         sqlQuery = u"""
-            select ned_name from %(tableName)s where raDeg is null and (download_error != 1 or download_error is null) limit 50000;
-        """ % locals()
-        sqlQuery = u"""
-            select ned_name from %(tableName)s where  (download_error != 1 or download_error is null) limit 50000;
+            select primaryId, ned_name from %(tableName)s where primaryId > %(lastPrimaryId)s and %(needsMetadata)s order by primaryId limit %(batchSize)s;
         """ % locals()
         rows = readquery(
             log=self.log,
@@ -370,7 +416,9 @@ class ned(_base_importer):
         )
 
         self.theseIds = []
-        self.theseIds[:] = [r["ned_name"].replace('"', '\\"') for r in rows]
+        self.theseIds[:] = [r["ned_name"] for r in rows]
+        if len(rows):
+            self.lastPrimaryId = rows[-1]["primaryId"]
 
         self.log.debug(
             'completed the ``_get_ned_sources_needing_metadata`` method')
@@ -397,7 +445,6 @@ class ned(_base_importer):
             'starting the ``_do_ned_namesearch_queries_and_add_resulting_metadata_to_database`` method')
 
         from fundamentals.mysql import writequery
-        from neddy import namesearch
         from astrocalc.coords import unit_conversion
         import sys
 
@@ -410,13 +457,50 @@ class ned(_base_importer):
         # QUERY NED WITH BATCH
         totalCount = len(self.theseIds)
         print("requesting metadata from NED for %(totalCount)s galaxies (batch %(batchCount)s)" % locals())
-        # QUERY THE ONLINE NED DATABASE USING NEDDY'S NAMESEARCH METHOD
-        search = namesearch(
+        # QUERY THE ONLINE NED DATABASE WITH BATCH NAME SEARCHES (ONE REQUEST
+        # PER `namesearch chunk size` NAMES) SENT CONCURRENTLY
+        from sherlock.commonutils import concurrent_fetcher, response_cache
+
+        # SERVE WHAT WE CAN FROM THE LOCAL NED RESPONSE CACHE (ONE ENTRY PER NAME)
+        cache = response_cache(
+            log=self.log,
+            settings=self.settings
+        )
+        results = []
+        missingNames = []
+        for name in self.theseIds:
+            hit, response = cache.get("ned namesearch", {"name": name})
+            if hit:
+                results += response
+            else:
+                missingNames.append(name)
+        if len(missingNames) and cache.replayOnly:
+            count = len(missingNames)
+            message = "%(count)s NED names are not in the response cache and `replay only` is set" % locals()
+            self.log.error(message)
+            raise IOError(message)
+
+        chunkSize = self._ned_fetch_chunk_size("namesearch chunk size", 180)
+        chunks = [missingNames[i:i + chunkSize]
+                  for i in range(0, len(missingNames), chunkSize)]
+        fetcher = concurrent_fetcher(
             log=self.log,
-            names=self.theseIds,
-            quiet=True
+            settings=self.settings
         )
-        results = search.get()
+        baseUrl = self._ned_base_url()
+        fetched = fetcher.get(
+            urls=[_ned_namesearch_url(baseUrl, c) for c in chunks],
+            parse=_parse_ned_namesearch
+        )
+        for chunkNames, chunkResults in zip(chunks, fetched):
+            results += chunkResults
+            # NAMES WITH NO RESULTS ARE CACHED TOO
+            byName = {n: [] for n in chunkNames}
+            for r in chunkResults:
+                if r.get("input_name") in byName:
+                    byName[r["input_name"]].append(r)
+            for name, response in byName.items():
+                cache.set("ned namesearch", {"name": name}, response)
         print("results returned from ned -- starting to add to database" % locals())
 
         # CLEAN THE RETURNED DATA AND UPDATE DATABASE
@@ -424,8 +508,11 @@ class ned(_base_importer):
         count = 0
         sqlQuery = ""
         dictList = []
+        # THE METADATA STATUS OF EACH NAME IN THE BATCH
+        statuses = {n: "missing" for n in self.theseIds}
         for thisDict in results:
             thisDict["tableName"] = tableName
+            inputName = thisDict.get("input_name")
             count += 1
             for k, v in list(thisDict.items()):
                 if not v or len(v) == 0:
@@ -447,6 +534,8 @@ class ned(_base_importer):
                     name = thisDict["input_name"]
                     self.log.warning(
                         "Could not convert the RA & DEC for the %(name)s NED source" % locals())
+                    if inputName in statuses:
+                        statuses[inputName] = "error"
                     continue
                 thisDict["eb_v"] = thisDict["eb-v"]
                 thisDict["ned_name"] = thisDict["input_name"]
@@ -456,6 +545,12 @@ class ned(_base_importer):
                         row[k] = None
                     else:
                         row[k] = thisDict[k]
+                # NORMALISE THE MAGNITUDE HERE RATHER THAN CASTING THE WHOLE
+                # TABLE AFTER EACH INGEST
+                row["magnitude"] = _magnitude_from_filter(
+                    row["magnitude_filter"])
+                if inputName in statuses:
+                    statuses[inputName] = "ok"
 
                 if '"' in thisDict["ned_name"]:
                     print(thisDict)
@@ -469,15 +564,15 @@ class ned(_base_importer):
             createStatement="""SET SESSION sql_mode="";"""
         )
 
-        theseIds = ("\", \"").join(self.theseIds)
-
+        # TIMESTAMP EVERY SOURCE IN THE BATCH WITH ITS METADATA STATUS
         sqlQuery = u"""
-            update %(tableName)s set download_error = 1 where ned_name in ("%(theseIds)s");
+            update %(tableName)s set metadata_fetched = now(), metadata_status = %%s where ned_name = %%s
         """ % locals()
         writequery(
             log=self.log,
             sqlQuery=sqlQuery,
             dbConn=self.cataloguesDbConn,
+            manyValueList=[(v, k) for k, v in statuses.items()]
         )
 
         print("%(count)s/%(totalCount)s galaxy metadata batch entries added to database" % locals())
@@ -519,12 +614,10 @@ class ned(_base_importer):
         from fundamentals.mysql import readquery
 
         tableName = self.dbTableName
+        needsMetadata = self._ned_metadata_needed_predicate()
 
-        # sqlQuery = u"""
-        #     select count(*) as count from %(tableName)s where raDeg is null and (download_error != 1 or download_error is null)
-        # """ % locals()
         sqlQuery = u"""
-            select count(*) as count from %(tableName)s where (download_error != 1 or download_error is null)
+            select count(*) as count from %(tableName)s where %(needsMetadata)s
         """ % locals()
         rows = readquery(
             log=self.log,
@@ -533,7 +626,7 @@ class ned(_base_importer):
             quiet=False
         )
         self.total = rows[0]["count"]
-        self.batches = (self.total // 50000) + 1
+        self.batches = (self.total // self._ned_metadata_batch_size()) + 1
 
         if self.total == 0:
             self.batches = 0
@@ -542,5 +635,304 @@ class ned(_base_importer):
             'completed the ``_count_ned_sources_in_database_requiring_metadata`` method')
         return self.total, self.batches
 
+    def _ned_fetch_chunk_size(
+            self,
+            key,
+            default):
+        """*the number of names sent to NED per request, from the ``ned fetching`` settings*
+
+        **Key Arguments**
+
+        - ``key`` -- the chunk-size setting (``namesearch chunk size``)
+        - ``default`` -- value if not set
+        """
+        chunkSize = default
+        if "ned fetching" in self.settings and self.settings["ned fetching"] and self.settings["ned fetching"].get(key):
+            chunkSize = int(self.settings["ned fetching"][key])
+        return chunkSize
+
+    def _ned_base_url(
+            self):
+        """*the base URL of the NED cgi-bin services, from the ``ned fetching`` settings (tests point it at a local stand-in server)*
+        """
+        baseUrl = "https://ned.ipac.caltech.edu/cgi-bin/"
+        if "ned fetching" in self.settings and self.settings["ned fetching"] and self.settings["ned fetching"].get("base url"):
+            baseUrl = self.settings["ned fetching"]["base url"]
+        if not baseUrl.endswith("/"):
+            baseUrl += "/"
+        return baseUrl
+
+    def _add_metadata_columns(
+            self):
+        """*add the ``magnitude``, ``metadata_fetched`` and ``metadata_status`` columns to a NED stream table created by an older version of sherlock*
+
+        When the columns are first added the sources already flagged with ``download_error`` are timestamped with their last modification date, and their magnitudes are backfilled from ``magnitude_filter`` with the same rule as ``_magnitude_from_filter`` (a one-off; new sources get their magnitude at insert). Values without a leading number stay NULL rather than becoming 0.
+
+        **Return**
+
+        - ``exists`` -- False if the NED stream table does not exist yet
+        """
+        self.log.debug('starting the ``_add_metadata_columns`` method')
+
+        from fundamentals.mysql import readquery, writequery
+
+        tableName = self.dbTableName
+
+        sqlQuery = u"""
+            SELECT COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME='%(tableName)s' ORDER BY ORDINAL_POSITION;
+        """ % locals()
+        rows = readquery(
+            log=self.log,
+            sqlQuery=sqlQuery,
+            dbConn=self.cataloguesDbConn,
+        )
+        existingColumns = [r["COLUMN_NAME"] for r in rows]
+        if not len(existingColumns):
+            self.log.debug('completed the ``_add_metadata_columns`` method')
+            return False
+
+        alterations = []
+        for columnName, columnType in [
+                ("magnitude", "double DEFAULT NULL"),
+                ("metadata_fetched", "datetime DEFAULT NULL"),
+                ("metadata_status", "varchar(20) DEFAULT NULL")]:
+            if columnName not in existingColumns:
+                alterations.append(
+                    "ADD `%(columnName)s` %(columnType)s" % locals())
+        if "metadata_fetched" in existingColumns:
+            self.log.debug('completed the ``_add_metadata_columns`` method')
+            return True
+
+        alterations.append(
+            "ADD KEY `idx_metadata_fetched` (`metadata_fetched`)")
+        alterations = ", ".join(alterations)
+        self.log.info(
+            'adding the metadata tracking columns to the `%(tableName)s` table' % locals())
+        for sqlQuery in [
+                """ALTER TABLE `%(tableName)s` %(alterations)s""" % locals(),
+                """update `%(tableName)s` set metadata_fetched = dateLastModified, metadata_status = if(raDeg is null, "missing", "ok") where download_error = 1""" % locals(),
+                """SET session sql_mode = "";""",
+                _magnitude_backfill_statement(tableName)]:
+            writequery(
+                log=self.log,
+                sqlQuery=sqlQuery,
+                dbConn=self.cataloguesDbConn,
+            )
+
+        self.log.debug('completed the ``_add_metadata_columns`` method')
+        return True
+
+    def _ned_metadata_needed_predicate(
+            self):
+        """*the SQL condition selecting NED sources whose metadata has never been fetched, or was fetched more than ``ned metadata refresh days`` ago*
+        """
+        predicate = "metadata_fetched is null"
+        if "ned metadata refresh days" in self.settings and self.settings["ned metadata refresh days"]:
+            refreshDays = int(self.settings["ned metadata refresh days"])
+            predicate = "(metadata_fetched is null or metadata_fetched < now() - interval %(refreshDays)s day)" % locals()
+        return predicate
+
+    def _ned_metadata_batch_size(
+            self):
+        """*the number of NED sources requested from the database per metadata batch*
+        """
+        batchSize = 10000
+        if "ned metadata batch size" in self.settings and self.settings["ned metadata batch size"]:
+            batchSize = int(self.settings["ned metadata batch size"])
+        return batchSize
+
     # use the tab-trigger below for new method
     # xt-class-method
+
+
+def _split_coordinate(
+        coord):
+    """*a coordinate given as a "ra dec" string or (ra, dec) tuple/list as a [ra, dec] list*
+    """
+    if isinstance(coord, ("".__class__, u"".__class__)):
+        return coord.split(" ")[:2]
+    return [coord[0], coord[1]]
+
+
+def _ned_conesearch_url(
+        baseUrl,
+        raDeg,
+        decDeg,
+        radiusArcsec):
+    """*the NED near-position search URL for one query centre (the query ``neddy``'s conesearch makes, including unclassified sources)*
+    """
+    import urllib.parse
+
+    params = {
+        "in_csys": "Equatorial",
+        "in_equinox": "J2000.0",
+        "lon": "%0.6fd" % (raDeg,),
+        "lat": "%0.6fd" % (decDeg,),
+        "radius": "%0.6f" % (radiusArcsec / 60.,),
+        "hconst": "73",
+        "omegam": "0.27",
+        "omegav": "0.73",
+        "corr_z": "1",
+        "z_constraint": "Unconstrained",
+        "z_value1": "",
+        "z_value2": "",
+        "z_unit": "z",
+        "ot_include": "ANY",
+        "nmp_op": "ANY",
+        "out_csys": "Equatorial",
+        "out_equinox": "J2000.0",
+        "obj_sort": "Distance to search center",
+        "of": "ascii_bar",
+        "zv_breaker": "30000.0",
+        "list_limit": "500",
+        "img_stamp": "NO",
+        "search_type": "Near Position Search"
+    }
+    return baseUrl + "objsearch?" + urllib.parse.urlencode(params)
+
+
+def _parse_ned_conesearch(
+        body):
+    """*the names of the sources in a NED near-position search result page*
+
+    A page without NED's results banner (e.g. an error page) raises a ``ValueError``, so the request is retried.
+    """
+    import csv
+    import re
+
+    text = body.decode("utf-8", "replace")
+    if "Results from query to  NASA/IPAC Extragalactic Database" not in text:
+        raise ValueError("something went wrong with the NED conesearch")
+
+    names = []
+    matchObject = re.search(r"No\.\|Object Name.*?\n(.*)", text, re.S)
+    if matchObject:
+        csvReader = csv.DictReader(
+            matchObject.group().split("\n"), dialect='excel', delimiter='|', quotechar='"')
+        for row in csvReader:
+            if row.get("Object Name"):
+                names.append(row["Object Name"].strip())
+    return names
+
+
+def _ned_sub_discs(
+        raDeg,
+        decDeg,
+        radiusArcsec):
+    """*the 7 half-radius query centres ``neddy`` covers an oversized (truncated) NED conesearch with*
+    """
+    import math
+
+    shifts = [
+        (0, 0),
+        (0, math.sqrt(3.) / 2.),
+        (3. / 4., math.sqrt(3.) / 4.),
+        (3. / 4., -math.sqrt(3.) / 4.),
+        (0, -math.sqrt(3.) / 2.),
+        (-3. / 4., -math.sqrt(3.) / 4.),
+        (-3. / 4., math.sqrt(3.) / 4.)
+    ]
+    return [[raDeg + s[0] * radiusArcsec / 3600., decDeg + s[1] * radiusArcsec / 3600., radiusArcsec / 2.] for s in shifts]
+
+
+def _ned_namesearch_url(
+        baseUrl,
+        names):
+    """*the NED batch (gmd) name search URL for a list of source names, requesting the metadata columns ``neddy``'s namesearch requests*
+    """
+    import urllib.parse
+
+    urlParameters = [
+        ("delimiter", "bar"),
+        ("NO_LINKS", "1"),
+        ("nondb", ["row_count", "user_name_msg", "user_objname"]),
+        ("crosid", "objname"),
+        ("enotes", "objnote"),
+        ("position", ["ra,dec", "bhextin", "pretype", "z", "zunc", "zflag"]),
+        ("gadata", ["magnit", "sizemaj", "sizemin", "morphol"]),
+        ("attdat_CON", ["M", "S", "H", "R", "z"]),
+        ("distance_CON", ["mm", "dmpc"]),
+        ("attdat", "attned")
+    ]
+    queryUrl = baseUrl + "gmd?uplist=" + \
+        "%0D".join(urllib.parse.quote(n) for n in names)
+    for k, v in urlParameters:
+        if not isinstance(v, list):
+            v = [v]
+        for item in v:
+            queryUrl += "&" + k + "=" + urllib.parse.quote(item)
+    return queryUrl
+
+
+def _parse_ned_namesearch(
+        body):
+    """*the rows of a NED batch name search result page, as dictionaries keyed by ``neddy``'s namesearch column names*
+    """
+    import csv
+    import re
+
+    text = body.decode("utf-8", "replace")
+
+    # STRIP THE HTML AROUND THE TABLE
+    text = re.sub(r'.*<PRE><strong>   (.*?)</strong>(.*?)</PRE></TABLE>.*',
+                  r"\g<1>\g<2>", text, flags=re.I | re.S)
+    text = re.sub(r'\|(\w)\|', r"abs(\g<1>)", text, flags=re.I | re.S)
+    text = text.replace("|b|", "abs(b)")
+
+    headers = ["row_number", "input_note", "input_name", "ned_notes", "ned_name", "ra", "dec", "eb-v", "object_type", "redshift", "redshift_err", "redshift_quality", "magnitude_filter",
+               "major_diameter_arcmin", "minor_diameter_arcmin", "morphology", "hierarchy", "galaxy_morphology", "radio_morphology", "activity_type", "distance_indicator", "distance_mod", "distance"]
+
+    results = []
+    matchObject = re.search(r"\n1\s*?\|\s*?.*", text, re.S)
+    if not matchObject:
+        return results
+
+    headerLine = "".join(h.ljust(30, ' ') + " | " for h in headers)
+    theseLines = [headerLine] + matchObject.group().split("\n")[1:]
+    csvReader = csv.DictReader(
+        theseLines, dialect='excel', delimiter='|', quotechar='"')
+    for row in csvReader:
+        row = dict(row)
+        if not len(row) or None in row:
+            continue
+        thisDict = {}
+        for k, v in row.items():
+            k = k.strip()
+            if not k:
+                continue
+            if isinstance(v, ("".__class__, u"".__class__)):
+                if k in ("ra", "dec"):
+                    v = v.replace("h", ":").replace(
+                        "m", ":").replace("d", ":").replace("s", "")
+                v = v.strip()
+            thisDict[k] = v
+        results.append(thisDict)
+    return results
+
+
+def _magnitude_backfill_statement(
+        tableName):
+    """*the SQL filling the ``magnitude`` column of a NED stream table from ``magnitude_filter`` with the same rule as ``_magnitude_from_filter``*
+
+    The REGEXP guard only lets through values with a leading number (MySQL would silently turn the rest into 0). The value is cut at the first ``e`` so that MySQL's string-to-number conversion, which stops at the first non-numeric character, never reads an exponent. Run it with ``sql_mode = ""`` so the truncated conversions are warnings rather than errors.
+    """
+    leading = "SUBSTRING_INDEX(LOWER(LTRIM(`magnitude_filter`)), 'e', 1) + 0"
+    return """update `%(tableName)s` set magnitude = ROUND(%(leading)s, 2) where magnitude is null and magnitude_filter REGEXP '^[[:space:]]*[-+]?([0-9]+[.]?[0-9]*|[.][0-9]+)' and ABS(ROUND(%(leading)s, 2)) <= 999.99;""" % locals()
+
+
+def _magnitude_from_filter(
+        magnitudeFilter):
+    """*the numeric magnitude leading a NED magnitude/filter string (e.g. ``17.3g`` -> 17.3), rounded to 2 decimal places. None if there isn't one*
+    """
+    import re
+
+    if magnitudeFilter is None:
+        return None
+    match = re.match(r"\s*([-+]?(\d+\.?\d*|\.\d+))", str(magnitudeFilter))
+    if not match:
+        return None
+    magnitude = round(float(match.group(1)), 2)
+    # THE RANGE OF THE DECIMAL(5,2) THE COLUMN WAS ONCE CAST TO
+    if abs(magnitude) > 999.99:
+        return None
+    return magnitude
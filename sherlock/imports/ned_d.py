@@ -50,7 +50,7 @@ class ned_d(_base_importer):
     def ingest(self):
         """Import the ned_d catalogue into the catalogues database
 
-        The method first generates a list of python dictionaries from the ned_d datafile, imports this list of dictionaries into a database table and then generates the HTMIDs for that table. 
+        The method streams the ned_d datafile in chunks, parsing each chunk into python dictionaries and importing them (with their HTMIDs) into a database table before reading the next, then adds the median distance of each galaxy.
 
         **Usage**
 
@@ -66,7 +66,6 @@ class ned_d(_base_importer):
         """
         self.log.debug('starting the ``get`` method')
 
-        dictList = self._create_dictionary_of_ned_d()
         self.primaryIdColumnName = "primaryId"
         self.raColName = "raDeg"
         self.declColName = "decDeg"
@@ -86,6 +85,8 @@ class ned_d(_base_importer):
               `dist_mod` double DEFAULT NULL,
               `dist_mod_err` double DEFAULT NULL,
               `dist_mpc` double DEFAULT NULL,
+              `dist_mpc_median` double DEFAULT NULL,
+              `dist_mod_median` double DEFAULT NULL,
               `galaxy_index_id` mediumint(9) DEFAULT NULL,
               `hubble_const` double DEFAULT NULL,
               `lmc_mod` double DEFAULT NULL,
@@ -178,11 +179,11 @@ class ned_d(_base_importer):
         `%(tableName)s`.`master_row` = 1);
         """ % locals()
 
-        self.add_data_to_database_table(
-            dictList=dictList,
+        self.stream_data_to_database_table(
             createStatement=createStatement
         )
 
+        self._add_median_distances()
         self._clean_up_columns()
         self._get_metadata_for_galaxies()
         # self._update_sdss_coverage()
@@ -190,132 +191,176 @@ class ned_d(_base_importer):
         self.log.debug('completed the ``get`` method')
         return None
 
-    def _create_dictionary_of_ned_d(
-            self):
-        """create a list of dictionaries containing all the rows in the ned_d catalogue
+    def _read_header(
+            self,
+            dataFile):
+        """*skip the metadata lines at the top of the ned_d data file and read the column names from the header row*
 
-        **Return**
+        **Key Arguments**
 
-        - ``dictList`` - a list of dictionaries containing all the rows in the ned_d catalogue
+        - ``dataFile`` -- the data file, opened in binary mode and positioned at its start
+        """
+        self.log.debug('starting the ``_read_header`` method')
 
+        import csv
 
-        .. todo ::
+        keyMap = {
+            "redshift (z)": "redshift",
+            "Hubble const.": "hubble_const",
+            "G": "galaxy_index_id",
+            "err": "dist_mod_err",
+            "D (Mpc)": "dist_mpc",
+            "Date (Yr. - 1980)": "ref_date",
+            "REFCODE": "ref",
+            "Exclusion Code": "dist_in_ned_flag",
+            "Adopted LMC modulus": "lmc_mod",
+            "m-M": "dist_mod",
+            "Notes": "notes",
+            "SN ID": "dist_derived_from_sn",
+            "method": "dist_method",
+            "Galaxy ID": "primary_ned_id",
+            "D": "dist_index_id"
+        }
+
+        self.theseKeys = []
+        for line in iter(dataFile.readline, b""):
+            line = line.decode(self.encoding)
+            # THE METADATA LINES ABOVE THE HEADER ROW AREN'T ALWAYS VALID CSV
+            if "Exclusion Code" in line and "Hubble const." in line:
+                row = next(csv.reader(
+                    [line], dialect='excel', delimiter=',', quotechar='"'))
+                self.theseKeys[:] = [keyMap.get(i, i) for i in row]
+                break
+
+        self.log.debug('completed the ``_read_header`` method')
+        return None
 
-            - update key arguments values and definitions with defaults
-            - update return values and definitions
-            - update usage examples and text
-            - update docstring text
-            - check sublime snippet exists
-            - clip any useful text to docs mindmap
-            - regenerate the docs and check redendering of this docstring
+    def _chunk_ends_on_record(
+            self,
+            data):
+        """*a chunk ends on a record boundary when it is not inside a quoted field (an even number of quotes, as escaped quotes come in pairs)*
         """
-        self.log.debug(
-            'starting the ``_create_dictionary_of_ned_d`` method')
+        return data.count(b'"') % 2 == 0
 
+    def _parse_chunk(
+            self,
+            lines):
+        """*yield a dictionary for each distance in a chunk of the ned_d data file*
+
+        The chunk is parsed in one pass by pandas' C CSV reader and the columns are typed and cleaned column-wise: numeric columns are converted (unparseable or empty values become null), the reference year is offset from 1980, the zero and empty placeholders NED-D uses for missing values become null, and the summary rows with the 999999 distance index are dropped. Of each galaxy's distances in the chunk, the one with the lowest distance index is flagged as its ``master_row`` (a galaxy split across chunks is left with more than one, fixed in ``_clean_up_columns``).
+
+        **Key Arguments**
+
+        - ``lines`` -- list of lines from the data file
+        """
+        import io
         import pandas as pd
-        import csv
-        import sys
 
-        count = 0
-        with open(self.pathToDataFile, 'r') as csvFile:
-            csvReader = csv.reader(
-                csvFile, dialect='excel', delimiter=',', quotechar='"')
-            totalRows = sum(1 for row in csvReader)
-        csvFile.close()
-        totalCount = totalRows
-
-        with open(self.pathToDataFile, 'r') as csvFile:
-            csvReader = csv.reader(
-                csvFile, dialect='excel', delimiter=',', quotechar='"')
-            theseKeys = []
-            dictList = []
-            for row in csvReader:
-                if len(theseKeys) == 0:
-                    totalRows -= 1
-                if "Exclusion Code" in row and "Hubble const." in row:
-                    for i in row:
-                        if i == "redshift (z)":
-                            theseKeys.append("redshift")
-                        elif i == "Hubble const.":
-                            theseKeys.append("hubble_const")
-                        elif i == "G":
-                            theseKeys.append("galaxy_index_id")
-                        elif i == "err":
-                            theseKeys.append("dist_mod_err")
-                        elif i == "D (Mpc)":
-                            theseKeys.append("dist_mpc")
-                        elif i == "Date (Yr. - 1980)":
-                            theseKeys.append("ref_date")
-                        elif i == "REFCODE":
-                            theseKeys.append("ref")
-                        elif i == "Exclusion Code":
-                            theseKeys.append("dist_in_ned_flag")
-                        elif i == "Adopted LMC modulus":
-                            theseKeys.append("lmc_mod")
-                        elif i == "m-M":
-                            theseKeys.append("dist_mod")
-                        elif i == "Notes":
-                            theseKeys.append("notes")
-                        elif i == "SN ID":
-                            theseKeys.append("dist_derived_from_sn")
-                        elif i == "method":
-                            theseKeys.append("dist_method")
-                        elif i == "Galaxy ID":
-                            theseKeys.append("primary_ned_id")
-                        elif i == "D":
-                            theseKeys.append("dist_index_id")
-                        else:
-                            theseKeys.append(i)
-                    continue
-
-                if len(theseKeys):
-                    count += 1
-                    if count > 1:
-                        # Cursor up one line and clear line
-                        sys.stdout.write("\x1b[1A\x1b[2K")
-                    if count > totalCount:
-                        count = totalCount
-                    percent = (float(count) / float(totalCount)) * 100.
-                    print(
-                        "%(count)s / %(totalCount)s (%(percent)1.1f%%) rows added to memory" % locals())
-                    rowDict = {}
-                    for t, r in zip(theseKeys, row):
-                        rowDict[t] = r
-                        if t == "ref_date":
-                            try:
-                                rowDict[t] = int(r) + 1980
-                            except:
-                                rowDict[t] = None
-
-                    if rowDict["dist_index_id"] != "999999":
-                        dictList.append(rowDict)
-
-        csvFile.close()
-
-        df = pd.DataFrame(dictList)
-        df['galaxy_index_id'] = df['galaxy_index_id'].values.astype(int)
-        # GROUP RESULTS
-        dfGroups = df.groupby(['galaxy_index_id'])
-
-        medianDistDf = dfGroups[["dist_mpc",
-                                 "dist_mod"]].median().reset_index()
-        # RENAME COLUMNS
-        medianDistDf.rename(
-            columns={"dist_mpc": "dist_mpc_median"}, inplace=True)
-        medianDistDf.rename(
-            columns={"dist_mod": "dist_mod_median"}, inplace=True)
-
-        # MERGE DATAFRAMES
-        df = df.merge(medianDistDf, on=['galaxy_index_id'], how='outer')
-
-        # SORT BY COLUMN NAME
-        df.sort_values(['galaxy_index_id'],
-                       ascending=[True], inplace=True)
-
-        dictList = df.to_dict('records')
-        self.log.debug(
-            'completed the ``_create_dictionary_of_ned_d`` method')
-        return dictList
+        if not len(lines):
+            return
+
+        intColumns = ["galaxy_index_id", "dist_index_id", "ref_date"]
+        floatColumns = ["dist_mod", "dist_mod_err", "dist_mpc",
+                        "redshift", "hubble_const", "lmc_mod"]
+        numericColumns = [c for c in intColumns +
+                          floatColumns if c in self.theseKeys]
+
+        # EMPTY NUMBERS ARE NULL, BUT EMPTY STRINGS STAY EMPTY STRINGS (AND
+        # "NA", "NULL" ETC. ARE NOT READ AS NULLS)
+        readCsv = dict(
+            header=None,
+            names=self.theseKeys,
+            keep_default_na=False,
+            na_values={c: [""] for c in numericColumns},
+            quotechar='"',
+            skip_blank_lines=True
+        )
+        data = "\n".join(lines)
+        try:
+            df = pd.read_csv(io.StringIO(data), dtype={
+                c: (float if c in numericColumns else str) for c in self.theseKeys}, **readCsv)
+        except ValueError:
+            # A MALFORMED NUMBER IN THE CHUNK - READ AS TEXT AND NULL THE
+            # NUMBERS THAT CAN'T BE PARSED
+            df = pd.read_csv(io.StringIO(data), dtype=str, **readCsv)
+            for c in numericColumns:
+                df[c] = pd.to_numeric(df[c], errors="coerce")
+        if not len(df.index):
+            return
+
+        for c in intColumns:
+            df[c] = df[c].round().astype("Int64")
+        df["ref_date"] = df["ref_date"] + 1980
+
+        # NED-D USES 0 AND "" FOR MISSING VALUES IN THESE COLUMNS
+        for c in ["dist_mod_err", "redshift", "hubble_const", "lmc_mod"]:
+            df.loc[df[c] == 0, c] = None
+        for c in ["dist_in_ned_flag", "notes", "dist_derived_from_sn"]:
+            df.loc[df[c] == "", c] = None
+
+        # DROP THE SUMMARY ROWS AND REPEATED DISTANCES (THE LAST ONE WINS, AS
+        # IT WOULD WHEN UPSERTED)
+        df = df.loc[(df["dist_index_id"] != 999999).fillna(True)]
+        df = df.drop_duplicates(
+            subset=["galaxy_index_id", "dist_index_id"], keep="last")
+
+        df["master_row"] = (df["dist_index_id"] == df.groupby(
+            "galaxy_index_id")["dist_index_id"].transform("min")).fillna(False).astype(int)
+
+        # BUILD THE DICTIONARIES FROM WHOLE COLUMNS (MUCH FASTER THAN
+        # `DataFrame.to_dict`, WHICH CONVERTS CELL BY CELL)
+        keys = list(df.columns)
+        columns = [df[c].astype(object).where(
+            df[c].notnull(), None).tolist() for c in keys]
+        for row in zip(*columns):
+            yield dict(zip(keys, row))
+
+    def _add_median_distances(
+            self):
+        """*add the median distance (Mpc and modulus) of each galaxy to all of its rows*
+
+        Only the galaxy index and distance columns are read back from the table, so this doesn't need the whole catalogue in memory.
+        """
+        self.log.debug('starting the ``_add_median_distances`` method')
+
+        from fundamentals.mysql import readquery, writequery
+        import pandas as pd
+
+        tableName = self.dbTableName
+
+        sqlQuery = u"""
+            select galaxy_index_id, dist_mpc, dist_mod from %(tableName)s
+        """ % locals()
+        rows = readquery(
+            log=self.log,
+            sqlQuery=sqlQuery,
+            dbConn=self.cataloguesDbConn,
+            quiet=False
+        )
+        if not len(rows):
+            return None
+
+        df = pd.DataFrame(list(rows))
+        for c in ["dist_mpc", "dist_mod"]:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+        medianDistDf = df.groupby(['galaxy_index_id'])[
+            ["dist_mpc", "dist_mod"]].median().reset_index()
+        medianDistDf = medianDistDf.astype(object).where(
+            pd.notnull(medianDistDf), None)
+
+        sqlQuery = u"""
+            update %(tableName)s set dist_mpc_median = %%s, dist_mod_median = %%s where galaxy_index_id = %%s
+        """ % locals()
+        writequery(
+            log=self.log,
+            sqlQuery=sqlQuery,
+            dbConn=self.cataloguesDbConn,
+            manyValueList=list(zip(medianDistDf["dist_mpc"], medianDistDf[
+                "dist_mod"], medianDistDf["galaxy_index_id"]))
+        )
+
+        self.log.debug('completed the ``_add_median_distances`` method')
+        return None
 
     def _clean_up_columns(
             self):
@@ -339,25 +384,11 @@ class ned_d(_base_importer):
 
         print("cleaning up %(tableName)s columns" % locals())
 
+        # THE MISSING VALUES ARE NULLED AND THE MASTER ROWS FLAGGED AS THE CHUNKS
+        # ARE PARSED (SEE `_parse_chunk`) - ONLY GALAXIES SPLIT ACROSS CHUNKS
+        # ARE LEFT WITH MORE THAN ONE MASTER ROW
         sqlQuery = u"""
-                set sql_mode="STRICT_TRANS_TABLES,NO_ZERO_IN_DATE,NO_ZERO_DATE,ERROR_FOR_DIVISION_BY_ZERO,NO_AUTO_CREATE_USER,NO_ENGINE_SUBSTITUTION";
-            """ % locals()
-        writequery(
-            log=self.log,
-            sqlQuery=sqlQuery,
-            dbConn=self.cataloguesDbConn,
-        )
-
-        sqlQuery = u"""
-                update %(tableName)s set dist_mod_err = null where dist_mod_err = 0;
-                update %(tableName)s set dist_in_ned_flag = null where dist_in_ned_flag = "";
-                update %(tableName)s set notes = null where notes = "";
-                update %(tableName)s set redshift = null where redshift = 0;
-                update %(tableName)s set dist_derived_from_sn = null where dist_derived_from_sn = "";
-                update %(tableName)s set hubble_const = null where hubble_const = 0;
-                update %(tableName)s set lmc_mod = null where lmc_mod = 0;
-                update %(tableName)s set master_row = 0;
-                update %(tableName)s set master_row = 1 where primaryId in (select * from (select distinct primaryId from %(tableName)s group by galaxy_index_id) as alias);
+                update %(tableName)s a join (select galaxy_index_id, min(dist_index_id) as masterIndex from %(tableName)s where master_row = 1 group by galaxy_index_id having count(*) > 1) b on a.galaxy_index_id = b.galaxy_index_id set a.master_row = 0 where a.master_row = 1 and a.dist_index_id != b.masterIndex;
             """ % locals()
         writequery(
             log=self.log,
@@ -0,0 +1,63 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from sherlock.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+
+class test_base_importer(unittest.TestCase):
+
+    def test_import_chunk_progress_saves_the_finished_prefix(self):
+
+        from sherlock.imports._base_importer import _import_chunk_progress
+        ranges = [(100, 200), (200, 300), (300, 400), (400, 500)]
+        progress = _import_chunk_progress(
+            ranges=ranges,
+            rowCount=7
+        )
+
+        # A LATER CHUNK FINISHING FIRST SAVES NOTHING
+        self.assertIsNone(progress.finish(index=2, rowCount=30))
+        self.assertEqual(progress.importedRows, 37)
+
+        # THE FIRST CHUNK SAVES ITS OWN END
+        self.assertEqual(progress.finish(index=0, rowCount=10), (200, 17))
+
+        # FILLING THE GAP SAVES THROUGH THE CHUNK THAT FINISHED EARLY
+        self.assertEqual(progress.finish(index=1, rowCount=20), (400, 67))
+        self.assertEqual(progress.finish(index=3, rowCount=40), (500, 107))
+        self.assertEqual(progress.rowCount, 107)
+        self.assertEqual(progress.importedRows, 107)
+
+    def test_import_chunk_progress_stops_at_a_failed_chunk(self):
+
+        from sherlock.imports._base_importer import _import_chunk_progress
+        progress = _import_chunk_progress(
+            ranges=[(0, 10), (10, 20), (20, 30)]
+        )
+        self.assertEqual(progress.finish(index=0, rowCount=5), (10, 5))
+        progress.fail(index=1)
+        # THE SAVED PROGRESS NEVER PASSES THE FAILED CHUNK, SO A RE-RUN
+        # RESUMES FROM IT
+        self.assertIsNone(progress.finish(index=2, rowCount=5))
+        self.assertEqual(progress.rowCount, 5)
+        self.assertEqual(progress.importedRows, 10)
+        self.assertEqual(progress.failed, set([1]))
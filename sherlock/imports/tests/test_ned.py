@@ -60,6 +60,50 @@ except:
     pass
 
 
+# CANNED NED RESULT PAGES
+_conesearchPage = u"""Results from query to  NASA/IPAC Extragalactic Database (NED),
+which is operated by the Jet Propulsion Laboratory, California Institute of
+Technology, under contract with the National Aeronautics and Space Administration.
+
+SEARCH RESULTS
+No.|Object Name|RA(deg)|DEC(deg)|Type|Velocity|Redshift|Redshift Flag|Magnitude and Filter|Separation|References|Notes|Photometry Points|Positions|Redshift Points|Diameter Points|Associations
+1|WISEA J013255.83-431357.5|23.23264|-43.23266|IrS|||||0.041|0|0|4|1|0|0|0
+2|2MASX J01325689-4314097|23.23706|-43.23603|G|||| 15.9J |0.214|1|0|12|2|0|2|0
+"""
+
+_namesearchPage = u"""<HTML><BODY><TABLE><PRE><strong>   row|input note|input name|notes|NED name|RA|Dec|E(B-V)|type|z|z unc|z flag|mag|major|minor|morph|hierarchy|gal morph|radio morph|activity|dist ind|dist mod|dist</strong>
+1 | | NGC 0253 | | NGC 0253 | 00h47m33.134s | -25d17m19.68s | 0.016 | G  | 0.000864 | 0.000007 |  | 8.04 | 27.5 | 6.8 | SAB(s)c |  |  |  | HII |  | 27.7 | 3.5
+</PRE></TABLE></BODY></HTML>
+"""
+
+# A LOCAL STAND-IN FOR THE NED SERVERS
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+
+class _standInServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _standInHandler(BaseHTTPRequestHandler):
+    lock = threading.Lock()
+    paths = []
+
+    def do_GET(self):
+        with _standInHandler.lock:
+            _standInHandler.paths.append(self.path)
+        self.send_response(200)
+        self.end_headers()
+        if self.path.startswith("/objsearch"):
+            self.wfile.write(_conesearchPage.encode())
+        else:
+            self.wfile.write(_namesearchPage.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
 class test_ned(unittest.TestCase):
 
     def test_ned_function(self):
@@ -73,6 +117,177 @@ class test_ned(unittest.TestCase):
         )
         catalogue.ingest()
 
+    def test_magnitude_from_filter(self):
+
+        from sherlock.imports.ned import _magnitude_from_filter
+        self.assertEqual(_magnitude_from_filter("17.3g"), 17.3)
+        self.assertEqual(_magnitude_from_filter(" 15.678 B"), 15.68)
+        self.assertEqual(_magnitude_from_filter("-2.1"), -2.1)
+        self.assertEqual(_magnitude_from_filter(".5r"), 0.5)
+        self.assertEqual(_magnitude_from_filter("19"), 19.0)
+        self.assertEqual(_magnitude_from_filter(18.25), 18.25)
+        # AN EXPONENT IS NOT PART OF THE MAGNITUDE
+        self.assertEqual(_magnitude_from_filter("1e5"), 1.0)
+        # NO LEADING NUMBER - NULL, NOT 0
+        for value in [None, "", "g", "B=17.3", "..."]:
+            self.assertIsNone(_magnitude_from_filter(value))
+        # OUTSIDE THE DECIMAL(5,2) RANGE
+        self.assertIsNone(_magnitude_from_filter("12345.6"))
+
+    def test_magnitude_backfill_matches_the_parser(self):
+
+        from sherlock.imports.ned import _magnitude_backfill_statement, _magnitude_from_filter
+        values = ["17.3g", " 15.678 B", "-2.1", ".5r", "19", "1e5",
+                  "", "g", "B=17.3", "...", "12345.6"]
+        sqlQuery = """drop table IF EXISTS tcs_cat_ned_magnitude_test; create table tcs_cat_ned_magnitude_test (primaryId int primary key, magnitude_filter varchar(30) DEFAULT NULL, magnitude double DEFAULT NULL);"""
+        writequery(
+            log=log,
+            sqlQuery=sqlQuery,
+            dbConn=cataloguesDbConn
+        )
+        writequery(
+            log=log,
+            sqlQuery="""insert into tcs_cat_ned_magnitude_test (primaryId, magnitude_filter) values (%s, %s)""",
+            dbConn=cataloguesDbConn,
+            manyValueList=[(i, v) for i, v in enumerate(values)]
+        )
+        writequery(
+            log=log,
+            sqlQuery="""SET session sql_mode = "";""",
+            dbConn=cataloguesDbConn
+        )
+        writequery(
+            log=log,
+            sqlQuery=_magnitude_backfill_statement(
+                "tcs_cat_ned_magnitude_test"),
+            dbConn=cataloguesDbConn
+        )
+        from fundamentals.mysql import readquery
+        rows = readquery(
+            log=log,
+            sqlQuery="""select primaryId, magnitude from tcs_cat_ned_magnitude_test order by primaryId""",
+            dbConn=cataloguesDbConn
+        )
+        for r in rows:
+            self.assertEqual(
+                r["magnitude"], _magnitude_from_filter(values[r["primaryId"]]))
+
+    def test_get_ned_sources_needing_metadata(self):
+
+        from sherlock.imports import ned
+        sqlQuery = """drop table IF EXISTS tcs_cat_ned_metadata_test; create table tcs_cat_ned_metadata_test (primaryId int primary key, ned_name varchar(50), metadata_fetched datetime DEFAULT NULL);"""
+        writequery(
+            log=log,
+            sqlQuery=sqlQuery,
+            dbConn=cataloguesDbConn
+        )
+        writequery(
+            log=log,
+            sqlQuery="""insert into tcs_cat_ned_metadata_test (primaryId, ned_name, metadata_fetched) values (%s, %s, %s)""",
+            dbConn=cataloguesDbConn,
+            manyValueList=[(1, "a", None), (2, "b", "2020-01-01"), (3, "c", None), (4, "d", None), (5, "e", None)]
+        )
+
+        theseSettings = dict(settings)
+        theseSettings["ned metadata batch size"] = 2
+        catalogue = ned(
+            log=log,
+            settings=theseSettings
+        )
+        catalogue.cataloguesDbConn = cataloguesDbConn
+        catalogue.dbTableName = "tcs_cat_ned_metadata_test"
+        catalogue.lastPrimaryId = 0
+
+        # KEYSET WALK - SOURCES WITH METADATA ARE SKIPPED, EACH PAGE STARTS
+        # AFTER THE LAST
+        pages = []
+        while catalogue._get_ned_sources_needing_metadata():
+            pages.append(list(catalogue.theseIds))
+        self.assertEqual(pages, [["a", "c"], ["d", "e"]])
+
+        # SOURCES FETCHED LONGER AGO THAN THE REFRESH WINDOW ARE DUE AGAIN
+        catalogue.settings["ned metadata refresh days"] = 30
+        catalogue.lastPrimaryId = 0
+        catalogue._get_ned_sources_needing_metadata()
+        self.assertEqual(catalogue.theseIds, ["a", "b"])
+
+    def test_ned_conesearch_pages(self):
+
+        from sherlock.imports.ned import _ned_conesearch_url, _parse_ned_conesearch, _ned_sub_discs
+        url = _ned_conesearch_url(
+            "https://ned.ipac.caltech.edu/cgi-bin/", 23.2323, -43.23434, 30)
+        self.assertTrue(url.startswith(
+            "https://ned.ipac.caltech.edu/cgi-bin/objsearch?"))
+        self.assertIn("lon=23.232300d", url)
+        self.assertIn("radius=0.500000", url)
+        self.assertEqual(_parse_ned_conesearch(_conesearchPage.encode()), [
+                         "WISEA J013255.83-431357.5", "2MASX J01325689-4314097"])
+        # AN ERROR PAGE IS RAISED (AND SO RETRIED BY THE FETCHER)
+        try:
+            _parse_ned_conesearch(b"<html>Service unavailable</html>")
+            assert False
+        except ValueError as e:
+            print(str(e))
+
+        discs = _ned_sub_discs(10., 20., 3600.)
+        self.assertEqual(len(discs), 7)
+        self.assertEqual(discs[0], [10., 20., 1800.])
+        self.assertAlmostEqual(discs[2][0], 10.75)
+
+    def test_ned_namesearch_pages(self):
+
+        from sherlock.imports.ned import _ned_namesearch_url, _parse_ned_namesearch
+        url = _ned_namesearch_url(
+            "https://ned.ipac.caltech.edu/cgi-bin/", ["NGC 0253", "M 31"])
+        self.assertTrue(url.startswith(
+            "https://ned.ipac.caltech.edu/cgi-bin/gmd?uplist=NGC%200253%0DM%2031&delimiter=bar"))
+        rows = _parse_ned_namesearch(_namesearchPage.encode())
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["input_name"], "NGC 0253")
+        self.assertEqual(rows[0]["ra"], "00:47:33.134")
+        self.assertEqual(rows[0]["dec"], "-25:17:19.68")
+        self.assertEqual(rows[0]["object_type"], "G")
+        self.assertEqual(rows[0]["redshift"], "0.000864")
+        self.assertEqual(rows[0]["distance"], "3.5")
+        self.assertEqual(_parse_ned_namesearch(b"<html></html>"), [])
+
+    def test_ned_requests_go_through_the_fetcher(self):
+
+        from sherlock.imports import ned
+        server = _standInServer(("127.0.0.1", 0), _standInHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        theseSettings = dict(settings)
+        theseSettings["ned fetching"] = {
+            "base url": "http://127.0.0.1:%s/" % (server.server_address[1],),
+            "max concurrent requests": 2, "requests per second": 1000, "burst": 1000}
+        theseSettings["ned cache"] = {"enabled": False}
+        catalogue = ned(
+            log=log,
+            settings=theseSettings,
+            coordinateList=["23.2323 -43.23434", (23.2330, -43.2340), "150.0 2.0"],
+            radiusArcsec=30
+        )
+        _standInHandler.paths = []
+        dictList = catalogue._create_dictionary_of_ned()
+        # ONE HTTP REQUEST PER QUERY CENTRE, DUPLICATE SOURCES LISTED ONCE
+        self.assertEqual(len(_standInHandler.paths), 3)
+        self.assertEqual(dictList, [{"ned_name": "WISEA J013255.83-431357.5"}, {
+                         "ned_name": "2MASX J01325689-4314097"}])
+
+        # THE CACHE IS KEYED PER QUERY CENTRE - A RE-RUN ONLY REQUESTS THE
+        # CENTRES IT HAS NOT SEEN
+        cacheDir = pathToOutputDir + "/ned_cache"
+        shutil.rmtree(cacheDir, ignore_errors=True)
+        catalogue.settings["ned cache"] = {
+            "enabled": True, "directory": cacheDir}
+        catalogue._create_dictionary_of_ned()
+        catalogue.coordinateList = ["150.0 2.0", "151.0 2.0"]
+        _standInHandler.paths = []
+        catalogue._create_dictionary_of_ned()
+        self.assertEqual(len(_standInHandler.paths), 1)
+        self.assertIn("lon=151.000000d", _standInHandler.paths[0])
+        server.shutdown()
+
     def test_ned_function_exception(self):
 
         from sherlock.imports import ned
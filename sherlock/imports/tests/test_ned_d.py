@@ -77,6 +77,25 @@ class test_ned_d(unittest.TestCase):
         )
         catalogue.ingest()
 
+    @pytest.mark.full
+    def test_ned_d_parse_chunk_function(self):
+
+        from sherlock.imports import ned_d
+        catalogue = ned_d(
+            log=log,
+            settings=settings,
+            pathToDataFile=pathToInputDir + "/ned_d_test.csv",
+            version="1.0",
+            catalogueName="ned_d"
+        )
+        rows = [r for s, e, lines in catalogue._read_data_chunks()
+                for r in catalogue._parse_chunk(lines)]
+        self.assertEqual(len(rows), 12)
+        self.assertEqual(rows[0]["ref_date"], 2014)
+        self.assertEqual(rows[0]["lmc_mod"], None)
+        self.assertEqual(sum(r["master_row"] for r in rows), len(
+            set(r["galaxy_index_id"] for r in rows)))
+
     def test_ned_d_function_exception(self):
 
         from sherlock.imports import ned_d
@@ -73,6 +73,52 @@ class test_veron(unittest.TestCase):
         )
         catalogue.ingest()
 
+    def test_veron_streamed_in_small_chunks_function(self):
+
+        import copy
+        chunkSettings = copy.deepcopy(settings)
+        # A FEW ROWS PER CHUNK
+        chunkSettings["catalogue import chunk megabytes"] = 0.0005
+        chunkSettings["catalogue import workers"] = 1
+
+        from sherlock.imports import veron
+        catalogue = veron(
+            log=log,
+            settings=chunkSettings,
+            pathToDataFile=pathToInputDir + "/veron-test-data.txt",
+            version="1.0",
+            catalogueName="veron"
+        )
+        rows = [r for s, e, lines in catalogue._read_data_chunks()
+                for r in catalogue._parse_chunk(lines)]
+        self.assertEqual(len(rows), 50)
+        self.assertEqual(len(list(catalogue._read_data_chunks())) > 1, True)
+        catalogue.stream_data_to_database_table(
+            createStatement=False)
+
+    def test_veron_imported_in_parallel_function(self):
+
+        import copy
+        chunkSettings = copy.deepcopy(settings)
+        chunkSettings["catalogue import chunk megabytes"] = 0.0005
+        chunkSettings["catalogue import workers"] = 3
+        chunkSettings["catalogue import insert connections"] = 2
+
+        from sherlock.imports import veron
+        catalogue = veron(
+            log=log,
+            settings=chunkSettings,
+            pathToDataFile=pathToInputDir + "/veron-test-data.txt",
+            version="1.0",
+            catalogueName="veron"
+        )
+        ranges = catalogue._data_chunk_ranges()
+        self.assertEqual(ranges, [(s, e)
+                                  for s, e, lines in catalogue._read_data_chunks()])
+        rows = catalogue.stream_data_to_database_table(
+            createStatement=False)
+        self.assertEqual(rows, 50)
+
     def test_veron_function_exception(self):
 
         from sherlock.imports import veron
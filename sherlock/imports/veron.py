@@ -71,8 +71,6 @@ class veron(_base_importer):
         """
         self.log.debug('starting the ``get`` method')
 
-        dictList = self._create_dictionary_of_veron()
-
         tableName = self.dbTableName
         createStatement = """
     CREATE TABLE `%(tableName)s` (
@@ -104,115 +102,74 @@ class veron(_base_importer):
     ) ENGINE=MyISAM AUTO_INCREMENT=168945 DEFAULT CHARSET=utf8 COLLATE=utf8_unicode_ci;
 """ % locals()
 
-        self.add_data_to_database_table(
-            dictList=dictList,
+        self.stream_data_to_database_table(
             createStatement=createStatement
         )
 
         self.log.debug('completed the ``get`` method')
         return None
 
-    def _create_dictionary_of_veron(
-            self):
-        """create a list of dictionaries containing all the rows in the veron catalogue
-
-        **Return**
+    def _read_header(
+            self,
+            dataFile):
+        """*skip the VizieR comment block at the top of the veron data file and read the column names from the header*
 
-        - ``dictList`` - a list of dictionaries containing all the rows in the veron catalogue
+        **Key Arguments**
 
+        - ``dataFile`` -- the data file, opened in binary mode and positioned at its start
+        """
+        self.log.debug('starting the ``_read_header`` method')
+
+        keyMap = {
+            "_RAJ2000": "raDeg",
+            "_DEJ2000": "decDeg",
+            "Cl": "class",
+            "nR": "not_radio",
+            "Name": "name",
+            "l_z": "redshift_flag",
+            "z": "redshift",
+            "Sp": "spectral_classification",
+            "n_Vmag": "magnitude_filter",
+            "Vmag": "magnitude",
+            "B-V": "B_V",
+            "U-B": "U_B",
+            "Mabs": "abs_magnitude"
+        }
+
+        self.theseKeys = []
+        for line in iter(dataFile.readline, b""):
+            line = line.decode(self.encoding).rstrip("\r\n")
+            if len(line) == 0 or line[0] in ["#", " "]:
+                continue
+            self.theseKeys[:] = [keyMap.get(k, k) for k in line.split("|")]
+            break
 
-        .. todo ::
+        # SKIP THE UNITS AND DASHED LINES BELOW THE COLUMN NAMES
+        dataFile.readline()
+        dataFile.readline()
 
-            - update key arguments values and definitions with defaults
-            - update return values and definitions
-            - update usage examples and text
-            - update docstring text
-            - check sublime snippet exists
-            - clip any useful text to docs mindmap
-            - regenerate the docs and check redendering of this docstring
-        """
-        self.log.debug(
-            'starting the ``_create_dictionary_of_veron`` method')
+        self.log.debug('completed the ``_read_header`` method')
+        return None
 
-        import sys
-        import string
+    def _parse_chunk(
+            self,
+            lines):
+        """*yield a dictionary for each row of the veron catalogue in a chunk of the data file*
 
-        dictList = []
-        try:
-            lines = str.split(self.catData, '\n')
-        except:
-            lines = string.split(self.catData, '\n')
+        **Key Arguments**
 
-        totalCount = len(lines)
-        count = 0
-        switch = 0
+        - ``lines`` -- list of lines from the data file
+        """
         for line in lines:
-            if (len(line) == 0 or line[0] in ["#", " "]) and switch == 0:
+            if not len(line.strip()) or line[0] == "#":
                 continue
-            else:
-                switch = 1
-            count += 1
-            if count > 1:
-                # Cursor up one line and clear line
-                sys.stdout.write("\x1b[1A\x1b[2K")
-            print("%(count)s / %(totalCount)s veron data added to memory" % locals())
-
-            if count == 1:
-                theseKeys = []
-                try:
-                    someKeys = str.split(line, '|')
-                except:
-                    someKeys = string.split(line, '|')
-
-                for key in someKeys:
-                    if key == "_RAJ2000":
-                        key = "raDeg"
-                    if key == "_DEJ2000":
-                        key = "decDeg"
-                    if key == "Cl":
-                        key = "class"
-                    if key == "nR":
-                        key = "not_radio"
-                    if key == "Name":
-                        key = "name"
-                    if key == "l_z":
-                        key = "redshift_flag"
-                    if key == "z":
-                        key = "redshift"
-                    if key == "Sp":
-                        key = "spectral_classification"
-                    if key == "n_Vmag":
-                        key = "magnitude_filter"
-                    if key == "Vmag":
-                        key = "magnitude"
-                    if key == "B-V":
-                        key = "B_V"
-                    if key == "U-B":
-                        key = "U_B"
-                    if key == "Mabs":
-                        key = "abs_magnitude"
-                    theseKeys.append(key)
-                continue
-
-            if count in [2, 3]:
-                continue
-
             thisDict = {}
-            try:
-                theseValues = str.split(line, '|')
-            except:
-                theseValues = string.split(line, '|')
-
-            for k, v in zip(theseKeys, theseValues):
+            for k, v in zip(self.theseKeys, line.split('|')):
                 v = v.strip()
                 if len(v) == 0 or v == "-":
                     v = None
                 thisDict[k] = v
-            dictList.append(thisDict)
-
-        self.log.debug(
-            'completed the ``_create_dictionary_of_veron`` method')
-        return dictList
+            yield thisDict
 
     # use the tab-trigger below for new method
     # xt-class-method
@@ -98,6 +98,26 @@ class test_transient_classifier(unittest.TestCase):
         )
         classifications, crossmatches = this.classify()
 
+    def test_classify_iter_function(self):
+
+        from sherlock import transient_classifier
+        this = transient_classifier(
+            log=log,
+            settings=settings,
+            ra=["08:57:57.19", "09:01:11.02"],
+            dec=["+43:25:44.1", "+12:10:41.3"],
+            name=["PS17gx", "PS17gy"],
+            updateNed=False,
+            verbose=0
+        )
+        seen = []
+        for transientId, classification, crossmatches in this.classify_iter():
+            seen.append(transientId)
+            self.assertTrue(len(classification) >= 1)
+            for c in crossmatches:
+                self.assertEqual(c["transient_object_id"], transientId)
+        self.assertEqual(sorted(seen), ["PS17gx", "PS17gy"])
+
     def test_get_transient_metadata_from_database_list(self):
 
         from sherlock import transient_classifier
@@ -148,6 +168,314 @@ class test_transient_classifier(unittest.TestCase):
         )
         classifier.classification_annotations()
 
+    def test_sort_transients_by_sky_position(self):
+
+        from sherlock import transient_classifier
+        classifier = transient_classifier(
+            log=log,
+            settings=settings,
+            updateNed=False
+        )
+        transientsMetadataList = [
+            {"id": 1, "ra": 10.0, "dec": 10.0},
+            {"id": 2, "ra": 200.0, "dec": -40.0},
+            {"id": 3, "ra": 10.001, "dec": 10.001},
+            {"id": 4, "ra": 200.001, "dec": -40.001}
+        ]
+        sortedList = classifier._sort_transients_by_sky_position(
+            transientsMetadataList=transientsMetadataList
+        )
+        ids = [t["id"] for t in sortedList]
+        self.assertEqual(sorted(ids), [1, 2, 3, 4])
+        # NEIGHBOURS ON THE SKY END UP NEXT TO EACH OTHER
+        self.assertEqual(abs(ids.index(1) - ids.index(3)), 1)
+        self.assertEqual(abs(ids.index(2) - ids.index(4)), 1)
+
+    def test_sort_transients_by_sky_position_healpix(self):
+
+        import copy
+        from sherlock import transient_classifier
+        healpixSettings = copy.deepcopy(settings)
+        healpixSettings["sky sort transients"] = "healpix"
+        classifier = transient_classifier(
+            log=log,
+            settings=healpixSettings,
+            updateNed=False
+        )
+        transientsMetadataList = [
+            {"id": 1, "ra": 10.0, "dec": 10.0},
+            {"id": 2, "ra": 200.0, "dec": -40.0},
+            {"id": 3, "ra": 10.001, "dec": 10.001},
+            {"id": 4, "ra": 200.001, "dec": -40.001}
+        ]
+        # SORTED ALONG THE HTM CURVE IF `healpy` IS NOT INSTALLED
+        sortedList = classifier._sort_transients_by_sky_position(
+            transientsMetadataList=transientsMetadataList
+        )
+        ids = [t["id"] for t in sortedList]
+        self.assertEqual(sorted(ids), [1, 2, 3, 4])
+        self.assertEqual(abs(ids.index(1) - ids.index(3)), 1)
+        self.assertEqual(abs(ids.index(2) - ids.index(4)), 1)
+
+    def test_peak_magnitude_query(self):
+
+        import copy
+        from sherlock import transient_classifier
+        peakSettings = copy.deepcopy(settings)
+        transientSettings = peakSettings["database settings"]["transients"]
+
+        # THE `{ids}` PLACEHOLDER IS REPLACED BY THE BATCH'S IDS
+        transientSettings[
+            "transient peak magnitude query"] = "select transientBucketId as 'id', min(magnitude) as 'mag' from transientBucket where transientBucketId in ({ids}) and magnitude is not null group by transientBucketId"
+        classifier = transient_classifier(
+            log=log,
+            settings=peakSettings,
+            updateNed=False
+        )
+        self.assertEqual(classifier._peak_magnitude_query(transientIds=[3, 1]),
+                         "select transientBucketId as 'id', min(magnitude) as 'mag' from transientBucket where transientBucketId in (3,1) and magnitude is not null group by transientBucketId")
+        self.assertIn("in (select transient_object_id from sherlock_crossmatches where dateLastModified",
+                      classifier._peak_magnitude_query())
+        peakMags = classifier._get_peak_magnitudes(transientIds=[1, 2, 3])
+        self.assertEqual(set(peakMags.keys()) <= set([1, 2, 3]), True)
+
+        # QUERIES WITHOUT THE PLACEHOLDER ARE WRAPPED, NOT EDITED
+        transientSettings[
+            "transient peak magnitude query"] = "select p.transientBucketId as 'id', min(p.magnitude) as 'mag' from transientBucket p where p.magnitude is not null and p.transientBucketId in (select transientBucketId from pesstoObjects where classifiedFlag = 1) group by p.transientBucketId"
+        classifier = transient_classifier(
+            log=log,
+            settings=peakSettings,
+            updateNed=False
+        )
+        self.assertEqual(classifier._peak_magnitude_query(transientIds=[3, 1]),
+                         "select * from (%s) t where t.id in (3,1)" % (transientSettings["transient peak magnitude query"],))
+        self.assertEqual(classifier.peakQueryWarned, True)
+        self.assertEqual(classifier._peak_magnitude_query(),
+                         transientSettings["transient peak magnitude query"])
+        peakMags = classifier._get_peak_magnitudes(transientIds=[1, 2, 3])
+        self.assertEqual(set(peakMags.keys()) <= set([1, 2, 3]), True)
+
+    def test_fingerprint_transient_results(self):
+
+        from sherlock import transient_classifier
+        classifier = transient_classifier(
+            log=log,
+            settings=settings,
+            updateNed=False
+        )
+        crossmatches = [
+            {"transient_object_id": 1, "rank": 2,
+                "catalogue_object_id": "b", "separationArcsec": 3.2},
+            {"transient_object_id": 1, "rank": 1,
+                "catalogue_object_id": "a", "separationArcsec": 0.5}
+        ]
+        fingerprint = classifier._fingerprint_transient_results(
+            classification=["SN"], crossmatches=crossmatches)
+        # ORDER OF THE CROSSMATCHES AND FLOATING-POINT NOISE DO NOT MATTER
+        crossmatches[1]["separationArcsec"] = 0.5000000001
+        self.assertEqual(fingerprint, classifier._fingerprint_transient_results(
+            classification=["SN"], crossmatches=crossmatches[::-1]))
+        # A NEW TOP CLASSIFICATION DOES
+        self.assertNotEqual(fingerprint, classifier._fingerprint_transient_results(
+            classification=["NT"], crossmatches=crossmatches))
+
+    def test_top_ranked_crossmatches(self):
+
+        from sherlock import transient_classifier
+        classifier = transient_classifier(
+            log=log,
+            settings=settings,
+            updateNed=False
+        )
+        crossmatches = [
+            {"transient_object_id": 1, "rank": 1, "merged_rank": None},
+            {"transient_object_id": 1, "rank": None, "merged_rank": 1},
+            {"transient_object_id": 1, "rank": 2, "merged_rank": None},
+            {"transient_object_id": 1, "rank": 3, "merged_rank": None},
+            {"transient_object_id": 1, "rank": None, "merged_rank": 3},
+            {"transient_object_id": 2, "rank": 1, "merged_rank": None}
+        ]
+        kept = classifier._top_ranked_crossmatches(
+            crossmatches=crossmatches, topN=2)
+        self.assertEqual(kept, crossmatches[:3] + crossmatches[5:])
+
+    def test_add_transient_absolute_magnitudes(self):
+
+        from sherlock import transient_classifier
+        classifier = transient_classifier(
+            log=log,
+            settings=settings,
+            updateNed=False
+        )
+        crossmatches = [
+            {"transient_object_id": 1, "association_type": "SN",
+                "direct_distance_modulus": None, "z_distance_modulus": 35.0},
+            {"transient_object_id": 2, "association_type": "SN",
+                "direct_distance_modulus": 30.0, "z_distance_modulus": 35.0},
+            {"transient_object_id": 3, "association_type": "SN",
+                "direct_distance_modulus": None, "z_distance_modulus": None}
+        ]
+        classifier._add_transient_absolute_magnitudes(
+            crossmatches=crossmatches,
+            peakMags={1: 18.123, 2: 18.0, 3: 19.0}
+        )
+        self.assertEqual(crossmatches[0]["transientAbsMag"], -16.88)
+        # THE DIRECT DISTANCE MODULUS IS PREFERRED
+        self.assertEqual(crossmatches[1]["transientAbsMag"], -12.0)
+        self.assertEqual(crossmatches[2]["transientAbsMag"], None)
+
+    def test_update_peak_magnitudes_for_batch(self):
+
+        from sherlock import transient_classifier
+        classifier = transient_classifier(
+            log=log,
+            settings=settings,
+            updateNed=False
+        )
+        transientsMetadataList = classifier._get_transient_metadata_from_database_list()
+        classifier.update_peak_magnitudes(
+            transientIds=[t["id"] for t in transientsMetadataList])
+        # AN EMPTY BATCH IS A NO-OP
+        classifier.update_peak_magnitudes(transientIds=[])
+
+    def test_migrate_annotations(self):
+
+        from sherlock import transient_classifier
+        classifier = transient_classifier(
+            log=log,
+            settings=settings,
+            updateNed=False
+        )
+        classifier.migrate_annotations(compact=True)
+        classifier.migrate_annotations(compact=False)
+
+        from fundamentals.mysql import readquery
+        rows = readquery(
+            log=log,
+            sqlQuery="select count(*) as count from sherlock_classifications where annotation_template is not null",
+            dbConn=transientsDbConn
+        )
+        self.assertEqual(rows[0]["count"], 0)
+
+    def test_keyset_pagination(self):
+
+        import copy
+        keysetSettings = copy.deepcopy(settings)
+        keysetSettings["transient keyset pagination"] = True
+        keysetSettings["transient keyset state file"] = pathToOutputDir + \
+            "/transient_keyset.json"
+
+        from sherlock import transient_classifier
+        classifier = transient_classifier(
+            log=log,
+            settings=keysetSettings,
+            updateNed=False
+        )
+        classifier.largeBatchSize = 5
+        firstPage = classifier._get_transient_metadata_from_database_list()
+        ids = [t["id"] for t in firstPage]
+        self.assertEqual(ids, sorted(ids))
+
+        classifier._set_keyset_high_water_mark(ids[-1])
+        self.assertEqual(classifier._get_keyset_high_water_mark(), ids[-1])
+        classifier.keysetHighWaterMark = ids[-1]
+        secondPage = classifier._get_transient_metadata_from_database_list()
+        for t in secondPage:
+            self.assertGreater(t["id"], ids[-1])
+
+        classifier._set_keyset_high_water_mark(None)
+        self.assertEqual(classifier._get_keyset_high_water_mark(), None)
+
+    def test_keyset_page_query_wraps_the_transient_query(self):
+
+        import copy
+        keysetSettings = copy.deepcopy(settings)
+        keysetSettings["transient keyset pagination"] = True
+        keysetSettings["transient keyset state file"] = pathToOutputDir + \
+            "/transient_keyset.json"
+        transientQuery = "select t.transientBucketId as 'id', raDeg 'ra', decDeg 'dec' from transientBucket t where t.transientBucketId in (select transientBucketId from pesstoObjects where classifiedFlag = 0) order by t.transientBucketId desc"
+        keysetSettings["database settings"]["transients"][
+            "transient query"] = transientQuery + ";"
+
+        from sherlock import transient_classifier
+        classifier = transient_classifier(
+            log=log,
+            settings=keysetSettings,
+            updateNed=False
+        )
+        classifier.largeBatchSize = 5
+        self.assertEqual(classifier._keyset_page_query(
+        ), "select * from (%s) as keysetPage order by keysetPage.id limit 5" % (transientQuery,))
+        self.assertEqual(classifier._keyset_page_query(highWaterMark=12), "select * from (%s) as keysetPage where keysetPage.id > 12 order by keysetPage.id limit 5" % (transientQuery,))
+
+        keysetSettings["database settings"]["transients"][
+            "transient query"] = transientQuery + " limit 100"
+        with self.assertRaises(ValueError):
+            transient_classifier(
+                log=log,
+                settings=keysetSettings,
+                updateNed=False
+            )
+
+    def test_daemon_idle_wait_backs_off(self):
+
+        import copy
+        daemonSettings = copy.deepcopy(settings)
+        daemonSettings["daemon min poll seconds"] = 0.1
+        daemonSettings["daemon max poll seconds"] = 0.4
+
+        from sherlock import transient_classifier
+        classifier = transient_classifier(
+            log=log,
+            settings=daemonSettings,
+            updateNed=False,
+            daemonMode=True
+        )
+        classifier._daemon_idle_wait()
+        self.assertEqual(classifier.pollSeconds, 0.2)
+        classifier._daemon_idle_wait()
+        classifier._daemon_idle_wait()
+        self.assertEqual(classifier.pollSeconds, 0.4)
+
+        # A SHUTDOWN REQUEST STOPS THE DAEMON LOOP
+        classifier.stopRequested = True
+        classifier.classify()
+
+    def test_photometry_layout_is_only_converted_on_request(self):
+
+        import copy
+        from sherlock import transient_classifier
+        sparseSettings = copy.deepcopy(settings)
+        sparseSettings["sparse photometry"] = True
+        classifier = transient_classifier(
+            log=log,
+            settings=sparseSettings,
+            updateNed=False
+        )
+        classifier._create_tables_if_not_exist()
+        # THE TABLE STILL HAS ITS MAGNITUDE COLUMNS - CLASSIFY REFUSES TO START
+        self.assertEqual(classifier.photometryLayoutMatches, False)
+        try:
+            classifier._check_photometry_layout()
+            assert False
+        except ValueError as e:
+            print(str(e))
+
+        classifier.convert_photometry_layout()
+        self.assertEqual(classifier.photometryLayoutMatches, True)
+        classifier._check_photometry_layout()
+
+        # AND BACK TO ONE COLUMN PER BAND
+        classifier = transient_classifier(
+            log=log,
+            settings=settings,
+            updateNed=False
+        )
+        classifier._create_tables_if_not_exist()
+        self.assertEqual(classifier.photometryLayoutMatches, False)
+        classifier.convert_photometry_layout()
+        self.assertEqual(classifier.photometryLayoutMatches, True)
+
     def test_transient_classifier_function_exception(self):
 
         from sherlock import transient_classifier
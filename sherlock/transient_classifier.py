@@ -92,6 +92,12 @@ class transient_classifier(object):
 
     By setting ``update=True`` the classifier will update the ``sherlockClassification`` column of the ``transient table`` with new classification and populate the ``sherlock_crossmatches`` table with key details of the crossmatched sources from the catalogues database. By setting ``update=False`` results are printed to stdout but the database is not updated (useful for dry runs and testing new algorithms),
 
+    The optional ``transient peak magnitude query`` (returning ``id`` and ``mag``) can mark where the transient-id restriction belongs with an ``{ids}`` placeholder, e.g. ``... where transientBucketId in ({ids}) and ...``, so each batch's peak magnitudes are read for just that batch's transients (see ``_peak_magnitude_query``).
+
+    On very large transient tables set ``transient keyset pagination: True`` to walk the table by its primary key instead of re-counting and re-scanning the unclassified transients on every loop. The ``transient query`` is wrapped as a derived table and each page is selected from it with ``id > <high-water mark> order by id limit <batch size>``, so the ``id`` the query returns must be the table's primary key (MySQL merges the simple derived table into the outer query, keeping each page an index range scan). The query may contain joins, subqueries, ``group by`` or ``order by``, but not its own ``limit``. The high-water mark is saved to the ``transient keyset state file`` after each batch is written, so an interrupted run resumes where it left off.
+
+    Long ``update=True`` backfills can also set ``checkpoint journal: True``. The results of each batch are then spilled to disk and journalled before they are written, and the written batches' transient-id ranges are journalled after, so a crashed or killed run replays any half-finished write without re-crossmatching it. When paging by key it also skips the transients it has already written; a transient query is trusted to stop returning them, so only those still being written are held back.
+
 
     .. todo ::
 
@@ -122,6 +128,7 @@ class transient_classifier(object):
     ):
 
         from astrocalc.coords import unit_conversion
+        from sherlock.commonutils import annotation_renderer
         import psutil
         import yaml
         import re
@@ -139,6 +146,7 @@ class transient_classifier(object):
         self.daemonMode = daemonMode
         self.updatePeakMags = updatePeakMags
         self.oneRun = oneRun
+        self.peakQueryWarned = False
         self.lite = lite
         self.filterPreference = [
             "R", "_r", "G", "V", "_g", "B", "I", "_i", "_z", "J", "H", "K", "U", "_u", "_y", "W1", "unkMag"
@@ -196,6 +204,87 @@ class transient_classifier(object):
         else:
             self.largeBatchSize = self.cpuCount * self.miniBatchSize
 
+        # OPTIONALLY LET MEASURED THROUGHPUT TUNE THE MINI-BATCH AND POOL SIZES
+        self.batchController = False
+        if "adaptive batching" in self.settings and self.settings["adaptive batching"] and self.settings["adaptive batching"].get("enabled"):
+            from sherlock.commonutils import adaptive_batch_controller
+            self.batchController = adaptive_batch_controller(
+                log=self.log,
+                settings=self.settings,
+                miniBatchSize=self.miniBatchSize,
+                poolSize=self.cpuCount
+            )
+
+        # OPTIONALLY WALK THE TRANSIENT TABLE BY ITS PRIMARY KEY (KEYSET
+        # PAGINATION) INSTEAD OF RE-COUNTING THE UNCLASSIFIED TRANSIENTS
+        self.keysetColumn = False
+        self.keysetHighWaterMark = None
+        if not self.cl and "transient keyset pagination" in self.settings and self.settings["transient keyset pagination"]:
+            transientSettings = self.settings[
+                "database settings"]["transients"]
+            self.keysetColumn = "id"
+            # FAIL NOW RATHER THAN AT THE FIRST PAGE IF THE QUERY CAN'T BE PAGED
+            self._keyset_page_query()
+            self.keysetHighWaterMark = self._get_keyset_high_water_mark()
+
+        # JOURNAL THE BATCHES WRITTEN (AND BEING WRITTEN) SO AN INTERRUPTED RUN
+        # RESUMES WITHOUT RE-CROSSMATCHING FINISHED BATCHES
+        self.journal = False
+        if not self.cl and self.update and "checkpoint journal" in self.settings and self.settings["checkpoint journal"]:
+            from sherlock.commonutils import checkpoint_journal
+            self.journal = checkpoint_journal(
+                log=self.log,
+                pathToJournal=self._checkpoint_journal_path(),
+                settings=self.settings
+            )
+
+        # MAP OF THE SKY COVERED BY RECENT NED QUERIES (BUILT ON FIRST USE)
+        self.nedCoverage = False
+
+        # QUEUE NED REFRESHES FOR THE `sherlock nedprefetch` SERVICE INSTEAD OF
+        # QUERYING NED INLINE (QUEUE CREATED ON FIRST USE)
+        self.nedPrefetch = False
+        if not self.cl and "ned prefetch" in self.settings and self.settings["ned prefetch"]:
+            self.nedPrefetch = True
+        self.nedPrefetchQueue = False
+
+        # DAEMON MODE - POLLING BACKOFF, GRACEFUL SHUTDOWN AND A WARM WORKER POOL
+        self.minPollSeconds = 2.
+        self.maxPollSeconds = 60.
+        if "daemon min poll seconds" in self.settings and self.settings["daemon min poll seconds"]:
+            self.minPollSeconds = float(
+                self.settings["daemon min poll seconds"])
+        if "daemon max poll seconds" in self.settings and self.settings["daemon max poll seconds"]:
+            self.maxPollSeconds = float(
+                self.settings["daemon max poll seconds"])
+        self.pollSeconds = self.minPollSeconds
+        self.stopRequested = False
+        self.daemonPool = False
+        self.daemonPoolSize = 0
+        self.previousSignalHandlers = {}
+
+        # BUILD ANNOTATIONS FROM THE IN-MEMORY BATCH RATHER THAN RE-READING THE
+        # RESULTS BACK OUT OF THE DATABASE
+        self.annotateInBatch = False
+        if "annotate in batch" in self.settings and self.settings["annotate in batch"]:
+            self.annotateInBatch = True
+
+        # RANGE-PARTITIONED RESULT TABLES (SET UP IN `_create_tables_if_not_exist`)
+        self.resultPartitioner = False
+
+        # PACK THE SPARSE MAGNITUDE COLUMNS OF THE CROSSMATCHES INTO ONE COLUMN
+        self.sparsePhotometry = False
+        if "sparse photometry" in self.settings and self.settings["sparse photometry"]:
+            self.sparsePhotometry = True
+        # FALSE WHEN `sherlock_crossmatches` IS IN THE OTHER PHOTOMETRY LAYOUT
+        # (CHECKED IN `_create_tables_if_not_exist`)
+        self.photometryLayoutMatches = True
+
+        # STORE ANNOTATIONS AS A LINK TEMPLATE KEY + PARAMETERS RATHER THAN FULL HTML
+        self.compactAnnotations = False
+        if "compact annotations" in self.settings and self.settings["compact annotations"]:
+            self.compactAnnotations = True
+
         # CHECK INPUT TYPES
         if not isinstance(self.ra, list) and not isinstance(self.ra, bool) and not isinstance(self.ra, float) and not isinstance(self.ra, str):
             message = "Input RA and Dec must be floats or lists of floats"
@@ -210,6 +299,10 @@ class transient_classifier(object):
         self.converter = unit_conversion(
             log=self.log
         )
+        # ANNOTATION RENDERER (PRECOMPILED TEMPLATES + MEMOISED SDSS NAMES)
+        self.annotationRenderer = annotation_renderer(
+            log=self.log
+        )
 
         if self.ra and not isinstance(self.ra, float) and ":" in self.ra:
             # ASTROCALC UNIT CONVERTER OBJECT
@@ -269,11 +362,24 @@ class transient_classifier(object):
 
         if self.transientsDbConn and self.update:
             self._create_tables_if_not_exist()
+            self._check_photometry_layout()
+
+        # FINISH ANY WRITES AN INTERRUPTED RUN LEFT PENDING
+        if self.journal:
+            self._replay_checkpointed_writes(colMaps=colMaps)
 
         import time
         start_time = time.time()
 
-        while remaining:
+        daemon = self.daemonMode and not self.cl and not self.oneRun
+        if daemon:
+            self._install_shutdown_handlers()
+
+        while remaining or (daemon and not self.stopRequested):
+
+            # A SHUTDOWN WAS REQUESTED WHILE THE LAST BATCH WAS IN FLIGHT
+            if self.stopRequested:
+                break
 
             miniBatchSize = int(
                 (self.largeBatchSize) / (self.cpuCount))
@@ -282,35 +388,50 @@ class transient_classifier(object):
             # QUERY THE TRANSIENT DATABASE
             if not self.ra and not self.dec:
 
-                # COUNT REMAINING TRANSIENTS
-                from fundamentals.mysql import readquery
-                sqlQuery = self.settings["database settings"][
-                    "transients"]["transient count"]
-                thisInt = randint(0, 100)
-                if "where" in sqlQuery:
-                    sqlQuery = sqlQuery.replace(
-                        "where", "where %(thisInt)s=%(thisInt)s and " % locals())
-
-                if remaining == 1 or remaining < self.largeBatchSize:
-                    print("COUNTING THE UNCLASSIFIED TRANSIENTS FROM THE DATABASE")
-                    rows = readquery(
-                        log=self.log,
-                        sqlQuery=sqlQuery,
-                        dbConn=self.transientsDbConn,
-                    )
-                    remaining = rows[0]["count(*)"]
+                # LONG-RUNNING DAEMONS CAN SEE THEIR CONNECTIONS TIMED-OUT BY THE SERVER
+                if daemon:
+                    self.transientsDbConn.ping(reconnect=True)
+                    self.cataloguesDbConn.ping(reconnect=True)
+
+                if self.keysetColumn:
+                    # NO COUNTING IN KEYSET MODE - ESTIMATE PROGRESS FROM THE
+                    # KEY RANGE INSTEAD
+                    self._estimate_keyset_progress()
                 else:
-                    remaining = remaining - self.largeBatchSize
+                    # COUNT REMAINING TRANSIENTS
+                    from fundamentals.mysql import readquery
+                    sqlQuery = self.settings["database settings"][
+                        "transients"]["transient count"]
+                    thisInt = randint(0, 100)
+                    if "where" in sqlQuery:
+                        sqlQuery = sqlQuery.replace(
+                            "where", "where %(thisInt)s=%(thisInt)s and " % locals())
+
+                    if remaining == 1 or remaining < self.largeBatchSize:
+                        print("COUNTING THE UNCLASSIFIED TRANSIENTS FROM THE DATABASE")
+                        rows = readquery(
+                            log=self.log,
+                            sqlQuery=sqlQuery,
+                            dbConn=self.transientsDbConn,
+                        )
+                        remaining = rows[0]["count(*)"]
+                    else:
+                        remaining = remaining - self.largeBatchSize
 
-                if remaining <= self.largeBatchSize:
-                    miniBatchSize = int((remaining) / (self.cpuCount))
+                    if remaining <= self.largeBatchSize:
+                        miniBatchSize = int((remaining) / (self.cpuCount))
 
-                print(
-                    "%(remaining)s transient sources requiring a classification remain" % locals())
+                    print(
+                        "%(remaining)s transient sources requiring a classification remain" % locals())
 
                 # A LIST OF DICTIONARIES OF TRANSIENT METADATA
                 transientsMetadataList = self._get_transient_metadata_from_database_list()
 
+                if self.keysetColumn:
+                    remaining = len(transientsMetadataList)
+                    if remaining < self.largeBatchSize:
+                        miniBatchSize = int((remaining) / (self.cpuCount))
+
                 # START THE TIME TO TRACK CLASSIFICATION SPEED
                 start_time = time.time()
 
@@ -320,32 +441,10 @@ class transient_classifier(object):
 
             # TRANSIENT PASSED VIA COMMAND-LINE
             else:
-                # CONVERT SINGLE TRANSIENTS TO LIST
-                if not isinstance(self.ra, list):
-                    self.ra = [self.ra]
-                    self.dec = [self.dec]
-                    self.name = [self.name]
-
-                count = len(self.dec)
+                transientsMetadataList = self._get_transient_metadata_from_coordinates()
+                count = len(transientsMetadataList)
                 print(
                     "  now classifying the next %(count)s transient sources" % locals())
-
-                # GIVEN TRANSIENTS UNIQUE NAMES IF NOT PROVIDED
-                if not self.name[0]:
-                    self.name = []
-                    for i, v in enumerate(self.ra):
-                        self.name.append("transient_%(i)05d" % locals())
-
-                transientsMetadataList = []
-                for r, d, n in zip(self.ra, self.dec, self.name):
-                    transient = {
-                        'name': n,
-                        'object_classification': None,
-                        'dec': d,
-                        'id': n,
-                        'ra': r
-                    }
-                    transientsMetadataList.append(transient)
                 remaining = 0
 
             if self.oneRun:
@@ -357,13 +456,19 @@ class transient_classifier(object):
                     print("No transients need classified")
                     return None, None
                 else:
-                    print(
-                        "No remaining transients need classified, will try again in 5 mins")
-                    time.sleep("10")
+                    self._daemon_idle_wait()
+                    continue
+
+            # NEW WORK - POLL QUICKLY AGAIN ONCE THIS BATCH IS DONE
+            self.pollSeconds = self.minPollSeconds
 
             # FROM THE LOCATIONS OF THE TRANSIENTS, CHECK IF OUR LOCAL NED DATABASE
-            # NEEDS UPDATED
-            if self.updateNed:
+            # NEEDS UPDATED (OR QUEUE THE UPDATE FOR THE NED PREFETCHER)
+            if self.updateNed and self.nedPrefetch:
+                self._queue_ned_prefetch(
+                    transientsMetadataList=transientsMetadataList
+                )
+            elif self.updateNed:
 
                 self._update_ned_stream(
                     transientsMetadataList=transientsMetadataList
@@ -371,6 +476,14 @@ class transient_classifier(object):
 
             if miniBatchSize < self.miniBatchSize:
                 miniBatchSize = self.miniBatchSize
+            if self.batchController:
+                miniBatchSize = self.batchController.miniBatchSize
+
+            # KEEP EACH MINI-BATCH SPATIALLY COMPACT
+            if len(transientsMetadataList) > miniBatchSize:
+                transientsMetadataList = self._sort_transients_by_sky_position(
+                    transientsMetadataList=transientsMetadataList
+                )
 
             # SOME TESTING SHOWED THAT 25 IS GOOD
             total = len(transientsMetadataList)
@@ -394,6 +507,8 @@ class transient_classifier(object):
                 print("MINI BATCH SIZE = %(batches)s x %(miniBatchSize)s" % locals())
 
             poolSize = self.cpuCount
+            if self.batchController:
+                poolSize = self.batchController.poolSize
             if poolSize and batches < poolSize:
                 poolSize = batches
 
@@ -402,8 +517,35 @@ class transient_classifier(object):
             if self.verbose > 0:
                 print("START CROSSMATCH")
             crossmatchArray = []
-            crossmatchArray = fmultiprocess(log=self.log, function=_crossmatch_transients_against_catalogues,
-                                            inputArray=list(range(len(theseBatches))), poolSize=poolSize, settings=self.settings, colMaps=colMaps, turnOffMP=False, progressBar=True)
+            batchResults = False
+            if daemon:
+                # KEEP THE WORKERS (AND THEIR CATALOGUE CONNECTIONS) WARM
+                # BETWEEN BATCHES
+                batchResults = self._crossmatch_with_daemon_pool(
+                    theseBatches=theseBatches,
+                    colMaps=colMaps
+                )
+            elif self.batchController:
+                # TIME EACH MINI-BATCH SO THE CONTROLLER CAN RETUNE THE SIZES
+                batchResults = fmultiprocess(log=self.log, function=_timed_crossmatch_transients_against_catalogues,
+                                             inputArray=list(range(len(theseBatches))), poolSize=poolSize, settings=self.settings, colMaps=colMaps, turnOffMP=False, progressBar=True)
+            else:
+                crossmatchArray = fmultiprocess(log=self.log, function=_crossmatch_transients_against_catalogues,
+                                                inputArray=list(range(len(theseBatches))), poolSize=poolSize, settings=self.settings, colMaps=colMaps, turnOffMP=False, progressBar=True)
+
+            if batchResults is not False:
+                for r in batchResults:
+                    if self.batchController:
+                        self.batchController.record(
+                            transientCount=r["transients"],
+                            seconds=r["seconds"],
+                            matchCount=len(r["crossmatches"])
+                        )
+                    crossmatchArray.append(r["crossmatches"])
+                if self.batchController:
+                    self.batchController.update()
+                    if self.verbose > 1 and len(self.batchController.decisions):
+                        print(self.batchController.decisions[-1])
 
             if self.verbose > 0:
                 print("FINISH CROSSMATCH/START RANKING: %d" %
@@ -414,34 +556,12 @@ class transient_classifier(object):
             crossmatches = []
 
             for sublist in crossmatchArray:
-                sublist = sorted(
-                    sublist, key=itemgetter('transient_object_id'))
-
-                # REORGANISE INTO INDIVIDUAL TRANSIENTS FOR RANKING AND
-                # TOP-LEVEL CLASSIFICATION EXTRACTION
-
-                batch = []
-                if len(sublist) != 0:
-                    transientId = sublist[0]['transient_object_id']
-
-                    for s in sublist:
-                        if s['transient_object_id'] != transientId:
-                            # RANK TRANSIENT CROSSMATCH BATCH
-                            cl, cr = self._rank_classifications(
-                                batch, colMaps)
-                            crossmatches.extend(cr)
-                            classifications.update(cl)
-
-                            transientId = s['transient_object_id']
-                            batch = [s]
-                        else:
-                            batch.append(s)
-
-                    # RANK FINAL BATCH
-                    cl, cr = self._rank_classifications(
-                        batch, colMaps)
-                    classifications.update(cl)
-                    crossmatches.extend(cr)
+                cl, cr = self._rank_mini_batch_crossmatches(
+                    crossmatches=sublist,
+                    colMaps=colMaps
+                )
+                classifications.update(cl)
+                crossmatches.extend(cr)
 
             for t in transientsMetadataList:
                 if t["id"] not in classifications:
@@ -459,12 +579,39 @@ class transient_classifier(object):
                       (time.time() - start_time2,))
             start_time2 = time.time()
             if self.update and not self.ra:
+                annotations = False
+                if self.annotateInBatch:
+                    annotations = self._generate_batch_annotations(
+                        crossmatches=crossmatches,
+                        classifications=classifications,
+                        updatePeakMagnitudes=self.updatePeakMags
+                    )
+                checkpoint = False
+                if self.journal:
+                    checkpoint = self.journal.record_pending(
+                        transientIds=[t["id"] for t in transientsMetadataList],
+                        crossmatches=crossmatches,
+                        classifications=classifications,
+                        annotations=annotations
+                    )
                 self._update_transient_database(
                     crossmatches=crossmatches,
                     classifications=classifications,
                     transientsMetadataList=transientsMetadataList,
-                    colMaps=colMaps
+                    colMaps=colMaps,
+                    annotations=annotations
                 )
+                if checkpoint:
+                    self.journal.record_complete(checkpoint)
+
+            # MOVE THE KEYSET HIGH-WATER MARK PAST THIS BATCH (ONLY PERSISTED
+            # ONCE THE RESULTS ARE IN THE DATABASE)
+            if self.keysetColumn and len(transientsMetadataList):
+                self.keysetHighWaterMark = max(
+                    t["id"] for t in transientsMetadataList)
+                if self.update:
+                    self._set_keyset_high_water_mark(
+                        self.keysetHighWaterMark)
 
             if self.verbose > 1:
                 print("FINISH UPDATING TRANSIENT DB/START ANNOTATING TRANSIENT DB: %d" %
@@ -491,12 +638,14 @@ class transient_classifier(object):
 
                 return classifications, crossmatches
 
-            if self.updatePeakMags and self.settings["database settings"]["transients"]["transient peak magnitude query"]:
-                self.update_peak_magnitudes()
-
-            # BULK RUN -- NOT A COMMAND-LINE SINGLE CLASSIFICATION
-            self.update_classification_annotations_and_summaries(
-                self.updatePeakMags)
+            # BULK RUN -- NOT A COMMAND-LINE SINGLE CLASSIFICATION (ANNOTATIONS
+            # ARE ALREADY WRITTEN WITH THE CLASSIFICATIONS WHEN BUILT IN-BATCH)
+            if not (self.annotateInBatch and self.update):
+                if self.updatePeakMags and self.settings["database settings"]["transients"]["transient peak magnitude query"]:
+                    self.update_peak_magnitudes(
+                        transientIds=[t["id"] for t in transientsMetadataList])
+                self.update_classification_annotations_and_summaries(
+                    self.updatePeakMags)
 
             print("FINISH ANNOTATING TRANSIENT DB: %d" %
                   (time.time() - start_time2,))
@@ -504,6 +653,9 @@ class transient_classifier(object):
 
             del crossmatchArray, classifications, crossmatches
 
+        if daemon:
+            self._shutdown_daemon()
+
         self.log.debug('completed the ``classify`` method')
         return None, None
 
@@ -534,6 +686,34 @@ class transient_classifier(object):
 
         print("GETTING A LIST OF UNCLASSIFIED TRANSIENTS FROM THE DATABASE")
 
+        if self.keysetColumn:
+            transientsMetadataList = self._get_next_keyset_page()
+            # SKIP PAGES THE CHECKPOINT JOURNAL HAS ALREADY WRITTEN
+            while self.journal and len(transientsMetadataList):
+                unwritten = self.journal.filter_completed(
+                    transientsMetadataList)
+                if len(unwritten):
+                    transientsMetadataList = unwritten
+                    break
+                self.keysetHighWaterMark = max(
+                    t["id"] for t in transientsMetadataList)
+                transientsMetadataList = self._get_next_keyset_page()
+            # END OF THE KEY RANGE - WRAP AROUND ONCE TO PICK UP ANY TRANSIENTS
+            # BEHIND THE HIGH-WATER MARK THAT HAVE BEEN UNCLASSIFIED SINCE
+            if not len(transientsMetadataList) and self.keysetHighWaterMark is not None:
+                self.log.info(
+                    'reached the end of the transient key range, restarting from the beginning')
+                self.keysetHighWaterMark = None
+                if self.update:
+                    self._set_keyset_high_water_mark(None)
+                # A NEW PASS - NOTHING IS WRITTEN YET
+                if self.journal:
+                    self.journal.reset()
+                transientsMetadataList = self._get_next_keyset_page()
+            self.log.debug(
+                'completed the ``_get_transient_metadata_from_database_list`` method')
+            return transientsMetadataList
+
         sqlQuery = self.settings["database settings"][
             "transients"]["transient query"] + " limit " + str(self.largeBatchSize)
 
@@ -549,193 +729,1131 @@ class transient_classifier(object):
             quiet=False
         )
 
+        # THE QUERY ONLY RETURNS TRANSIENTS NEEDING CLASSIFICATION, SO ONLY HOLD
+        # BACK THOSE STILL BEING WRITTEN (AND RESET THE JOURNAL AT THE END OF A PASS)
+        if self.journal:
+            transientsMetadataList = self.journal.filter_query_page(
+                transientsMetadataList)
+
         self.log.debug(
             'completed the ``_get_transient_metadata_from_database_list`` method')
         return transientsMetadataList
 
-    def _update_ned_stream(
-        self,
-        transientsMetadataList
-    ):
-        """ update the NED stream within the catalogues database at the locations of the transients
+    def _install_shutdown_handlers(
+            self):
+        """*catch SIGTERM/SIGINT in daemon mode so the in-flight batch is crossmatched and written to the database before sherlock exits*
 
-        **Key Arguments**
+        A second signal aborts immediately.
+        """
+        self.log.debug('starting the ``_install_shutdown_handlers`` method')
 
-        - ``transientsMetadataList`` -- the list of transient metadata lifted from the database.
+        import signal
 
+        def request_stop(signum, frame):
+            if self.stopRequested:
+                raise KeyboardInterrupt
+            self.stopRequested = True
+            self.log.warning(
+                'received signal %(signum)s, draining the in-flight batch before shutting down' % locals())
+            print("SHUTDOWN REQUESTED - sherlock will stop once the in-flight batch has been written to the database (signal again to abort)")
 
-        .. todo ::
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                self.previousSignalHandlers[sig] = signal.signal(
+                    sig, request_stop)
+            except ValueError:
+                # SIGNAL HANDLERS CAN ONLY BE SET FROM THE MAIN THREAD
+                self.log.warning(
+                    'could not install the daemon shutdown handlers outside of the main thread')
+
+        self.log.debug('completed the ``_install_shutdown_handlers`` method')
+        return None
 
-            - update key arguments values and definitions with defaults
-            - update return values and definitions
-            - update usage examples and text
-            - update docstring text
-            - check sublime snippet exists
-            - clip any useful text to docs mindmap
-            - regenerate the docs and check redendering of this docstring
+    def _shutdown_daemon(
+            self):
+        """*close the warm worker pool and restore the original signal handlers*
         """
-        self.log.debug('starting the ``_update_ned_stream`` method')
+        self.log.debug('starting the ``_shutdown_daemon`` method')
 
-        from sherlock.imports import ned
-        from fundamentals.mysql import writequery
+        import signal
 
-        coordinateList = []
-        for i in transientsMetadataList:
-            # thisList = str(i["ra"]) + " " + str(i["dec"])
-            thisList = (i["ra"], i["dec"])
-            coordinateList.append(thisList)
+        if self.daemonPool:
+            self.daemonPool.close()
+            self.daemonPool.join()
+            self.daemonPool = False
+            self.daemonPoolSize = 0
 
-        coordinateList = self._remove_previous_ned_queries(
-            coordinateList=coordinateList
-        )
+        for sig, handler in self.previousSignalHandlers.items():
+            signal.signal(sig, handler)
+        self.previousSignalHandlers = {}
 
-        # MINIMISE COORDINATES IN LIST TO REDUCE NUMBER OF REQUIRE NED QUERIES
-        coordinateList = self._consolidate_coordinateList(
-            coordinateList=coordinateList
-        )
+        print("sherlock daemon has shut down cleanly")
 
-        stream = ned(
-            log=self.log,
-            settings=self.settings,
-            coordinateList=coordinateList,
-            radiusArcsec=self.settings["ned stream search radius arcec"]
-        )
-        stream.ingest()
+        self.log.debug('completed the ``_shutdown_daemon`` method')
+        return None
 
-        sqlQuery = """SET session sql_mode = "";""" % locals(
-        )
-        writequery(
-            log=self.log,
-            sqlQuery=sqlQuery,
-            dbConn=self.cataloguesDbConn
-        )
-        sqlQuery = """update tcs_cat_ned_stream set magnitude = CAST(`magnitude_filter` AS DECIMAL(5,2)) where magnitude is null and magnitude_filter is not null;""" % locals(
-        )
-        writequery(
+    def _get_warm_worker_pool(
+            self):
+        """*return the persistent crossmatch worker pool, (re)starting it only when the required pool size has changed*
+
+        **Return**
+
+        - ``pool`` -- a ``multiprocess`` pool whose workers keep their catalogue database connections open between mini-batches
+        """
+        from multiprocess import Pool
+
+        poolSize = max(1, self.cpuCount)
+        if self.batchController:
+            poolSize = self.batchController.poolSize
+
+        if self.daemonPool and self.daemonPoolSize != poolSize:
+            self.daemonPool.close()
+            self.daemonPool.join()
+            self.daemonPool = False
+        if not self.daemonPool:
+            self.daemonPool = Pool(
+                processes=poolSize, initializer=_init_daemon_worker)
+            self.daemonPoolSize = poolSize
+
+        return self.daemonPool
+
+    def _latest_transient_key(
+            self):
+        """*cheaply read the largest primary key in the transient table (a single index lookup) so the idle daemon can spot newly-ingested transients*
+
+        **Return**
+
+        - ``latestKey`` -- the current maximum transient primary key
+        """
+        from fundamentals.mysql import readquery
+
+        transientSettings = self.settings["database settings"]["transients"]
+        primaryIdCol = transientSettings["transient primary id column"]
+        transientTable = transientSettings["transient table"]
+
+        sqlQuery = """select max(%(primaryIdCol)s) as latestKey from %(transientTable)s""" % locals()
+        rows = readquery(
             log=self.log,
             sqlQuery=sqlQuery,
-            dbConn=self.cataloguesDbConn
+            dbConn=self.transientsDbConn,
         )
+        return rows[0]["latestKey"]
 
-        self.log.debug('completed the ``_update_ned_stream`` method')
+    def _daemon_idle_wait(
+            self):
+        """*wait for new transients with exponential backoff*
+
+        The wait doubles after every empty poll (between ``daemon min poll seconds`` and ``daemon max poll seconds``). While waiting, the maximum transient primary key is probed every ``daemon min poll seconds`` and the daemon wakes as soon as new rows land. A shutdown request also ends the wait.
+        """
+        self.log.debug('starting the ``_daemon_idle_wait`` method')
+
+        import time
+
+        pollSeconds = self.pollSeconds
+        print(
+            "No remaining transients need classified, will try again in %(pollSeconds)0.0f seconds (or sooner if new transients arrive)" % locals())
+
+        self.transientsDbConn.ping(reconnect=True)
+        latestKey = self._latest_transient_key()
+        waited = 0.
+        while waited < pollSeconds and not self.stopRequested:
+            tick = min(self.minPollSeconds, pollSeconds - waited)
+            time.sleep(tick)
+            waited += tick
+            if self.stopRequested:
+                break
+            if self._latest_transient_key() != latestKey:
+                self.log.debug('new transients have landed, waking the daemon')
+                self.pollSeconds = self.minPollSeconds
+                return None
+
+        self.pollSeconds = min(pollSeconds * 2., self.maxPollSeconds)
+
+        self.log.debug('completed the ``_daemon_idle_wait`` method')
         return None
 
-    def _remove_previous_ned_queries(
+    def _crossmatch_with_daemon_pool(
             self,
-            coordinateList):
-        """iterate through the transient locations to see if we have recent local NED coverage of that area already
+            theseBatches,
+            colMaps):
+        """*crossmatch the mini-batches on a persistent worker pool whose workers keep their catalogue database connections open between batches*
 
         **Key Arguments**
 
-        - ``coordinateList`` -- set of coordinate to check for previous queries
-
+        - ``theseBatches`` -- list of mini-batches of transient metadata
+        - ``colMaps`` -- dictionary of dictionaries with the name of the database-view as the key and the column-name dictary map as value
 
         **Return**
 
-        - ``updatedCoordinateList`` -- coordinate list with previous queries removed
+        - ``batchResults`` -- list of dictionaries (``crossmatches``, ``transients``, ``seconds``), one per mini-batch
+        """
+        self.log.debug('starting the ``_crossmatch_with_daemon_pool`` method')
 
+        from functools import partial
 
-        .. todo ::
+        pool = self._get_warm_worker_pool()
+        mapfunc = partial(_crossmatch_transient_batch,
+                          log=self.log, settings=self.settings, colMaps=colMaps)
+        batchResults = pool.map(mapfunc, theseBatches, chunksize=1)
 
-            - update key arguments values and definitions with defaults
-            - update return values and definitions
-            - update usage examples and text
-            - update docstring text
-            - check sublime snippet exists
-            - clip any useful text to docs mindmap
-            - regenerate the docs and check redendering of this docstring
+        self.log.debug('completed the ``_crossmatch_with_daemon_pool`` method')
+        return batchResults
+
+    def classify_iter(
+            self):
         """
-        self.log.debug('starting the ``_remove_previous_ned_queries`` method')
+        *classify the transients and yield the results for each transient as soon as its mini-batch has been crossmatched and ranked*
 
-        from HMpTy.mysql import conesearch
-        from datetime import datetime, timedelta
+        Mini-batches are crossmatched on a warm worker pool and handed back in completion order, so downstream consumers (e.g. alerting) can act on the first results while the remaining mini-batches are still running, and the full result set is never held in memory. For database runs with ``update=True`` each mini-batch is written to the transient database before its results are yielded. Iteration ends once no transients remain (or after one batch with ``oneRun=True``).
 
-        # 1 DEGREE QUERY RADIUS
-        radius = 60. * 60.
-        updatedCoordinateList = []
-        keepers = []
+        **Return**
 
-        # CALCULATE THE OLDEST RESULTS LIMIT
-        now = datetime.now()
-        td = timedelta(
-            days=self.settings["ned stream refresh rate in days"])
-        refreshLimit = now - td
-        refreshLimit = refreshLimit.strftime("%Y-%m-%d %H:%M:%S")
+        - ``transientId`` -- the transient's id
+        - ``classification`` -- rank-ordered list of classifications for the transient (with the human-readable annotation appended for transients passed in via ``ra``/``dec``)
+        - ``crossmatches`` -- the transient's ranked crossmatches
 
-        raList = []
-        raList[:] = [c[0] for c in coordinateList]
-        decList = []
-        decList[:] = [c[1] for c in coordinateList]
+        **Usage**
 
-        # MATCH COORDINATES AGAINST PREVIOUS NED SEARCHES
-        cs = conesearch(
+        ```python
+        from sherlock import transient_classifier
+        classifier = transient_classifier(
+            log=log,
+            settings=settings,
+            ra=["08:57:57.19", "09:01:11.02"],
+            dec=["+43:25:44.1", "+12:10:41.3"],
+            name=["PS17gx", "PS17gy"]
+        )
+        for transientId, classification, crossmatches in classifier.classify_iter():
+            print(transientId, classification[0])
+        ```
+        """
+        self.log.debug('starting the ``classify_iter`` method')
+
+        from sherlock.commonutils import get_crossmatch_catalogues_column_map
+        from functools import partial
+
+        colMaps = get_crossmatch_catalogues_column_map(
             log=self.log,
-            dbConn=self.cataloguesDbConn,
-            tableName="tcs_helper_ned_query_history",
-            columns="*",
-            ra=raList,
-            dec=decList,
-            radiusArcsec=radius,
-            separations=True,
-            distinct=True,
-            sqlWhere="dateQueried > '%(refreshLimit)s'" % locals(),
-            closest=False
+            dbConn=self.cataloguesDbConn
         )
-        matchIndies, matches = cs.search()
 
-        # DETERMINE WHICH COORDINATES REQUIRE A NED QUERY
-        curatedMatchIndices = []
-        curatedMatches = []
-        for i, m in zip(matchIndies, matches.list):
-            match = False
-            row = m
-            row["separationArcsec"] = row["cmSepArcsec"]
-            raStream = row["raDeg"]
-            decStream = row["decDeg"]
-            radiusStream = row["arcsecRadius"]
-            dateStream = row["dateQueried"]
-            angularSeparation = row["separationArcsec"]
+        if self.transientsDbConn and self.update:
+            self._create_tables_if_not_exist()
+            self._check_photometry_layout()
 
-            if angularSeparation + self.settings["first pass ned search radius arcec"] < radiusStream:
-                curatedMatchIndices.append(i)
-                curatedMatches.append(m)
+        # FINISH ANY WRITES AN INTERRUPTED RUN LEFT PENDING
+        if self.journal:
+            self._replay_checkpointed_writes(colMaps=colMaps)
 
-        # NON MATCHES
-        for i, v in enumerate(coordinateList):
-            if i not in curatedMatchIndices:
-                updatedCoordinateList.append(v)
+        try:
+            while not self.stopRequested:
 
-        self.log.debug('completed the ``_remove_previous_ned_queries`` method')
-        return updatedCoordinateList
+                if self.ra:
+                    transientsMetadataList = self._get_transient_metadata_from_coordinates()
+                else:
+                    transientsMetadataList = self._get_transient_metadata_from_database_list()
+                if not len(transientsMetadataList):
+                    break
 
-    def _update_transient_database(
+                if self.updateNed and self.nedPrefetch:
+                    self._queue_ned_prefetch(
+                        transientsMetadataList=transientsMetadataList
+                    )
+                elif self.updateNed:
+                    self._update_ned_stream(
+                        transientsMetadataList=transientsMetadataList
+                    )
+
+                miniBatchSize = self.miniBatchSize
+                if self.batchController:
+                    miniBatchSize = self.batchController.miniBatchSize
+                if len(transientsMetadataList) > miniBatchSize:
+                    transientsMetadataList = self._sort_transients_by_sky_position(
+                        transientsMetadataList=transientsMetadataList
+                    )
+                theseBatches = [transientsMetadataList[i:i + miniBatchSize]
+                                for i in range(0, len(transientsMetadataList), miniBatchSize)]
+
+                mapfunc = partial(_crossmatch_transient_batch,
+                                  log=self.log, settings=self.settings, colMaps=colMaps)
+                for result in self._get_warm_worker_pool().imap_unordered(mapfunc, theseBatches):
+                    if self.batchController:
+                        self.batchController.record(
+                            transientCount=result["transients"],
+                            seconds=result["seconds"],
+                            matchCount=len(result["crossmatches"])
+                        )
+
+                    classifications, crossmatches = self._rank_mini_batch_crossmatches(
+                        crossmatches=result["crossmatches"],
+                        colMaps=colMaps
+                    )
+                    for transientId in result["transientIds"]:
+                        if transientId not in classifications:
+                            classifications[transientId] = ["ORPHAN"]
+
+                    if self.ra:
+                        classifications = self.update_classification_annotations_and_summaries(
+                            False, True, crossmatches, classifications)
+                        for k, v in classifications.items():
+                            if len(v) == 1 and v[0] == "ORPHAN":
+                                v.append(
+                                    "No contexual information is available for this transient")
+                        if self.lite != False:
+                            crossmatches = self._lighten_return(crossmatches)
+                    elif self.update:
+                        annotations = False
+                        if self.annotateInBatch:
+                            annotations = self._generate_batch_annotations(
+                                crossmatches=crossmatches,
+                                classifications=classifications,
+                                updatePeakMagnitudes=self.updatePeakMags
+                            )
+                        checkpoint = False
+                        if self.journal:
+                            checkpoint = self.journal.record_pending(
+                                transientIds=result["transientIds"],
+                                crossmatches=crossmatches,
+                                classifications=classifications,
+                                annotations=annotations
+                            )
+                        self._update_transient_database(
+                            crossmatches=crossmatches,
+                            classifications=classifications,
+                            transientsMetadataList=[],
+                            colMaps=colMaps,
+                            annotations=annotations
+                        )
+                        if checkpoint:
+                            self.journal.record_complete(checkpoint)
+
+                    # GROUP THE RANKED CROSSMATCHES BY TRANSIENT
+                    transientCrossmatches = {}
+                    for c in crossmatches:
+                        transientCrossmatches.setdefault(
+                            c["transient_object_id"], []).append(c)
+
+                    for transientId in result["transientIds"]:
+                        yield transientId, classifications[transientId], transientCrossmatches.get(transientId, [])
+
+                if self.batchController:
+                    self.batchController.update()
+
+                if self.ra or self.oneRun:
+                    break
+
+                # MOVE THE KEYSET HIGH-WATER MARK PAST THIS BATCH
+                if self.keysetColumn:
+                    self.keysetHighWaterMark = max(
+                        t["id"] for t in transientsMetadataList)
+                    if self.update:
+                        self._set_keyset_high_water_mark(
+                            self.keysetHighWaterMark)
+
+                if self.update and not self.annotateInBatch:
+                    if self.updatePeakMags and self.settings["database settings"]["transients"]["transient peak magnitude query"]:
+                        self.update_peak_magnitudes(
+                            transientIds=[t["id"] for t in transientsMetadataList])
+                    self.update_classification_annotations_and_summaries(
+                        self.updatePeakMags)
+        finally:
+            # ALSO RUNS IF THE CALLER STOPS ITERATING EARLY
+            if self.daemonPool:
+                self.daemonPool.terminate()
+                self.daemonPool.join()
+                self.daemonPool = False
+                self.daemonPoolSize = 0
+
+        self.log.debug('completed the ``classify_iter`` method')
+        return
+
+    def _get_transient_metadata_from_coordinates(
+            self):
+        """*build the transient metadata list from the coordinates (and optional names) passed in via ``ra``, ``dec`` and ``name``*
+
+        **Return**
+
+        - ``transientsMetadataList`` -- list of transient metadata dictionaries
+        """
+        # CONVERT SINGLE TRANSIENTS TO LIST
+        if not isinstance(self.ra, list):
+            self.ra = [self.ra]
+            self.dec = [self.dec]
+            self.name = [self.name]
+
+        # GIVEN TRANSIENTS UNIQUE NAMES IF NOT PROVIDED
+        if not self.name[0]:
+            self.name = []
+            for i, v in enumerate(self.ra):
+                self.name.append("transient_%(i)05d" % locals())
+
+        transientsMetadataList = []
+        for r, d, n in zip(self.ra, self.dec, self.name):
+            transient = {
+                'name': n,
+                'object_classification': None,
+                'dec': d,
+                'id': n,
+                'ra': r
+            }
+            transientsMetadataList.append(transient)
+
+        return transientsMetadataList
+
+    def _rank_mini_batch_crossmatches(
             self,
             crossmatches,
-            classifications,
-            transientsMetadataList,
             colMaps):
-        """ update transient database with classifications and crossmatch results
+        """*split the crossmatches of a mini-batch into individual transients and rank each*
 
         **Key Arguments**
 
-        - ``crossmatches`` -- the crossmatches and associations resulting from the catlaogue crossmatches
-        - ``classifications`` -- the classifications assigned to the transients post-crossmatches (dictionary of rank ordered list of classifications)
-        - ``transientsMetadataList`` -- the list of transient metadata lifted from the database.
+        - ``crossmatches`` -- the crossmatches returned for a single mini-batch
         - ``colMaps`` -- maps of the important column names for each table/view in the crossmatch-catalogues database
 
+        **Return**
 
-        .. todo ::
-
-            - update key arguments values and definitions with defaults
-            - update return values and definitions
-            - update usage examples and text
-            - update docstring text
-            - check sublime snippet exists
-            - clip any useful text to docs mindmap
-            - regenerate the docs and check redendering of this docstring
+        - ``classifications`` -- dictionary of rank-ordered classification lists keyed by transient id
+        - ``crossmatches`` -- the ranked crossmatches
         """
+        from operator import itemgetter
 
-        self.log.debug('starting the ``_update_transient_database`` method')
+        classifications = {}
+        rankedCrossmatches = []
+
+        sublist = sorted(
+            crossmatches, key=itemgetter('transient_object_id'))
+
+        # REORGANISE INTO INDIVIDUAL TRANSIENTS FOR RANKING AND
+        # TOP-LEVEL CLASSIFICATION EXTRACTION
+        batch = []
+        if len(sublist) != 0:
+            transientId = sublist[0]['transient_object_id']
+
+            for s in sublist:
+                if s['transient_object_id'] != transientId:
+                    # RANK TRANSIENT CROSSMATCH BATCH
+                    cl, cr = self._rank_classifications(
+                        batch, colMaps)
+                    rankedCrossmatches.extend(cr)
+                    classifications.update(cl)
+
+                    transientId = s['transient_object_id']
+                    batch = [s]
+                else:
+                    batch.append(s)
+
+            # RANK FINAL BATCH
+            cl, cr = self._rank_classifications(
+                batch, colMaps)
+            classifications.update(cl)
+            rankedCrossmatches.extend(cr)
+
+        return classifications, rankedCrossmatches
+
+    def _get_next_keyset_page(
+            self):
+        """*select the next page of unclassified transients with a primary key above the current high-water mark*
+
+        See ``_keyset_page_query`` for how the page is selected.
+
+        **Return**
+
+        - ``transientsMetadataList`` -- the next page of transients, ordered by primary key
+        """
+        self.log.debug('starting the ``_get_next_keyset_page`` method')
+
+        from fundamentals.mysql import readquery
+
+        sqlQuery = self._keyset_page_query(
+            highWaterMark=self.keysetHighWaterMark
+        )
+
+        transientsMetadataList = readquery(
+            log=self.log,
+            sqlQuery=sqlQuery,
+            dbConn=self.transientsDbConn,
+            quiet=False
+        )
+
+        self.log.debug('completed the ``_get_next_keyset_page`` method')
+        return transientsMetadataList
+
+    def _keyset_page_query(
+            self,
+            highWaterMark=None):
+        """*wrap the ``transient query`` to select the page of transients with an ``id`` above the high-water mark*
+
+        The query is used unedited as a derived table: ``select * from (<transient query>) as keysetPage where keysetPage.id > <high-water mark> order by keysetPage.id limit <large batch size>``. A query ending in its own ``limit`` can't be paged this way (it would limit the transients before the page is selected), so it raises a ``ValueError``.
+
+        **Key Arguments**
+
+        - ``highWaterMark`` -- the largest ``id`` already selected. Default *None* (the first page)
+
+        **Return**
+
+        - ``sqlQuery`` -- the page query
+        """
+        import re
+
+        transientQuery = self.settings["database settings"][
+            "transients"]["transient query"].strip().rstrip(";").strip()
+        if re.search(r"\blimit\s+\d+(\s*,\s*\d+)?(\s+offset\s+\d+)?$", transientQuery, re.IGNORECASE):
+            message = "the `transient query` can't end with a `limit` clause when `transient keyset pagination` is on (the pages are limited to the large batch size)"
+            self.log.error(message)
+            raise ValueError(message)
+
+        largeBatchSize = int(self.largeBatchSize)
+        where = ""
+        if highWaterMark is not None:
+            if isinstance(highWaterMark, str):
+                highWaterMark = "'%s'" % (highWaterMark.replace("'", "''"),)
+            where = " where keysetPage.id > %(highWaterMark)s" % locals()
+
+        sqlQuery = """select * from (%(transientQuery)s) as keysetPage%(where)s order by keysetPage.id limit %(largeBatchSize)s""" % locals()
+        return sqlQuery
+
+    def _keyset_state_file(
+            self):
+        """*the path to the local file used to persist the keyset high-water marks, and the key for this transient table within it*
+
+        **Return**
+
+        - ``stateFile`` -- path to the JSON state file (``transient keyset state file`` setting)
+        - ``stateKey`` -- ``<host>/<database>/<table>`` key of this transient table
+        """
+        stateFile = "~/.config/sherlock/transient_keyset.json"
+        if "transient keyset state file" in self.settings and self.settings["transient keyset state file"]:
+            stateFile = self.settings["transient keyset state file"]
+        stateFile = os.path.expanduser(stateFile)
+
+        transientSettings = self.settings["database settings"]["transients"]
+        stateKey = "%s/%s/%s" % (transientSettings.get("host"), transientSettings.get(
+            "db"), transientSettings.get("transient table"))
+        return stateFile, stateKey
+
+    def _get_keyset_high_water_mark(
+            self):
+        """*read the persisted keyset high-water mark so an interrupted run resumes where it left off*
+
+        **Return**
+
+        - ``highWaterMark`` -- the largest transient primary key already classified in the current pass, or *None* to start from the beginning
+        """
+        self.log.debug('starting the ``_get_keyset_high_water_mark`` method')
+
+        import json
+
+        stateFile, stateKey = self._keyset_state_file()
+        highWaterMark = None
+        if os.path.exists(stateFile):
+            try:
+                with open(stateFile, 'r') as f:
+                    highWaterMark = json.load(f).get(stateKey)
+            except ValueError:
+                self.log.warning(
+                    'could not parse the keyset state file %(stateFile)s, starting from the beginning of the transient table' % locals())
+        if highWaterMark is not None:
+            self.log.info(
+                'resuming keyset pagination of the transient table after id %(highWaterMark)s' % locals())
+
+        self.log.debug('completed the ``_get_keyset_high_water_mark`` method')
+        return highWaterMark
+
+    def _set_keyset_high_water_mark(
+            self,
+            highWaterMark):
+        """*persist the keyset high-water mark (None clears it at the end of a pass)*
+
+        **Key Arguments**
+
+        - ``highWaterMark`` -- the largest transient primary key classified so far, or *None*
+        """
+        self.log.debug('starting the ``_set_keyset_high_water_mark`` method')
+
+        import json
+
+        stateFile, stateKey = self._keyset_state_file()
+        state = {}
+        if os.path.exists(stateFile):
+            try:
+                with open(stateFile, 'r') as f:
+                    state = json.load(f)
+            except ValueError:
+                state = {}
+        else:
+            # Recursively create missing directories
+            stateDir = os.path.dirname(stateFile)
+            if stateDir and not os.path.exists(stateDir):
+                os.makedirs(stateDir)
+
+        if highWaterMark is None:
+            state.pop(stateKey, None)
+        else:
+            state[stateKey] = highWaterMark
+
+        # WRITE THEN RENAME SO A KILLED PROCESS NEVER LEAVES A HALF-WRITTEN FILE
+        tmpFile = stateFile + ".tmp"
+        with open(tmpFile, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmpFile, stateFile)
+
+        self.log.debug('completed the ``_set_keyset_high_water_mark`` method')
+        return None
+
+    def _checkpoint_journal_path(
+            self):
+        """*the path to the checkpoint journal of this transient table*
+
+        **Return**
+
+        - ``pathToJournal`` -- ``<checkpoint journal directory>/<host>_<database>_<table>.jsonl``
+        """
+        import re
+
+        journalDir = "~/.config/sherlock/checkpoints"
+        if "checkpoint journal directory" in self.settings and self.settings["checkpoint journal directory"]:
+            journalDir = self.settings["checkpoint journal directory"]
+        stateFile, stateKey = self._keyset_state_file()
+        journalName = re.sub(r'[^a-zA-Z0-9\-\.]+', '_', stateKey)
+        return os.path.join(os.path.expanduser(journalDir), journalName + ".jsonl")
+
+    def _replay_checkpointed_writes(
+            self,
+            colMaps):
+        """*write the results of any batches an interrupted run crossmatched but did not finish writing, straight from the checkpoint journal's spills*
+
+        **Key Arguments**
+
+        - ``colMaps`` -- maps of the important column names for each table/view in the crossmatch-catalogues database
+        """
+        self.log.debug('starting the ``_replay_checkpointed_writes`` method')
+
+        for batchKey, payload in self.journal.outstanding():
+            count = len(payload["classifications"])
+            print(
+                "REPLAYING THE UNFINISHED WRITE OF %(count)s CHECKPOINTED TRANSIENT RESULTS" % locals())
+            self._update_transient_database(
+                crossmatches=payload["crossmatches"],
+                classifications=payload["classifications"],
+                transientsMetadataList=[],
+                colMaps=colMaps,
+                annotations=payload["annotations"]
+            )
+            self.journal.record_complete(batchKey)
+
+        self.log.debug('completed the ``_replay_checkpointed_writes`` method')
+        return None
+
+    def _estimate_keyset_progress(
+            self):
+        """*estimate how far through the transient table the keyset pass has got from the primary-key range (cheap index lookups, no counting)*
+
+        **Return**
+
+        - ``fraction`` -- the approximate fraction of the key range already walked (*None* if it cannot be estimated)
+        """
+        self.log.debug('starting the ``_estimate_keyset_progress`` method')
+
+        from fundamentals.mysql import readquery
+
+        transientSettings = self.settings["database settings"]["transients"]
+        primaryIdCol = transientSettings["transient primary id column"]
+        transientTable = transientSettings["transient table"]
+
+        fraction = None
+        highWaterMark = self.keysetHighWaterMark
+        if highWaterMark is None or isinstance(highWaterMark, str):
+            print("STARTING A KEYSET PASS THROUGH THE TRANSIENT TABLE")
+            return fraction
+
+        sqlQuery = """select min(%(primaryIdCol)s) as minId, max(%(primaryIdCol)s) as maxId from %(transientTable)s""" % locals()
+        rows = readquery(
+            log=self.log,
+            sqlQuery=sqlQuery,
+            dbConn=self.transientsDbConn,
+        )
+        if len(rows) and rows[0]["minId"] is not None and rows[0]["maxId"] != rows[0]["minId"]:
+            minId = rows[0]["minId"]
+            maxId = rows[0]["maxId"]
+            fraction = min(1., max(
+                0., float(highWaterMark - minId) / float(maxId - minId)))
+            percent = fraction * 100.
+            print(
+                "keyset pass through the transient table is ~%(percent)0.1f%% complete (id %(highWaterMark)s of %(minId)s-%(maxId)s)" % locals())
+
+        self.log.debug('completed the ``_estimate_keyset_progress`` method')
+        return fraction
+
+    def _sort_transients_by_sky_position(
+            self,
+            transientsMetadataList):
+        """*order the transients along a space-filling curve (HTM or HEALPix) so that consecutive transients, and therefore each mini-batch, cover a compact region of sky*
+
+        The curve and its resolution are set with the ``sky sort transients`` (htm|healpix|False) and ``sky sort level`` settings. HEALPix ordering needs the ``healpy`` package; without it the transients are sorted along the HTM curve at the same level instead.
+
+        **Key Arguments**
+
+        - ``transientsMetadataList`` -- the list of transient metadata dictionaries (each with ``ra`` and ``dec`` keys in decimal degrees)
+
+        **Return**
+
+        - ``transientsMetadataList`` -- the same transients ordered by their position along the curve
+
+        **Usage**
+
+        ```python
+        transientsMetadataList = classifier._sort_transients_by_sky_position(
+            transientsMetadataList=transientsMetadataList
+        )
+        ```
+        """
+        self.log.debug(
+            'starting the ``_sort_transients_by_sky_position`` method')
+
+        import numpy as np
+
+        curve = False
+        if "sky sort transients" in self.settings and self.settings["sky sort transients"]:
+            curve = str(self.settings["sky sort transients"]).lower()
+        if not curve or len(transientsMetadataList) < 2:
+            return transientsMetadataList
+
+        level = 10
+        if "sky sort level" in self.settings and self.settings["sky sort level"]:
+            level = int(self.settings["sky sort level"])
+
+        raArray = np.array([float(t["ra"]) for t in transientsMetadataList])
+        decArray = np.array([float(t["dec"]) for t in transientsMetadataList])
+
+        if curve not in ("htm", "healpix"):
+            message = "`sky sort transients` must be one of htm, healpix or False (not `%(curve)s`)" % locals()
+            self.log.error(message)
+            raise ValueError(message)
+
+        if curve == "healpix":
+            try:
+                import healpy as hp
+            except ImportError:
+                self.log.warning(
+                    "the `healpy` package is not installed, so transients are sorted along the HTM curve instead of HEALPix")
+                curve = "htm"
+
+        if curve == "healpix":
+            pixels = hp.ang2pix(2**level, raArray, decArray,
+                                nest=True, lonlat=True)
+        else:
+            # HTM IDS ARE NESTED (CHILDREN OF A TRIXEL SHARE ITS ID PREFIX) SO
+            # SORTING ON THEM WALKS THE SKY ALONG A QUADTREE CURVE
+            from HMpTy import HTM
+            mesh = HTM(
+                depth=level,
+                log=self.log
+            )
+            pixels = mesh.lookup_id(raArray, decArray)
+
+        order = np.argsort(np.asarray(pixels), kind="stable")
+        transientsMetadataList = [transientsMetadataList[i] for i in order]
+
+        self.log.debug(
+            'completed the ``_sort_transients_by_sky_position`` method')
+        return transientsMetadataList
+
+    def _update_ned_stream(
+        self,
+        transientsMetadataList
+    ):
+        """ update the NED stream within the catalogues database at the locations of the transients
+
+        **Key Arguments**
+
+        - ``transientsMetadataList`` -- the list of transient metadata lifted from the database.
+
+
+        .. todo ::
+
+            - update key arguments values and definitions with defaults
+            - update return values and definitions
+            - update usage examples and text
+            - update docstring text
+            - check sublime snippet exists
+            - clip any useful text to docs mindmap
+            - regenerate the docs and check redendering of this docstring
+        """
+        self.log.debug('starting the ``_update_ned_stream`` method')
+
+        from sherlock.imports import ned
+
+        coordinateList = []
+        for i in transientsMetadataList:
+            # thisList = str(i["ra"]) + " " + str(i["dec"])
+            thisList = (i["ra"], i["dec"])
+            coordinateList.append(thisList)
+
+        coordinateList = self._remove_previous_ned_queries(
+            coordinateList=coordinateList
+        )
+
+        # MINIMISE COORDINATES IN LIST TO REDUCE NUMBER OF REQUIRE NED QUERIES
+        coordinateList = self._consolidate_coordinateList(
+            coordinateList=coordinateList
+        )
+
+        stream = ned(
+            log=self.log,
+            settings=self.settings,
+            coordinateList=coordinateList,
+            radiusArcsec=self.settings["ned stream search radius arcec"]
+        )
+        stream.ingest()
+
+        # ADD THE QUERIES JUST MADE TO THE NED COVERAGE MAP
+        if self.nedCoverage:
+            self.nedCoverage.sync()
+
+        self.log.debug('completed the ``_update_ned_stream`` method')
+        return None
+
+    def prefetch_ned(
+            self):
+        """*run the NED prefetch service - refresh the NED stream around the locations queued in the ``ned_prefetch_queue`` and flag their transients for reclassification*
+
+        With ``ned prefetch: True`` the classifier no longer waits on NED. It queues the transients without recent NED coverage and crossmatches them against the coverage that exists; this service fetches the queued locations (coverage-filtered and consolidated as in ``_update_ned_stream``) and then resets the classification of the queued transients that have since been classified, so they are picked up again by the ``transient query``. Reclassification is cheap for the transients whose results don't change, as their unchanged results are not rewritten.
+
+        A transient still being classified when its location is fetched is flagged once its classification lands (or given up on after a day). In daemon mode the service keeps polling the queue with the daemon's poll backoff until SIGTERM/ctrl-c, otherwise it stops once the queue is empty.
+
+        **Usage**
+
+        ```python
+        from sherlock import transient_classifier
+        prefetcher = transient_classifier(
+            log=log,
+            settings=settings,
+            daemonMode=True
+        )
+        prefetcher.prefetch_ned()
+        ```
+        """
+        self.log.debug('starting the ``prefetch_ned`` method')
+
+        import time
+
+        queue = self._get_ned_prefetch_queue()
+        if self.daemonMode:
+            self._install_shutdown_handlers()
+
+        fetched = 0
+        while not self.stopRequested:
+            self._flag_prefetched_transients()
+
+            rows = queue.next_batch(limit=self.largeBatchSize)
+            if not len(rows):
+                if not self.daemonMode:
+                    break
+                # BACK OFF WHILE THE QUEUE IS EMPTY
+                pollSeconds = self.pollSeconds
+                waited = 0.
+                while waited < pollSeconds and not self.stopRequested:
+                    tick = min(self.minPollSeconds, pollSeconds - waited)
+                    time.sleep(tick)
+                    waited += tick
+                self.pollSeconds = min(pollSeconds * 2., self.maxPollSeconds)
+                self.transientsDbConn.ping(reconnect=True)
+                self.cataloguesDbConn.ping(reconnect=True)
+                continue
+            self.pollSeconds = self.minPollSeconds
+
+            count = len(rows)
+            print("refreshing the NED stream around %(count)s queued locations" % locals())
+            self._update_ned_stream(
+                transientsMetadataList=[
+                    {"ra": r["raDeg"], "dec": r["decDeg"]} for r in rows]
+            )
+            queue.mark_fetched(primaryIds=[r["primaryId"] for r in rows])
+            fetched += count
+
+        self._flag_prefetched_transients()
+        queue.purge()
+        if self.daemonMode:
+            self._shutdown_daemon()
+
+        self.log.info(
+            'refreshed the NED stream around %(fetched)s queued locations' % locals())
+
+        self.log.debug('completed the ``prefetch_ned`` method')
+        return None
+
+    def _get_ned_prefetch_queue(
+            self):
+        """*the NED prefetch queue (created on first use)*
+        """
+        if not self.nedPrefetchQueue:
+            from sherlock.commonutils import ned_prefetch_queue
+            self.nedPrefetchQueue = ned_prefetch_queue(
+                log=self.log,
+                dbConn=self.cataloguesDbConn,
+                settings=self.settings
+            )
+        return self.nedPrefetchQueue
+
+    def _queue_ned_prefetch(
+            self,
+            transientsMetadataList):
+        """*queue the transients without recent local NED coverage for the NED prefetcher, rather than querying NED before they are crossmatched*
+
+        **Key Arguments**
+
+        - ``transientsMetadataList`` -- the list of transient metadata lifted from the database.
+
+        **Return**
+
+        - ``queued`` -- the number of transients queued
+        """
+        self.log.debug('starting the ``_queue_ned_prefetch`` method')
+
+        queue = self._get_ned_prefetch_queue()
+        coordinateList = self._remove_previous_ned_queries(
+            coordinateList=list(dict.fromkeys(
+                (t["ra"], t["dec"]) for t in transientsMetadataList))
+        )
+        queuedCoordinates, queuedIds = queue.entries_for(
+            transientsMetadataList=transientsMetadataList,
+            coordinateList=coordinateList
+        )
+
+        queued = queue.enqueue(
+            coordinateList=queuedCoordinates,
+            transientIds=queuedIds
+        )
+
+        self.log.debug('completed the ``_queue_ned_prefetch`` method')
+        return queued
+
+    def _flag_prefetched_transients(
+            self):
+        """*reset the classification of the transients whose queued location the NED prefetcher has fetched, so they are classified again with the new NED data*
+
+        By default the ``transient classification column`` is set back to NULL, which suits a ``transient query`` selecting the transients with no classification. Transient queries of another shape set ``ned prefetch reclassify sql`` to the statement that queues transients for reclassification (``{ids}`` is replaced with the quoted list of transient ids). The transients are also forgotten by the ``checkpoint journal`` of the transient table so a resumed or running ``dbmatch`` pass does not skip them.
+
+        **Return**
+
+        - ``flagged`` -- the number of transients flagged for reclassification
+        """
+        self.log.debug('starting the ``_flag_prefetched_transients`` method')
+
+        from fundamentals.mysql import readquery, writequery
+
+        queue = self._get_ned_prefetch_queue()
+        rows = queue.fetched_transients()
+        if not len(rows):
+            self.log.debug(
+                'completed the ``_flag_prefetched_transients`` method')
+            return 0
+
+        transientTable = self.settings["database settings"][
+            "transients"]["transient table"]
+        transientTableClassCol = self.settings["database settings"][
+            "transients"]["transient classification column"]
+        transientTableIdCol = self.settings["database settings"][
+            "transients"]["transient primary id column"]
+
+        # ONLY TRANSIENTS ALREADY CLASSIFIED ARE RESET - ANY STILL BEING
+        # CLASSIFIED ARE FLAGGED ONCE THEIR CLASSIFICATION LANDS
+        transientIds = list(dict.fromkeys(r["transientId"] for r in rows))
+        classified = []
+        for i in range(0, len(transientIds), 10000):
+            ids = ('", "').join(str(t).replace('"', '\\"')
+                                for t in transientIds[i:i + 10000])
+            sqlQuery = """select `%(transientTableIdCol)s` as id from `%(transientTable)s` where `%(transientTableIdCol)s` in ("%(ids)s") and `%(transientTableClassCol)s` is not null""" % locals()
+            classified += [str(r["id"]) for r in readquery(
+                log=self.log,
+                sqlQuery=sqlQuery,
+                dbConn=self.transientsDbConn,
+            )]
+
+        reclassifySql = False
+        if "ned prefetch reclassify sql" in self.settings and self.settings["ned prefetch reclassify sql"]:
+            reclassifySql = self.settings["ned prefetch reclassify sql"]
+        if len(classified) and reclassifySql:
+            for i in range(0, len(classified), 10000):
+                ids = ", ".join('"%s"' % str(t).replace('"', '\\"')
+                                for t in classified[i:i + 10000])
+                writequery(
+                    log=self.log,
+                    sqlQuery=reclassifySql.replace("{ids}", ids),
+                    dbConn=self.transientsDbConn
+                )
+        elif len(classified):
+            sqlQuery = """update `%(transientTable)s` set `%(transientTableClassCol)s` = null where `%(transientTableIdCol)s` = %%s""" % locals()
+            writequery(
+                log=self.log,
+                sqlQuery=sqlQuery,
+                dbConn=self.transientsDbConn,
+                manyValueList=[(t,) for t in classified]
+            )
+
+        # A JOURNALLED PASS MUST NOT SKIP THEM AS ALREADY WRITTEN
+        if len(classified) and "checkpoint journal" in self.settings and self.settings["checkpoint journal"]:
+            journal = self.journal
+            if not journal:
+                from sherlock.commonutils import checkpoint_journal
+                journal = checkpoint_journal(
+                    log=self.log,
+                    pathToJournal=self._checkpoint_journal_path(),
+                    settings=self.settings
+                )
+            journal.forget([int(t) if t.isdigit() else t for t in classified])
+
+        queue.mark_flagged(primaryIds=queue.done_entries(
+            rows=rows,
+            flaggedIds=classified
+        ))
+
+        flagged = len(classified)
+        if flagged:
+            self.log.info(
+                'flagged %(flagged)s transients for reclassification with newly fetched NED data' % locals())
+
+        self.log.debug('completed the ``_flag_prefetched_transients`` method')
+        return flagged
+
+    def _remove_previous_ned_queries(
+            self,
+            coordinateList):
+        """iterate through the transient locations to see if we have recent local NED coverage of that area already
+
+        With ``ned coverage map: True`` the check is a lookup in the locally persisted ``ned_coverage_map`` instead of a conesearch of the ``tcs_helper_ned_query_history`` table.
+
+        **Key Arguments**
+
+        - ``coordinateList`` -- set of coordinate to check for previous queries
+
+
+        **Return**
+
+        - ``updatedCoordinateList`` -- coordinate list with previous queries removed
+
+
+        .. todo ::
+
+            - update key arguments values and definitions with defaults
+            - update return values and definitions
+            - update usage examples and text
+            - update docstring text
+            - check sublime snippet exists
+            - clip any useful text to docs mindmap
+            - regenerate the docs and check redendering of this docstring
+        """
+        self.log.debug('starting the ``_remove_previous_ned_queries`` method')
+
+        if "ned coverage map" in self.settings and self.settings["ned coverage map"]:
+            if not self.nedCoverage:
+                from sherlock.commonutils import ned_coverage_map
+                self.nedCoverage = ned_coverage_map(
+                    log=self.log,
+                    dbConn=self.cataloguesDbConn,
+                    settings=self.settings
+                )
+            # PICK UP QUERIES MADE SINCE THE LAST SYNC (E.G. BY OTHER PROCESSES)
+            self.nedCoverage.sync()
+            updatedCoordinateList = self.nedCoverage.uncovered(
+                coordinateList=coordinateList
+            )
+            self.log.debug(
+                'completed the ``_remove_previous_ned_queries`` method')
+            return updatedCoordinateList
+
+        from HMpTy.mysql import conesearch
+        from datetime import datetime, timedelta
+
+        # 1 DEGREE QUERY RADIUS
+        radius = 60. * 60.
+        updatedCoordinateList = []
+        keepers = []
+
+        # CALCULATE THE OLDEST RESULTS LIMIT
+        now = datetime.now()
+        td = timedelta(
+            days=self.settings["ned stream refresh rate in days"])
+        refreshLimit = now - td
+        refreshLimit = refreshLimit.strftime("%Y-%m-%d %H:%M:%S")
+
+        raList = []
+        raList[:] = [c[0] for c in coordinateList]
+        decList = []
+        decList[:] = [c[1] for c in coordinateList]
+
+        # MATCH COORDINATES AGAINST PREVIOUS NED SEARCHES
+        cs = conesearch(
+            log=self.log,
+            dbConn=self.cataloguesDbConn,
+            tableName="tcs_helper_ned_query_history",
+            columns="*",
+            ra=raList,
+            dec=decList,
+            radiusArcsec=radius,
+            separations=True,
+            distinct=True,
+            sqlWhere="dateQueried > '%(refreshLimit)s'" % locals(),
+            closest=False
+        )
+        matchIndies, matches = cs.search()
+
+        # DETERMINE WHICH COORDINATES REQUIRE A NED QUERY
+        curatedMatchIndices = set()
+        curatedMatches = []
+        for i, m in zip(matchIndies, matches.list):
+            match = False
+            row = m
+            row["separationArcsec"] = row["cmSepArcsec"]
+            raStream = row["raDeg"]
+            decStream = row["decDeg"]
+            radiusStream = row["arcsecRadius"]
+            dateStream = row["dateQueried"]
+            angularSeparation = row["separationArcsec"]
+
+            if angularSeparation + self.settings["first pass ned search radius arcec"] < radiusStream:
+                curatedMatchIndices.add(i)
+                curatedMatches.append(m)
+
+        # NON MATCHES
+        for i, v in enumerate(coordinateList):
+            if i not in curatedMatchIndices:
+                updatedCoordinateList.append(v)
+
+        self.log.debug('completed the ``_remove_previous_ned_queries`` method')
+        return updatedCoordinateList
+
+    def _update_transient_database(
+            self,
+            crossmatches,
+            classifications,
+            transientsMetadataList,
+            colMaps,
+            annotations=False):
+        """ update transient database with classifications and crossmatch results
+
+        **Key Arguments**
+
+        - ``crossmatches`` -- the crossmatches and associations resulting from the catlaogue crossmatches
+        - ``classifications`` -- the classifications assigned to the transients post-crossmatches (dictionary of rank ordered list of classifications)
+        - ``transientsMetadataList`` -- the list of transient metadata lifted from the database.
+        - ``colMaps`` -- maps of the important column names for each table/view in the crossmatch-catalogues database
+        - ``annotations`` -- dictionary of annotation columns (``annotation``, ``annotation_template``, ``annotation_params``, ``summary`` and ``separationArcsec``) keyed by transient id, written with the classification rows. Default *False*
+
+
+        .. todo ::
+
+            - update key arguments values and definitions with defaults
+            - update return values and definitions
+            - update usage examples and text
+            - update docstring text
+            - check sublime snippet exists
+            - clip any useful text to docs mindmap
+            - regenerate the docs and check redendering of this docstring
+        """
+
+        self.log.debug('starting the ``_update_transient_database`` method')
 
         import time
         from fundamentals.mysql import insert_list_of_dictionaries_into_database_tables
@@ -744,17 +1862,88 @@ class transient_classifier(object):
 
         start_time = time.time()
         print("UPDATING TRANSIENTS DATABASE WITH RESULTS")
-        print("DELETING OLD RESULTS")
 
-        now = datetime.now()
-        now = now.strftime("%Y-%m-%d_%H-%M-%S-%f")
+        now = datetime.now()
+        now = now.strftime("%Y-%m-%d_%H-%M-%S-%f")
+
+        transientTable = self.settings["database settings"][
+            "transients"]["transient table"]
+        transientTableClassCol = self.settings["database settings"][
+            "transients"]["transient classification column"]
+        transientTableIdCol = self.settings["database settings"][
+            "transients"]["transient primary id column"]
+
+        # ONLY PERSIST THE TOP-N RANKED CROSSMATCHES OF EACH TRANSIENT
+        if "persist top n crossmatches" in self.settings and self.settings["persist top n crossmatches"]:
+            crossmatches = self._top_ranked_crossmatches(
+                crossmatches=crossmatches,
+                topN=int(self.settings["persist top n crossmatches"])
+            )
+
+        # DIFFERENTIAL WRITES - ONLY REWRITE TRANSIENTS WHOSE RESULTS CHANGED
+        fingerprints = False
+        if "differential result writes" in self.settings and self.settings["differential result writes"]:
+            crossmatches, classifications, fingerprints = self._drop_unchanged_results(
+                crossmatches=crossmatches,
+                classifications=classifications
+            )
+            if not len(classifications):
+                print("NO TRANSIENT RESULTS HAVE CHANGED - NOTHING TO WRITE")
+                self.log.debug(
+                    'completed the ``_update_transient_database`` method')
+                return None
+
+        # MAKE SURE THE ID-RANGE PARTITIONS FOR THIS BATCH EXIST (CACHED BOUND -
+        # ONLY ALTERS THE TABLES WHEN THE BATCH REACHES PAST IT)
+        if self.resultPartitioner and self.resultPartitioner.scheme == "id" and len(classifications):
+            self.resultPartitioner.ensure_partitions(
+                maxTransientId=max(classifications.keys()))
+
+        # ONLY THE BANDS PRESENT ARE WRITTEN, PACKED INTO THE `photometry` COLUMN
+        if self.sparsePhotometry:
+            from sherlock.commonutils import pack_photometry
+            crossmatches = pack_photometry(
+                log=self.log,
+                crossmatches=crossmatches
+            )
+
+        # BULK-LOAD WRITE PATH - STAGE THE RESULTS THEN SWAP THEM IN WITH
+        # SET-BASED SQL
+        if "bulk write results" in self.settings and self.settings["bulk write results"]:
+            from sherlock.commonutils import bulk_result_writer
+            writer = bulk_result_writer(
+                log=self.log,
+                dbConn=self.transientsDbConn,
+                settings=self.settings
+            )
+            replaceIds = list(classifications.keys())
+            writer.replace_rows(
+                dbTableName="sherlock_crossmatches",
+                dictList=crossmatches,
+                replaceIds=replaceIds
+            )
+            inserts = []
+            for k, v in list(classifications.items()):
+                inserts.append({
+                    "transient_object_id": k,
+                    "classification": v[0]
+                })
+                if fingerprints:
+                    inserts[-1]["fingerprint"] = fingerprints[k]
+                if annotations and k in annotations:
+                    inserts[-1].update(annotations[k])
+            writer.replace_rows(
+                dbTableName="sherlock_classifications",
+                dictList=inserts,
+                replaceIds=replaceIds
+            )
+            print("FINISHED BULK WRITING RESULTS TO THE TRANSIENT DATABASE: %d" %
+                  (time.time() - start_time,))
+            self.log.debug(
+                'completed the ``_update_transient_database`` method')
+            return None
 
-        transientTable = self.settings["database settings"][
-            "transients"]["transient table"]
-        transientTableClassCol = self.settings["database settings"][
-            "transients"]["transient classification column"]
-        transientTableIdCol = self.settings["database settings"][
-            "transients"]["transient primary id column"]
+        print("DELETING OLD RESULTS")
 
         # COMBINE ALL CROSSMATCHES INTO A LIST OF DICTIONARIES TO DUMP INTO
         # DATABASE TABLE
@@ -806,6 +1995,10 @@ class transient_classifier(object):
                 "transient_object_id": k,
                 "classification": v[0]
             }
+            if fingerprints:
+                thisInsert["fingerprint"] = fingerprints[k]
+            if annotations and k in annotations:
+                thisInsert.update(annotations[k])
             inserts.append(thisInsert)
 
         print("FINISHED UPDATING CLASSIFICATIONS IN TRANSIENT TABLE/UPDATING sherlock_classifications TABLE: %d" %
@@ -831,6 +2024,173 @@ class transient_classifier(object):
         self.log.debug('completed the ``_update_transient_database`` method')
         return None
 
+    def _drop_unchanged_results(
+            self,
+            crossmatches,
+            classifications):
+        """*remove the transients whose ranked results are identical to those already stored, so only changed transients are rewritten*
+
+        Each transient's results are reduced to a fingerprint (see ``_fingerprint_transient_results``) which is compared against the ``fingerprint`` stored with its row in ``sherlock_classifications``. Unchanged transients are skipped, but their classification is still copied to the transient table so they drop out of the ``transient query``.
+
+        **Key Arguments**
+
+        - ``crossmatches`` -- the ranked crossmatches for the batch
+        - ``classifications`` -- the classifications for the batch (dictionary of rank ordered lists keyed by transient id)
+
+        **Return**
+
+        - ``crossmatches`` -- the crossmatches of the changed transients only
+        - ``classifications`` -- the classifications of the changed transients only
+        - ``fingerprints`` -- dictionary of the new fingerprints of the changed transients
+        """
+        self.log.debug('starting the ``_drop_unchanged_results`` method')
+
+        from fundamentals.mysql import readquery, writequery
+
+        transientTable = self.settings["database settings"][
+            "transients"]["transient table"]
+        transientTableClassCol = self.settings["database settings"][
+            "transients"]["transient classification column"]
+        transientTableIdCol = self.settings["database settings"][
+            "transients"]["transient primary id column"]
+
+        transientCrossmatches = {}
+        for c in crossmatches:
+            transientCrossmatches.setdefault(
+                c["transient_object_id"], []).append(c)
+
+        fingerprints = {}
+        for k, v in classifications.items():
+            fingerprints[k] = self._fingerprint_transient_results(
+                classification=v,
+                crossmatches=transientCrossmatches.get(k, [])
+            )
+
+        transientIDs = ",".join([str(c) for c in classifications.keys()])
+        sqlQuery = """select transient_object_id, fingerprint from sherlock_classifications where transient_object_id in (%(transientIDs)s) and fingerprint is not null""" % locals()
+        rows = readquery(
+            log=self.log,
+            sqlQuery=sqlQuery,
+            dbConn=self.transientsDbConn,
+        )
+        stored = {r["transient_object_id"]: r["fingerprint"] for r in rows}
+
+        unchanged = [k for k in classifications.keys() if k in stored and stored[k] == fingerprints[k]]
+
+        # SKIPPED TRANSIENTS STILL NEED THEIR CLASSIFICATION IN THE TRANSIENT
+        # TABLE (NORMALLY SET BY THE INSERT TRIGGER) - ONE UPDATE PER CLASS
+        byClassification = {}
+        for k in unchanged:
+            byClassification.setdefault(
+                classifications[k][0], []).append(str(k))
+        for classification, ids in byClassification.items():
+            ids = ",".join(ids)
+            sqlQuery = """update `%(transientTable)s` set `%(transientTableClassCol)s` = "%(classification)s" where `%(transientTableIdCol)s` in (%(ids)s)""" % locals()
+            writequery(
+                log=self.log,
+                sqlQuery=sqlQuery,
+                dbConn=self.transientsDbConn,
+            )
+
+        unchanged = set(unchanged)
+        total = len(classifications)
+        skipped = len(unchanged)
+        print("%(skipped)s of %(total)s transients are unchanged since they were last classified - skipping their result writes" % locals())
+
+        classifications = {k: v for k, v in classifications.items()
+                           if k not in unchanged}
+        crossmatches = [c for c in crossmatches if c["transient_object_id"] not in unchanged]
+        fingerprints = {k: v for k, v in fingerprints.items()
+                        if k not in unchanged}
+
+        self.log.debug('completed the ``_drop_unchanged_results`` method')
+        return crossmatches, classifications, fingerprints
+
+    def _fingerprint_transient_results(
+            self,
+            classification,
+            crossmatches):
+        """*a short hash of a transient's ranked classification results*
+
+        Built from the top classification and, for each ranked crossmatch, the catalogue, catalogue object id, rank, merged rank, association type, separation, distance and magnitude values that feed the stored rows and annotations.
+
+        **Key Arguments**
+
+        - ``classification`` -- the transient's rank ordered list of classifications
+        - ``crossmatches`` -- the transient's ranked crossmatches
+
+        **Return**
+
+        - ``fingerprint`` -- 40 character hex digest
+
+        **Usage**
+
+        ```python
+        fingerprint = classifier._fingerprint_transient_results(
+            classification=["SN"],
+            crossmatches=crossmatches
+        )
+        ```
+        """
+        import hashlib
+
+        keys = ["catalogue_view_name", "catalogue_object_id", "rank", "merged_rank", "association_type",
+                "separationArcsec", "physical_separation_kpc", "z", "photoZ", "direct_distance", "transientAbsMag"] + self.filterPreference
+
+        def normalise(value):
+            # ROUND FLOATS SO NUMERICAL NOISE DOES NOT COUNT AS A CHANGE
+            if isinstance(value, float):
+                if value != value:
+                    return None
+                return round(value, 4)
+            return value
+
+        ranked = sorted(crossmatches, key=lambda c: (
+            c.get("rank") or 0, str(c.get("catalogue_object_id"))))
+        parts = [str(classification[0])]
+        for c in ranked:
+            parts.append("|".join([str(normalise(c.get(k))) for k in keys]))
+
+        return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def _top_ranked_crossmatches(
+            self,
+            crossmatches,
+            topN):
+        """*trim ranked crossmatches to the top-N ranked sources of each transient*
+
+        The catalogue entries that were merged into one of the kept sources (``merged_rank`` <= N) are kept with it.
+
+        **Key Arguments**
+
+        - ``crossmatches`` -- the ranked crossmatches
+        - ``topN`` -- the number of ranked sources to keep per transient
+
+        **Return**
+
+        - ``crossmatches`` -- the trimmed crossmatches
+
+        **Usage**
+
+        ```python
+        crossmatches = classifier._top_ranked_crossmatches(
+            crossmatches=crossmatches,
+            topN=3
+        )
+        ```
+        """
+        self.log.debug('starting the ``_top_ranked_crossmatches`` method')
+
+        keep = []
+        for c in crossmatches:
+            rank = c.get("rank")
+            mergedRank = c.get("merged_rank")
+            if (rank and rank <= topN) or (mergedRank and mergedRank <= topN):
+                keep.append(c)
+
+        self.log.debug('completed the ``_top_ranked_crossmatches`` method')
+        return keep
+
     def _rank_classifications(
             self,
             crossmatchArray,
@@ -1420,6 +2780,8 @@ class transient_classifier(object):
             coordinateList):
         """*match the coordinate list against itself with the parameters of the NED search queries to minimise duplicated NED queries*
 
+        With ``ned query consolidation: disc cover`` the query centres are chosen with ``disc_cover`` so that every transient sits at least the ``first pass ned search radius arcec`` inside a query disc, using as few queries as it can. The number of queries the HTM set grouping (``ned query consolidation: htm sets``) would have needed is logged alongside for comparison.
+
         **Key Arguments**
 
         - ``coordinateList`` -- the original coordinateList.
@@ -1458,6 +2820,17 @@ class transient_classifier(object):
         from HMpTy.htm import sets
         import numpy as np
 
+        consolidation = "htm sets"
+        if "ned query consolidation" in self.settings and self.settings["ned query consolidation"]:
+            consolidation = self.settings["ned query consolidation"]
+        if consolidation not in ("disc cover", "htm sets"):
+            message = "`ned query consolidation` must be one of `disc cover` or `htm sets` (not `%(consolidation)s`)" % locals()
+            self.log.error(message)
+            raise ValueError(message)
+
+        if not len(coordinateList):
+            return []
+
         raList = []
         raList[:] = np.array([c[0] for c in coordinateList])
         decList = []
@@ -1486,6 +2859,21 @@ class transient_classifier(object):
         for aSet in allMatches:
             updatedCoordianteList.append(aSet[0])
 
+        if consolidation == "disc cover":
+            from sherlock.commonutils import disc_cover
+            setsCount = len(updatedCoordianteList)
+            updatedCoordianteList = disc_cover(
+                log=self.log,
+                coordinateList=coordinateList,
+                radiusArcsec=radius * 60. * 60.
+            )
+            coverCount = len(updatedCoordianteList)
+            locationCount = len(coordinateList)
+            self.log.info(
+                'the %(locationCount)s transient locations need %(coverCount)s NED queries with a disc cover (%(setsCount)s with HTM set grouping)' % locals())
+            if self.verbose > 1:
+                print("NED QUERIES: %(coverCount)s (DISC COVER) VS %(setsCount)s (HTM SETS) FOR %(locationCount)s TRANSIENT LOCATIONS" % locals())
+
         self.log.debug('completed the ``_consolidate_coordinateList`` method')
         return updatedCoordianteList
 
@@ -1558,6 +2946,8 @@ class transient_classifier(object):
             classifications=False):
         """*update classification annotations and summaries*
 
+        The result tables are not created or migrated here (this runs once per batch): ``classify``/``classify_iter`` set them up at start-up and ``sherlock annotate`` before its backfill (``_create_tables_if_not_exist``).
+
         **Key Arguments**
 
         - ``updatePeakMagnitudes`` -- update the peak magnitudes in the annotations to give absolute magnitudes. Default *True*
@@ -1621,6 +3011,12 @@ class transient_classifier(object):
                 sqlQuery=sqlQuery,
                 dbConn=self.transientsDbConn
             )
+            # CROSSMATCHES WRITTEN WITH SPARSE PHOTOMETRY
+            from sherlock.commonutils import unpack_photometry
+            rows = unpack_photometry(
+                log=self.log,
+                crossmatches=rows
+            )
         # COMMAND-LINE SINGLE CLASSIFICATION
         else:
             rows = crossmatches
@@ -1628,48 +3024,54 @@ class transient_classifier(object):
         # print "FINISHED COLLECTING TRANSIENTS WITH NO ANNOTATIONS/GENERATING ANNOTATIONS: %d" % (time.time() - start_time,)
         # start_time = time.time()
 
-        updates = []
-
-        for row in rows:
-            annotation, summary, sep = self.generate_match_annotation(
-                match=row, updatePeakMagnitudes=updatePeakMagnitudes)
-
-            if cl and "rank" in row and row["rank"] == 1:
-                if classifications != False:
-                    classifications[
-                        row["transient_object_id"]].append(annotation)
-                if self.verbose != 0:
-                    print("\n" + annotation)
-
-            update = {
-                "transient_object_id": row["transient_object_id"],
-                "annotation": annotation,
-                "summary": summary,
-                "separationArcsec": sep
-            }
-            updates.append(update)
-
         if cl:
+            # RENDER THE WHOLE SET OF ANNOTATIONS IN ONE CALL
+            rendered = self.annotationRenderer.render_batch(
+                matches=rows, updatePeakMagnitudes=updatePeakMagnitudes)
+            for row, (annotation, summary, sep) in zip(rows, rendered):
+                if "rank" in row and row["rank"] == 1:
+                    if classifications != False:
+                        classifications[
+                            row["transient_object_id"]].append(annotation)
+                    if self.verbose != 0:
+                        print("\n" + annotation)
             return classifications
 
+        updates = self.annotationRenderer.render_batch_columns(
+            matches=rows, updatePeakMagnitudes=updatePeakMagnitudes, compact=self.compactAnnotations)
+        for row, update in zip(rows, updates):
+            update["transient_object_id"] = row["transient_object_id"]
+
         # print "FINISHED GENERATING ANNOTATIONS/ADDING ANNOTATIONS TO TRANSIENT DATABASE: %d" % (time.time() - start_time,)
         # start_time = time.time()
 
-        insert_list_of_dictionaries_into_database_tables(
-            dbConn=self.transientsDbConn,
-            log=self.log,
-            dictList=updates,
-            dbTableName="sherlock_classifications",
-            dateModified=True,
-            batchSize=10000,
-            replace=True,
-            dbSettings=self.settings["database settings"]["transients"]
-        )
+        if "bulk write results" in self.settings and self.settings["bulk write results"]:
+            from sherlock.commonutils import bulk_result_writer
+            writer = bulk_result_writer(
+                log=self.log,
+                dbConn=self.transientsDbConn,
+                settings=self.settings
+            )
+            writer.upsert_rows(
+                dbTableName="sherlock_classifications",
+                dictList=updates
+            )
+        else:
+            insert_list_of_dictionaries_into_database_tables(
+                dbConn=self.transientsDbConn,
+                log=self.log,
+                dictList=updates,
+                dbTableName="sherlock_classifications",
+                dateModified=True,
+                batchSize=10000,
+                replace=True,
+                dbSettings=self.settings["database settings"]["transients"]
+            )
 
         # print "FINISHED ADDING ANNOTATIONS TO TRANSIENT DATABASE/UPDATING ORPHAN ANNOTATIONS: %d" % (time.time() - start_time,)
         # start_time = time.time()
 
-        sqlQuery = """update sherlock_classifications  set annotation = "The transient location is not matched against any known catalogued source", summary = "No catalogued match" where classification = 'ORPHAN'  and summary is null """ % locals()
+        sqlQuery = """update sherlock_classifications  set annotation = "The transient location is not matched against any known catalogued source", summary = "No catalogued match", annotation_template = NULL, annotation_params = NULL where classification = 'ORPHAN'  and summary is null """ % locals()
         writequery(
             log=self.log,
             sqlQuery=sqlQuery,
@@ -1683,54 +3085,267 @@ class transient_classifier(object):
             'completed the ``update_classification_annotations_and_summaries`` method')
         return None
 
-    # use the tab-trigger below for new method
-    def update_peak_magnitudes(
-            self):
-        """*update peak magnitudes*
+    def _generate_batch_annotations(
+            self,
+            crossmatches,
+            classifications,
+            updatePeakMagnitudes=True):
+        """*build the human-readable annotations and summaries for a batch straight from its ranked crossmatches*
+
+        The in-memory equivalent of ``update_peak_magnitudes`` followed by ``update_classification_annotations_and_summaries`` for a bulk run, so the annotations can be written together with the classification rows instead of being read back out of the database.
 
         **Key Arguments**
 
-        # -
+        - ``crossmatches`` -- the ranked crossmatches of the batch. ``transientAbsMag`` is added to them when ``updatePeakMagnitudes`` is set
+        - ``classifications`` -- the classifications of the batch (dictionary of rank ordered lists keyed by transient id)
+        - ``updatePeakMagnitudes`` -- include the transient absolute peak magnitudes in the annotations. Default *True*
+
+        **Return**
+
+        - ``annotations`` -- dictionary of ``annotation``, ``annotation_template``, ``annotation_params``, ``summary`` and ``separationArcsec`` keyed by transient id
+
+        **Usage**
+
+        ```python
+        annotations = classifier._generate_batch_annotations(
+            crossmatches=crossmatches,
+            classifications=classifications,
+            updatePeakMagnitudes=True
+        )
+        ```
+        """
+        self.log.debug('starting the ``_generate_batch_annotations`` method')
+
+        if updatePeakMagnitudes and self.settings["database settings"]["transients"]["transient peak magnitude query"]:
+            peakMags = self._get_peak_magnitudes(
+                transientIds=list(classifications.keys()))
+            self._add_transient_absolute_magnitudes(
+                crossmatches=crossmatches,
+                peakMags=peakMags
+            )
+        elif updatePeakMagnitudes:
+            for c in crossmatches:
+                c.setdefault("transientAbsMag", None)
+
+        annotations = {}
+        topMatches = [c for c in crossmatches if "rank" in c and c["rank"] == 1]
+        rendered = self.annotationRenderer.render_batch_columns(
+            matches=topMatches, updatePeakMagnitudes=updatePeakMagnitudes, compact=self.compactAnnotations)
+        for c, columns in zip(topMatches, rendered):
+            annotations[c["transient_object_id"]] = columns
+
+        for k, v in classifications.items():
+            if k not in annotations and v[0] == "ORPHAN":
+                annotations[k] = {
+                    "annotation": "The transient location is not matched against any known catalogued source",
+                    "annotation_template": None,
+                    "annotation_params": None,
+                    "summary": "No catalogued match",
+                    "separationArcsec": None
+                }
+
+        self.log.debug('completed the ``_generate_batch_annotations`` method')
+        return annotations
+
+    def _get_peak_magnitudes(
+            self,
+            transientIds):
+        """*run the ``transient peak magnitude query`` for just the given transients (see ``_peak_magnitude_query``)*
 
+        **Key Arguments**
+
+        - ``transientIds`` -- the ids of the transients
 
         **Return**
 
-        - None
+        - ``peakMags`` -- dictionary of peak magnitudes keyed by transient id
+        """
+        self.log.debug('starting the ``_get_peak_magnitudes`` method')
 
+        from fundamentals.mysql import readquery
 
-        **Usage**
+        peakMags = {}
+        if not len(transientIds):
+            return peakMags
 
-        ..  todo::
+        sqlQuery = self._peak_magnitude_query(transientIds=transientIds)
 
-            - add usage info
-            - create a sublime snippet for usage
-            - write a command-line tool for this method
-            - update package tutorial with command-line tool info if needed
+        rows = readquery(
+            log=self.log,
+            sqlQuery=sqlQuery,
+            dbConn=self.transientsDbConn
+        )
+        for r in rows:
+            if r["mag"] is not None:
+                peakMags[r["id"]] = float(r["mag"])
+
+        self.log.debug('completed the ``_get_peak_magnitudes`` method')
+        return peakMags
+
+    def _peak_magnitude_query(
+            self,
+            transientIds=False):
+        """*the ``transient peak magnitude query``, restricted to the given transients*
+
+        Queries can mark where the transient-id restriction belongs with an ``{ids}`` placeholder, e.g. ``... where transientBucketId in ({ids}) and magnitude is not null group by transientBucketId``. The placeholder is replaced by the list of ids, so MySQL only reads those transients' rows. When the whole table is being updated (no ``transientIds``), it is replaced by the ids of the crossmatches modified in the last day.
+
+        Queries without the placeholder are never edited. For a batch they are wrapped as a derived table filtered on the ``id`` they return (``select * from (<query>) t where t.id in (...)``). MySQL 8.0.22+ pushes that filter into simple and grouped queries; older servers build the full result first.
+
+        **Key Arguments**
+
+        - ``transientIds`` -- the ids of the transients. Default *False* (all transients)
+
+        **Return**
+
+        - ``sqlQuery`` -- the query, returning ``id`` and ``mag`` columns
+
+        **Usage**
 
         ```python
-        usage code
+        sqlQuery = classifier._peak_magnitude_query(transientIds=[1, 2, 3])
         ```
+        """
+        sqlQuery = self.settings["database settings"][
+            "transients"]["transient peak magnitude query"]
 
+        if transientIds is not False:
+            idList = ",".join([str(i) for i in transientIds])
+        else:
+            idList = False
+
+        if "{ids}" in sqlQuery:
+            if idList is False:
+                idList = "select transient_object_id from sherlock_crossmatches where dateLastModified > DATE_SUB(NOW(), INTERVAL 1 DAY)"
+            return sqlQuery.replace("{ids}", idList)
+
+        if idList is False:
+            return sqlQuery
+        if not self.peakQueryWarned:
+            self.log.warning(
+                'the `transient peak magnitude query` has no `{ids}` placeholder, so each batch wraps it as a derived table (slow on MySQL < 8.0.22). Add `{ids}` where the transient-id restriction belongs')
+            self.peakQueryWarned = True
+        return """select * from (%(sqlQuery)s) t where t.id in (%(idList)s)""" % locals()
+
+    def _add_transient_absolute_magnitudes(
+            self,
+            crossmatches,
+            peakMags):
+        """*add the transient's absolute peak magnitude (peak mag minus the host's distance modulus) to each crossmatch*
 
-        .. todo ::
+        Mirrors the SQL in ``update_peak_magnitudes``: the direct distance modulus is preferred over the redshift distance modulus, and the result is rounded to 2 decimal places.
 
-            - update key arguments values and definitions with defaults
-            - update return values and definitions
-            - update usage examples and text
-            - update docstring text
-            - check sublime snippet exists
-            - clip any useful text to docs mindmap
-            - regenerate the docs and check redendering of this docstring
+        **Key Arguments**
+
+        - ``crossmatches`` -- the crossmatches to update in place
+        - ``peakMags`` -- dictionary of transient peak magnitudes keyed by transient id
+        """
+        for c in crossmatches:
+            c.setdefault("transientAbsMag", None)
+            mag = peakMags.get(c["transient_object_id"])
+            modulus = c.get("direct_distance_modulus")
+            if modulus is None:
+                modulus = c.get("z_distance_modulus")
+            if mag is None or modulus is None:
+                continue
+            if c["transientAbsMag"] is None or c.get("association_type") not in ("AGN", "CV", "BS", "VS"):
+                c["transientAbsMag"] = round(mag - modulus, 2)
+        return None
+
+    # use the tab-trigger below for new method
+    def update_peak_magnitudes(
+            self,
+            transientIds=False):
+        """*update the transient absolute peak magnitudes (``transientAbsMag``) of the crossmatches*
+
+        **Key Arguments**
+
+        - ``transientIds`` -- only update the crossmatches of these transients. The peak magnitudes are fetched for just these transients and joined to the crossmatches through a temporary id table, so the cost scales with the batch rather than the transient table. Default *False* (run the ``transient peak magnitude query`` over the whole table and update every crossmatch modified in the last day)
+
+        **Return**
+
+        - None
+
+        **Usage**
+
+        ```python
+        classifier.update_peak_magnitudes(
+            transientIds=[t["id"] for t in transientsMetadataList]
+        )
+        ```
         """
         self.log.debug('starting the ``update_peak_magnitudes`` method')
 
         from fundamentals.mysql import writequery
 
-        sqlQuery = self.settings["database settings"][
-            "transients"]["transient peak magnitude query"]
+        if transientIds is not False:
+            self._update_batch_peak_magnitudes(transientIds=transientIds)
+            self.log.debug('completed the ``update_peak_magnitudes`` method')
+            return None
+
+        sqlQuery = self._peak_magnitude_query()
+
+        sqlQuery = """UPDATE sherlock_crossmatches s,
+            (%(sqlQuery)s) t
+        SET
+            s.transientAbsMag = ROUND(t.mag - IFNULL(direct_distance_modulus,
+                            z_distance_modulus),
+                    2)
+        WHERE
+            IFNULL(direct_distance_modulus,
+                    z_distance_modulus) IS NOT NULL
+            AND (s.association_type not in ("AGN","CV","BS","VS")
+                 or s.transientAbsMag is null)
+                AND t.id = s.transient_object_id
+                AND (s.dateLastModified > DATE_SUB(NOW(), INTERVAL 1 DAY));""" % locals()
+
+        writequery(
+            log=self.log,
+            sqlQuery=sqlQuery,
+            dbConn=self.transientsDbConn,
+        )
+
+        self.log.debug('completed the ``update_peak_magnitudes`` method')
+        return None
+
+    def _update_batch_peak_magnitudes(
+            self,
+            transientIds):
+        """*update ``transientAbsMag`` for the crossmatches of just the given transients via a temporary peak-magnitude table*
+
+        **Key Arguments**
+
+        - ``transientIds`` -- the ids of the transients just classified
+        """
+        self.log.debug('starting the ``_update_batch_peak_magnitudes`` method')
+
+        from fundamentals.mysql import writequery
+
+        if not len(transientIds):
+            return None
+
+        peakMags = self._get_peak_magnitudes(transientIds=transientIds)
+        if not len(peakMags):
+            return None
+
+        writequery(
+            log=self.log,
+            sqlQuery="""CREATE TEMPORARY TABLE IF NOT EXISTS `sherlock_batch_peak_mags` (`transient_object_id` bigint(20) NOT NULL, `mag` double DEFAULT NULL, PRIMARY KEY (`transient_object_id`)) ENGINE=MEMORY""",
+            dbConn=self.transientsDbConn
+        )
+        writequery(
+            log=self.log,
+            sqlQuery="""TRUNCATE TABLE `sherlock_batch_peak_mags`""",
+            dbConn=self.transientsDbConn
+        )
+        writequery(
+            log=self.log,
+            sqlQuery="""INSERT INTO `sherlock_batch_peak_mags` (transient_object_id, mag) VALUES (%s, %s)""",
+            dbConn=self.transientsDbConn,
+            manyValueList=list(peakMags.items())
+        )
 
-        sqlQuery = """UPDATE sherlock_crossmatches s,
-            (%(sqlQuery)s) t
+        sqlQuery = """UPDATE sherlock_crossmatches s
+            JOIN sherlock_batch_peak_mags t ON t.transient_object_id = s.transient_object_id
         SET
             s.transientAbsMag = ROUND(t.mag - IFNULL(direct_distance_modulus,
                             z_distance_modulus),
@@ -1739,26 +3354,29 @@ class transient_classifier(object):
             IFNULL(direct_distance_modulus,
                     z_distance_modulus) IS NOT NULL
             AND (s.association_type not in ("AGN","CV","BS","VS")
-                 or s.transientAbsMag is null)
-                AND t.id = s.transient_object_id
-                AND (s.dateLastModified > DATE_SUB(NOW(), INTERVAL 1 DAY));""" % locals()
-
+                 or s.transientAbsMag is null);"""
         writequery(
             log=self.log,
             sqlQuery=sqlQuery,
             dbConn=self.transientsDbConn,
         )
+        writequery(
+            log=self.log,
+            sqlQuery="""DROP TEMPORARY TABLE IF EXISTS `sherlock_batch_peak_mags`""",
+            dbConn=self.transientsDbConn
+        )
 
-        self.log.debug('completed the ``update_peak_magnitudes`` method')
+        self.log.debug('completed the ``_update_batch_peak_magnitudes`` method')
         return None
 
     def _create_tables_if_not_exist(
-            self):
+            self,
+            convertPhotometryLayout=False):
         """*create the sherlock helper tables if they don't yet exist*
 
         **Key Arguments**
 
-        # -
+        - ``convertPhotometryLayout`` -- convert ``sherlock_crossmatches`` to the photometry layout set by ``sparse photometry`` if it is in the other one (see ``convert_photometry_layout``). Default *False* (only record the mismatch in ``photometryLayoutMatches``)
 
 
         **Return**
@@ -1878,6 +3496,7 @@ CREATE TABLE IF NOT EXISTS `sherlock_crossmatches` (
   `classificationReliability` tinyint(4) DEFAULT NULL,
   `transientAbsMag` double DEFAULT NULL,
   `merged_rank` tinyint(4) DEFAULT NULL,
+  `photometry` TEXT COLLATE utf8_unicode_ci DEFAULT NULL,
   PRIMARY KEY (`id`),
   KEY `key_transient_object_id` (`transient_object_id`),
   KEY `key_catalogue_object_id` (`catalogue_object_id`),
@@ -1896,6 +3515,9 @@ CREATE TABLE IF NOT EXISTS `sherlock_classifications` (
   `dateLastModified` datetime DEFAULT CURRENT_TIMESTAMP,
   `dateCreated` datetime DEFAULT CURRENT_TIMESTAMP,
   `updated` varchar(45) DEFAULT '0',
+  `fingerprint` char(40) DEFAULT NULL,
+  `annotation_template` varchar(20) DEFAULT NULL,
+  `annotation_params` TEXT COLLATE utf8_unicode_ci DEFAULT NULL,
   PRIMARY KEY (`transient_object_id`),
   KEY `key_transient_object_id` (`transient_object_id`),
   KEY `idx_summary` (`summary`),
@@ -1903,8 +3525,22 @@ CREATE TABLE IF NOT EXISTS `sherlock_classifications` (
   KEY `idx_dateLastModified` (`dateLastModified`)
 ) ENGINE=MyISAM DEFAULT CHARSET=utf8 COLLATE=utf8_unicode_ci;
 
+CREATE TABLE IF NOT EXISTS `sherlock_annotation_templates` (
+  `template_key` varchar(20) NOT NULL,
+  `link_prefix` TEXT COLLATE utf8_unicode_ci DEFAULT NULL,
+  `link_middle` TEXT COLLATE utf8_unicode_ci DEFAULT NULL,
+  `link_suffix` TEXT COLLATE utf8_unicode_ci DEFAULT NULL,
+  PRIMARY KEY (`template_key`)
+) ENGINE=MyISAM DEFAULT CHARSET=utf8 COLLATE=utf8_unicode_ci;
+
 """ % locals()
 
+        # THE COMPACT (SPARSE PHOTOMETRY) LAYOUT HAS NO MAGNITUDE COLUMNS
+        if self.sparsePhotometry:
+            from sherlock.commonutils.sparse_photometry import PHOTOMETRY_COLUMNS
+            createStatement = "\n".join([l for l in createStatement.split(
+                "\n") if not any(l.startswith("  `%s` double" % c) for c in PHOTOMETRY_COLUMNS)])
+
         # A FIX FOR MYSQL VERSIONS < 5.6
         triggers = []
         if float(self.dbVersions["transients"][:3]) < 5.6:
@@ -1935,6 +3571,81 @@ END""" % locals())
             self.log.info(
                 "Could not create table (`%(crossmatchTable)s`). Probably already exist." % locals())
 
+        # TABLES CREATED BY OLDER VERSIONS OF SHERLOCK LACK THE RESULT
+        # FINGERPRINT, COMPACT-ANNOTATION AND SPARSE-PHOTOMETRY COLUMNS
+        newColumns = {
+            "sherlock_classifications": [
+                ("fingerprint", "char(40) DEFAULT NULL"),
+                ("annotation_template", "varchar(20) DEFAULT NULL"),
+                ("annotation_params", "TEXT COLLATE utf8_unicode_ci DEFAULT NULL")
+            ],
+            "sherlock_crossmatches": [
+                ("photometry", "TEXT COLLATE utf8_unicode_ci DEFAULT NULL")
+            ]
+        }
+        existingColumns = {}
+        for tableName, columns in newColumns.items():
+            sqlQuery = u"""
+                SELECT COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME='%(tableName)s' ORDER BY ORDINAL_POSITION;
+            """ % locals()
+            rows = readquery(
+                log=self.log,
+                sqlQuery=sqlQuery,
+                dbConn=self.transientsDbConn,
+            )
+            existingColumns[tableName] = [r["COLUMN_NAME"] for r in rows]
+            for columnName, columnType in columns:
+                if columnName not in existingColumns[tableName]:
+                    sqlQuery = """ALTER TABLE `%(tableName)s` ADD `%(columnName)s` %(columnType)s""" % locals()
+                    writequery(
+                        log=self.log,
+                        sqlQuery=sqlQuery,
+                        dbConn=self.transientsDbConn,
+                    )
+                    existingColumns[tableName].append(columnName)
+
+        # SWITCHING `sparse photometry` NEEDS THE CROSSMATCH TABLE CONVERTING TO
+        # THE COMPACT OR ONE-COLUMN-PER-BAND LAYOUT - ONLY DONE ON REQUEST
+        # (`sherlock photometry`)
+        from sherlock.commonutils.sparse_photometry import photometry_layout_statements, PHOTOMETRY_COLUMNS
+        statements = photometry_layout_statements(
+            log=self.log,
+            sparse=self.sparsePhotometry,
+            existingColumns=existingColumns["sherlock_crossmatches"]
+        )
+        self.photometryLayoutMatches = not len(statements)
+        if len(statements) and convertPhotometryLayout:
+            print("CONVERTING `sherlock_crossmatches` TO THE %s PHOTOMETRY LAYOUT" % ("COMPACT" if self.sparsePhotometry else "ONE-COLUMN-PER-BAND",))
+            for sqlQuery in statements:
+                writequery(
+                    log=self.log,
+                    sqlQuery=sqlQuery,
+                    dbConn=self.transientsDbConn,
+                )
+            if self.sparsePhotometry:
+                existingColumns["sherlock_crossmatches"] = [
+                    c for c in existingColumns["sherlock_crossmatches"] if c not in PHOTOMETRY_COLUMNS]
+            else:
+                existingColumns["sherlock_crossmatches"] += [
+                    c for c in PHOTOMETRY_COLUMNS if c not in existingColumns["sherlock_crossmatches"]]
+            self.photometryLayoutMatches = True
+
+        # KEEP EMPTY PARTITIONS AHEAD OF THE INCOMING RESULTS (TABLES ARE ONLY
+        # PARTITIONED BY `sherlock partition`)
+        if "result table partitioning" in self.settings and self.settings["result table partitioning"] and self.settings["result table partitioning"].get("enabled"):
+            from sherlock.commonutils import result_table_partitioner
+            self.resultPartitioner = result_table_partitioner(
+                log=self.log,
+                dbConn=self.transientsDbConn,
+                settings=self.settings
+            )
+            self.resultPartitioner.ensure_partitions()
+
+        self._create_rendered_annotations_view(
+            classificationColumns=existingColumns["sherlock_classifications"])
+        self._create_crossmatch_photometry_view(
+            crossmatchColumns=existingColumns["sherlock_crossmatches"])
+
         sqlQuery = u"""
             SHOW TRIGGERS;
         """ % locals()
@@ -1977,224 +3688,273 @@ END""" % locals())
         self.log.debug('completed the ``_create_tables_if_not_exist`` method')
         return None
 
-    # use the tab-trigger below for new method
-    def generate_match_annotation(
+    def _create_rendered_annotations_view(
             self,
-            match,
-            updatePeakMagnitudes=False):
-        """*generate a human readale annotation for the transient-catalogue source match*
+            classificationColumns):
+        """*populate the annotation link-template table and (re)create the ``view_sherlock_classifications_rendered`` view*
+
+        The view exposes every column of ``sherlock_classifications`` but with compact annotations expanded back into full html, so readers never need to know how an annotation was stored.
 
         **Key Arguments**
 
-        - ``match`` -- the source crossmatched against the transient
-        - ``updatePeakMagnitudes`` -- update the peak magnitudes in the annotations to give absolute magnitudes. Default *False*
+        - ``classificationColumns`` -- the ordered column names of the ``sherlock_classifications`` table
+        """
+        self.log.debug(
+            'starting the ``_create_rendered_annotations_view`` method')
 
+        from fundamentals.mysql import writequery
+        from sherlock.commonutils.annotation_renderer import LINK_TEMPLATES, LINK_PLACEHOLDER
 
-        **Return**
+        writequery(
+            log=self.log,
+            sqlQuery="""REPLACE INTO `sherlock_annotation_templates` (template_key, link_prefix, link_middle, link_suffix) VALUES (%s, %s, %s, %s)""",
+            dbConn=self.transientsDbConn,
+            manyValueList=[(k, v[0], v[1], v[2])
+                           for k, v in LINK_TEMPLATES.items()]
+        )
 
-        - None
+        linkId = "JSON_UNQUOTE(JSON_EXTRACT(c.annotation_params, '$.id'))"
+        linkName = "IFNULL(JSON_UNQUOTE(JSON_EXTRACT(c.annotation_params, '$.name')), %(linkId)s)" % locals()
+        selectColumns = []
+        for col in classificationColumns:
+            if col == "annotation":
+                selectColumns.append(
+                    "IF(c.annotation_template IS NULL, c.annotation, REPLACE(c.annotation, '%(LINK_PLACEHOLDER)s', CONCAT(t.link_prefix, %(linkId)s, t.link_middle, %(linkName)s, t.link_suffix))) AS `annotation`" % locals())
+            else:
+                selectColumns.append("c.`%(col)s`" % locals())
+        selectColumns = ", ".join(selectColumns)
+
+        sqlQuery = """CREATE OR REPLACE VIEW `view_sherlock_classifications_rendered` AS SELECT %(selectColumns)s FROM `sherlock_classifications` c LEFT JOIN `sherlock_annotation_templates` t ON c.annotation_template = t.template_key""" % locals()
+        try:
+            writequery(
+                log=self.log,
+                sqlQuery=sqlQuery,
+                dbConn=self.transientsDbConn
+            )
+        except:
+            self.log.info(
+                "Could not create the `view_sherlock_classifications_rendered` view (the database server needs JSON support)")
+
+        self.log.debug(
+            'completed the ``_create_rendered_annotations_view`` method')
+        return None
+
+    def _create_crossmatch_photometry_view(
+            self,
+            crossmatchColumns):
+        """*(re)create the ``view_sherlock_crossmatches_photometry`` view*
+
+        The view exposes every column of ``sherlock_crossmatches`` with the magnitude columns filled from the packed ``photometry`` column where the crossmatch was written with sparse photometry (in the compact layout the table has no magnitude columns at all), so existing consumers keep seeing one column per band.
+
+        **Key Arguments**
+
+        - ``crossmatchColumns`` -- the ordered column names of the ``sherlock_crossmatches`` table
+        """
+        self.log.debug(
+            'starting the ``_create_crossmatch_photometry_view`` method')
+
+        from fundamentals.mysql import writequery
+        from sherlock.commonutils.sparse_photometry import PHOTOMETRY_COLUMNS
+
+        selectColumns = []
+        for col in crossmatchColumns:
+            if col in PHOTOMETRY_COLUMNS:
+                selectColumns.append(
+                    "IFNULL(c.`%(col)s`, JSON_EXTRACT(c.photometry, '$.%(col)s') + 0) AS `%(col)s`" % locals())
+            else:
+                selectColumns.append("c.`%(col)s`" % locals())
+        for col in PHOTOMETRY_COLUMNS:
+            if col not in crossmatchColumns:
+                selectColumns.append(
+                    "JSON_EXTRACT(c.photometry, '$.%(col)s') + 0 AS `%(col)s`" % locals())
+        selectColumns = ", ".join(selectColumns)
+
+        sqlQuery = """CREATE OR REPLACE VIEW `view_sherlock_crossmatches_photometry` AS SELECT %(selectColumns)s FROM `sherlock_crossmatches` c""" % locals()
+        try:
+            writequery(
+                log=self.log,
+                sqlQuery=sqlQuery,
+                dbConn=self.transientsDbConn
+            )
+        except:
+            self.log.info(
+                "Could not create the `view_sherlock_crossmatches_photometry` view (the database server needs JSON support)")
+
+        self.log.debug(
+            'completed the ``_create_crossmatch_photometry_view`` method')
+        return None
 
+    def convert_photometry_layout(
+            self):
+        """*convert the ``sherlock_crossmatches`` table to the photometry layout set by ``sparse photometry``*
+
+        With ``sparse photometry: True`` the magnitude columns are packed into the ``photometry`` column and dropped; with ``False`` they are added back and unpacked. This rewrites every row of the table and alters its columns, so it is only run on request (``dbmatch`` refuses to start while the table and the setting disagree). Consumers reading the magnitude columns directly should read ``view_sherlock_crossmatches_photometry`` before the table is converted to the compact layout.
 
         **Usage**
 
+        ```bash
+        sherlock photometry
+        ```
 
+        or
 
         ```python
-        usage code
+        from sherlock import transient_classifier
+        classifier = transient_classifier(
+            log=log,
+            settings=settings,
+            updateNed=False
+        )
+        classifier.convert_photometry_layout()
         ```
+        """
+        self.log.debug('starting the ``convert_photometry_layout`` method')
 
-        ---
+        self._create_tables_if_not_exist(convertPhotometryLayout=True)
 
-        ```eval_rst
-        .. todo::
+        self.log.debug('completed the ``convert_photometry_layout`` method')
+        return None
 
-            - add usage info
-            - create a sublime snippet for usage
-            - write a command-line tool for this method
-            - update package tutorial with command-line tool info if needed
+    def _check_photometry_layout(
+            self):
+        """*refuse to classify into a ``sherlock_crossmatches`` table in the other photometry layout to the ``sparse photometry`` setting*
+        """
+        if self.photometryLayoutMatches:
+            return None
+        if self.sparsePhotometry:
+            message = "`sparse photometry` is set but `sherlock_crossmatches` still has one column per magnitude band. Run `sherlock photometry` to convert the table, or unset `sparse photometry`"
+        else:
+            message = "`sherlock_crossmatches` is in the compact photometry layout but `sparse photometry` is not set. Run `sherlock photometry` to convert the table back, or set `sparse photometry: True`"
+        self.log.error(message)
+        raise ValueError(message)
+
+    def migrate_annotations(
+            self,
+            compact=True,
+            batchSize=10000):
+        """*convert the annotations already stored in the ``sherlock_classifications`` table to (or back from) the compact link-template form*
+
+        Rows are walked in ``transient_object_id`` order, one batch at a time, so the migration can be interrupted and rerun safely.
+
+        **Key Arguments**
+
+        - ``compact`` -- convert full html annotations to the compact form. Set to *False* to expand compact annotations back to full html. Default *True*
+        - ``batchSize`` -- the number of rows to convert per batch. Default *10000*
+
+        **Return**
+
+        - ``migrated`` -- the number of rows converted
+
+        **Usage**
+
+        ```bash
+        sherlock annotate --compact
+        ```
+
+        or
+
+        ```python
+        from sherlock import transient_classifier
+        classifier = transient_classifier(
+            log=log,
+            settings=settings,
+            updateNed=False
+        )
+        classifier.migrate_annotations(compact=True)
         ```
         """
-        self.log.debug('starting the ``generate_match_annotation`` method')
+        self.log.debug('starting the ``migrate_annotations`` method')
 
-        import math
+        from fundamentals.mysql import readquery, writequery
 
-        if "catalogue_object_subtype" not in match:
-            match["catalogue_object_subtype"] = None
-        catalogue = match["catalogue_table_name"]
-        objectId = match["catalogue_object_id"]
-        objectType = match["catalogue_object_type"]
-        objectSubtype = match["catalogue_object_subtype"]
-        catalogueString = catalogue
-        if catalogueString is None:
-            badGuy = match["transient_object_id"]
-            print(f"Issue with object {badGuy}")
-            raise TypeError(f"Issue with object {badGuy}")
-        if "catalogue" not in catalogueString.lower():
-            catalogueString = catalogue + " catalogue"
-        if "/" in catalogueString:
-            catalogueString += "s"
-
-        if "ned" in catalogue.lower():
-            objectId = objectId.replace("+", "%2B")
-            objectId = '''<a href="https://ned.ipac.caltech.edu/cgi-bin/objsearch?objname=%(objectId)s&extend=no&hconst=73&omegam=0.27&omegav=0.73&corr_z=1&out_csys=Equatorial&out_equinox=J2000.0&obj_sort=RA+or+Longitude&of=pre_text&zv_breaker=30000.0&list_limit=5&img_stamp=YES">%(objectId)s</a>''' % locals()
-        elif "sdss" in catalogue.lower():
-            objectId = "http://skyserver.sdss.org/dr12/en/tools/explore/Summary.aspx?id=%(objectId)s" % locals(
-            )
+        self._create_tables_if_not_exist()
 
-            ra = self.converter.ra_decimal_to_sexegesimal(
-                ra=match["raDeg"],
-                delimiter=""
-            )
-            dec = self.converter.dec_decimal_to_sexegesimal(
-                dec=match["decDeg"],
-                delimiter=""
-            )
-            # 2025-07-17 KWS Added a quick workaround for when the ra or dec are not parseable.
-            try:
-                betterName = "SDSS J" + ra[0:9] + dec[0:9]
-            except TypeError as e:
-                print("ERROR", ra, dec, objectId)
-                betterName = ''
-            objectId = '''<a href="%(objectId)s">%(betterName)s</a>''' % locals()
-        elif "milliquas" in catalogue.lower():
-            thisName = objectId
-            objectId = objectId.replace(" ", "+")
-            objectId = '''<a href="https://heasarc.gsfc.nasa.gov/db-perl/W3Browse/w3table.pl?popupFrom=Query+Results&tablehead=name%%3Dheasarc_milliquas%%26description%%3DMillion+Quasars+Catalog+%%28MILLIQUAS%%29%%2C+Version+4.8+%%2822+June+2016%%29%%26url%%3Dhttp%%3A%%2F%%2Fheasarc.gsfc.nasa.gov%%2FW3Browse%%2Fgalaxy-catalog%%2Fmilliquas.html%%26archive%%3DN%%26radius%%3D1%%26mission%%3DGALAXY+CATALOG%%26priority%%3D5%%26tabletype%%3DObject&dummy=Examples+of+query+constraints%%3A&varon=name&bparam_name=%%3D%%22%(objectId)s%%22&bparam_name%%3A%%3Aunit=+&bparam_name%%3A%%3Aformat=char25&varon=ra&bparam_ra=&bparam_ra%%3A%%3Aunit=degree&bparam_ra%%3A%%3Aformat=float8%%3A.5f&varon=dec&bparam_dec=&bparam_dec%%3A%%3Aunit=degree&bparam_dec%%3A%%3Aformat=float8%%3A.5f&varon=bmag&bparam_bmag=&bparam_bmag%%3A%%3Aunit=mag&bparam_bmag%%3A%%3Aformat=float8%%3A4.1f&varon=rmag&bparam_rmag=&bparam_rmag%%3A%%3Aunit=mag&bparam_rmag%%3A%%3Aformat=float8%%3A4.1f&varon=redshift&bparam_redshift=&bparam_redshift%%3A%%3Aunit=+&bparam_redshift%%3A%%3Aformat=float8%%3A6.3f&varon=radio_name&bparam_radio_name=&bparam_radio_name%%3A%%3Aunit=+&bparam_radio_name%%3A%%3Aformat=char22&varon=xray_name&bparam_xray_name=&bparam_xray_name%%3A%%3Aunit=+&bparam_xray_name%%3A%%3Aformat=char22&bparam_lii=&bparam_lii%%3A%%3Aunit=degree&bparam_lii%%3A%%3Aformat=float8%%3A.5f&bparam_bii=&bparam_bii%%3A%%3Aunit=degree&bparam_bii%%3A%%3Aformat=float8%%3A.5f&bparam_broad_type=&bparam_broad_type%%3A%%3Aunit=+&bparam_broad_type%%3A%%3Aformat=char4&bparam_optical_flag=&bparam_optical_flag%%3A%%3Aunit=+&bparam_optical_flag%%3A%%3Aformat=char3&bparam_red_psf_flag=&bparam_red_psf_flag%%3A%%3Aunit=+&bparam_red_psf_flag%%3A%%3Aformat=char1&bparam_blue_psf_flag=&bparam_blue_psf_flag%%3A%%3Aunit=+&bparam_blue_psf_flag%%3A%%3Aformat=char1&bparam_ref_name=&bparam_ref_name%%3A%%3Aunit=+&bparam_ref_name%%3A%%3Aformat=char6&bparam_ref_redshift=&bparam_ref_redshift%%3A%%3Aunit=+&bparam_ref_redshift%%3A%%3Aformat=char6&bparam_qso_prob=&bparam_qso_prob%%3A%%3Aunit=percent&bparam_qso_prob%%3A%%3Aformat=int2%%3A3d&bparam_alt_name_1=&bparam_alt_name_1%%3A%%3Aunit=+&bparam_alt_name_1%%3A%%3Aformat=char22&bparam_alt_name_2=&bparam_alt_name_2%%3A%%3Aunit=+&bparam_alt_name_2%%3A%%3Aformat=char22&Entry=&Coordinates=J2000&Radius=Default&Radius_unit=arcsec&NR=CheckCaches%%2FGRB%%2FSIMBAD%%2BSesame%%2FNED&Time=&ResultMax=1000&displaymode=Display&Action=Start+Search&table=heasarc_milliquas">%(thisName)s</a>''' % locals()
-
-        if objectSubtype and str(objectSubtype).lower() in ["uvs", "radios", "xray", "qso", "irs", 'uves', 'viss', 'hii', 'gclstr', 'ggroup', 'gpair', 'gtrpl']:
-            objectType = objectSubtype
-
-        if objectType == "star":
-            objectType = "stellar source"
-        elif objectType == "agn":
-            objectType = "AGN"
-        elif objectType == "cb":
-            objectType = "CV"
-        elif objectType == "unknown":
-            objectType = "unclassified source"
-
-        sep = match["separationArcsec"]
-        if match["classificationReliability"] == 1:
-            classificationReliability = "synonymous"
-            psep = match["physical_separation_kpc"]
-            if psep:
-                location = '%(sep)0.1f" (%(psep)0.1f Kpc) from the %(objectType)s core' % locals(
-                )
-            else:
-                location = '%(sep)0.1f" from the %(objectType)s core' % locals(
-                )
-        else:
-            # elif match["classificationReliability"] in (2, 3):
-            classificationReliability = "possibly associated"
-            n = float(match["northSeparationArcsec"])
-            if n > 0:
-                nd = "S"
-            else:
-                nd = "N"
-            e = float(match["eastSeparationArcsec"])
-            if e > 0:
-                ed = "W"
-            else:
-                ed = "E"
-            n = math.fabs(float(n))
-            e = math.fabs(float(e))
-            psep = match["physical_separation_kpc"]
-            if psep:
-                location = '%(n)0.2f" %(nd)s, %(e)0.2f" %(ed)s (%(psep)0.1f Kpc) from the %(objectType)s centre' % locals(
-                )
-            else:
-                location = '%(n)0.2f" %(nd)s, %(e)0.2f" %(ed)s from the %(objectType)s centre' % locals(
-                )
-            location = location.replace("unclassified", "object's")
-
-        best_mag = None
-        best_mag_error = None
-        best_mag_filter = None
-        filters = ["R", "V", "B", "I", "J", "G", "H", "K", "U",
-                   "_r", "_g", "_i", "_g", "_z", "_y", "_u", "W1", "unkMag"]
-        for f in filters:
-            if f in match and match[f] and not best_mag:
-                best_mag = match[f]
-                try:
-                    best_mag_error = match[f + "Err"]
-                except:
-                    pass
-                subfilter = f.replace(
-                    "_", "").replace("Mag", "")
-                best_mag_filter = f.replace(
-                    "_", "").replace("Mag", "") + "="
-                if "unk" in best_mag_filter:
-                    best_mag_filter = ""
-                    subfilter = ''
-
-        if not best_mag_filter:
-            if str(best_mag).lower() in ("8", "11", "18"):
-                best_mag_filter = "an "
-            else:
-                best_mag_filter = "a "
+        if compact:
+            rowFilter = "annotation_template IS NULL AND annotation LIKE '%%<a href=%%'"
         else:
-            if str(best_mag_filter)[0].lower() in ("r", "i", "h"):
-                best_mag_filter = "an " + best_mag_filter
-            else:
-                best_mag_filter = "a " + best_mag_filter
-        if not best_mag:
-            best_mag = "an unknown-"
-            best_mag_filter = ""
-        else:
-            best_mag = "%(best_mag)0.2f " % locals()
-
-        distance = None
-        if "direct_distance" in match and match["direct_distance"]:
-            d = match["direct_distance"]
-            distance = "distance of %(d)0.1f Mpc" % locals()
-
-            if match["z"]:
-                z = match["z"]
-                distance += "(z=%(z)0.3f)" % locals()
-        elif "z" in match and match["z"]:
-            z = match["z"]
-            distance = "z=%(z)0.3f" % locals()
-        elif "photoZ" in match and match["photoZ"]:
-            z = match["photoZ"]
-            zErr = match["photoZErr"]
-            if not zErr:
-                distance = "photoZ=%(z)0.3f" % locals()
-            else:
-                distance = "photoZ=%(z)0.3f (&plusmn%(zErr)0.3f)" % locals()
-
-        if distance:
-            distance = "%(distance)s" % locals()
-
-        distance_modulus = None
-        if match["direct_distance_modulus"]:
-            distance_modulus = match["direct_distance_modulus"]
-        elif match["z_distance_modulus"]:
-            distance_modulus = match["z_distance_modulus"]
-        elif match["pz_distance_modulus"]:
-            distance_modulus = match["pz_distance_modulus"]
-
-        if updatePeakMagnitudes:
-            if distance:
-                absMag = match["transientAbsMag"]
-                absMag = """ A host %(distance)s implies a transient <em>M =</em> %(absMag)s mag.""" % locals(
-                )
-            else:
-                absMag = ""
-        else:
-            if distance and distance_modulus:
-                absMag = "%(distance_modulus)0.2f" % locals()
-                absMag = """ A host %(distance)s implies a <em>m - M =</em> %(absMag)s.""" % locals(
+            rowFilter = "annotation_template IS NOT NULL"
+
+        lastId = -1
+        migrated = 0
+        while True:
+            sqlQuery = """SELECT transient_object_id, annotation, annotation_template, annotation_params FROM sherlock_classifications WHERE transient_object_id > %(lastId)s AND %(rowFilter)s ORDER BY transient_object_id LIMIT %(batchSize)s""" % locals()
+            rows = readquery(
+                log=self.log,
+                sqlQuery=sqlQuery,
+                dbConn=self.transientsDbConn
+            )
+            if not len(rows):
+                break
+            lastId = rows[-1]["transient_object_id"]
+
+            valueList = []
+            for r in rows:
+                if compact:
+                    annotation, annotationTemplate, annotationParams = self.annotationRenderer.compact(
+                        annotation=r["annotation"])
+                    if not annotationTemplate:
+                        continue
+                else:
+                    annotation = self.annotationRenderer.expand(
+                        annotation=r["annotation"],
+                        annotationTemplate=r["annotation_template"],
+                        annotationParams=r["annotation_params"]
+                    )
+                    annotationTemplate = None
+                    annotationParams = None
+                valueList.append(
+                    (annotation, annotationTemplate, annotationParams, r["transient_object_id"]))
+
+            if len(valueList):
+                writequery(
+                    log=self.log,
+                    sqlQuery="""UPDATE sherlock_classifications SET annotation = %s, annotation_template = %s, annotation_params = %s WHERE transient_object_id = %s""",
+                    dbConn=self.transientsDbConn,
+                    manyValueList=valueList
                 )
-            else:
-                absMag = ""
+            migrated += len(valueList)
+            self.log.info(
+                "%(migrated)s annotations migrated so far" % locals())
 
-        annotation = "The transient is %(classificationReliability)s with <em>%(objectId)s</em>; %(best_mag_filter)s%(best_mag)smag %(objectType)s found in the %(catalogueString)s. It's located %(location)s.%(absMag)s" % locals()
-        try:
-            summary = '%(sep)0.1f" from %(objectType)s in %(catalogue)s' % locals()
-        except:
-            badGuy = match["transient_object_id"]
-            print(f"Issue with object {badGuy}")
-            raise TypeError(f"Issue with object {badGuy}")
+        self.log.debug('completed the ``migrate_annotations`` method')
+        return migrated
+
+    # use the tab-trigger below for new method
+    def generate_match_annotation(
+            self,
+            match,
+            updatePeakMagnitudes=False):
+        """*generate a human readale annotation for the transient-catalogue source match*
+
+        **Key Arguments**
+
+        - ``match`` -- the source crossmatched against the transient
+        - ``updatePeakMagnitudes`` -- update the peak magnitudes in the annotations to give absolute magnitudes. Default *False*
+
+
+        **Return**
+
+        - ``annotation`` -- the full html annotation
+        - ``summary`` -- the one-line summary
+        - ``sep`` -- the transient-source separation in arcsec
+
+        **Usage**
+
+        The rendering itself lives in ``sherlock.commonutils.annotation_renderer`` (use its ``render_batch`` method for many matches at once).
+
+        ```python
+        annotation, summary, sep = classifier.generate_match_annotation(
+            match=crossmatch,
+            updatePeakMagnitudes=False
+        )
+        ```
+        """
+        self.log.debug('starting the ``generate_match_annotation`` method')
+
+        annotation, summary, sep = self.annotationRenderer.render(
+            match=match,
+            updatePeakMagnitudes=updatePeakMagnitudes
+        )
 
         self.log.debug('completed the ``generate_match_annotation`` method')
         return annotation, summary, sep
@@ -2270,6 +4030,107 @@ def _crossmatch_transients_against_catalogues(
     return crossmatches
 
 
+def _timed_crossmatch_transients_against_catalogues(
+        transientsMetadataListIndex,
+        log,
+        settings,
+        colMaps):
+    """*run ``_crossmatch_transients_against_catalogues`` on a mini-batch and report how long it took*
+
+    **Key Arguments**
+
+    - ``transientsMetadataListIndex`` -- the index of the mini-batch of transients to crossmatch
+    - ``colMaps`` -- dictionary of dictionaries with the name of the database-view (e.g. `tcs_view_agn_milliquas_v4_5`) as the key and the column-name dictary map as value (`{view_name: {columnMap}}`).
+
+    **Return**
+
+    - ``result`` -- dictionary with the ``crossmatches``, the number of ``transients`` in the mini-batch and the wall-clock ``seconds`` taken
+    """
+    import time
+
+    global theseBatches
+
+    start_time = time.time()
+    crossmatches = _crossmatch_transients_against_catalogues(
+        transientsMetadataListIndex=transientsMetadataListIndex,
+        log=log,
+        settings=settings,
+        colMaps=colMaps
+    )
+
+    return {
+        "crossmatches": crossmatches,
+        "transients": len(theseBatches[transientsMetadataListIndex]),
+        "seconds": time.time() - start_time
+    }
+
+
+def _init_daemon_worker():
+    """*initialise a warm daemon worker: leave SIGINT to the parent (so the in-flight batch can drain) and defer connecting to the catalogues database until the first batch*
+    """
+    import signal
+    global workerCataloguesDbConn
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    workerCataloguesDbConn = False
+
+
+def _crossmatch_transient_batch(
+        transientsMetadataList,
+        log,
+        settings,
+        colMaps):
+    """*crossmatch a mini-batch of transients passed in directly, reusing the worker's catalogues database connection between batches*
+
+    **Key Arguments**
+
+    - ``transientsMetadataList`` -- the mini-batch of transient metadata to crossmatch
+    - ``colMaps`` -- dictionary of dictionaries with the name of the database-view (e.g. `tcs_view_agn_milliquas_v4_5`) as the key and the column-name dictary map as value (`{view_name: {columnMap}}`).
+
+    **Return**
+
+    - ``result`` -- dictionary with the ``crossmatches``, the number of ``transients`` in the mini-batch, their ``transientIds`` and the wall-clock ``seconds`` taken
+    """
+    import time
+    from fundamentals.mysql import database
+    from sherlock import transient_catalogue_crossmatch
+
+    global workerCataloguesDbConn
+
+    log.debug('starting the ``_crossmatch_transient_batch`` function')
+
+    start_time = time.time()
+
+    if "workerCataloguesDbConn" not in globals() or not workerCataloguesDbConn:
+        workerCataloguesDbConn = database(
+            log=log,
+            dbSettings=settings["database settings"]["static catalogues"]
+        ).connect()
+    else:
+        workerCataloguesDbConn.ping(reconnect=True)
+
+    cm = transient_catalogue_crossmatch(
+        log=log,
+        dbConn=workerCataloguesDbConn,
+        transients=transientsMetadataList,
+        settings=settings,
+        colMaps=colMaps
+    )
+    crossmatches = cm.match()
+
+    if "dlr_testing" in settings and settings["dlr_testing"]:
+        crossmatches = add_DLR2(crossmatches)
+
+    log.debug('completed the ``_crossmatch_transient_batch`` function')
+
+    return {
+        "crossmatches": crossmatches,
+        "transients": len(transientsMetadataList),
+        "transientIds": [t["id"] for t in transientsMetadataList],
+        "seconds": time.time() - start_time
+    }
+
+
 def add_DLR(catalogueMatches):
     """*Calculate the Directional Light Radius*
 